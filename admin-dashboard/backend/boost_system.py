@@ -5,13 +5,14 @@ Credits, Payments, and Boost Management
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Query, Body
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 from enum import Enum
 import uuid
 import os
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 
 # Import Stripe integration
 from emergentintegrations.payments.stripe.checkout import (
@@ -23,6 +24,8 @@ from emergentintegrations.payments.stripe.checkout import (
 
 logger = logging.getLogger("boost_system")
 
+BOOST_EXPIRY_BATCH_SIZE = int(os.environ.get("BOOST_EXPIRY_BATCH_SIZE", "1000"))
+
 # =============================================================================
 # ENUMS
 # =============================================================================
@@ -216,8 +219,10 @@ class AdminCreditAdjustRequest(BaseModel):
 # =============================================================================
 
 class BoostSystem:
-    def __init__(self, db):
+    def __init__(self, db, on_listings_changed: Optional[Callable[[List[str]], Awaitable[Any]]] = None):
         self.db = db
+        # Called with the ids of listings whose boost state changed (cache invalidation)
+        self.on_listings_changed = on_listings_changed
         self.stripe_api_key = os.environ.get('STRIPE_API_KEY', 'sk_test_emergent')
         
     async def initialize_default_data(self):
@@ -807,7 +812,9 @@ class BoostSystem:
                     "is_active": True
                 },
                 "is_boosted": True,
-                "boost_priority": pricing.get("priority", 1)
+                "boost_priority": pricing.get("priority", 1),
+                # Stored sort key for keyset pagination (main backend utils/pagination.py)
+                "boost_tier": 1 + max(pricing.get("priority", 1), 0)
             }}
         )
         
@@ -830,43 +837,74 @@ class BoostSystem:
         boosts = await self.db.listing_boosts.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
         return boosts
     
-    async def expire_boosts(self) -> int:
-        """Expire all boosts that have passed their expiration time (called by cron job)"""
+    async def expire_boosts(self, batch_size: int = BOOST_EXPIRY_BATCH_SIZE) -> int:
+        """
+        Expire all boosts that have passed their expiration time (called by cron job).
+        Set-based, mirroring the main backend's utils/boost_expiry.py: per batch one
+        update_many on listing_boosts, one aggregation for the boosts still active on
+        the affected listings and one bulk_write of listing flags. Batches repeat
+        until the backlog is drained.
+        """
         now = datetime.now(timezone.utc)
-        
-        # Find expired boosts
-        expired = await self.db.listing_boosts.find({
+        query = {
             "status": BoostStatus.ACTIVE,
-            "expires_at": {"$lte": now.isoformat()}
-        }).to_list(1000)
+            # expires_at is a BSON date when written here, an ISO string by the main backend
+            "$or": [
+                {"expires_at": {"$lte": now}},
+                {"expires_at": {"$lte": now.isoformat()}}
+            ]
+        }
         
         count = 0
-        for boost in expired:
-            # Update boost status
-            await self.db.listing_boosts.update_one(
-                {"id": boost["id"]},
-                {"$set": {"status": BoostStatus.EXPIRED}}
-            )
+        while True:
+            expired = await self.db.listing_boosts.find(
+                query, {"_id": 0, "id": 1, "listing_id": 1, "boost_type": 1}
+            ).sort("expires_at", 1).limit(batch_size).to_list(batch_size)
+            if not expired:
+                break
             
-            # Update listing
-            await self.db.listings.update_one(
-                {"id": boost["listing_id"]},
-                {"$unset": {f"boosts.{boost['boost_type']}": ""}}
+            result = await self.db.listing_boosts.update_many(
+                {"id": {"$in": [b["id"] for b in expired]}, "status": BoostStatus.ACTIVE},
+                {"$set": {"status": BoostStatus.EXPIRED, "expired_at": now}}
             )
+            count += result.modified_count
             
-            # Check if listing has any other active boosts
-            remaining_boosts = await self.db.listing_boosts.find_one({
-                "listing_id": boost["listing_id"],
-                "status": BoostStatus.ACTIVE
-            })
+            # Boost types still active per affected listing
+            expired_types: Dict[str, set] = {}
+            for boost in expired:
+                if boost.get("listing_id"):
+                    expired_types.setdefault(boost["listing_id"], set()).add(boost.get("boost_type"))
+            still_active: Dict[str, set] = {}
+            if expired_types:
+                async for row in self.db.listing_boosts.aggregate([
+                    {"$match": {"listing_id": {"$in": list(expired_types)}, "status": BoostStatus.ACTIVE}},
+                    {"$group": {"_id": "$listing_id", "types": {"$addToSet": "$boost_type"}}}
+                ]):
+                    still_active[row["_id"]] = set(row.get("types", []))
             
-            if not remaining_boosts:
-                await self.db.listings.update_one(
-                    {"id": boost["listing_id"]},
-                    {"$set": {"is_boosted": False, "boost_priority": 0}}
-                )
+            # Unset expired types (unless re-boosted with the same type); clear flags when none remain
+            ops = []
+            for listing_id, types in expired_types.items():
+                active_types = still_active.get(listing_id)
+                update: Dict[str, Any] = {}
+                unset = {f"boosts.{t}": "" for t in sorted(t for t in types - (active_types or set()) if t)}
+                if unset:
+                    update["$unset"] = unset
+                if active_types is None:
+                    update["$set"] = {"is_boosted": False, "boost_priority": 0, "boost_tier": 0}
+                if update:
+                    ops.append(UpdateOne({"id": listing_id}, update))
+            if ops:
+                await self.db.listings.bulk_write(ops, ordered=False)
+            
+            if self.on_listings_changed and expired_types:
+                try:
+                    await self.on_listings_changed(list(expired_types))
+                except Exception as e:
+                    logger.error(f"Boost expiry listener failed: {e}")
             
-            count += 1
+            if len(expired) < batch_size:
+                break
         
         return count
     
@@ -972,11 +1010,11 @@ class BoostSystem:
 # CREATE ROUTER
 # =============================================================================
 
-def create_boost_router(db, get_current_user, get_current_admin):
+def create_boost_router(db, get_current_user, get_current_admin, on_listings_changed=None):
     """Create the boost system router with dependencies"""
     
     router = APIRouter(prefix="/boost", tags=["Boost System"])
-    boost_system = BoostSystem(db)
+    boost_system = BoostSystem(db, on_listings_changed=on_listings_changed)
     
     # Initialize default data on startup
     @router.on_event("startup")
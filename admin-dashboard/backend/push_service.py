@@ -7,111 +7,223 @@ This module provides integration with:
 3. OneSignal for cross-platform delivery
 
 The default provider for this app is Expo Push, since the mobile app is built with Expo.
+
+Large sends go through PushDispatchJob: recipients are split into provider-sized
+chunks (100 for Expo, 500 for FCM multicast) and sent concurrently over a shared
+keep-alive client, transient failures are retried with backoff, and tokens the
+provider reports as unregistered are pruned in bulk. Progress is kept in
+push_dispatch_jobs. EXPO_PUSH_URL can point at tests/fake_expo_push_server.py.
 """
 
 import os
+import uuid
+import random
+import asyncio
 import logging
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable, Tuple
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 EXPO_PUSH_ENABLED = os.environ.get("EXPO_PUSH_ENABLED", "true").lower() == "true"
+EXPO_PUSH_URL = os.environ.get("EXPO_PUSH_URL", "https://exp.host/--/api/v2/push/send")
+EXPO_ACCESS_TOKEN = os.environ.get("EXPO_ACCESS_TOKEN", "")
+EXPO_PUSH_CHUNK_SIZE = int(os.environ.get("EXPO_PUSH_CHUNK_SIZE", "100"))  # Expo accepts at most 100 messages per request
 
 FIREBASE_ENABLED = os.environ.get("FIREBASE_ENABLED", "false").lower() == "true"
 FIREBASE_CREDENTIALS_PATH = os.environ.get("FIREBASE_CREDENTIALS_PATH", "")
+FCM_MULTICAST_CHUNK_SIZE = int(os.environ.get("FCM_MULTICAST_CHUNK_SIZE", "500"))  # FCM multicast limit
 
 ONESIGNAL_ENABLED = os.environ.get("ONESIGNAL_ENABLED", "false").lower() == "true"
 ONESIGNAL_APP_ID = os.environ.get("ONESIGNAL_APP_ID", "")
 ONESIGNAL_API_KEY = os.environ.get("ONESIGNAL_API_KEY", "")
 
+# Dispatch tuning
+PUSH_CONCURRENCY = int(os.environ.get("PUSH_CONCURRENCY", "6"))  # chunks in flight per provider
+PUSH_MAX_RETRIES = int(os.environ.get("PUSH_MAX_RETRIES", "3"))
+PUSH_RETRY_BACKOFF = float(os.environ.get("PUSH_RETRY_BACKOFF", "0.5"))  # seconds, doubled per attempt
+PUSH_RETRY_MAX_DELAY = float(os.environ.get("PUSH_RETRY_MAX_DELAY", "10"))
+PUSH_MAX_ERRORS_REPORTED = 50
+PUSH_DISPATCH_USER_BATCH = int(os.environ.get("PUSH_DISPATCH_USER_BATCH", "1000"))
+PUSH_PROGRESS_INTERVAL = float(os.environ.get("PUSH_PROGRESS_INTERVAL", "1"))  # seconds between progress writes
+# A queued/running job with no progress write for this long belongs to a process that died
+PUSH_JOB_STALE_AFTER = int(os.environ.get("PUSH_JOB_STALE_AFTER", "300"))  # seconds
+
 # Firebase Admin SDK (lazy loaded)
 firebase_app = None
 
+# Shared keep-alive client for push providers (created on first use)
+_http_client: Optional[httpx.AsyncClient] = None
+
+ProgressCallback = Callable[[Dict[str, int]], Awaitable[None]]
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_connections=PUSH_CONCURRENCY * 2, max_keepalive_connections=PUSH_CONCURRENCY * 2),
+            http2=False
+        )
+    return _http_client
+
+
+async def close_push_client():
+    """Close the shared HTTP client (app shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), PUSH_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    delay = PUSH_RETRY_BACKOFF * (2 ** attempt)
+    return min(delay * random.uniform(0.5, 1.0), PUSH_RETRY_MAX_DELAY)
+
+
+class _TransientPushError(Exception):
+    def __init__(self, message: str, retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+async def _post_expo_chunk(messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """POST one chunk, retrying throttling, 5xx and connection errors. Returns (tickets, retries)."""
+    headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip, deflate"}
+    if EXPO_ACCESS_TOKEN:
+        headers["Authorization"] = f"Bearer {EXPO_ACCESS_TOKEN}"
+
+    attempt = 0
+    while True:
+        try:
+            response = await _get_http_client().post(EXPO_PUSH_URL, json=messages, headers=headers)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise _TransientPushError(f"HTTP {response.status_code}", response.headers.get("retry-after"))
+            try:
+                result = response.json()
+            except ValueError:
+                # HTML error pages (413, proxy errors) reject the whole chunk
+                return [{"status": "error", "message": f"HTTP {response.status_code}: invalid response body"}
+                        for _ in messages], attempt
+            if not isinstance(result, dict):
+                result = {}
+            if response.status_code != 200 or "data" not in result:
+                errors = result.get("errors") or [{"message": f"HTTP {response.status_code}"}]
+                message = errors[0].get("message", "Request rejected")
+                return [{"status": "error", "message": message} for _ in messages], attempt
+            return result["data"], attempt
+        except (_TransientPushError, httpx.TransportError) as e:
+            if attempt >= PUSH_MAX_RETRIES:
+                return [{"status": "error", "message": f"Gave up after {attempt + 1} attempts: {e}"} for _ in messages], attempt
+            await asyncio.sleep(_retry_delay(attempt, getattr(e, "retry_after", None)))
+            attempt += 1
+
 
 async def send_expo_push_notification(
     push_tokens: List[str],
     title: str,
     body: str,
     data: Optional[Dict[str, Any]] = None,
-    channel_id: str = "default"
+    channel_id: str = "default",
+    on_progress: Optional[ProgressCallback] = None
 ) -> Dict[str, Any]:
     """
     Send push notifications via Expo Push Service
     
+    Tokens are sent in chunks of EXPO_PUSH_CHUNK_SIZE, up to PUSH_CONCURRENCY
+    chunks at a time over a shared client. Throttling, 5xx and connection
+    errors are retried with backoff.
+    
     Args:
         push_tokens: List of Expo push tokens (ExponentPushToken[xxx])
         title: Notification title
         body: Notification body text
         data: Optional data payload for deep linking
         channel_id: Android notification channel
+        on_progress: Optional coroutine called with per-chunk counts
     
     Returns:
-        Result dict with success/failure info
+        Result dict with success/failure info and the tokens Expo reported as
+        DeviceNotRegistered (to be pruned by the caller)
     """
     if not push_tokens:
         return {"success": 0, "failure": 0, "reason": "No tokens provided"}
     
     # Filter valid Expo tokens
-    valid_tokens = [t for t in push_tokens if t and t.startswith("ExponentPushToken")]
+    valid_tokens = list(dict.fromkeys(t for t in push_tokens if t and t.startswith("ExponentPushToken")))
     
     if not valid_tokens:
         logger.info("No valid Expo push tokens found")
         return {"success": 0, "failure": len(push_tokens), "reason": "No valid Expo tokens"}
     
-    try:
-        # Build messages
-        messages = []
-        for token in valid_tokens:
-            message = {
-                "to": token,
-                "title": title,
-                "body": body,
-                "sound": "default",
-                "channelId": channel_id,
-            }
-            if data:
-                message["data"] = data
-            messages.append(message)
-        
-        # Send to Expo Push API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://exp.host/--/api/v2/push/send",
-                json=messages,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            result = response.json()
-            
-            success_count = 0
-            failure_count = 0
-            errors = []
-            
-            if "data" in result:
-                for i, ticket in enumerate(result["data"]):
-                    if ticket.get("status") == "ok":
-                        success_count += 1
-                    else:
-                        failure_count += 1
-                        if ticket.get("message"):
-                            errors.append({
-                                "token": valid_tokens[i][:30] + "...",
-                                "error": ticket.get("message")
-                            })
-            
-            logger.info(f"Expo push sent: {success_count} success, {failure_count} failed")
-            
-            return {
-                "success": success_count,
-                "failure": failure_count,
-                "errors": errors if errors else None
-            }
-    except Exception as e:
-        logger.error(f"Expo push failed: {e}")
-        return {"success": 0, "failure": len(valid_tokens), "error": str(e)}
+    # Build messages
+    messages = []
+    for token in valid_tokens:
+        message = {
+            "to": token,
+            "title": title,
+            "body": body,
+            "sound": "default",
+            "channelId": channel_id,
+        }
+        if data:
+            message["data"] = data
+        messages.append(message)
+    
+    totals = {"success": 0, "failure": 0, "retries": 0}
+    errors: List[Dict[str, str]] = []
+    unregistered: List[str] = []
+    semaphore = asyncio.Semaphore(PUSH_CONCURRENCY)
+    
+    async def send_chunk(chunk: List[Dict[str, Any]]):
+        async with semaphore:
+            tickets, retries = await _post_expo_chunk(chunk)
+        counts = {"success": 0, "failure": 0, "unregistered": 0}
+        for message, ticket in zip(chunk, tickets):
+            if ticket.get("status") == "ok":
+                counts["success"] += 1
+                continue
+            counts["failure"] += 1
+            if (ticket.get("details") or {}).get("error") == "DeviceNotRegistered":
+                counts["unregistered"] += 1
+                unregistered.append(message["to"])
+            elif ticket.get("message") and len(errors) < PUSH_MAX_ERRORS_REPORTED:
+                errors.append({"token": message["to"][:30] + "...", "error": ticket["message"]})
+        totals["success"] += counts["success"]
+        totals["failure"] += counts["failure"]
+        totals["retries"] += retries
+        if on_progress:
+            await on_progress(counts)
+    
+    chunks = _chunks(messages, EXPO_PUSH_CHUNK_SIZE)
+    await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+    
+    logger.info(
+        f"Expo push sent: {totals['success']} success, {totals['failure']} failed "
+        f"({len(chunks)} requests, {totals['retries']} retries, {len(unregistered)} unregistered)"
+    )
+    
+    return {
+        "success": totals["success"],
+        "failure": totals["failure"],
+        "requests": len(chunks),
+        "retries": totals["retries"],
+        "unregistered_tokens": unregistered,
+        "errors": errors if errors else None
+    }
+
 
 def init_firebase():
     """Initialize Firebase Admin SDK"""
@@ -145,57 +257,93 @@ async def send_fcm_notification(
     title: str,
     body: str,
     data: Optional[Dict[str, str]] = None,
-    image_url: Optional[str] = None
+    image_url: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None
 ) -> Dict[str, Any]:
     """
     Send push notification via Firebase Cloud Messaging
     
+    Tokens are sent as multicasts of FCM_MULTICAST_CHUNK_SIZE, up to
+    PUSH_CONCURRENCY at a time (the SDK call is blocking, so each runs in a
+    worker thread). A multicast that fails as a whole is retried with backoff.
+    
     Args:
         tokens: List of FCM device tokens
         title: Notification title
         body: Notification body text
         data: Optional data payload
         image_url: Optional image URL for rich notifications
+        on_progress: Optional coroutine called with per-chunk counts
     
     Returns:
-        Result dict with success/failure counts
+        Result dict with success/failure counts and unregistered tokens
     """
     if not FIREBASE_ENABLED:
         logger.info("FCM disabled - notification not sent")
         return {"success": 0, "failure": len(tokens), "reason": "FCM disabled"}
     
-    if not init_firebase():
+    if not init_firebase() and not firebase_app:
         return {"success": 0, "failure": len(tokens), "reason": "FCM not initialized"}
     
     try:
         from firebase_admin import messaging
-        
-        notification = messaging.Notification(
-            title=title,
-            body=body,
-            image=image_url
-        )
-        
-        # Send to multiple tokens
-        message = messaging.MulticastMessage(
-            notification=notification,
-            data=data or {},
-            tokens=tokens
-        )
-        
-        response = messaging.send_multicast(message)
-        
-        return {
-            "success": response.success_count,
-            "failure": response.failure_count,
-            "responses": [
-                {"success": r.success, "message_id": r.message_id if r.success else None}
-                for r in response.responses
-            ]
-        }
-    except Exception as e:
-        logger.error(f"FCM send failed: {e}")
-        return {"success": 0, "failure": len(tokens), "error": str(e)}
+    except ImportError:
+        return {"success": 0, "failure": len(tokens), "reason": "firebase-admin package not installed"}
+    
+    notification = messaging.Notification(title=title, body=body, image=image_url)
+    send_multicast = getattr(messaging, "send_each_for_multicast", None) or messaging.send_multicast
+    
+    totals = {"success": 0, "failure": 0, "retries": 0}
+    errors: List[Dict[str, str]] = []
+    unregistered: List[str] = []
+    semaphore = asyncio.Semaphore(PUSH_CONCURRENCY)
+    
+    async def send_chunk(chunk: List[str]):
+        message = messaging.MulticastMessage(notification=notification, data=data or {}, tokens=chunk)
+        counts = {"success": 0, "failure": 0, "unregistered": 0}
+        attempt = 0
+        async with semaphore:
+            while True:
+                try:
+                    response = await asyncio.to_thread(send_multicast, message)
+                    break
+                except Exception as e:
+                    if attempt >= PUSH_MAX_RETRIES:
+                        response = None
+                        counts["failure"] = len(chunk)
+                        if len(errors) < PUSH_MAX_ERRORS_REPORTED:
+                            errors.append({"token": f"{len(chunk)} tokens", "error": str(e)})
+                        break
+                    await asyncio.sleep(_retry_delay(attempt))
+                    attempt += 1
+        if response is not None:
+            for token, r in zip(chunk, response.responses):
+                if r.success:
+                    counts["success"] += 1
+                    continue
+                counts["failure"] += 1
+                if isinstance(r.exception, messaging.UnregisteredError):
+                    counts["unregistered"] += 1
+                    unregistered.append(token)
+                elif len(errors) < PUSH_MAX_ERRORS_REPORTED:
+                    errors.append({"token": token[:30] + "...", "error": str(r.exception)})
+        totals["success"] += counts["success"]
+        totals["failure"] += counts["failure"]
+        totals["retries"] += attempt
+        if on_progress:
+            await on_progress(counts)
+    
+    chunks = _chunks(list(dict.fromkeys(tokens)), FCM_MULTICAST_CHUNK_SIZE)
+    await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+    
+    return {
+        "success": totals["success"],
+        "failure": totals["failure"],
+        "requests": len(chunks),
+        "retries": totals["retries"],
+        "unregistered_tokens": unregistered,
+        "errors": errors if errors else None
+    }
 
 
 async def send_onesignal_notification(
@@ -254,29 +402,28 @@ async def send_onesignal_notification(
         if url:
             payload["url"] = url
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://onesignal.com/api/v1/notifications",
-                json=payload,
-                headers={
-                    "Authorization": f"Basic {ONESIGNAL_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-            )
-            
-            result = response.json()
-            
-            if response.status_code == 200:
-                return {
-                    "success": True,
-                    "id": result.get("id"),
-                    "recipients": result.get("recipients", 0)
-                }
-            else:
-                return {
-                    "success": False,
-                    "errors": result.get("errors", [])
-                }
+        response = await _get_http_client().post(
+            "https://onesignal.com/api/v1/notifications",
+            json=payload,
+            headers={
+                "Authorization": f"Basic {ONESIGNAL_API_KEY}",
+                "Content-Type": "application/json"
+            }
+        )
+        
+        result = response.json()
+        
+        if response.status_code == 200:
+            return {
+                "success": True,
+                "id": result.get("id"),
+                "recipients": result.get("recipients", 0)
+            }
+        else:
+            return {
+                "success": False,
+                "errors": result.get("errors", [])
+            }
     except Exception as e:
         logger.error(f"OneSignal send failed: {e}")
         return {"success": False, "error": str(e)}
@@ -290,7 +437,9 @@ async def send_push_notification(
     expo_tokens: Optional[List[str]] = None,
     segments: Optional[List[str]] = None,
     data: Optional[Dict[str, Any]] = None,
-    image_url: Optional[str] = None
+    image_url: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    include_onesignal: bool = True
 ) -> Dict[str, Any]:
     """
     Send push notification using available provider (Expo, FCM, or OneSignal)
@@ -307,6 +456,8 @@ async def send_push_notification(
         segments: List of segments to target
         data: Optional data payload
         image_url: Optional image URL
+        on_progress: Optional coroutine called with per-chunk counts
+        include_onesignal: False when the caller sends to OneSignal itself
     
     Returns:
         Result dict with provider and delivery info
@@ -323,7 +474,8 @@ async def send_push_notification(
             push_tokens=expo_tokens,
             title=title,
             body=body,
-            data=data
+            data=data,
+            on_progress=on_progress
         )
         results["providers"].append({"provider": "expo", **expo_result})
     
@@ -334,12 +486,13 @@ async def send_push_notification(
             title=title,
             body=body,
             data={k: str(v) for k, v in (data or {}).items()},
-            image_url=image_url
+            image_url=image_url,
+            on_progress=on_progress
         )
         results["providers"].append({"provider": "fcm", **fcm_result})
     
     # Try OneSignal if enabled
-    if ONESIGNAL_ENABLED:
+    if ONESIGNAL_ENABLED and include_onesignal:
         onesignal_result = await send_onesignal_notification(
             user_ids=user_ids,
             segments=segments,
@@ -391,45 +544,266 @@ async def get_user_tokens(db, user_ids: List[str]) -> Dict[str, List[str]]:
     1. users collection -> push_token field (Expo tokens from mobile app)
     2. user_device_tokens collection -> token field (FCM/other tokens)
     """
-    expo_tokens = []
-    fcm_tokens = []
+    expo_tokens: Dict[str, None] = {}
+    fcm_tokens: Dict[str, None] = {}
     
     # Get Expo tokens from users collection (mobile app stores them here)
     users = await db.users.find(
         {"user_id": {"$in": user_ids}, "push_token": {"$exists": True, "$ne": None}},
         {"push_token": 1}
-    ).to_list(10000)
+    ).to_list(length=None)
     
     for user in users:
         token = user.get("push_token")
         if token:
             if token.startswith("ExponentPushToken"):
-                expo_tokens.append(token)
+                expo_tokens[token] = None
             else:
-                fcm_tokens.append(token)
+                fcm_tokens[token] = None
     
     # Also check user_device_tokens collection
     device_tokens = await db.user_device_tokens.find(
         {"user_id": {"$in": user_ids}},
         {"token": 1}
-    ).to_list(10000)
+    ).to_list(length=None)
     
     for dt in device_tokens:
         token = dt.get("token")
         if token:
             if token.startswith("ExponentPushToken"):
-                if token not in expo_tokens:
-                    expo_tokens.append(token)
+                expo_tokens[token] = None
             else:
-                if token not in fcm_tokens:
-                    fcm_tokens.append(token)
+                fcm_tokens[token] = None
     
     return {
-        "expo_tokens": expo_tokens,
-        "fcm_tokens": fcm_tokens
+        "expo_tokens": list(expo_tokens),
+        "fcm_tokens": list(fcm_tokens)
     }
 
 
 async def remove_device_token(db, user_id: str, token: str):
     """Remove a device token"""
     await db.user_device_tokens.delete_one({"user_id": user_id, "token": token})
+
+
+async def prune_device_tokens(db, tokens: List[str]) -> int:
+    """Remove tokens a provider reported as unregistered, in bulk"""
+    if not tokens:
+        return 0
+    tokens = list(dict.fromkeys(tokens))
+    users_result, devices_result = await asyncio.gather(
+        db.users.update_many({"push_token": {"$in": tokens}}, {"$unset": {"push_token": ""}}),
+        db.user_device_tokens.delete_many({"token": {"$in": tokens}})
+    )
+    logger.info(
+        f"Pruned {len(tokens)} unregistered push tokens "
+        f"({users_result.modified_count} users, {devices_result.deleted_count} device records)"
+    )
+    return len(tokens)
+
+
+# Background dispatch jobs
+_running_jobs: Dict[str, asyncio.Task] = {}
+
+
+class PushDispatchJob:
+    """
+    One background send to a (possibly very large) audience.
+    
+    Users arrive in batches; each batch's tokens are looked up and sent
+    through send_push_notification, so memory stays bounded by the batch
+    size. Counters are written to push_dispatch_jobs at most every
+    PUSH_PROGRESS_INTERVAL seconds, and unregistered tokens are pruned in
+    bulk after each batch.
+    """
+    
+    def __init__(self, db, job_id: str):
+        self.db = db
+        self.job_id = job_id
+        self.counts = {"users_processed": 0, "tokens_total": 0, "sent": 0, "failed": 0, "pruned": 0}
+        self.providers: Dict[str, Dict[str, Any]] = {}
+        self._last_flush = 0.0
+    
+    async def _on_progress(self, chunk_counts: Dict[str, int]):
+        self.counts["sent"] += chunk_counts["success"]
+        self.counts["failed"] += chunk_counts["failure"]
+        await self.flush()
+    
+    async def flush(self, force: bool = False, **fields):
+        now = asyncio.get_running_loop().time()
+        if not force and now - self._last_flush < PUSH_PROGRESS_INTERVAL:
+            return
+        self._last_flush = now
+        await self.db.push_dispatch_jobs.update_one(
+            {"id": self.job_id},
+            {"$set": {**self.counts, **fields, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        )
+    
+    def _merge(self, result: Dict[str, Any]) -> List[str]:
+        unregistered = []
+        for provider in result.get("providers", []):
+            name = provider["provider"]
+            total = self.providers.setdefault(name, {"provider": name})
+            for key, value in provider.items():
+                if key in ("success", "failure", "requests", "retries", "recipients") and isinstance(value, int) and not isinstance(value, bool):
+                    total[key] = total.get(key, 0) + value
+                elif key == "errors" and value:
+                    total["errors"] = (total.get("errors") or []) + value[:PUSH_MAX_ERRORS_REPORTED - len(total.get("errors") or [])]
+                elif key == "unregistered_tokens":
+                    unregistered.extend(value)
+                elif key not in total:
+                    total[key] = value
+        return unregistered
+    
+    async def run(
+        self,
+        user_batches: AsyncIterator[List[str]],
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None,
+        image_url: Optional[str] = None,
+        on_batch: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+        segments: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send to every batch and return a send_push_notification-shaped summary.
+        With `segments`, OneSignal gets one segment send instead of one call
+        per batch of user ids.
+        """
+        await self.flush(force=True, status="running", started_at=datetime.now(timezone.utc).isoformat())
+        async for user_ids in user_batches:
+            if not user_ids:
+                continue
+            tokens = await get_user_tokens(self.db, user_ids)
+            self.counts["tokens_total"] += len(tokens["expo_tokens"]) + len(tokens["fcm_tokens"])
+            if on_batch:
+                await on_batch(user_ids)
+            result = await send_push_notification(
+                title=title,
+                body=body,
+                user_ids=user_ids,
+                expo_tokens=tokens["expo_tokens"],
+                fcm_tokens=tokens["fcm_tokens"],
+                data=data,
+                image_url=image_url,
+                on_progress=self._on_progress,
+                include_onesignal=not segments
+            )
+            self.counts["pruned"] += await prune_device_tokens(self.db, self._merge(result))
+            self.counts["users_processed"] += len(user_ids)
+            await self.flush()
+        
+        if segments and ONESIGNAL_ENABLED:
+            onesignal_result = await send_onesignal_notification(
+                segments=segments, title=title, body=body, data=data, image_url=image_url
+            )
+            self._merge({"providers": [{"provider": "onesignal", **onesignal_result}]})
+        
+        if not self.providers:
+            self.providers["none"] = {"provider": "none", "success": False, "reason": "No recipients with push tokens"}
+        summary = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "title": title,
+            "providers": list(self.providers.values()),
+            **self.counts
+        }
+        await self.flush(force=True, status="completed", finished_at=summary["timestamp"], push_result=summary)
+        return summary
+
+
+async def start_push_job(
+    db,
+    user_batches: AsyncIterator[List[str]],
+    title: str,
+    body: str,
+    data: Optional[Dict[str, Any]] = None,
+    image_url: Optional[str] = None,
+    notification_id: Optional[str] = None,
+    on_batch: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+    on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    on_failed: Optional[Callable[[str], Awaitable[None]]] = None,
+    segments: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Record a push_dispatch_jobs entry and run the send in the background.
+    Returns the job document; poll get_push_job() for progress.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    job_doc = {
+        "id": f"pushjob_{uuid.uuid4().hex[:12]}",
+        "notification_id": notification_id,
+        "title": title,
+        "status": "queued",
+        "users_processed": 0,
+        "tokens_total": 0,
+        "sent": 0,
+        "failed": 0,
+        "pruned": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    await db.push_dispatch_jobs.insert_one(dict(job_doc))
+    job = PushDispatchJob(db, job_doc["id"])
+    
+    async def runner():
+        try:
+            summary = await job.run(user_batches, title, body, data, image_url, on_batch, segments)
+            if on_complete:
+                await on_complete(summary)
+        except asyncio.CancelledError:
+            await job.flush(force=True, status="cancelled", finished_at=datetime.now(timezone.utc).isoformat())
+            if on_failed:
+                try:
+                    await on_failed("Push job cancelled")
+                except Exception as e:
+                    logger.error(f"Push job {job.job_id} cancel callback failed: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Push job {job.job_id} failed: {e}")
+            await job.flush(force=True, status="failed", error=str(e), finished_at=datetime.now(timezone.utc).isoformat())
+            if on_failed:
+                await on_failed(str(e))
+        finally:
+            _running_jobs.pop(job.job_id, None)
+    
+    _running_jobs[job.job_id] = asyncio.create_task(runner())
+    return job_doc
+
+
+async def get_push_job(db, job_id: str) -> Optional[Dict[str, Any]]:
+    return await db.push_dispatch_jobs.find_one({"id": job_id}, {"_id": 0})
+
+
+def _seconds_since(timestamp: Any) -> float:
+    if not timestamp:
+        return float("inf")
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - timestamp).total_seconds()
+
+
+async def push_job_active(db, job_id: Optional[str], claimed_at: Any = None) -> bool:
+    """
+    Whether a send is still in progress: the job is queued or running and
+    has written progress within PUSH_JOB_STALE_AFTER. Without a job id (the
+    claimer died before starting one) only the claim time counts.
+    """
+    if not job_id:
+        return _seconds_since(claimed_at) < PUSH_JOB_STALE_AFTER
+    if job_id in _running_jobs:
+        return True
+    job = await get_push_job(db, job_id)
+    if not job or job.get("status") not in ("queued", "running"):
+        return False
+    return _seconds_since(job.get("updated_at")) < PUSH_JOB_STALE_AFTER
+
+
+async def stop_push_jobs():
+    """Cancel running jobs (marked cancelled) and close the shared client (app shutdown)"""
+    tasks = list(_running_jobs.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_push_client()
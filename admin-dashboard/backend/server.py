@@ -2551,71 +2551,8 @@ async def import_listings_csv(
     file: UploadFile = File(...),
     admin: dict = Depends(require_permission(Permission.MANAGE_LISTINGS))
 ):
-    """Import listings from CSV file"""
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File must be a CSV")
-    
-    content = await file.read()
-    try:
-        import csv
-        import io
-        
-        csv_reader = csv.DictReader(io.StringIO(content.decode('utf-8')))
-        
-        created = 0
-        updated = 0
-        errors = []
-        
-        for row_num, row in enumerate(csv_reader, start=2):
-            try:
-                # Required fields
-                if not row.get('name') or not row.get('price'):
-                    errors.append(f"Row {row_num}: Missing required fields (name, price)")
-                    continue
-                
-                listing_data = {
-                    "name": sanitize_input(row.get('name', '')),
-                    "description": sanitize_input(row.get('description', '')),
-                    "price": float(row.get('price', 0)),
-                    "currency": row.get('currency', 'EUR'),
-                    "category_id": row.get('category_id'),
-                    "location": row.get('location'),
-                    "status": row.get('status', 'active'),
-                    "condition": row.get('condition', 'new'),
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }
-                
-                # Check if listing exists by ID
-                if row.get('id'):
-                    existing = await db.listings.find_one({"id": row['id']})
-                    if existing:
-                        await db.listings.update_one({"id": row['id']}, {"$set": listing_data})
-                        updated += 1
-                        continue
-                
-                # Create new listing
-                listing_data["id"] = f"listing_{uuid.uuid4().hex[:12]}"
-                listing_data["created_at"] = datetime.now(timezone.utc).isoformat()
-                listing_data["views"] = 0
-                listing_data["favorites"] = 0
-                listing_data["images"] = []
-                
-                await db.listings.insert_one(listing_data)
-                created += 1
-                
-            except Exception as e:
-                errors.append(f"Row {row_num}: {str(e)}")
-        
-        return {
-            "success": True,
-            "created": created,
-            "updated": updated,
-            "errors": errors[:10],  # Return first 10 errors
-            "total_errors": len(errors)
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {str(e)}")
+    """Import listings from CSV file (rows with an existing id update that listing)"""
+    return await run_csv_import(file, "listings", admin)
 
 # =============================================================================
 # REPORTS MANAGEMENT ENDPOINTS
@@ -3993,8 +3930,14 @@ async def send_notification(
     request: Request,
     admin: dict = Depends(require_permission(Permission.MANAGE_SETTINGS))
 ):
-    """Send a notification immediately via push notification service"""
-    from push_service import send_push_notification, get_user_tokens
+    """
+    Send a notification via the push notification service.
+    
+    The send runs as a background job (recipients are streamed in batches, so
+    there is no audience cap); poll GET /notifications/{notif_id}/dispatch for
+    progress. The notification moves to "sent" when the job finishes.
+    """
+    from push_service import start_push_job, push_job_active, PUSH_DISPATCH_USER_BATCH
     
     existing = await db.admin_notifications.find_one({"id": notif_id})
     if not existing:
@@ -4003,71 +3946,62 @@ async def send_notification(
     if existing.get("status") == "sent":
         raise HTTPException(status_code=400, detail="Notification already sent")
     
-    now = datetime.now(timezone.utc).isoformat()
-    
-    # Get target users
-    if existing.get("target_type") == "all":
-        users = await db.users.find({}, {"user_id": 1}).to_list(10000)
-        user_ids = [u["user_id"] for u in users]
-        segments = ["All"]
-    elif existing.get("target_ids"):
-        user_ids = existing["target_ids"]
-        users = [{"user_id": uid} for uid in user_ids]
-        segments = None
-    else:
-        users = []
-        user_ids = []
-        segments = None
-    
-    # Get push tokens for users (now returns both expo and fcm tokens)
-    tokens_data = await get_user_tokens(db, user_ids) if user_ids else {"expo_tokens": [], "fcm_tokens": []}
-    
-    # Send push notification
-    push_result = await send_push_notification(
-        title=existing.get("title", ""),
-        body=existing.get("message", ""),
-        user_ids=user_ids,
-        expo_tokens=tokens_data.get("expo_tokens", []),
-        fcm_tokens=tokens_data.get("fcm_tokens", []),
-        segments=segments,
-        data={
-            "notification_id": notif_id,
-            "type": existing.get("type", "broadcast")
-        }
+    # Claim the notification so a double click does not start two sends
+    claim_filter = {"id": notif_id, "status": {"$nin": ["sent", "sending"]}}
+    if existing.get("status") == "sending" and not await push_job_active(
+        db, existing.get("push_job_id"), existing.get("updated_at")
+    ):
+        # The previous send finished without updating the notification or its process died
+        claim_filter = {"id": notif_id, "status": "sending", "updated_at": existing.get("updated_at")}
+    claimed = await db.admin_notifications.update_one(
+        claim_filter,
+        {"$set": {"status": "sending", "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    if claimed.modified_count == 0:
+        raise HTTPException(status_code=409, detail="Notification is already being sent")
     
-    # Update notification status
-    await db.admin_notifications.update_one(
-        {"id": notif_id},
-        {"$set": {
-            "status": "sent", 
-            "sent_at": now, 
-            "updated_at": now,
-            "push_result": push_result
-        }}
-    )
+    now = datetime.now(timezone.utc).isoformat()
+    recipients = 0
+    
+    # Target users, streamed in batches
+    async def user_batches():
+        if existing.get("target_type") == "all":
+            batch = []
+            async for u in db.users.find({}, {"user_id": 1}).batch_size(PUSH_DISPATCH_USER_BATCH):
+                batch.append(u["user_id"])
+                if len(batch) >= PUSH_DISPATCH_USER_BATCH:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        elif existing.get("target_ids"):
+            target_ids = existing["target_ids"]
+            for i in range(0, len(target_ids), PUSH_DISPATCH_USER_BATCH):
+                yield target_ids[i:i + PUSH_DISPATCH_USER_BATCH]
     
     # Create notification records for users (in-app notifications)
     # Insert into both user_notifications (for admin tracking) and notifications (for mobile app)
-    if users:
+    async def create_in_app_records(user_ids: List[str]):
+        nonlocal recipients
+        recipients += len(user_ids)
         # Records for admin dashboard tracking
         user_notification_records = [
             {
                 "id": f"nr_{uuid.uuid4().hex[:12]}",
                 "notification_id": notif_id,
-                "user_id": u["user_id"],
+                "user_id": user_id,
                 "is_read": False,
                 "created_at": now,
             }
-            for u in users
+            for user_id in user_ids
         ]
-        await db.user_notifications.insert_many(user_notification_records)
+        await db.user_notifications.insert_many(user_notification_records, ordered=False)
         
         # Records for mobile app (this is what the app reads)
         mobile_notification_records = [
             {
                 "id": f"notif_{uuid.uuid4().hex[:12]}",
-                "user_id": u["user_id"],
+                "user_id": user_id,
                 "type": existing.get("type", "system"),
                 "title": existing.get("title", ""),
                 "body": existing.get("message", ""),
@@ -4084,25 +4018,86 @@ async def send_notification(
                     "cta_label": existing.get("cta_label"),
                 }
             }
-            for u in users
+            for user_id in user_ids
         ]
-        await db.notifications.insert_many(mobile_notification_records)
+        await db.notifications.insert_many(mobile_notification_records, ordered=False)
     
-    # Broadcast to connected WebSocket clients
-    await broadcast_admin_event("notification_sent", {
-        "notification_id": notif_id,
-        "recipients": len(users),
-        "push_result": push_result
-    })
+    async def finish(push_result: dict):
+        sent_at = datetime.now(timezone.utc).isoformat()
+        # Update notification status
+        await db.admin_notifications.update_one(
+            {"id": notif_id},
+            {"$set": {
+                "status": "sent",
+                "sent_at": sent_at,
+                "updated_at": sent_at,
+                "recipients": recipients,
+                "push_result": push_result
+            }}
+        )
+        # Broadcast to connected WebSocket clients
+        await broadcast_admin_event("notification_sent", {
+            "notification_id": notif_id,
+            "recipients": recipients,
+            "push_result": push_result
+        })
+    
+    async def fail(error: str):
+        await db.admin_notifications.update_one(
+            {"id": notif_id},
+            {"$set": {"status": "failed", "error": error, "recipients": recipients, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        )
+    
+    try:
+        job = await start_push_job(
+            db,
+            user_batches(),
+            title=existing.get("title", ""),
+            body=existing.get("message", ""),
+            data={
+                "notification_id": notif_id,
+                "type": existing.get("type", "broadcast")
+            },
+            notification_id=notif_id,
+            on_batch=create_in_app_records,
+            on_complete=finish,
+            on_failed=fail,
+            # OneSignal reaches everyone through its "All" segment, not per-batch ids
+            segments=["All"] if existing.get("target_type") == "all" else None
+        )
+    except Exception:
+        await db.admin_notifications.update_one(
+            {"id": notif_id}, {"$set": {"status": existing.get("status", "draft")}}
+        )
+        raise
     
-    await log_audit(admin["id"], admin["email"], AuditAction.UPDATE, "notification", notif_id, {"action": "send", "recipients": len(users)}, request)
+    await db.admin_notifications.update_one({"id": notif_id}, {"$set": {"push_job_id": job["id"]}})
+    await log_audit(admin["id"], admin["email"], AuditAction.UPDATE, "notification", notif_id, {"action": "send", "push_job_id": job["id"]}, request)
     
     return {
-        "message": "Notification sent successfully", 
-        "recipients": len(users),
-        "push_result": push_result
+        "message": "Notification queued for sending",
+        "job_id": job["id"],
+        "status": job["status"]
     }
 
+@api_router.get("/notifications/{notif_id}/dispatch")
+async def get_notification_dispatch(
+    notif_id: str,
+    admin: dict = Depends(require_permission(Permission.VIEW_REPORTS))
+):
+    """Progress of the background push job for a notification"""
+    from push_service import get_push_job
+    
+    notif = await db.admin_notifications.find_one({"id": notif_id}, {"_id": 0, "push_job_id": 1})
+    if not notif:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    if not notif.get("push_job_id"):
+        raise HTTPException(status_code=404, detail="Notification has not been sent")
+    job = await get_push_job(db, notif["push_job_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Push job not found")
+    return job
+
 @api_router.delete("/notifications/{notif_id}")
 async def delete_notification(
     notif_id: str,
@@ -4126,70 +4121,165 @@ async def delete_notification(
 # CSV IMPORT ENDPOINTS
 # =============================================================================
 
-@api_router.post("/users/import")
-async def import_users_csv(
-    file: UploadFile = File(...),
-    request: Request = None,
-    admin: dict = Depends(require_permission(Permission.EDIT_USERS))
-):
-    """Import users from CSV file"""
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File must be a CSV")
+# Imports stream the upload to disk and apply it in bulk chunks as a
+# background job (utils/csv_stream.py in the main backend). Small files finish
+# within CSV_IMPORT_WAIT_SECONDS and answer with the final counts; larger ones
+# answer with the running job, polled via /imports/{job_id}.
+CSV_IMPORT_WAIT_SECONDS = float(os.environ.get("CSV_IMPORT_WAIT_SECONDS", "10"))
+
+def _csv_listing_row(row: Dict[str, str]) -> Dict[str, Any]:
+    if not row.get('name') or not row.get('price'):
+        raise RowError("Missing required fields (name, price)", "name" if not row.get('name') else "price")
+    try:
+        price = float(row['price'])
+    except ValueError:
+        raise RowError("Price must be a number", "price", row['price'])
+    fields = {
+        "name": sanitize_input(row['name']),
+        "description": sanitize_input(row.get('description', '')),
+        "price": price,
+        "currency": row.get('currency') or 'EUR',
+        "category_id": row.get('category_id') or None,
+        "location": row.get('location') or None,
+        "status": row.get('status') or 'active',
+        "condition": row.get('condition') or 'new',
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    if row.get('id'):
+        fields["id"] = row['id']
+    return fields
+
+def _csv_new_listing(fields: Dict[str, Any], row_id: str, now: str) -> Dict[str, Any]:
+    return {
+        "id": stable_id("listing_", row_id),
+        "created_at": now,
+        "views": 0,
+        "favorites": 0,
+        "images": [],
+    }
+
+def _csv_user_row(row: Dict[str, str]) -> Dict[str, Any]:
+    email = row.get('email', '')
+    if not email:
+        raise RowError("Missing email", "email")
+    return {
+        "email": email,
+        "name": row.get('name') or email.split('@')[0],
+        "phone": row.get('phone') or None,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+def _csv_new_user(fields: Dict[str, Any], row_id: str, now: str) -> Dict[str, Any]:
+    return {
+        "user_id": stable_id("user_", row_id),
+        "status": "active",
+        "created_at": now,
+        "imported": True,
+    }
+
+def _csv_category_row(row: Dict[str, str]) -> Dict[str, Any]:
+    name = row.get('name', '')
+    if not name:
+        raise RowError("Missing name", "name")
+    slug = name.lower().replace(' ', '-').replace('&', 'and')
+    try:
+        order = int(row.get('order') or 0)
+    except ValueError:
+        raise RowError("Order must be a whole number", "order", row['order'])
+    fields = {
+        "name": name,
+        "slug": re.sub(r'[^a-z0-9-]', '', slug),
+        "parent_id": row.get('parent_id') or None,
+        "order": order,
+        "is_visible": (row.get('is_visible') or 'true').lower() == 'true',
+        "icon": row.get('icon') or None,
+        "color": row.get('color') or None,
+        "description": row.get('description') or None,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if row.get('id'):
+        fields["id"] = row['id']
+    return fields
+
+def _csv_new_category(fields: Dict[str, Any], row_id: str, now: str) -> Dict[str, Any]:
+    return {
+        "id": stable_id("cat_", row_id, 8),
+        "attributes": [],
+        "created_at": now,
+    }
+
+CSV_IMPORT_PERMISSIONS = {
+    "listings": Permission.MANAGE_LISTINGS,
+    "users": Permission.EDIT_USERS,
+    "categories": Permission.MANAGE_CATEGORIES,
+}
+
+try:
+    import sys
+    if '/app/backend' not in sys.path:
+        sys.path.insert(0, '/app/backend')
+    from utils.csv_stream import CsvImportSpec, RowError, StreamingCsvImporter, stable_id
     
-    import csv
-    import io
+    csv_importer = StreamingCsvImporter(db, [
+        CsvImportSpec("listings", "listings", "id", _csv_listing_row, _csv_new_listing, required=("name", "price")),
+        CsvImportSpec("users", "users", "email", _csv_user_row, _csv_new_user, required=("email",), update_existing=False),
+        CsvImportSpec("categories", "admin_categories", "id", _csv_category_row, _csv_new_category, required=("name",)),
+    ])
     
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    reader = csv.DictReader(io.StringIO(decoded))
+    @app.on_event("startup")
+    async def resume_csv_imports():
+        await csv_importer.resume_interrupted()
     
-    imported = 0
-    errors = []
-    now = datetime.now(timezone.utc).isoformat()
+    @app.on_event("shutdown")
+    async def stop_csv_imports():
+        await csv_importer.stop()
     
-    for i, row in enumerate(reader):
-        try:
-            # Validate required fields
-            email = row.get('email', '').strip()
-            name = row.get('name', '').strip()
-            
-            if not email:
-                errors.append(f"Row {i+2}: Missing email")
-                continue
-            
-            # Check if user already exists
-            existing = await db.users.find_one({"email": email})
-            if existing:
-                errors.append(f"Row {i+2}: User with email {email} already exists")
-                continue
-            
-            # Create user
-            user_id = f"user_{uuid.uuid4().hex[:12]}"
-            new_user = {
-                "user_id": user_id,
-                "email": email,
-                "name": name or email.split('@')[0],
-                "phone": row.get('phone', '').strip() or None,
-                "status": "active",
-                "created_at": now,
-                "updated_at": now,
-                "imported": True,
-            }
-            
-            await db.users.insert_one(new_user)
-            imported += 1
-            
-        except Exception as e:
-            errors.append(f"Row {i+2}: {str(e)}")
+    logger.info("Streaming CSV import loaded successfully")
+except ImportError as e:
+    csv_importer = None
+    logger.warning(f"Streaming CSV import not loaded: {e}")
+
+async def run_csv_import(file: UploadFile, kind: str, admin: dict, request: Optional[Request] = None) -> Dict[str, Any]:
+    """Start an import job and wait briefly so small files return their final counts"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="File must be a CSV")
+    if csv_importer is None:
+        raise HTTPException(status_code=503, detail="CSV import is not available")
     
-    await log_audit(admin["id"], admin["email"], AuditAction.CREATE, "users", "bulk_import", {"imported": imported, "errors": len(errors)}, request)
+    try:
+        job = await csv_importer.start(file, kind, admin["id"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {str(e)}")
     
-    return {
-        "message": f"Import completed",
-        "imported": imported,
-        "errors": errors[:10],  # Return first 10 errors
-        "total_errors": len(errors)
-    }
+    summary = await csv_importer.wait(job["id"], CSV_IMPORT_WAIT_SECONDS)
+    summary["success"] = summary["status"] != "failed"
+    summary["message"] = {
+        "completed": "Import completed",
+        "failed": "Import failed",
+    }.get(summary["status"], "Import is running in the background")
+    summary["status_url"] = f"/api/admin/imports/{job['id']}"
+    
+    await log_audit(admin["id"], admin["email"], AuditAction.CREATE, kind, "bulk_import", {"job_id": job["id"], "status": summary["status"], "imported": summary["imported"], "errors": summary["total_errors"]}, request)
+    return summary
+
+async def get_csv_import_job(job_id: str, admin: dict) -> Dict[str, Any]:
+    """The job, if the admin holds the permission for its kind of import"""
+    job = await csv_importer.get_job(job_id) if csv_importer else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    permission = CSV_IMPORT_PERMISSIONS[job["kind"]]
+    if permission not in ROLE_PERMISSIONS.get(AdminRole(admin.get("role")), []):
+        raise HTTPException(status_code=403, detail=f"Permission denied: {permission.value}")
+    return job
+
+@api_router.post("/users/import")
+async def import_users_csv(
+    file: UploadFile = File(...),
+    request: Request = None,
+    admin: dict = Depends(require_permission(Permission.EDIT_USERS))
+):
+    """Import users from CSV file (emails that already exist are reported as errors)"""
+    return await run_csv_import(file, "users", admin, request)
 
 @api_router.post("/categories/import")
 async def import_categories_csv(
@@ -4197,62 +4287,112 @@ async def import_categories_csv(
     request: Request = None,
     admin: dict = Depends(require_permission(Permission.MANAGE_CATEGORIES))
 ):
-    """Import categories from CSV file"""
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File must be a CSV")
-    
-    import csv
-    import io
-    
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    reader = csv.DictReader(io.StringIO(decoded))
-    
-    imported = 0
-    errors = []
-    now = datetime.now(timezone.utc).isoformat()
-    
-    for i, row in enumerate(reader):
-        try:
-            name = row.get('name', '').strip()
-            
-            if not name:
-                errors.append(f"Row {i+2}: Missing name")
-                continue
-            
-            cat_id = f"cat_{uuid.uuid4().hex[:8]}"
-            slug = name.lower().replace(' ', '-').replace('&', 'and')
-            slug = re.sub(r'[^a-z0-9-]', '', slug)
-            
-            new_category = {
-                "id": cat_id,
-                "name": name,
-                "slug": slug,
-                "parent_id": row.get('parent_id', '').strip() or None,
-                "order": int(row.get('order', 0)),
-                "is_visible": row.get('is_visible', 'true').lower() == 'true',
-                "icon": row.get('icon', '').strip() or None,
-                "color": row.get('color', '').strip() or None,
-                "description": row.get('description', '').strip() or None,
-                "attributes": [],
-                "created_at": now,
-                "updated_at": now,
-            }
-            
-            await db.admin_categories.insert_one(new_category)
-            imported += 1
-            
-        except Exception as e:
-            errors.append(f"Row {i+2}: {str(e)}")
-    
-    await log_audit(admin["id"], admin["email"], AuditAction.CREATE, "categories", "bulk_import", {"imported": imported, "errors": len(errors)}, request)
-    
-    return {
-        "message": f"Import completed",
-        "imported": imported,
-        "errors": errors[:10],
-        "total_errors": len(errors)
-    }
+    """Import categories from CSV file (rows with an existing id update that category)"""
+    return await run_csv_import(file, "categories", admin, request)
+
+@api_router.get("/imports/{job_id}")
+async def get_import_job(job_id: str, admin: dict = Depends(get_current_admin)):
+    """Progress and counts of a CSV import job"""
+    await get_csv_import_job(job_id, admin)
+    return await csv_importer.summary(job_id)
+
+@api_router.get("/imports/{job_id}/errors")
+async def download_import_errors(job_id: str, admin: dict = Depends(get_current_admin)):
+    """Every rejected row of a CSV import job, as CSV"""
+    from fastapi.responses import StreamingResponse
+    await get_csv_import_job(job_id, admin)
+    return StreamingResponse(
+        csv_importer.iter_error_report(job_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=import_errors_{job_id}.csv"}
+    )
+
+@api_router.post("/imports/{job_id}/resume")
+async def resume_import_job(job_id: str, admin: dict = Depends(get_current_admin)):
+    """Continue a failed or interrupted CSV import from its last checkpoint"""
+    await get_csv_import_job(job_id, admin)
+    job = await csv_importer.resume(job_id)
+    if not job:
+        raise HTTPException(status_code=409, detail="Import job is not resumable")
+    return await csv_importer.summary(job_id)
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+# The main backend runs its background jobs through a cluster-wide scheduler
+# (utils/scheduler.py); pausing and run requests are fields on the job
+# documents, picked up by whichever worker polls next.
+try:
+    import sys
+    if '/app/backend' not in sys.path:
+        sys.path.insert(0, '/app/backend')
+    from utils.scheduler import get_job_state, list_job_runs, list_job_states, request_job_run, set_job_paused
+    JOB_SCHEDULER_AVAILABLE = True
+except ImportError as e:
+    JOB_SCHEDULER_AVAILABLE = False
+    logger.warning(f"Job scheduler controls not loaded: {e}")
+
+async def get_scheduled_job(name: str) -> Dict[str, Any]:
+    if not JOB_SCHEDULER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Job scheduler is not available")
+    job = await get_job_state(db, name)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.get("/jobs")
+async def list_scheduled_jobs(admin: dict = Depends(require_permission(Permission.VIEW_SETTINGS))):
+    """Background jobs with their schedule, last run and lease state"""
+    if not JOB_SCHEDULER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Job scheduler is not available")
+    return {"jobs": await list_job_states(db)}
+
+@api_router.get("/jobs/{name}/runs")
+async def list_scheduled_job_runs(
+    name: str,
+    limit: int = Query(50, ge=1, le=500),
+    admin: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """Recent runs of a background job, newest first"""
+    await get_scheduled_job(name)
+    return {"runs": await list_job_runs(db, name, limit)}
+
+@api_router.post("/jobs/{name}/run")
+async def run_scheduled_job(
+    request: Request,
+    name: str,
+    admin: dict = Depends(require_permission(Permission.MANAGE_SETTINGS))
+):
+    """Run a background job on the next scheduler poll (also when paused)"""
+    await get_scheduled_job(name)
+    await request_job_run(db, name)
+    await log_audit(admin["id"], admin["email"], AuditAction.UPDATE, "scheduled_job", name, {"run_requested": True}, request)
+    return await get_scheduled_job(name)
+
+@api_router.post("/jobs/{name}/pause")
+async def pause_scheduled_job(
+    request: Request,
+    name: str,
+    admin: dict = Depends(require_permission(Permission.MANAGE_SETTINGS))
+):
+    """Stop scheduled runs of a background job; a run in progress finishes"""
+    await get_scheduled_job(name)
+    await set_job_paused(db, name, True)
+    await log_audit(admin["id"], admin["email"], AuditAction.UPDATE, "scheduled_job", name, {"paused": True}, request)
+    return await get_scheduled_job(name)
+
+@api_router.post("/jobs/{name}/resume")
+async def resume_scheduled_job(
+    request: Request,
+    name: str,
+    admin: dict = Depends(require_permission(Permission.MANAGE_SETTINGS))
+):
+    """Resume scheduled runs of a paused background job"""
+    await get_scheduled_job(name)
+    await set_job_paused(db, name, False)
+    await log_audit(admin["id"], admin["email"], AuditAction.UPDATE, "scheduled_job", name, {"paused": False}, request)
+    return await get_scheduled_job(name)
 
 # =============================================================================
 # WEBSOCKET FOR REAL-TIME NOTIFICATIONS
@@ -4704,10 +4844,25 @@ try:
         except JWTError:
             raise HTTPException(status_code=401, detail="Invalid token")
     
+    async def invalidate_boosted_listings(listing_ids):
+        """Expired boosts reorder feeds; drop the listing pages the main backend cached"""
+        try:
+            import sys
+            if '/app/backend' not in sys.path:
+                sys.path.insert(0, '/app/backend')
+            from utils.cache import cache as listings_cache
+        except ImportError as e:
+            logger.warning(f"Listing caches not invalidated for {len(listing_ids)} listing(s): {e}")
+            return
+        # Without Redis the main backend's caches live in its own process
+        if listings_cache.connected or await listings_cache.connect():
+            await listings_cache.invalidate_listings()
+    
     boost_router, boost_system = create_boost_router(
         db=db,
         get_current_user=get_current_user_for_boost,
-        get_current_admin=get_current_admin
+        get_current_admin=get_current_admin,
+        on_listings_changed=invalidate_boosted_listings
     )
     app.include_router(boost_router, prefix="/api/admin")
     
@@ -7304,6 +7459,12 @@ async def stop_ab_scheduler():
     ab_scheduler_running = False
     logger.info("A/B Winner Scheduler stopped")
 
+@app.on_event("shutdown")
+async def stop_push_dispatch():
+    """Cancel in-flight push jobs and close the shared push client"""
+    from push_service import stop_push_jobs
+    await stop_push_jobs()
+
 @app.get("/api/admin/ab-testing/scheduler-status")
 async def get_scheduler_status(admin: dict = Depends(get_current_admin)):
     """Get status of the A/B testing scheduler"""
@@ -7624,6 +7785,45 @@ async def download_invoice_pdf(invoice_id: str, admin: dict = Depends(get_curren
 # BADGES API
 # =============================================================================
 
+# Maintained badge leaderboard, shared with the main backend through Redis
+try:
+    import sys
+    if '/app/backend' not in sys.path:
+        sys.path.insert(0, '/app/backend')
+    from utils.leaderboard import get_badge_leaderboard
+    from utils.cache import cache as leaderboard_cache
+    
+    badge_leaderboard = get_badge_leaderboard(db)
+    
+    @app.on_event("startup")
+    async def connect_badge_leaderboard():
+        # A per-process board would miss the main backend's awards; only use the shared one
+        global badge_leaderboard
+        if not await leaderboard_cache.connect():
+            badge_leaderboard = None
+            logger.warning("Redis unavailable, badge ranks are computed from user_badges")
+    
+    logger.info("Badge leaderboard loaded successfully")
+except ImportError as e:
+    badge_leaderboard = None
+    logger.warning(f"Badge leaderboard not loaded, ranks are computed from user_badges: {e}")
+
+
+async def get_badge_count_rank(user_id: str) -> Optional[int]:
+    """A user's rank by badges held (None when they hold no badges)."""
+    if badge_leaderboard:
+        return await badge_leaderboard.rank(user_id, "count")
+    
+    own = await db.user_badges.count_documents({"user_id": user_id})
+    if not own:
+        return None
+    ahead = await db.user_badges.aggregate([
+        {"$group": {"_id": "$user_id", "badge_count": {"$sum": 1}}},
+        {"$match": {"badge_count": {"$gt": own}}},
+        {"$count": "total"}
+    ]).to_list(1)
+    return (ahead[0]["total"] if ahead else 0) + 1
+
 @app.get("/api/admin/badges")
 async def get_badges(admin: dict = Depends(get_current_admin)):
     """Get all badge definitions with stats"""
@@ -7747,6 +7947,8 @@ async def delete_badge(badge_id: str, admin: dict = Depends(get_current_admin)):
     
     # Remove from all users
     await db.user_badges.delete_many({"badge_id": badge_id})
+    if badge_leaderboard:
+        await badge_leaderboard.rebuild()
     
     # Log the action
     await db.admin_audit_log.insert_one({
@@ -7823,6 +8025,8 @@ async def award_badge(request: Request, admin: dict = Depends(get_current_admin)
     }
     
     await db.user_badges.insert_one(user_badge)
+    if badge_leaderboard:
+        await badge_leaderboard.record_award(user.get("user_id"), user_badge.get("points_value", 0))
     
     # Update user's badges array
     await db.users.update_one(
@@ -7852,6 +8056,8 @@ async def revoke_badge(user_badge_id: str, admin: dict = Depends(get_current_adm
     
     # Remove the badge
     await db.user_badges.delete_one({"id": user_badge_id})
+    if badge_leaderboard:
+        await badge_leaderboard.record_revoke(user_badge.get("user_id"), user_badge.get("points_value", 0))
     
     # Update user's badges array
     await db.users.update_one(
@@ -8176,22 +8382,27 @@ async def get_admin_leaderboard(
     """Get badge leaderboard with admin controls"""
     skip = (page - 1) * limit
     
-    pipeline = [
-        {"$group": {"_id": "$user_id", "badge_count": {"$sum": 1}}},
-        {"$sort": {"badge_count": -1}},
-        {"$skip": skip},
-        {"$limit": limit}
-    ]
-    
-    leaderboard_data = await db.user_badges.aggregate(pipeline).to_list(limit)
-    
-    # Get total count
-    count_pipeline = [
-        {"$group": {"_id": "$user_id"}},
-        {"$count": "total"}
-    ]
-    count_result = await db.user_badges.aggregate(count_pipeline).to_list(1)
-    total = count_result[0]["total"] if count_result else 0
+    if badge_leaderboard:
+        top = await badge_leaderboard.top("count", skip, limit)
+        leaderboard_data = [{"_id": t["user_id"], "badge_count": t["score"]} for t in top]
+        total = await badge_leaderboard.total("count")
+    else:
+        pipeline = [
+            {"$group": {"_id": "$user_id", "badge_count": {"$sum": 1}}},
+            {"$sort": {"badge_count": -1}},
+            {"$skip": skip},
+            {"$limit": limit}
+        ]
+        
+        leaderboard_data = await db.user_badges.aggregate(pipeline).to_list(limit)
+        
+        # Get total count
+        count_pipeline = [
+            {"$group": {"_id": "$user_id"}},
+            {"$count": "total"}
+        ]
+        count_result = await db.user_badges.aggregate(count_pipeline).to_list(1)
+        total = count_result[0]["total"] if count_result else 0
     
     # Get user details
     user_ids = [item["_id"] for item in leaderboard_data]
@@ -8222,6 +8433,13 @@ async def get_admin_leaderboard(
         }
     }
 
+@app.post("/api/admin/leaderboard/rebuild")
+async def rebuild_badge_leaderboard(admin: dict = Depends(get_current_admin)):
+    """Reconcile the maintained badge leaderboard with user_badges"""
+    if not badge_leaderboard:
+        raise HTTPException(status_code=503, detail="Badge leaderboard not available")
+    return await badge_leaderboard.rebuild()
+
 @app.get("/api/admin/leaderboard/user/{user_id}")
 async def get_user_badge_details(user_id: str, admin: dict = Depends(get_current_admin)):
     """Get detailed badge info for a specific user"""
@@ -8241,13 +8459,7 @@ async def get_user_badge_details(user_id: str, admin: dict = Depends(get_current
     # Get milestones
     milestones = await db.user_milestones.find({"user_id": user_id}, {"_id": 0}).to_list(50)
     
-    # Calculate rank
-    pipeline = [
-        {"$group": {"_id": "$user_id", "badge_count": {"$sum": 1}}},
-        {"$sort": {"badge_count": -1}}
-    ]
-    all_rankings = await db.user_badges.aggregate(pipeline).to_list(10000)
-    user_rank = next((i + 1 for i, r in enumerate(all_rankings) if r["_id"] == user_id), None)
+    user_rank = await get_badge_count_rank(user_id)
     
     return {
         "user": {
@@ -0,0 +1,107 @@
+"""
+Local stand-in for the Expo push API, for dispatcher throughput tests.
+
+Behaves like https://exp.host/--/api/v2/push/send for what the dispatcher
+relies on:
+- rejects requests with more than 100 messages (PUSH_TOO_MANY_NOTIFICATIONS)
+- answers tokens containing "Unregistered" with a DeviceNotRegistered ticket
+- fails every FAIL_EVERY-th request with 503 (0 disables) to exercise retries
+- answers every HTML_ERROR_EVERY-th request with a non-JSON 413 page, like a
+  proxy in front of the API would (0 disables)
+- waits LATENCY seconds per request, like a real round trip
+
+Run standalone and point the admin backend at it:
+    python tests/fake_expo_push_server.py --port 8099
+    EXPO_PUSH_URL=http://127.0.0.1:8099/--/api/v2/push/send
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+
+MAX_MESSAGES = 100
+
+
+class FakeExpoPushServer:
+    def __init__(self, latency: float = 0.02, fail_every: int = 0, html_error_every: int = 0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.html_error_every = html_error_every
+        self.stats = {"requests": 0, "messages": 0, "rejected": 0, "failed": 0, "html_errors": 0,
+                      "max_batch": 0, "max_in_flight": 0}
+        self._in_flight = 0
+        self.app = FastAPI()
+        self.app.post("/--/api/v2/push/send")(self.send)
+        self._server = None
+        self._thread = None
+
+    async def send(self, request: Request):
+        messages = await request.json()
+        self.stats["requests"] += 1
+        # Taken before awaiting, other requests bump the shared counter meanwhile
+        n = self.stats["requests"]
+        self._in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail_every and n % self.fail_every == 0:
+                self.stats["failed"] += 1
+                return JSONResponse({"errors": [{"code": "INTERNAL_SERVER_ERROR"}]}, status_code=503)
+            if self.html_error_every and n % self.html_error_every == 0:
+                self.stats["html_errors"] += 1
+                return HTMLResponse("<html><body><h1>413 Request Entity Too Large</h1></body></html>", status_code=413)
+            if len(messages) > MAX_MESSAGES:
+                self.stats["rejected"] += 1
+                return JSONResponse({"errors": [{
+                    "code": "PUSH_TOO_MANY_NOTIFICATIONS",
+                    "message": f"You are trying to send more than {MAX_MESSAGES} push notifications in one request"
+                }]}, status_code=400)
+            self.stats["messages"] += len(messages)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(messages))
+            tickets = []
+            for i, message in enumerate(messages):
+                if "Unregistered" in message["to"]:
+                    tickets.append({
+                        "status": "error",
+                        "message": f"\"{message['to']}\" is not a registered push notification recipient",
+                        "details": {"error": "DeviceNotRegistered"}
+                    })
+                else:
+                    tickets.append({"status": "ok", "id": f"ticket-{n}-{i}"})
+            return {"data": tickets}
+        finally:
+            self._in_flight -= 1
+
+    def start(self, port: int = 0) -> str:
+        """Serve on a background thread; returns the push URL"""
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/--/api/v2/push/send"
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503")
+    args = parser.parse_args()
+    server = FakeExpoPushServer(args.latency, args.fail_every)
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
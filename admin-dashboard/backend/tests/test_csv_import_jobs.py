@@ -0,0 +1,73 @@
+"""
+Test suite for streaming CSV imports
+Covers the import endpoints' summary, job progress and the row error report
+"""
+
+import pytest
+import requests
+import uuid
+
+# Use the public URL from environment
+BASE_URL = "https://r2-storage-hub.preview.emergentagent.com/api/admin"
+
+# Test credentials
+ADMIN_EMAIL = "admin@marketplace.com"
+ADMIN_PASSWORD = "Admin@123456"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Authorization header for multipart uploads"""
+    response = requests.post(f"{BASE_URL}/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestListingsCsvImport:
+    """Listings import runs as a job and reports rejected rows"""
+
+    def test_import_reports_row_errors(self, auth_headers):
+        tag = uuid.uuid4().hex[:8]
+        csv_content = (
+            "name,price,currency\n"
+            f"TEST_Import_{tag}_a,10,EUR\n"
+            f"TEST_Import_{tag}_b,not-a-price,EUR\n"
+            ",5,EUR\n"
+            f"TEST_Import_{tag}_c,12.5,EUR\n"
+        )
+        files = {"file": ("listings.csv", csv_content, "text/csv")}
+        response = requests.post(f"{BASE_URL}/listings/import", files=files, headers=auth_headers)
+        assert response.status_code == 200, response.text
+
+        data = response.json()
+        assert data["status"] == "completed"
+        assert data["created"] == 2
+        assert data["total_errors"] == 2
+        assert data["errors"][0].startswith("Row 3:")
+        assert data["errors"][1].startswith("Row 4:")
+
+        job = requests.get(f"{BASE_URL}/imports/{data['job_id']}", headers=auth_headers)
+        assert job.status_code == 200
+        assert job.json()["rows_done"] == 4
+        assert job.json()["progress"] == 100
+
+        report = requests.get(f"{BASE_URL}/imports/{data['job_id']}/errors", headers=auth_headers)
+        assert report.status_code == 200
+        lines = report.text.strip().splitlines()
+        assert lines[0] == "row,field,value,error"
+        assert len(lines) == 3
+
+    def test_missing_required_columns_rejected(self, auth_headers):
+        files = {"file": ("listings.csv", "title,cost\nPhone,10\n", "text/csv")}
+        response = requests.post(f"{BASE_URL}/listings/import", files=files, headers=auth_headers)
+        assert response.status_code == 400
+        assert "Missing required columns" in response.json()["detail"]
+
+    def test_completed_job_not_resumable(self, auth_headers):
+        files = {"file": ("listings.csv", f"name,price\nTEST_Import_{uuid.uuid4().hex[:8]},3\n", "text/csv")}
+        data = requests.post(f"{BASE_URL}/listings/import", files=files, headers=auth_headers).json()
+        response = requests.post(f"{BASE_URL}/imports/{data['job_id']}/resume", headers=auth_headers)
+        assert response.status_code == 409
@@ -0,0 +1,132 @@
+"""
+Test the push dispatcher against a local fake Expo push server
+Tests:
+1. Tokens are sent in chunks of at most 100, several requests in flight
+2. 503 responses are retried and every message is delivered
+3. DeviceNotRegistered tokens are reported for pruning
+4. Non-JSON error pages fail only their own chunk
+5. Throughput for a large audience (printed, run with -s)
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("uvicorn")
+pytest.importorskip("httpx")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import push_service  # noqa: E402
+from fake_expo_push_server import FakeExpoPushServer  # noqa: E402
+
+
+def expo_tokens(count: int, unregistered_every: int = 0):
+    return [
+        f"ExponentPushToken[{'Unregistered' if unregistered_every and i % unregistered_every == 0 else 'device'}{i}]"
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def fake_expo(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server = FakeExpoPushServer(**kwargs)
+        monkeypatch.setattr(push_service, "EXPO_PUSH_URL", server.start())
+        monkeypatch.setattr(push_service, "PUSH_RETRY_BACKOFF", 0.01)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def send(tokens):
+    async def run():
+        try:
+            return await push_service.send_expo_push_notification(tokens, "Title", "Body", {"type": "test"})
+        finally:
+            await push_service.close_push_client()
+    return asyncio.run(run())
+
+
+class TestPushDispatchChunking:
+    """send_expo_push_notification - chunked, concurrent delivery"""
+
+    def test_chunks_within_expo_limit(self, fake_expo):
+        """All messages delivered in requests of at most 100"""
+        server = fake_expo(latency=0.05)
+        result = send(expo_tokens(2_050))
+        assert result["success"] == 2_050
+        assert result["failure"] == 0
+        assert result["requests"] == 21
+        assert server.stats["rejected"] == 0
+        assert server.stats["max_batch"] == 100
+        assert server.stats["max_in_flight"] > 1
+
+    def test_duplicate_tokens_sent_once(self, fake_expo):
+        """Duplicate tokens are collapsed"""
+        server = fake_expo(latency=0)
+        result = send(expo_tokens(10) * 3)
+        assert result["success"] == 10
+        assert server.stats["messages"] == 10
+
+
+class TestPushDispatchRetries:
+    """Transient failures are retried with backoff"""
+
+    def test_503_retried(self, fake_expo):
+        """Every 3rd request fails with 503 but all messages are delivered"""
+        server = fake_expo(latency=0, fail_every=3)
+        result = send(expo_tokens(1_000))
+        assert result["success"] == 1_000
+        assert result["retries"] >= 1
+        assert server.stats["failed"] >= 1
+
+
+class TestPushDispatchPruning:
+    """DeviceNotRegistered tokens are returned for bulk pruning"""
+
+    def test_unregistered_tokens_reported(self, fake_expo):
+        """Unregistered tokens are listed, not reported as errors"""
+        fake_expo(latency=0)
+        tokens = expo_tokens(500, unregistered_every=10)
+        result = send(tokens)
+        assert result["success"] == 450
+        assert result["failure"] == 50
+        assert sorted(result["unregistered_tokens"]) == sorted(t for t in tokens if "Unregistered" in t)
+        assert result["errors"] is None
+
+
+class TestPushDispatchRejectedChunks:
+    """A chunk rejected with a non-JSON body does not abort the send"""
+
+    def test_html_error_page_fails_only_its_chunk(self, fake_expo):
+        """Every 4th request gets an HTML 413; the other chunks are delivered"""
+        server = fake_expo(latency=0, html_error_every=4)
+        result = send(expo_tokens(1_000))
+        rejected = server.stats["html_errors"] * 100
+        assert rejected > 0
+        assert result["success"] == 1_000 - rejected
+        assert result["failure"] == rejected
+        assert "invalid response body" in result["errors"][0]["error"]
+
+
+class TestPushDispatchThroughput:
+    """Throughput against the fake server with realistic latency"""
+
+    def test_throughput(self, fake_expo):
+        """50k tokens at 50ms per request"""
+        server = fake_expo(latency=0.05)
+        started = time.perf_counter()
+        result = send(expo_tokens(50_000))
+        elapsed = time.perf_counter() - started
+        assert result["success"] == 50_000
+        print(f"\n50,000 pushes in {elapsed:.2f}s ({50_000 / elapsed:,.0f}/s, "
+              f"{server.stats['requests']} requests, max {server.stats['max_in_flight']} in flight)")
@@ -0,0 +1,70 @@
+"""
+Test suite for background job controls
+Covers listing scheduled jobs, pausing/resuming and manual run requests
+"""
+
+import time
+
+import pytest
+import requests
+
+# Use the public URL from environment
+BASE_URL = "https://r2-storage-hub.preview.emergentagent.com/api/admin"
+
+# Test credentials
+ADMIN_EMAIL = "admin@marketplace.com"
+ADMIN_PASSWORD = "Admin@123456"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(f"{BASE_URL}/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestScheduledJobs:
+    """Jobs registered by the main backend are visible and controllable"""
+
+    def test_list_jobs(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/jobs", headers=auth_headers)
+        assert response.status_code == 200, response.text
+        jobs = {job["name"]: job for job in response.json()["jobs"]}
+        assert "expire_boosts" in jobs
+        assert jobs["expire_boosts"]["schedule"] == "every 60s"
+        assert jobs["weekly_digest"]["schedule"] == "cron 0 9 * * 1"
+
+    def test_pause_run_and_resume(self, auth_headers):
+        name = "expire_boosts"
+        paused = requests.post(f"{BASE_URL}/jobs/{name}/pause", headers=auth_headers)
+        assert paused.status_code == 200, paused.text
+        assert paused.json()["paused"] is True
+
+        # A manual run goes through even while paused
+        before = requests.get(f"{BASE_URL}/jobs/{name}/runs", params={"limit": 1}, headers=auth_headers).json()["runs"]
+        run = requests.post(f"{BASE_URL}/jobs/{name}/run", headers=auth_headers)
+        assert run.status_code == 200
+        assert run.json()["run_requested"] is True
+
+        latest = None
+        for _ in range(30):
+            runs = requests.get(f"{BASE_URL}/jobs/{name}/runs", params={"limit": 1}, headers=auth_headers).json()["runs"]
+            if runs and (not before or runs[0]["id"] != before[0]["id"]):
+                latest = runs[0]
+                break
+            time.sleep(1)
+        assert latest is not None, "Requested run did not happen"
+        assert latest["trigger"] == "manual"
+        assert latest["status"] == "succeeded"
+        assert latest["duration_ms"] >= 0
+
+        resumed = requests.post(f"{BASE_URL}/jobs/{name}/resume", headers=auth_headers)
+        assert resumed.status_code == 200
+        assert resumed.json()["paused"] is False
+
+    def test_unknown_job(self, auth_headers):
+        response = requests.post(f"{BASE_URL}/jobs/no_such_job/run", headers=auth_headers)
+        assert response.status_code == 404
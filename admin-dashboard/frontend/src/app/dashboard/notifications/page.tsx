@@ -61,7 +61,7 @@ interface Notification {
   target_ids?: string[];
   scheduled_at?: string;
   sent_at?: string;
-  status: 'draft' | 'scheduled' | 'sent' | 'failed';
+  status: 'draft' | 'scheduled' | 'sending' | 'sent' | 'failed';
   created_at: string;
   read_count?: number;
   total_recipients?: number;
@@ -12,7 +12,12 @@ import uuid
 import os
 import logging
 import asyncio
-from collections import defaultdict
+
+from utils.analytics_rollups import (
+    AnalyticsRollups, CHAT_EVENT_TYPES, OFFER_EVENT_TYPES, SCOPE_LISTING, SCOPE_SELLER,
+    count_of, summarize,
+)
+from utils.analytics_ingest import analytics_ingestor
 
 # AI Integration for insights
 try:
@@ -189,6 +194,8 @@ class AnalyticsSystem:
     def __init__(self, db):
         self.db = db
         self.llm_key = os.environ.get('EMERGENT_LLM_KEY')
+        self.rollups = AnalyticsRollups(db)
+        analytics_ingestor.attach(db)
     
     async def initialize_default_settings(self):
         """Initialize default analytics settings if not exist"""
@@ -349,11 +356,12 @@ class AnalyticsSystem:
         referrer: Optional[str] = None,
         metadata: Optional[dict] = None
     ) -> dict:
-        """Track an analytics event"""
-        
-        # Check if listing is boosted
-        listing = await self.db.listings.find_one({"id": listing_id})
-        is_boosted = listing.get("is_boosted", False) if listing else False
+        """
+        Track an analytics event.
+        Duplicate checks and boost state are answered from memory; the event,
+        its rollups and the listing view counter are written in batches by
+        analytics_ingestor.
+        """
         
         # Filter self-views
         if viewer_id and viewer_id == seller_id:
@@ -366,17 +374,15 @@ class AnalyticsSystem:
             ip_hash = hashlib.sha256(viewer_ip.encode()).hexdigest()[:16]
         
         # Check for bot/duplicate (simple rate limiting)
-        if ip_hash and event_type == EventType.VIEW:
-            recent_view = await self.db.analytics_events.find_one({
-                "listing_id": listing_id,
-                "viewer_ip_hash": ip_hash,
-                "event_type": "view",
-                "timestamp": {"$gte": (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()}
-            })
-            if recent_view:
-                return {"tracked": False, "reason": "duplicate"}
+        if event_type == EventType.VIEW and analytics_ingestor.is_duplicate_view(listing_id, ip_hash):
+            return {"tracked": False, "reason": "duplicate"}
+        
+        # Check if listing is boosted
+        listing = await analytics_ingestor.listing_info(listing_id)
+        is_boosted = listing.get("is_boosted", False) if listing else False
         
         # Create event
+        now = datetime.now(timezone.utc)
         event = {
             "id": f"evt_{uuid.uuid4().hex[:12]}",
             "listing_id": listing_id,
@@ -388,18 +394,26 @@ class AnalyticsSystem:
             "device_type": device_type,
             "referrer": referrer,
             "is_boosted": is_boosted,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": now.isoformat(),
             "metadata": metadata or {}
         }
+        rollup = {
+            "listing_id": listing_id,
+            "seller_id": seller_id,
+            "event_type": event["event_type"],
+            "timestamp": now,
+            "viewer_key": viewer_id or ip_hash,
+            "is_boosted": is_boosted,
+            "device": device_type,
+            "referrer": referrer,
+            "location": location
+        }
         
-        await self.db.analytics_events.insert_one(event)
+        # Update listing view count (coalesced per listing at flush time)
+        listing_update = {"$inc": {"views": 1}} if event_type == EventType.VIEW else None
         
-        # Update listing view count
-        if event_type == EventType.VIEW:
-            await self.db.listings.update_one(
-                {"id": listing_id},
-                {"$inc": {"views": 1}}
-            )
+        if not await analytics_ingestor.submit(event, rollup, listing_update):
+            return {"tracked": False, "reason": "overloaded"}
         
         return {"tracked": True, "event_id": event["id"]}
     
@@ -412,74 +426,19 @@ class AnalyticsSystem:
         listing_id: str,
         period: TimePeriod = TimePeriod.DAYS_7
     ) -> dict:
-        """Get aggregated metrics for a listing"""
+        """Get aggregated metrics for a listing (from hourly/daily rollup buckets)"""
         
-        # Calculate time range
-        now = datetime.now(timezone.utc)
-        if period == TimePeriod.HOURS_24:
-            start_time = now - timedelta(hours=24)
-        elif period == TimePeriod.DAYS_7:
-            start_time = now - timedelta(days=7)
-        elif period == TimePeriod.DAYS_30:
-            start_time = now - timedelta(days=30)
-        else:
-            start_time = None
-        
-        # Build query
-        query = {"listing_id": listing_id}
-        if start_time:
-            query["timestamp"] = {"$gte": start_time.isoformat()}
-        
-        # Get all events
-        events = await self.db.analytics_events.find(query).to_list(10000)
-        
-        # Aggregate metrics
-        total_views = 0
-        unique_viewers = set()
-        saves = 0
-        chats = 0
-        offers = 0
-        boost_views = 0
-        non_boost_views = 0
-        location_breakdown = defaultdict(int)
-        hourly_views = defaultdict(int)
-        daily_views = defaultdict(int)
-        
-        for event in events:
-            event_type = event.get("event_type")
-            
-            if event_type == "view":
-                total_views += 1
-                if event.get("viewer_id"):
-                    unique_viewers.add(event["viewer_id"])
-                elif event.get("viewer_ip_hash"):
-                    unique_viewers.add(event["viewer_ip_hash"])
-                
-                if event.get("is_boosted"):
-                    boost_views += 1
-                else:
-                    non_boost_views += 1
-                
-                if event.get("location"):
-                    location_breakdown[event["location"]] += 1
-                
-                # Time trends
-                ts = event.get("timestamp")
-                if ts:
-                    if isinstance(ts, str):
-                        ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                    hourly_views[ts.hour] += 1
-                    daily_views[ts.strftime("%Y-%m-%d")] += 1
-            
-            elif event_type == "save":
-                saves += 1
-            elif event_type == "chat_initiated":
-                chats += 1
-            elif event_type == "offer_received":
-                offers += 1
+        summary = summarize(await self.rollups.buckets(SCOPE_LISTING, listing_id, period.value))
+        events = summary["events"]
+        
+        total_views = events.get("view", 0)
+        saves = events.get("save", 0)
+        chats = count_of(events, *CHAT_EVENT_TYPES)
+        offers = count_of(events, *OFFER_EVENT_TYPES)
+        boost_views = summary["views_boosted"]
+        non_boost_views = summary["views_organic"]
         
         # Calculate rates
-        unique_view_count = len(unique_viewers)
         view_to_chat_rate = (chats / total_views * 100) if total_views > 0 else 0
         view_to_offer_rate = (offers / total_views * 100) if total_views > 0 else 0
         
@@ -488,11 +447,13 @@ class AnalyticsSystem:
         if non_boost_views > 0 and boost_views > 0:
             boost_impact = ((boost_views - non_boost_views) / non_boost_views * 100)
         
+        daily_views = summary["daily_views"]
+        
         return {
             "listing_id": listing_id,
             "period": period.value,
             "total_views": total_views,
-            "unique_views": unique_view_count,
+            "unique_views": summary["unique"].get("view", 0),
             "saves": saves,
             "chats_initiated": chats,
             "offers_received": offers,
@@ -501,8 +462,8 @@ class AnalyticsSystem:
             "boost_views": boost_views,
             "non_boost_views": non_boost_views,
             "boost_impact_percent": round(boost_impact, 2),
-            "location_breakdown": dict(location_breakdown),
-            "hourly_trend": [hourly_views.get(h, 0) for h in range(24)],
+            "location_breakdown": {k: v for k, v in summary["location"].items() if k != "unknown"},
+            "hourly_trend": summary["view_hours"],
             "daily_trend": dict(sorted(daily_views.items())[-7:]) if daily_views else {}
         }
     
@@ -511,17 +472,11 @@ class AnalyticsSystem:
         seller_id: str,
         period: TimePeriod = TimePeriod.DAYS_7
     ) -> dict:
-        """Get aggregated metrics for all seller's listings"""
+        """Get aggregated metrics for all seller's listings (from rollup buckets)"""
         
-        # Get all seller's listings
-        listings = await self.db.listings.find(
-            {"user_id": seller_id},
-            {"id": 1}
-        ).to_list(1000)
-        
-        listing_ids = [l["id"] for l in listings]
+        total_listings = await self.db.listings.count_documents({"user_id": seller_id})
         
-        if not listing_ids:
+        if not total_listings:
             return {
                 "seller_id": seller_id,
                 "period": period.value,
@@ -534,49 +489,40 @@ class AnalyticsSystem:
                 "top_listings": []
             }
         
-        # Calculate time range
-        now = datetime.now(timezone.utc)
-        if period == TimePeriod.HOURS_24:
-            start_time = now - timedelta(hours=24)
-        elif period == TimePeriod.DAYS_7:
-            start_time = now - timedelta(days=7)
-        elif period == TimePeriod.DAYS_30:
-            start_time = now - timedelta(days=30)
-        else:
-            start_time = None
-        
-        # Build query
-        query = {"listing_id": {"$in": listing_ids}}
-        if start_time:
-            query["timestamp"] = {"$gte": start_time.isoformat()}
-        
-        # Aggregate per listing
-        pipeline = [
-            {"$match": query},
-            {"$group": {
-                "_id": "$listing_id",
-                "views": {"$sum": {"$cond": [{"$eq": ["$event_type", "view"]}, 1, 0]}},
-                "saves": {"$sum": {"$cond": [{"$eq": ["$event_type", "save"]}, 1, 0]}},
-                "chats": {"$sum": {"$cond": [{"$eq": ["$event_type", "chat_initiated"]}, 1, 0]}},
-                "offers": {"$sum": {"$cond": [{"$eq": ["$event_type", "offer_received"]}, 1, 0]}},
-            }},
-            {"$sort": {"views": -1}}
-        ]
-        
-        results = await self.db.analytics_events.aggregate(pipeline).to_list(1000)
+        summary = summarize(await self.rollups.buckets(SCOPE_SELLER, seller_id, period.value, with_unique=False))
+        events = summary["events"]
         
         # Calculate totals
-        total_views = sum(r["views"] for r in results)
-        total_saves = sum(r["saves"] for r in results)
-        total_chats = sum(r["chats"] for r in results)
-        total_offers = sum(r["offers"] for r in results)
+        total_views = events.get("view", 0)
+        total_saves = events.get("save", 0)
+        total_chats = count_of(events, *CHAT_EVENT_TYPES)
+        total_offers = count_of(events, *OFFER_EVENT_TYPES)
         
         avg_conversion = (total_chats / total_views * 100) if total_views > 0 else 0
         
+        # Per-listing totals, most viewed first
+        results = [
+            {
+                "_id": row["listing_id"],
+                "views": row["events"].get("view", 0),
+                "saves": row["events"].get("save", 0),
+                "chats": count_of(row["events"], *CHAT_EVENT_TYPES),
+            }
+            for row in await self.rollups.per_listing_totals(seller_id, period.value)
+        ]
+        results.sort(key=lambda r: r["views"], reverse=True)
+        
         # Get top listings with details
+        top = results[:5]
+        details = {
+            l["id"]: l for l in await self.db.listings.find(
+                {"id": {"$in": [r["_id"] for r in top]}},
+                {"_id": 0, "id": 1, "title": 1, "images": 1, "price": 1}
+            ).to_list(len(top))
+        }
         top_listings = []
-        for r in results[:5]:
-            listing = await self.db.listings.find_one({"id": r["_id"]}, {"_id": 0, "id": 1, "title": 1, "images": 1, "price": 1})
+        for r in top:
+            listing = details.get(r["_id"])
             if listing:
                 top_listings.append({
                     **listing,
@@ -589,7 +535,7 @@ class AnalyticsSystem:
         return {
             "seller_id": seller_id,
             "period": period.value,
-            "total_listings": len(listing_ids),
+            "total_listings": total_listings,
             "total_views": total_views,
             "total_saves": total_saves,
             "total_chats": total_chats,
@@ -1460,22 +1406,42 @@ class SellerBadgesManager:
 # ROUTER FACTORY
 # =============================================================================
 
-def create_analytics_router(db, get_current_user, get_current_admin, create_notification_func=None):
-    """Create analytics router with all endpoints"""
+def create_analytics_router(db, get_current_user, get_current_admin, create_notification_func=None, scheduler=None):
+    """
+    Create analytics router with all endpoints. With a job scheduler
+    (utils/scheduler.py) the engagement and badge checks run as cluster-wide
+    jobs instead of a loop per worker.
+    """
     
     router = APIRouter(prefix="/analytics", tags=["Analytics"])
     analytics = AnalyticsSystem(db)
     engagement_notifier = EngagementNotificationManager(db, create_notification_func)
     badges_manager = SellerBadgesManager(db, create_notification_func)
     
+    if scheduler is not None:
+        from utils.scheduler import IntervalTrigger
+        
+        async def check_engagement_spikes():
+            """Check listings for engagement spikes and notify their sellers"""
+            await engagement_notifier.load_config()
+            if engagement_notifier.config.enabled:
+                await engagement_notifier.check_engagement_spikes()
+        
+        # Runs every default check_interval_minutes; pause or trigger it from the admin dashboard
+        scheduler.register("engagement_spikes", check_engagement_spikes,
+                           IntervalTrigger(EngagementNotificationConfig().check_interval_minutes * 60), jitter=60)
+        scheduler.register("seller_badges", badges_manager.evaluate_all_sellers,
+                           IntervalTrigger(24 * 60 * 60), jitter=600)
+    
     # Initialize on startup
     @router.on_event("startup")
     async def startup():
         await analytics.initialize_default_settings()
         await engagement_notifier.load_config()
-        await engagement_notifier.start_background_task()
         await badges_manager.initialize_badges()
-        await badges_manager.start_background_task()
+        if scheduler is None:
+            await engagement_notifier.start_background_task()
+            await badges_manager.start_background_task()
     
     @router.on_event("shutdown")
     async def shutdown():
@@ -1749,7 +1715,7 @@ def create_analytics_router(db, get_current_user, get_current_admin, create_noti
         viewer_ip = request.client.host if request.client else None
         
         # Get listing to find seller
-        listing = await db.listings.find_one({"id": data.listing_id})
+        listing = await analytics_ingestor.listing_info(data.listing_id)
         if not listing:
             raise HTTPException(status_code=404, detail="Listing not found")
         
@@ -12,6 +12,9 @@ import uuid
 import os
 import logging
 
+from utils.pagination import compute_boost_tier
+from utils.event_bus import event_bus, EventTypes
+
 # Import Stripe integration
 from emergentintegrations.payments.stripe.checkout import (
     StripeCheckout, 
@@ -801,9 +804,12 @@ def create_boost_routes(db, get_current_user):
                     "is_active": True
                 },
                 "is_boosted": True,
-                "boost_priority": pricing.get("priority", 1)
+                "boost_priority": pricing.get("priority", 1),
+                "boost_tier": compute_boost_tier(True, pricing.get("priority", 1))
             }}
         )
+        event_bus.emit(EventTypes.LISTING_BOOST_CHANGED, user_id=user["user_id"],
+                       properties={"listing_id": data.listing_id})
         
         boost.pop("_id", None)
         return boost
@@ -10,11 +10,15 @@ from datetime import datetime, timezone, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from enum import Enum
 import uuid
+import calendar
 import logging
 import asyncio
 import os
 from dotenv import load_dotenv
 
+from utils.cache import cache
+from utils.cohort_activity import cohort_start, retention_matrix
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -68,6 +72,10 @@ RETENTION_INTERVALS = {
     "M6": 180
 }
 
+# Signup cohort results are cached per granularity and window
+COHORT_RETENTION_CACHE_TTL = int(os.environ.get("COHORT_RETENTION_CACHE_TTL", "300"))
+COHORT_RETENTION_CACHE_STALE_TTL = int(os.environ.get("COHORT_RETENTION_CACHE_STALE_TTL", "900"))
+
 # ============================================================================
 # PYDANTIC MODELS
 # ============================================================================
@@ -163,7 +171,19 @@ class CohortAnalyticsService:
         }
         await self.events.insert_one(event.copy())
         return event
-    
+
+    async def track_events_batch(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Store many already-built events in one insert_many (event bus sink).
+        Events with an unknown event_type are skipped.
+        """
+        known = {e.value for e in EventType}
+        docs = [dict(event) for event in events if event.get("event_type") in known]
+        if not docs:
+            return 0
+        await self.events.insert_many(docs, ordered=False)
+        return len(docs)
+
     async def get_user_events(
         self,
         user_id: str,
@@ -263,74 +283,67 @@ class CohortAnalyticsService:
         granularity: TimeGranularity = TimeGranularity.MONTHLY,
         months_back: int = 12
     ) -> List[Dict]:
-        """Compute signup-based cohorts with retention data"""
-        now = datetime.now(timezone.utc)
-        cohorts = []
-        
+        """Compute signup-based cohorts with retention data (cached per granularity)"""
+        return await cache.get_or_compute(
+            f"cohort_retention:signup:{granularity.value}:{months_back}",
+            lambda: self._compute_signup_cohorts(granularity, months_back),
+            ttl=COHORT_RETENTION_CACHE_TTL,
+            stale_ttl=COHORT_RETENTION_CACHE_STALE_TTL
+        )
+
+    def _signup_periods(
+        self,
+        granularity: TimeGranularity,
+        months_back: int,
+        now: datetime
+    ) -> List[tuple]:
+        """(period_start, period_key) of the cohorts shown, newest first"""
+        periods = {}
         for month_offset in range(months_back):
-            # Calculate the cohort period
-            cohort_date = now - timedelta(days=30 * month_offset)
-            
+            # Step back whole calendar months (30-day steps skip short months)
+            year, month = divmod(now.year * 12 + now.month - 1 - month_offset, 12)
+            month += 1
+            cohort_date = now.replace(year=year, month=month, day=min(now.day, calendar.monthrange(year, month)[1]))
+            period_start = cohort_start(cohort_date, granularity.value)
             if granularity == TimeGranularity.MONTHLY:
-                period_start = cohort_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                if cohort_date.month == 12:
-                    period_end = period_start.replace(year=period_start.year + 1, month=1)
-                else:
-                    period_end = period_start.replace(month=period_start.month + 1)
                 period_key = period_start.strftime("%Y-%m")
             elif granularity == TimeGranularity.WEEKLY:
-                # Start of week (Monday)
-                period_start = cohort_date - timedelta(days=cohort_date.weekday())
-                period_start = period_start.replace(hour=0, minute=0, second=0, microsecond=0)
-                period_end = period_start + timedelta(days=7)
                 period_key = period_start.strftime("%Y-W%W")
             else:  # Daily
-                period_start = cohort_date.replace(hour=0, minute=0, second=0, microsecond=0)
-                period_end = period_start + timedelta(days=1)
                 period_key = period_start.strftime("%Y-%m-%d")
-            
-            # Get users who signed up in this period
-            cohort_users = await self.users.find({
-                "created_at": {
-                    "$gte": period_start.isoformat(),
-                    "$lt": period_end.isoformat()
-                }
-            }, {"_id": 0, "id": 1, "created_at": 1, "email": 1}).to_list(length=10000)
-            
-            if not cohort_users:
+            periods.setdefault(period_start, period_key)
+        return list(periods.items())
+
+    async def _compute_signup_cohorts(
+        self,
+        granularity: TimeGranularity,
+        months_back: int
+    ) -> List[Dict]:
+        """
+        Retention for every cohort and interval in one aggregation over the
+        per-user activity table. A user is retained at an interval if they
+        were active at or after cohort start + interval.
+        """
+        now = datetime.now(timezone.utc)
+        periods = self._signup_periods(granularity, months_back, now)
+        rows = await retention_matrix(
+            self.db, granularity.value, [start for start, _ in periods], RETENTION_INTERVALS
+        )
+
+        cohorts = []
+        for period_start, period_key in periods:
+            row = rows.get(period_start)
+            if not row or not row["user_count"]:
                 continue
-            
-            user_count = len(cohort_users)
-            user_ids = [u.get("id") for u in cohort_users if u.get("id")]
-            
-            # Calculate retention for each interval
+            user_count = row["user_count"]
+
             retention_data = {}
             for interval_name, days in RETENTION_INTERVALS.items():
-                retention_date = period_start + timedelta(days=days)
-                
                 # Skip future dates
-                if retention_date > now:
+                if period_start + timedelta(days=days) > now:
                     continue
-                
-                # Count users who had activity after the retention date
-                active_count = await self.events.count_documents({
-                    "user_id": {"$in": user_ids},
-                    "timestamp": {"$gte": retention_date.isoformat()}
-                })
-                
-                # Also check listings and transactions
-                listings_count = await self.listings.count_documents({
-                    "seller_id": {"$in": user_ids},
-                    "created_at": {"$gte": retention_date.isoformat()}
-                })
-                
-                total_active = min(active_count + listings_count, user_count)
-                retention_rate = (total_active / user_count * 100) if user_count > 0 else 0
-                retention_data[interval_name] = round(retention_rate, 1)
-            
-            # Calculate additional metrics
-            metrics = await self._calculate_cohort_metrics(user_ids, period_start)
-            
+                retention_data[interval_name] = round(row[interval_name] / user_count * 100, 1)
+
             cohort = {
                 "id": str(uuid.uuid4()),
                 "cohort_key": f"signup_date:{period_key}",
@@ -338,7 +351,13 @@ class CohortAnalyticsService:
                 "period": period_key,
                 "user_count": user_count,
                 "retention_data": retention_data,
-                "metrics": metrics,
+                "metrics": self._cohort_metrics(
+                    user_count,
+                    row["listings_posted"],
+                    row["transactions_completed"],
+                    row["boosts_used"],
+                    row["chats_started"]
+                ),
                 "computed_at": now.isoformat()
             }
             
@@ -356,22 +375,18 @@ class CohortAnalyticsService:
         user_ids = [u.get("id") for u in all_users if u.get("id")]
         
         # Categorize users
+        sellers = set(await self.listings.distinct("seller_id"))
+        buyers = set(await self.transactions.distinct("buyer_id"))
         for user_type in ["seller", "buyer", "hybrid"]:
             if user_type == "seller":
                 # Users with listings but no purchases
-                sellers = await self.listings.distinct("seller_id")
-                buyers = await self.transactions.distinct("buyer_id") if await self.transactions.count_documents({}) > 0 else []
-                type_users = [s for s in sellers if s not in buyers]
+                type_users = list(sellers - buyers)
             elif user_type == "buyer":
                 # Users with purchases but no listings
-                sellers = await self.listings.distinct("seller_id")
-                buyers = await self.transactions.distinct("buyer_id") if await self.transactions.count_documents({}) > 0 else []
-                type_users = [b for b in buyers if b not in sellers]
+                type_users = list(buyers - sellers)
             else:  # hybrid
                 # Users with both listings and purchases
-                sellers = await self.listings.distinct("seller_id")
-                buyers = await self.transactions.distinct("buyer_id") if await self.transactions.count_documents({}) > 0 else []
-                type_users = [u for u in sellers if u in buyers]
+                type_users = list(sellers & buyers)
             
             user_count = len(type_users)
             
@@ -485,13 +500,13 @@ class CohortAnalyticsService:
                 {"seller_id": {"$in": user_ids}}
             ],
             "created_at": {"$gte": since_str}
-        }) if await self.transactions.count_documents({}) > 0 else 0
+        })
         
         # Boosts used
         boosts_count = await self.boosts.count_documents({
             "user_id": {"$in": user_ids},
             "created_at": {"$gte": since_str}
-        }) if await self.boosts.count_documents({}) > 0 else 0
+        })
         
         # Chat events
         chats_count = await self.events.count_documents({
@@ -500,8 +515,18 @@ class CohortAnalyticsService:
             "timestamp": {"$gte": since_str}
         })
         
-        user_count = len(user_ids)
-        
+        return self._cohort_metrics(
+            len(user_ids), listings_count, transactions_count, boosts_count, chats_count
+        )
+
+    @staticmethod
+    def _cohort_metrics(
+        user_count: int,
+        listings_count: int,
+        transactions_count: int,
+        boosts_count: int,
+        chats_count: int
+    ) -> Dict[str, Any]:
         return {
             "listings_posted": listings_count,
             "avg_listings_per_user": round(listings_count / user_count, 2) if user_count > 0 else 0,
@@ -601,7 +626,7 @@ class CohortAnalyticsService:
         })
         
         # Transactions
-        total_transactions = await self.transactions.count_documents({}) if await self.transactions.count_documents({}) > 0 else 0
+        total_transactions = await self.transactions.count_documents({})
         
         return {
             "total_users": total_users,
@@ -23,6 +23,8 @@ import logging
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from utils.feature_flags import feature_flags
+
 logger = logging.getLogger(__name__)
 
 # Global scheduler state
@@ -611,6 +613,7 @@ class ConfigManagerService:
         
         if default_flags:
             await self.feature_flags.insert_many([d.copy() for d in default_flags])
+            await feature_flags.mark_changed()
         
         # Return without _id
         return default_flags
@@ -688,6 +691,7 @@ class ConfigManagerService:
         )
         
         self._invalidate_cache(environment, "feature_flags")
+        await feature_flags.mark_changed()
         return flag_data
     
     async def check_feature_enabled(
@@ -702,66 +706,28 @@ class ConfigManagerService:
         """
         Check if a feature is enabled for a specific context.
         Priority: Seller override > Role > Country > Global
+        Evaluated against the in-process flag snapshot (no database reads).
         """
-        result = {
-            "feature_id": feature_id,
-            "enabled": False,
-            "source": "default",
-            "rollout_percentage": 0
-        }
-        
-        # Check seller-specific override first
-        if seller_id:
-            seller_flag = await self.get_feature_flag(
-                environment, feature_id, FeatureFlagScope.SELLER, seller_id
-            )
-            if seller_flag:
-                result["enabled"] = seller_flag["enabled"]
-                result["source"] = f"seller:{seller_id}"
-                result["rollout_percentage"] = seller_flag.get("rollout_percentage", 100)
-                return result
-        
-        # Check role-specific
-        if user_role:
-            role_flag = await self.get_feature_flag(
-                environment, feature_id, FeatureFlagScope.ROLE, user_role
-            )
-            if role_flag:
-                result["enabled"] = role_flag["enabled"]
-                result["source"] = f"role:{user_role}"
-                result["rollout_percentage"] = role_flag.get("rollout_percentage", 100)
-                return result
-        
-        # Check country-specific
-        if country_code:
-            country_flag = await self.get_feature_flag(
-                environment, feature_id, FeatureFlagScope.COUNTRY, country_code
-            )
-            if country_flag:
-                result["enabled"] = country_flag["enabled"]
-                result["source"] = f"country:{country_code}"
-                result["rollout_percentage"] = country_flag.get("rollout_percentage", 100)
-                return result
-        
-        # Fall back to global
-        global_flag = await self.get_feature_flag(
-            environment, feature_id, FeatureFlagScope.GLOBAL
+        await feature_flags.ensure_loaded(self.db)
+        return feature_flags.evaluate(
+            environment.value, feature_id,
+            country_code=country_code, user_role=user_role, seller_id=seller_id, user_id=user_id
+        )
+    
+    async def evaluate_all_features(
+        self,
+        environment: Environment,
+        country_code: Optional[str] = None,
+        user_role: Optional[str] = None,
+        seller_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Dict]:
+        """Evaluate every known feature for one context"""
+        await feature_flags.ensure_loaded(self.db)
+        return feature_flags.evaluate_all(
+            environment.value, FEATURE_FLAGS,
+            country_code=country_code, user_role=user_role, seller_id=seller_id, user_id=user_id
         )
-        if global_flag:
-            enabled = global_flag["enabled"]
-            rollout = global_flag.get("rollout_percentage", 100)
-            
-            # Apply rollout percentage if user_id provided
-            if enabled and rollout < 100 and user_id:
-                # Deterministic rollout based on user_id hash
-                user_hash = int(hashlib.md5(user_id.encode()).hexdigest()[:8], 16)
-                enabled = (user_hash % 100) < rollout
-            
-            result["enabled"] = enabled
-            result["source"] = "global"
-            result["rollout_percentage"] = rollout
-        
-        return result
     
     # -------------------------------------------------------------------------
     # COUNTRY CONFIGS
@@ -1422,12 +1388,9 @@ class ConfigManagerService:
         country_config = await self.get_config_for_user_location(environment, country_code)
         
         # Check all feature flags
-        feature_states = {}
-        for feature_id in FEATURE_FLAGS:
-            result = await self.check_feature_enabled(
-                environment, feature_id, country_code, user_role, seller_id
-            )
-            feature_states[feature_id] = result
+        feature_states = await self.evaluate_all_features(
+            environment, country_code, user_role, seller_id
+        )
         
         return {
             "simulation": True,
@@ -2471,6 +2434,23 @@ def create_config_manager_router(db):
         """Get all feature flags"""
         return await service.get_feature_flags(environment, scope, scope_value)
     
+    @router.get("/features/{environment}/evaluate")
+    async def evaluate_all_features(
+        environment: Environment,
+        country_code: Optional[str] = None,
+        user_role: Optional[str] = None,
+        seller_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ):
+        """Evaluate all feature flags for a client context in one call"""
+        return {
+            "environment": environment.value,
+            "version": feature_flags.snapshot.version,
+            "features": await service.evaluate_all_features(
+                environment, country_code, user_role, seller_id, user_id
+            )
+        }
+    
     @router.get("/features/{environment}/{feature_id}")
     async def get_feature_flag(
         environment: Environment,
@@ -28,7 +28,9 @@ from pydantic import BaseModel, Field
 from fastapi import APIRouter, HTTPException, UploadFile, File, Body, Query, BackgroundTasks
 from fastapi.responses import Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-import bcrypt
+from pymongo.errors import BulkWriteError
+
+from utils.passwords import hash_passwords_async
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +54,8 @@ REQUIRED_FIELDS = ["email", "first_name", "last_name"]
 OPTIONAL_FIELDS = ["role"]
 ALL_FIELDS = REQUIRED_FIELDS + OPTIONAL_FIELDS
 PASSWORD_LENGTH = 12
+PASSWORD_HASH_CHUNK = 50  # passwords hashed concurrently per CPU pool round, users inserted per insert_many
+EXISTING_LOOKUP_CHUNK = 500  # emails per $in query when checking for existing users
 
 
 class ImportStatus(str, Enum):
@@ -90,9 +94,9 @@ class CSVImportService:
         self.notifications = db.notifications
         self.notify_callback = notify_callback
     
-    def _hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    async def _hash_passwords(self, passwords: List[str]) -> List[str]:
+        """bcrypt-hash passwords concurrently in the CPU pool"""
+        return await hash_passwords_async(passwords)
     
     def _generate_secure_password(self) -> str:
         """Generate a secure random password"""
@@ -315,14 +319,20 @@ class CSVImportService:
                     error=f'Invalid role. Allowed: {", ".join(ALLOWED_ROLES)}'
                 ))
         
-        # Check for duplicates in database
-        for email, row_num in emails_in_csv.items():
-            existing = await self.users.find_one({"email": email})
-            if existing:
-                errors.append(ValidationError(
-                    row=row_num, field='email', value=email,
+        # Check for duplicates in database, one $in query per chunk of emails
+        emails = list(emails_in_csv)
+        existing_errors: List[ValidationError] = []
+        for start in range(0, len(emails), EXISTING_LOOKUP_CHUNK):
+            async for existing in self.users.find(
+                {"email": {"$in": emails[start:start + EXISTING_LOOKUP_CHUNK]}},
+                {"_id": 0, "email": 1, "name": 1, "user_id": 1}
+            ):
+                email = existing["email"]
+                existing_errors.append(ValidationError(
+                    row=emails_in_csv[email], field='email', value=email,
                     error=f'Email already exists in database (user: {existing.get("name", existing.get("user_id"))})'
                 ))
+        errors.extend(sorted(existing_errors, key=lambda e: e.row))
         
         return {
             "total_rows": len(rows),
@@ -351,74 +361,86 @@ class CSVImportService:
                 {"$set": {"status": ImportStatus.IMPORTING, "progress": 0, "send_emails": send_emails}}
             )
             
-            for i, row in enumerate(rows):
+            # Users are created a chunk at a time: passwords hashed together in the
+            # CPU pool, then one insert_many per chunk
+            for start in range(0, len(rows), PASSWORD_HASH_CHUNK):
+                chunk = rows[start:start + PASSWORD_HASH_CHUNK]
+                passwords = [self._generate_secure_password() for _ in chunk]
                 try:
-                    email = row.get('email', '').strip().lower()
-                    first_name = row.get('first_name', '').strip()
-                    last_name = row.get('last_name', '').strip()
-                    role = row.get('role', 'user').strip().lower() or 'user'
+                    hashes = await self._hash_passwords(passwords)
+                    now = datetime.now(timezone.utc).isoformat()
+                    user_docs = []
+                    for row, hashed in zip(chunk, hashes):
+                        first_name = row.get('first_name', '').strip()
+                        last_name = row.get('last_name', '').strip()
+                        user_docs.append({
+                            "user_id": f"user_{uuid.uuid4().hex[:12]}",
+                            "email": row.get('email', '').strip().lower(),
+                            "name": f"{first_name} {last_name}",
+                            "first_name": first_name,
+                            "last_name": last_name,
+                            "password": hashed,
+                            "role": row.get('role', 'user').strip().lower() or 'user',
+                            "must_change_password": True,
+                            "created_at": now,
+                            "updated_at": now,
+                            "status": "active",
+                            "imported_via_csv": True,
+                            "import_job_id": job_id,
+                            "settings": {
+                                "notifications_enabled": True,
+                                "email_notifications": True,
+                                "sms_notifications": False
+                            }
+                        })
                     
-                    # Generate secure password
-                    password = self._generate_secure_password()
-                    
-                    # Create user
-                    user_id = f"user_{uuid.uuid4().hex[:12]}"
-                    user_data = {
-                        "user_id": user_id,
-                        "email": email,
-                        "name": f"{first_name} {last_name}",
-                        "first_name": first_name,
-                        "last_name": last_name,
-                        "password": self._hash_password(password),
-                        "role": role,
-                        "must_change_password": True,
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                        "status": "active",
-                        "imported_via_csv": True,
-                        "import_job_id": job_id,
-                        "settings": {
-                            "notifications_enabled": True,
-                            "email_notifications": True,
-                            "sms_notifications": False
-                        }
-                    }
+                    failed: Dict[int, str] = {}
+                    try:
+                        await self.users.insert_many(user_docs, ordered=False)
+                    except BulkWriteError as e:
+                        failed = {w["index"]: w.get("errmsg", "insert failed") for w in e.details.get("writeErrors", [])}
+                except Exception as e:
+                    # The whole chunk failed (hashing or the database); report every row in it
+                    user_docs = [{"email": str(row.get('email', ''))} for row in chunk]
+                    failed = {i: str(e) for i in range(len(chunk))}
+                
+                for i, (row, user) in enumerate(zip(chunk, user_docs)):
+                    if i in failed:
+                        logger.error(f"Error importing row {row.get('_row_number', start + i)}: {failed[i]}")
+                        result.errors.append(ValidationError(
+                            row=row.get('_row_number', start + i + 2),
+                            field='_row',
+                            value=str(row.get('email', '')),
+                            error=failed[i]
+                        ))
+                        continue
                     
-                    await self.users.insert_one(user_data)
                     result.imported += 1
+                    password = passwords[i]
                     
                     # Store password entry for report
                     password_entries.append({
-                        "email": email,
-                        "first_name": first_name,
-                        "last_name": last_name,
+                        "email": user["email"],
+                        "first_name": user["first_name"],
+                        "last_name": user["last_name"],
                         "password": password,
-                        "role": role
+                        "role": user["role"]
                     })
                     
                     # Send welcome email if option enabled
                     if send_emails:
-                        email_sent = await self._send_welcome_email(email, first_name, password)
+                        email_sent = await self._send_welcome_email(user["email"], user["first_name"], password)
                         if email_sent:
                             emails_sent += 1
                         else:
                             emails_failed += 1
-                    
-                    # Update progress
-                    progress = int((i + 1) / len(rows) * 100)
-                    await self.import_jobs.update_one(
-                        {"id": job_id},
-                        {"$set": {"progress": progress, "emails_sent": emails_sent, "emails_failed": emails_failed}}
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error importing row {row.get('_row_number', i)}: {e}")
-                    result.errors.append(ValidationError(
-                        row=row.get('_row_number', i + 2),
-                        field='_row',
-                        value=str(row.get('email', '')),
-                        error=str(e)
-                    ))
+                
+                # Update progress
+                progress = int((start + len(chunk)) / len(rows) * 100)
+                await self.import_jobs.update_one(
+                    {"id": job_id},
+                    {"$set": {"progress": progress, "emails_sent": emails_sent, "emails_failed": emails_failed}}
+                )
             
             result.valid_rows = result.imported
             
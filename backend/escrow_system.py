@@ -1326,6 +1326,7 @@ class EscrowService:
         
         if released_count > 0:
             logger.info(f"Auto-released {released_count} escrows")
+        return {"released": released_count}
     
     async def start_background_tasks(self):
         """Start background tasks"""
@@ -1362,16 +1363,24 @@ class EscrowService:
 # ROUTER FACTORY
 # =============================================================================
 
-def create_escrow_router(db, get_current_user, get_current_admin):
-    """Create escrow system router"""
+def create_escrow_router(db, get_current_user, get_current_admin, scheduler=None):
+    """
+    Create escrow system router. With a job scheduler (utils/scheduler.py)
+    auto-release runs as a cluster-wide job instead of a loop per worker.
+    """
     
     router = APIRouter(prefix="/escrow", tags=["Escrow & Online Selling"])
     service = EscrowService(db)
     
+    if scheduler is not None:
+        from utils.scheduler import IntervalTrigger
+        scheduler.register("escrow_auto_release", service.auto_release_escrows, IntervalTrigger(3600), jitter=60)
+    
     @router.on_event("startup")
     async def startup():
         await service.initialize()
-        await service.start_background_tasks()
+        if scheduler is None:
+            await service.start_background_tasks()
     
     @router.on_event("shutdown")
     async def shutdown():
@@ -4,20 +4,31 @@ Provides high-level platform performance, risks, and opportunities overview for
 """
 
 import os
+import time
 import uuid
 import json
+import inspect
 import logging
 import asyncio
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from enum import Enum
 from fastapi import APIRouter, HTTPException, Request, Query, BackgroundTasks
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from utils.cache import cache
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Sections computed at once while building a summary
+EXECUTIVE_SUMMARY_MAX_CONCURRENCY = int(os.environ.get("EXECUTIVE_SUMMARY_MAX_CONCURRENCY", "4"))
+# Current-window and snapshot sections are reused this long
+EXECUTIVE_SUMMARY_SECTION_TTL = int(os.environ.get("EXECUTIVE_SUMMARY_SECTION_TTL", "300"))
+# Immutable sections over a closed window are stored in executive_summary_sections this long
+EXECUTIVE_SUMMARY_CLOSED_SECTION_TTL = int(os.environ.get("EXECUTIVE_SUMMARY_CLOSED_SECTION_TTL", str(2 * 3600)))
+
 # AI Integration
 try:
     from emergentintegrations.llm.chat import LlmChat, UserMessage
@@ -200,6 +211,7 @@ class ExecutiveSummary(BaseModel):
     # Metadata
     ai_model_used: Optional[str] = None
     generation_time_seconds: Optional[float] = None
+    section_timings: Dict[str, Dict[str, Any]] = {}  # {"revenue:current": {"ms": 12.3, "source": "computed"}}
     status: str = "completed"  # generating, completed, failed
 
 
@@ -208,307 +220,247 @@ class ExecutiveSummary(BaseModel):
 # =============================================================================
 
 class ExecutiveSummaryDataAggregator:
-    """Aggregates data from various platform sources"""
+    """
+    Aggregates data from various platform sources.
+    *_window sections return raw values for one [start, end] window. Most
+    only count records by creation or completion time, so their result for a
+    window that has ended never changes; MUTABLE_WINDOW_SECTIONS also read
+    fields that keep changing. Snapshot sections (live, system_health)
+    describe the platform right now.
+    """
+    
+    WINDOW_SECTIONS = ("escrow", "platform", "revenue", "growth", "trust", "operations")
+    # platform reads users.last_seen, revenue filters banners on their current status
+    MUTABLE_WINDOW_SECTIONS = ("platform", "revenue")
+    SNAPSHOT_SECTIONS = ("live", "system_health")
     
     def __init__(self, db):
         self.db = db
     
     async def get_period_dates(self, period_type: SummaryFrequency) -> tuple:
-        """Get start and end dates for the period"""
+        """
+        Get start and end dates for the period. Both windows have the same
+        length and end on an hour boundary, so they stay the same for an hour
+        and period-over-period deltas compare like with like.
+        """
         now = datetime.now(timezone.utc)
+        anchor = now.replace(minute=0, second=0, microsecond=0)
         
         if period_type == SummaryFrequency.DAILY:
-            period_end = now
-            period_start = now - timedelta(days=1)
-            previous_start = period_start - timedelta(days=1)
-            previous_end = period_start
+            length = timedelta(days=1)
         elif period_type == SummaryFrequency.WEEKLY:
-            period_end = now
-            period_start = now - timedelta(days=7)
-            previous_start = period_start - timedelta(days=7)
-            previous_end = period_start
+            length = timedelta(days=7)
         else:  # monthly
-            period_end = now
-            period_start = now - timedelta(days=30)
-            previous_start = period_start - timedelta(days=30)
-            previous_end = period_start
+            length = timedelta(days=30)
+        
+        period_end = anchor
+        period_start = anchor - length
+        previous_start = period_start - length
+        previous_end = period_start
         
         return period_start, period_end, previous_start, previous_end
     
-    async def get_platform_overview(
-        self, 
-        period_start: datetime, 
-        period_end: datetime,
-        prev_start: datetime,
-        prev_end: datetime
-    ) -> Dict[str, Any]:
-        """Aggregate platform overview metrics"""
-        
-        # Total users
-        total_users_current = await self.db.users.count_documents({})
-        total_users_previous = await self.db.users.count_documents({
-            "created_at": {"$lt": prev_end}
-        })
-        
-        # Active users (users with activity in period)
-        active_current = await self.db.users.count_documents({
-            "last_seen": {"$gte": period_start, "$lte": period_end}
-        })
-        active_previous = await self.db.users.count_documents({
-            "last_seen": {"$gte": prev_start, "$lte": prev_end}
-        })
-        
-        # New listings
-        new_listings_current = await self.db.listings.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end}
-        })
-        new_listings_previous = await self.db.listings.count_documents({
-            "created_at": {"$gte": prev_start, "$lte": prev_end}
-        })
-        
-        # Completed transactions
-        completed_current = await self.db.escrow_transactions.count_documents({
-            "status": "completed",
-            "completed_at": {"$gte": period_start, "$lte": period_end}
-        })
-        completed_previous = await self.db.escrow_transactions.count_documents({
-            "status": "completed",
-            "completed_at": {"$gte": prev_start, "$lte": prev_end}
-        })
-        
-        # Escrow volume
-        escrow_pipeline_current = [
-            {"$match": {"status": "completed", "completed_at": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        escrow_current_result = await self.db.escrow_transactions.aggregate(escrow_pipeline_current).to_list(1)
-        escrow_volume_current = escrow_current_result[0]["total"] if escrow_current_result else 0
-        
-        escrow_pipeline_previous = [
-            {"$match": {"status": "completed", "completed_at": {"$gte": prev_start, "$lte": prev_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        escrow_previous_result = await self.db.escrow_transactions.aggregate(escrow_pipeline_previous).to_list(1)
-        escrow_volume_previous = escrow_previous_result[0]["total"] if escrow_previous_result else 0
-        
+    async def _total(self, collection, match: Dict[str, Any], expression: str, op: str = "$sum") -> float:
+        result = await collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": None, "total": {op: expression}}}
+        ]).to_list(1)
+        return (result[0]["total"] if result else 0) or 0
+    
+    async def escrow_window(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Completed escrow count, volume, commission and average order value"""
+        result = await self.db.escrow_transactions.aggregate([
+            {"$match": {"status": "completed", "completed_at": {"$gte": start, "$lte": end}}},
+            {"$group": {
+                "_id": None,
+                "completed": {"$sum": 1},
+                "volume": {"$sum": "$amount"},
+                "commission": {"$sum": "$platform_fee"},
+                "average_order_value": {"$avg": "$amount"}
+            }}
+        ]).to_list(1)
+        row = result[0] if result else {}
         return {
-            "total_users": MetricChange.calculate(total_users_current, total_users_previous),
-            "active_users": MetricChange.calculate(active_current, active_previous),
-            "new_listings": MetricChange.calculate(new_listings_current, new_listings_previous),
-            "completed_transactions": MetricChange.calculate(completed_current, completed_previous),
-            "escrow_volume": MetricChange.calculate(escrow_volume_current, escrow_volume_previous)
+            "completed": row.get("completed", 0),
+            "volume": row.get("volume") or 0,
+            "commission": row.get("commission") or 0,
+            "average_order_value": row.get("average_order_value") or 0
         }
     
-    async def get_revenue_metrics(
-        self,
-        period_start: datetime,
-        period_end: datetime,
-        prev_start: datetime,
-        prev_end: datetime
-    ) -> Dict[str, Any]:
-        """Aggregate revenue and monetization metrics"""
-        
-        # Commission earned from escrow
-        commission_pipeline_current = [
-            {"$match": {"status": "completed", "completed_at": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$platform_fee"}}}
-        ]
-        commission_current = await self.db.escrow_transactions.aggregate(commission_pipeline_current).to_list(1)
-        commission_current_val = commission_current[0]["total"] if commission_current else 0
-        
-        commission_pipeline_previous = [
-            {"$match": {"status": "completed", "completed_at": {"$gte": prev_start, "$lte": prev_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$platform_fee"}}}
-        ]
-        commission_previous = await self.db.escrow_transactions.aggregate(commission_pipeline_previous).to_list(1)
-        commission_previous_val = commission_previous[0]["total"] if commission_previous else 0
-        
-        # Boost revenue
-        boost_pipeline_current = [
-            {"$match": {"purchase_date": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        boost_current = await self.db.credit_purchases.aggregate(boost_pipeline_current).to_list(1)
-        boost_current_val = boost_current[0]["total"] if boost_current else 0
-        
-        boost_pipeline_previous = [
-            {"$match": {"purchase_date": {"$gte": prev_start, "$lte": prev_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        boost_previous = await self.db.credit_purchases.aggregate(boost_pipeline_previous).to_list(1)
-        boost_previous_val = boost_previous[0]["total"] if boost_previous else 0
-        
-        # Banner revenue
-        banner_pipeline_current = [
-            {"$match": {"created_at": {"$gte": period_start, "$lte": period_end}, "status": "active"}},
-            {"$group": {"_id": None, "total": {"$sum": "$total_cost"}}}
-        ]
-        banner_current = await self.db.banner_campaigns.aggregate(banner_pipeline_current).to_list(1)
-        banner_current_val = banner_current[0]["total"] if banner_current else 0
-        
-        banner_pipeline_previous = [
-            {"$match": {"created_at": {"$gte": prev_start, "$lte": prev_end}, "status": "active"}},
-            {"$group": {"_id": None, "total": {"$sum": "$total_cost"}}}
-        ]
-        banner_previous = await self.db.banner_campaigns.aggregate(banner_pipeline_previous).to_list(1)
-        banner_previous_val = banner_previous[0]["total"] if banner_previous else 0
-        
-        # Transport fees
-        transport_pipeline_current = [
-            {"$match": {"created_at": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$delivery_fee"}}}
-        ]
-        transport_current = await self.db.transport_orders.aggregate(transport_pipeline_current).to_list(1)
-        transport_current_val = transport_current[0]["total"] if transport_current else 0
-        
-        transport_pipeline_previous = [
-            {"$match": {"created_at": {"$gte": prev_start, "$lte": prev_end}}},
-            {"$group": {"_id": None, "total": {"$sum": "$delivery_fee"}}}
-        ]
-        transport_previous = await self.db.transport_orders.aggregate(transport_pipeline_previous).to_list(1)
-        transport_previous_val = transport_previous[0]["total"] if transport_previous else 0
-        
-        # Average order value
-        aov_pipeline_current = [
-            {"$match": {"status": "completed", "completed_at": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": None, "avg": {"$avg": "$amount"}}}
-        ]
-        aov_current = await self.db.escrow_transactions.aggregate(aov_pipeline_current).to_list(1)
-        aov_current_val = aov_current[0]["avg"] if aov_current else 0
+    async def platform_window(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Users registered by the end of the window, active users and new listings"""
+        users_before_end, active_users, new_listings = await asyncio.gather(
+            self.db.users.count_documents({"created_at": {"$lt": end}}),
+            # Active users (users with activity in period)
+            self.db.users.count_documents({"last_seen": {"$gte": start, "$lte": end}}),
+            self.db.listings.count_documents({"created_at": {"$gte": start, "$lte": end}})
+        )
+        return {
+            "users_before_end": users_before_end,
+            "active_users": active_users,
+            "new_listings": new_listings
+        }
+    
+    async def revenue_window(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Boost, banner and transport revenue (commission comes from escrow_window)"""
+        boost, banner, transport = await asyncio.gather(
+            self._total(self.db.credit_purchases, {"purchase_date": {"$gte": start, "$lte": end}}, "$amount"),
+            self._total(
+                self.db.banner_campaigns,
+                {"created_at": {"$gte": start, "$lte": end}, "status": "active"},
+                "$total_cost"
+            ),
+            self._total(self.db.transport_orders, {"created_at": {"$gte": start, "$lte": end}}, "$delivery_fee")
+        )
+        return {"boost": boost, "banner": banner, "transport": transport}
+    
+    async def growth_window(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """New signups and the top categories/locations for new listings"""
+        def top(field: str):
+            return self.db.listings.aggregate([
+                {"$match": {"created_at": {"$gte": start, "$lte": end}}},
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 5}
+            ]).to_list(5)
+        
+        signups, top_categories, top_locations = await asyncio.gather(
+            self.db.users.count_documents({"created_at": {"$gte": start, "$lte": end}}),
+            top("category_id"),
+            top("location")
+        )
+        return {
+            "signups": signups,
+            "top_categories": [{"category": c["_id"], "count": c["count"]} for c in top_categories],
+            "top_locations": [{"location": l["_id"], "count": l["count"]} for l in top_locations]
+        }
+    
+    async def trust_window(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Disputes, fraud flags and moderation incidents"""
+        disputes_opened, disputes_resolved, fraud_flags, moderation_incidents = await asyncio.gather(
+            self.db.escrow_disputes.count_documents({"created_at": {"$gte": start, "$lte": end}}),
+            self.db.escrow_disputes.count_documents({"resolved_at": {"$gte": start, "$lte": end}}),
+            # Fraud flags from moderation
+            self.db.moderation_flags.count_documents({
+                "created_at": {"$gte": start, "$lte": end},
+                "reason_tags": {"$in": ["fraud", "scam"]}
+            }),
+            self.db.moderation_actions.count_documents({"created_at": {"$gte": start, "$lte": end}})
+        )
+        return {
+            "disputes_opened": disputes_opened,
+            "disputes_resolved": disputes_resolved,
+            "fraud_flags": fraud_flags,
+            "moderation_incidents": moderation_incidents
+        }
+    
+    async def operations_window(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Transport orders created and delivered"""
+        total_transport, successful_transport = await asyncio.gather(
+            self.db.transport_orders.count_documents({"created_at": {"$gte": start, "$lte": end}}),
+            self.db.transport_orders.count_documents({
+                "created_at": {"$gte": start, "$lte": end},
+                "status": "delivered"
+            })
+        )
+        return {"total_transport": total_transport, "successful_transport": successful_transport}
+    
+    async def live_snapshot(self) -> Dict[str, Any]:
+        """Current totals and backlogs that do not belong to a window"""
+        now = datetime.now(timezone.utc)
+        total_users, escrow_delays, delivery_delays = await asyncio.gather(
+            self.db.users.count_documents({}),
+            # Escrow delays (orders taking > 7 days in transit)
+            self.db.escrow_transactions.count_documents({
+                "status": "in_transit",
+                "shipped_at": {"$lt": now - timedelta(days=7)}
+            }),
+            self.db.transport_orders.count_documents({
+                "status": {"$ne": "delivered"},
+                "estimated_delivery": {"$lt": now}
+            })
+        )
+        return {"total_users": total_users, "escrow_delays": escrow_delays, "delivery_delays": delivery_delays}
+    
+    async def system_health_snapshot(self) -> Dict[str, Any]:
+        """Aggregate system health metrics"""
         
-        aov_pipeline_previous = [
-            {"$match": {"status": "completed", "completed_at": {"$gte": prev_start, "$lte": prev_end}}},
-            {"$group": {"_id": None, "avg": {"$avg": "$amount"}}}
-        ]
-        aov_previous = await self.db.escrow_transactions.aggregate(aov_pipeline_previous).to_list(1)
-        aov_previous_val = aov_previous[0]["avg"] if aov_previous else 0
+        # API error rate (from error logs - placeholder)
+        api_error_rate = 0.5
         
-        total_revenue = commission_current_val + boost_current_val + banner_current_val + transport_current_val
-        total_revenue_prev = commission_previous_val + boost_previous_val + banner_previous_val + transport_previous_val
+        total_payments, failed_payments, total_notifications, delivered_notifications = await asyncio.gather(
+            self.db.payments.count_documents({}),
+            self.db.payments.count_documents({"status": "failed"}),
+            self.db.notification_logs.count_documents({}),
+            self.db.notification_logs.count_documents({"status": "delivered"})
+        )
+        payment_failure_rate = (failed_payments / total_payments * 100) if total_payments > 0 else 0
+        notification_rate = (delivered_notifications / total_notifications * 100) if total_notifications > 0 else 100
         
+        return {
+            "api_error_rate": round(api_error_rate, 2),
+            "payment_failure_rate": round(payment_failure_rate, 2),
+            "notification_delivery_rate": round(notification_rate, 1),
+            "feature_outages": []
+        }
+    
+    # -------------------------------------------------------------------------
+    # Sections built from window/snapshot results
+    # -------------------------------------------------------------------------
+    
+    @staticmethod
+    def platform_overview(platform, prev_platform, escrow, prev_escrow, live) -> Dict[str, Any]:
+        return {
+            "total_users": MetricChange.calculate(live["total_users"], prev_platform["users_before_end"]),
+            "active_users": MetricChange.calculate(platform["active_users"], prev_platform["active_users"]),
+            "new_listings": MetricChange.calculate(platform["new_listings"], prev_platform["new_listings"]),
+            "completed_transactions": MetricChange.calculate(escrow["completed"], prev_escrow["completed"]),
+            "escrow_volume": MetricChange.calculate(escrow["volume"], prev_escrow["volume"])
+        }
+    
+    @staticmethod
+    def revenue_metrics(revenue, prev_revenue, escrow, prev_escrow) -> Dict[str, Any]:
+        total_revenue = escrow["commission"] + revenue["boost"] + revenue["banner"] + revenue["transport"]
+        total_revenue_prev = (
+            prev_escrow["commission"] + prev_revenue["boost"] + prev_revenue["banner"] + prev_revenue["transport"]
+        )
         return {
             "total_revenue": MetricChange.calculate(total_revenue, total_revenue_prev),
-            "commission_earned": MetricChange.calculate(commission_current_val, commission_previous_val),
-            "boost_revenue": MetricChange.calculate(boost_current_val, boost_previous_val),
-            "banner_revenue": MetricChange.calculate(banner_current_val, banner_previous_val),
-            "transport_fees": MetricChange.calculate(transport_current_val, transport_previous_val),
-            "average_order_value": MetricChange.calculate(aov_current_val or 0, aov_previous_val or 0)
+            "commission_earned": MetricChange.calculate(escrow["commission"], prev_escrow["commission"]),
+            "boost_revenue": MetricChange.calculate(revenue["boost"], prev_revenue["boost"]),
+            "banner_revenue": MetricChange.calculate(revenue["banner"], prev_revenue["banner"]),
+            "transport_fees": MetricChange.calculate(revenue["transport"], prev_revenue["transport"]),
+            "average_order_value": MetricChange.calculate(
+                escrow["average_order_value"], prev_escrow["average_order_value"]
+            )
         }
     
-    async def get_growth_metrics(
-        self,
-        period_start: datetime,
-        period_end: datetime,
-        prev_start: datetime,
-        prev_end: datetime
-    ) -> Dict[str, Any]:
-        """Aggregate growth and retention metrics"""
-        
-        # New signups
-        signups_current = await self.db.users.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end}
-        })
-        signups_previous = await self.db.users.count_documents({
-            "created_at": {"$gte": prev_start, "$lte": prev_end}
-        })
-        
-        # Top growth categories
-        category_pipeline = [
-            {"$match": {"created_at": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": "$category_id", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 5}
-        ]
-        top_categories = await self.db.listings.aggregate(category_pipeline).to_list(5)
-        
-        # Top growth locations
-        location_pipeline = [
-            {"$match": {"created_at": {"$gte": period_start, "$lte": period_end}}},
-            {"$group": {"_id": "$location", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 5}
-        ]
-        top_locations = await self.db.listings.aggregate(location_pipeline).to_list(5)
-        
+    @staticmethod
+    def growth_metrics(growth, prev_growth) -> Dict[str, Any]:
         return {
-            "new_user_signups": MetricChange.calculate(signups_current, signups_previous),
+            "new_user_signups": MetricChange.calculate(growth["signups"], prev_growth["signups"]),
             "user_retention_rate": MetricChange.calculate(75, 72),  # Placeholder
             "seller_conversion_rate": MetricChange.calculate(12.5, 11.8),  # Placeholder
-            "top_growth_categories": [{"category": c["_id"], "count": c["count"]} for c in top_categories],
-            "top_growth_locations": [{"location": l["_id"], "count": l["count"]} for l in top_locations]
+            "top_growth_categories": growth["top_categories"],
+            "top_growth_locations": growth["top_locations"]
         }
     
-    async def get_trust_safety_metrics(
-        self,
-        period_start: datetime,
-        period_end: datetime
-    ) -> Dict[str, Any]:
-        """Aggregate trust and safety metrics"""
-        
-        # Disputes
-        disputes_opened = await self.db.escrow_disputes.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end}
-        })
-        disputes_resolved = await self.db.escrow_disputes.count_documents({
-            "resolved_at": {"$gte": period_start, "$lte": period_end}
-        })
-        
-        # Fraud flags from moderation
-        fraud_flags = await self.db.moderation_flags.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end},
-            "reason_tags": {"$in": ["fraud", "scam"]}
-        })
-        
-        # Moderation incidents
-        moderation_incidents = await self.db.moderation_actions.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end}
-        })
-        
-        # Escrow delays (orders taking > 7 days in transit)
-        escrow_delays = await self.db.escrow_transactions.count_documents({
-            "status": "in_transit",
-            "shipped_at": {"$lt": datetime.now(timezone.utc) - timedelta(days=7)}
-        })
-        
+    @staticmethod
+    def trust_safety_metrics(trust, live) -> Dict[str, Any]:
         # Calculate risk rating
-        if fraud_flags > 10 or disputes_opened > 20:
+        if trust["fraud_flags"] > 10 or trust["disputes_opened"] > 20:
             risk_rating = RiskLevel.HIGH
-        elif fraud_flags > 5 or disputes_opened > 10:
+        elif trust["fraud_flags"] > 5 or trust["disputes_opened"] > 10:
             risk_rating = RiskLevel.MEDIUM
         else:
             risk_rating = RiskLevel.LOW
         
-        return {
-            "disputes_opened": disputes_opened,
-            "disputes_resolved": disputes_resolved,
-            "fraud_flags": fraud_flags,
-            "moderation_incidents": moderation_incidents,
-            "escrow_delays": escrow_delays,
-            "risk_rating": risk_rating
-        }
+        return {**trust, "escrow_delays": live["escrow_delays"], "risk_rating": risk_rating}
     
-    async def get_operations_metrics(
-        self,
-        period_start: datetime,
-        period_end: datetime
-    ) -> Dict[str, Any]:
-        """Aggregate operations and logistics metrics"""
-        
-        # Transport success rate
-        total_transport = await self.db.transport_orders.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end}
-        })
-        successful_transport = await self.db.transport_orders.count_documents({
-            "created_at": {"$gte": period_start, "$lte": period_end},
-            "status": "delivered"
-        })
-        success_rate = (successful_transport / total_transport * 100) if total_transport > 0 else 100
-        
-        # Delivery delays
-        delivery_delays = await self.db.transport_orders.count_documents({
-            "status": {"$ne": "delivered"},
-            "estimated_delivery": {"$lt": datetime.now(timezone.utc)}
-        })
+    @staticmethod
+    def operations_metrics(operations, live) -> Dict[str, Any]:
+        total_transport = operations["total_transport"]
+        success_rate = (operations["successful_transport"] / total_transport * 100) if total_transport > 0 else 100
         
         # Partner performance (placeholder)
         partner_performance = [
@@ -519,32 +471,53 @@ class ExecutiveSummaryDataAggregator:
         return {
             "transport_success_rate": round(success_rate, 1),
             "average_delivery_days": 3.2,  # Placeholder
-            "delivery_delays": delivery_delays,
+            "delivery_delays": live["delivery_delays"],
             "partner_performance": partner_performance
         }
+
+
+class SectionGraph:
+    """
+    Runs named sections once each, after the sections they depend on, with
+    at most max_concurrency running at a time. Sections must be added after
+    their dependencies, so the graph is acyclic by construction.
+    """
     
-    async def get_system_health_metrics(self) -> Dict[str, Any]:
-        """Aggregate system health metrics"""
-        
-        # API error rate (from error logs - placeholder)
-        api_error_rate = 0.5
-        
-        # Payment failure rate
-        total_payments = await self.db.payments.count_documents({})
-        failed_payments = await self.db.payments.count_documents({"status": "failed"})
-        payment_failure_rate = (failed_payments / total_payments * 100) if total_payments > 0 else 0
-        
-        # Notification delivery rate
-        total_notifications = await self.db.notification_logs.count_documents({})
-        delivered_notifications = await self.db.notification_logs.count_documents({"status": "delivered"})
-        notification_rate = (delivered_notifications / total_notifications * 100) if total_notifications > 0 else 100
-        
-        return {
-            "api_error_rate": round(api_error_rate, 2),
-            "payment_failure_rate": round(payment_failure_rate, 2),
-            "notification_delivery_rate": round(notification_rate, 1),
-            "feature_outages": []
-        }
+    def __init__(self, max_concurrency: int):
+        self._sections: Dict[str, tuple] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.timings: Dict[str, float] = {}
+    
+    def add(self, name: str, compute: Callable[..., Any], deps: tuple = ()):
+        """compute(*dependency_results) returns the result or an awaitable"""
+        missing = [d for d in deps if d not in self._sections]
+        if missing:
+            raise ValueError(f"Section {name} depends on unknown sections {missing}")
+        self._sections[name] = (compute, deps)
+    
+    async def _run(self, name: str, tasks: Dict[str, asyncio.Task]):
+        compute, deps = self._sections[name]
+        args = [await tasks[dep] for dep in deps]
+        result = compute(*args)
+        if not inspect.isawaitable(result):
+            return result
+        async with self._semaphore:
+            started = time.perf_counter()
+            result = await result
+            self.timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    
+    async def run(self) -> Dict[str, Any]:
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self._sections:
+            tasks[name] = asyncio.create_task(self._run(name, tasks))
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return {name: task.result() for name, task in tasks.items()}
 
 
 # =============================================================================
@@ -739,13 +712,43 @@ class ExecutiveSummaryService:
         # Get period dates
         period_start, period_end, prev_start, prev_end = await self.aggregator.get_period_dates(period_type)
         
-        # Aggregate all data
-        platform_data = await self.aggregator.get_platform_overview(period_start, period_end, prev_start, prev_end)
-        revenue_data = await self.aggregator.get_revenue_metrics(period_start, period_end, prev_start, prev_end)
-        growth_data = await self.aggregator.get_growth_metrics(period_start, period_end, prev_start, prev_end)
-        trust_data = await self.aggregator.get_trust_safety_metrics(period_start, period_end)
-        ops_data = await self.aggregator.get_operations_metrics(period_start, period_end)
-        system_data = await self.aggregator.get_system_health_metrics()
+        # Aggregate all data: independent sections run concurrently, each
+        # section's sources are queried once and shared by its dependents
+        sources: Dict[str, str] = {}
+        aggregator = self.aggregator
+        graph = SectionGraph(EXECUTIVE_SUMMARY_MAX_CONCURRENCY)
+        for name in aggregator.WINDOW_SECTIONS:
+            graph.add(f"{name}:current", lambda name=name: self._window_section(
+                name, period_start, period_end, False, force_regenerate, sources
+            ))
+        for name in ("escrow", "platform", "revenue", "growth"):
+            graph.add(f"{name}:previous", lambda name=name: self._window_section(
+                name, prev_start, prev_end, True, force_regenerate, sources
+            ))
+        for name in aggregator.SNAPSHOT_SECTIONS:
+            graph.add(name, lambda name=name: self._snapshot_section(name, force_regenerate, sources))
+        
+        graph.add("platform_overview", aggregator.platform_overview, (
+            "platform:current", "platform:previous", "escrow:current", "escrow:previous", "live"
+        ))
+        graph.add("revenue_monetization", aggregator.revenue_metrics, (
+            "revenue:current", "revenue:previous", "escrow:current", "escrow:previous"
+        ))
+        graph.add("growth_retention", aggregator.growth_metrics, ("growth:current", "growth:previous"))
+        graph.add("trust_safety", aggregator.trust_safety_metrics, ("trust:current", "live"))
+        graph.add("operations_logistics", aggregator.operations_metrics, ("operations:current", "live"))
+        sections = await graph.run()
+        
+        platform_data = sections["platform_overview"]
+        revenue_data = sections["revenue_monetization"]
+        growth_data = sections["growth_retention"]
+        trust_data = sections["trust_safety"]
+        ops_data = sections["operations_logistics"]
+        system_data = sections["system_health"]
+        section_timings = {
+            name: {"ms": ms, "source": sources.get(name, "computed")}
+            for name, ms in graph.timings.items()
+        }
         
         # Prepare data for AI
         all_data = {
@@ -805,7 +808,8 @@ class ExecutiveSummaryService:
                 ) for r in ai_result.get("recommendations", [])
             ],
             ai_model_used="gpt-4o" if self.ai_generator.enabled else None,
-            generation_time_seconds=(datetime.now(timezone.utc) - start_time).total_seconds()
+            generation_time_seconds=(datetime.now(timezone.utc) - start_time).total_seconds(),
+            section_timings=section_timings
         )
         
         # Cache the summary
@@ -817,6 +821,68 @@ class ExecutiveSummaryService:
         
         return summary
     
+    async def _window_section(
+        self,
+        name: str,
+        start: datetime,
+        end: datetime,
+        closed: bool,
+        force: bool,
+        sources: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """One window section, memoized per (section, window)"""
+        label = f"{name}:{'previous' if closed else 'current'}"
+        compute = getattr(self.aggregator, f"{name}_window")
+        
+        if closed and name not in self.aggregator.MUTABLE_WINDOW_SECTIONS:
+            # Immutable data over a window that has ended: stored until the window rolls off
+            key = f"{name}:{start.isoformat()}:{end.isoformat()}"
+            stored = await self.db.executive_summary_sections.find_one({"_id": key}, {"result": 1})
+            if stored:
+                sources[label] = "closed_period"
+                return stored["result"]
+            result = await compute(start, end)
+            await self.db.executive_summary_sections.update_one(
+                {"_id": key},
+                {"$set": {
+                    "section": name,
+                    "window_start": start,
+                    "window_end": end,
+                    "result": result,
+                    "computed_at": datetime.now(timezone.utc),
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=EXECUTIVE_SUMMARY_CLOSED_SECTION_TTL)
+                }},
+                upsert=True
+            )
+            return result
+        
+        # Reused briefly, keyed by the window
+        return await self._short_lived(
+            f"exec_summary:{name}:{start.isoformat()}:{end.isoformat()}", label, lambda: compute(start, end), force, sources
+        )
+    
+    async def _snapshot_section(self, name: str, force: bool, sources: Dict[str, str]) -> Dict[str, Any]:
+        compute = getattr(self.aggregator, f"{name}_snapshot")
+        return await self._short_lived(f"exec_summary:{name}", name, compute, force, sources)
+    
+    async def _short_lived(self, key: str, label: str, compute: Callable, force: bool, sources: Dict[str, str]):
+        if force:
+            result = await compute()
+            await cache.set(key, result, EXECUTIVE_SUMMARY_SECTION_TTL)
+            return result
+        
+        computed = False
+        
+        async def load():
+            nonlocal computed
+            computed = True
+            return await compute()
+        
+        result = await cache.get_or_compute(key, load, ttl=EXECUTIVE_SUMMARY_SECTION_TTL)
+        if not computed:
+            sources[label] = "cached"
+        return result
+    
     async def _get_cached_summary(self, period_type: SummaryFrequency) -> Optional[ExecutiveSummary]:
         """Get cached summary if valid"""
         
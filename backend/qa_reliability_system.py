@@ -32,6 +32,8 @@ from pydantic import BaseModel
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
+from utils.feature_flags import feature_flags
+
 logger = logging.getLogger("qa_reliability")
 
 
@@ -225,6 +227,7 @@ class QAReliabilityService:
                 {"$setOnInsert": {**flag, "created_at": datetime.now(timezone.utc).isoformat()}},
                 upsert=True
             )
+        await feature_flags.mark_changed()
 
     # =========================================================================
     # ERROR LOGGING
@@ -1207,6 +1210,8 @@ class QAReliabilityService:
             }}
         )
         
+        await feature_flags.mark_changed()
+        
         # Log the change
         await self._log_audit(
             action="feature_flag_update",
@@ -1220,9 +1225,9 @@ class QAReliabilityService:
         return result.modified_count > 0
 
     async def is_feature_enabled(self, key: str) -> bool:
-        """Check if a feature is enabled"""
-        flag = await self.feature_flags.find_one({"key": key})
-        return flag.get("enabled", False) if flag else False
+        """Check if a feature is enabled (from the in-process flag snapshot)"""
+        await feature_flags.ensure_loaded(self.db)
+        return feature_flags.is_enabled(key)
 
     # =========================================================================
     # FAIL-SAFE & RETRY
@@ -9,6 +9,8 @@ from datetime import datetime, timezone, timedelta
 import uuid
 import logging
 
+from utils.session_cache import session_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +47,7 @@ def create_account_router(db, require_auth, create_notification):
             {"user_id": user.user_id},
             {"$set": {"password_updated_at": datetime.now(timezone.utc)}}
         )
+        session_cache.invalidate_user(user.user_id)
         
         # Create security notification
         await create_notification(
@@ -94,6 +97,7 @@ def create_account_router(db, require_auth, create_notification):
         # Clear sessions
         await db.sessions.delete_many({"user_id": user.user_id})
         await db.active_sessions.delete_many({"user_id": user.user_id})
+        session_cache.invalidate_user(user.user_id)
         
         return {
             "message": "Account scheduled for deletion",
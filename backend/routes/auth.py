@@ -3,7 +3,6 @@ Authentication Routes Module
 Handles user registration, login, session management, and Google OAuth
 """
 
-import hashlib
 import secrets
 import uuid
 import httpx
@@ -13,6 +12,8 @@ from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from pydantic import BaseModel
 import logging
 
+from utils.session_cache import session_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,34 +59,11 @@ class UserResponse(BaseModel):
 # =============================================================================
 # PASSWORD UTILITIES
 # =============================================================================
-# PASSWORD HASHING (BCRYPT)
-# =============================================================================
-
-from passlib.context import CryptContext
-
-# Bcrypt password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return pwd_context.hash(password)
-
+# bcrypt runs in the CPU pool (utils/passwords.py); the sync helpers are re-exported
 
-def verify_password(password: str, stored_hash: str) -> bool:
-    """Verify password against stored hash (supports both bcrypt and legacy SHA-256)"""
-    try:
-        # Try bcrypt first
-        if stored_hash.startswith('$2'):
-            return pwd_context.verify(password, stored_hash)
-        
-        # Fallback to legacy SHA-256 format (salt:hash)
-        if ':' in stored_hash:
-            salt, password_hash = stored_hash.split(':')
-            return hashlib.sha256((password + salt).encode()).hexdigest() == password_hash
-        
-        return False
-    except Exception:
-        return False
+from utils.passwords import (  # noqa: F401
+    pwd_context, hash_password, verify_password, hash_password_async, verify_password_async
+)
 
 
 # =============================================================================
@@ -125,7 +103,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         
         # Create user
         user_id = f"user_{uuid.uuid4().hex[:12]}"
-        password_hash = hash_password(register_data.password)
+        password_hash = await hash_password_async(register_data.password)
         
         new_user = {
             "user_id": user_id,
@@ -243,7 +221,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         """Login with email and password"""
         # Rate limiting
         client_ip = request.client.host if request.client else "unknown"
-        if not check_rate_limit(client_ip, "login"):
+        if not await check_rate_limit(client_ip, "login"):
             raise HTTPException(status_code=429, detail="Too many login attempts. Please wait.")
         
         # Find user by email
@@ -260,7 +238,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
             )
         
         # Verify password
-        if not verify_password(login_data.password, user["password_hash"]):
+        if not await verify_password_async(login_data.password, user["password_hash"]):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Create session
@@ -272,6 +250,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         
         # Remove old sessions for this user
         await db.user_sessions.delete_many({"user_id": user_id})
+        session_cache.invalidate_user(user_id)
         
         await db.user_sessions.insert_one({
             "user_id": user_id,
@@ -326,7 +305,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         
         # Rate limiting
         client_ip = request.client.host if request.client else "unknown"
-        if not check_rate_limit(client_ip, "login"):
+        if not await check_rate_limit(client_ip, "login"):
             raise HTTPException(status_code=429, detail="Too many login attempts")
         
         # Exchange session_id with Emergent Auth
@@ -377,6 +356,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         expires_at = datetime.now(timezone.utc) + timedelta(days=7)
         
         await db.user_sessions.delete_many({"user_id": user_id})
+        session_cache.invalidate_user(user_id)
         await db.user_sessions.insert_one({
             "user_id": user_id,
             "session_token": session_token,
@@ -412,6 +392,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         token = await get_session_token(request)
         if token:
             await db.user_sessions.delete_many({"session_token": token})
+            session_cache.invalidate_token(token)
         
         response.delete_cookie(key="session_token", path="/")
         return {"message": "Logged out successfully"}
@@ -421,7 +402,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         """Send password reset email"""
         # Rate limiting
         client_ip = request.client.host if request.client else "unknown"
-        if not check_rate_limit(client_ip, "forgot_password"):
+        if not await check_rate_limit(client_ip, "forgot_password"):
             raise HTTPException(status_code=429, detail="Too many requests. Please wait a few minutes.")
         
         # Find user by email
@@ -504,7 +485,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
             raise HTTPException(status_code=400, detail="Reset link has expired. Please request a new one.")
         
         # Update password
-        new_password_hash = hash_password(data.new_password)
+        new_password_hash = await hash_password_async(data.new_password)
         result = await db.users.update_one(
             {"email": reset_record["email"]},
             {"$set": {"password_hash": new_password_hash}}
@@ -520,6 +501,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         user = await db.users.find_one({"email": reset_record["email"]})
         if user:
             await db.user_sessions.delete_many({"user_id": user.get("user_id")})
+            session_cache.invalidate_user(user.get("user_id"))
         
         logger.info(f"Password reset successful for {reset_record['email']}")
         return {"message": "Password reset successful. You can now login with your new password."}
@@ -572,7 +554,7 @@ def create_auth_router(db, get_current_user, get_session_token, check_rate_limit
         """Resend verification email"""
         # Rate limiting
         client_ip = request.client.host if request.client else "unknown"
-        if not check_rate_limit(client_ip, "resend_verification"):
+        if not await check_rate_limit(client_ip, "resend_verification"):
             raise HTTPException(status_code=429, detail="Too many requests. Please wait a few minutes.")
         
         # Find user
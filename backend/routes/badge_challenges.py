@@ -10,6 +10,8 @@ from datetime import datetime, timezone, timedelta
 from enum import Enum
 import logging
 
+from utils.leaderboard import get_badge_leaderboard
+
 logger = logging.getLogger(__name__)
 
 
@@ -338,6 +340,7 @@ def create_badge_challenges_router(db, require_auth, send_push_notification=None
         APIRouter instance with badge challenge routes
     """
     router = APIRouter(tags=["badge-challenges"])
+    badge_leaderboard = get_badge_leaderboard(db)
     
     # Helper functions
     def get_challenge_period(challenge_type: ChallengeType, challenge_def: dict = None) -> tuple:
@@ -554,7 +557,9 @@ def create_badge_challenges_router(db, require_auth, send_push_notification=None
                         "is_viewed": False,
                         "source": "challenge",
                         "challenge_id": challenge_def["id"],
+                        "points_value": badge_reward["points_value"],
                     })
+                    await badge_leaderboard.record_award(user_id, badge_reward["points_value"])
                     
                     await db.challenge_completions.insert_one({
                         "user_id": user_id,
@@ -682,7 +687,9 @@ def create_badge_challenges_router(db, require_auth, send_push_notification=None
                         "earned_at": now,
                         "is_viewed": False,
                         "source": "streak",
+                        "points_value": badge_def["points"],
                     })
+                    await badge_leaderboard.record_award(user_id, badge_def["points"])
                     
                     if send_push_notification:
                         user = await db.users.find_one({"user_id": user_id})
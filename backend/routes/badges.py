@@ -8,6 +8,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
 import logging
 
+from utils.leaderboard import get_badge_leaderboard
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,6 +26,7 @@ def create_badges_router(db, get_current_user, badge_service=None):
         APIRouter instance with badge routes
     """
     router = APIRouter(prefix="/badges", tags=["badges"])
+    leaderboard = get_badge_leaderboard(db)
 
     # Badge definitions available in the system
     BADGE_DEFINITIONS = [
@@ -262,6 +265,13 @@ def create_badges_router(db, get_current_user, badge_service=None):
         
         return {"message": "Milestone acknowledged", "milestone_id": milestone_id}
 
+    async def _user_cards(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        users = await db.users.find(
+            {"user_id": {"$in": user_ids}},
+            {"_id": 0, "user_id": 1, "name": 1, "picture": 1}
+        ).to_list(length=len(user_ids))
+        return {u["user_id"]: u for u in users}
+
     @router.get("/leaderboard")
     async def get_leaderboard(
         page: int = Query(default=1, ge=1),
@@ -270,44 +280,29 @@ def create_badges_router(db, get_current_user, badge_service=None):
         """Get public badge leaderboard."""
         skip = (page - 1) * limit
         
-        # Aggregate badges per user
-        pipeline = [
-            {"$group": {
-                "_id": "$user_id",
-                "badge_count": {"$sum": 1},
-                "total_points": {"$sum": "$points_value"}
-            }},
-            {"$sort": {"total_points": -1, "badge_count": -1}},
-            {"$skip": skip},
-            {"$limit": limit}
-        ]
-        
-        results = await db.user_badges.aggregate(pipeline).to_list(length=limit)
+        results = await leaderboard.top("points", skip, limit)
+        user_ids = [r["user_id"] for r in results]
+        users_map = await _user_cards(user_ids)
+        badge_counts = await leaderboard.scores("count", user_ids)
         
         # Enrich with user info
-        leaderboard = []
-        for i, r in enumerate(results, start=skip + 1):
-            user = await db.users.find_one(
-                {"user_id": r["_id"]},
-                {"_id": 0, "name": 1, "picture": 1}
-            )
+        entries = []
+        for r in results:
+            user = users_map.get(r["user_id"])
             if user:
-                leaderboard.append({
-                    "rank": i,
-                    "user_id": r["_id"],
+                entries.append({
+                    "rank": r["rank"],
+                    "user_id": r["user_id"],
                     "name": user.get("name", "Unknown"),
                     "picture": user.get("picture"),
-                    "badge_count": r["badge_count"],
-                    "total_points": r["total_points"]
+                    "badge_count": badge_counts.get(r["user_id"], 0),
+                    "total_points": r["score"]
                 })
         
-        count_results = await db.user_badges.aggregate([
-            {"$group": {"_id": "$user_id"}}
-        ]).to_list(length=10000)
-        total = len(count_results)
+        total = await leaderboard.total("points")
         
         return {
-            "leaderboard": leaderboard,
+            "leaderboard": entries,
             "pagination": {
                 "page": page,
                 "limit": limit,
@@ -317,36 +312,40 @@ def create_badges_router(db, get_current_user, badge_service=None):
         }
 
     @router.get("/leaderboard/my-rank")
-    async def get_my_rank(current_user = Depends(get_current_user)):
-        """Get current user's rank on the leaderboard."""
+    async def get_my_rank(
+        radius: int = Query(default=3, ge=0, le=25),
+        current_user = Depends(get_current_user)
+    ):
+        """Get current user's rank on the leaderboard, with the users ranked around them."""
         user_id = current_user.user_id
         
-        # Get all users' points
-        pipeline = [
-            {"$group": {
-                "_id": "$user_id",
-                "total_points": {"$sum": "$points_value"}
-            }},
-            {"$sort": {"total_points": -1}}
-        ]
-        
-        all_users = await db.user_badges.aggregate(pipeline).to_list(length=10000)
-        
-        rank = None
-        user_points = 0
-        for i, u in enumerate(all_users, start=1):
-            if u["_id"] == user_id:
-                rank = i
-                user_points = u["total_points"]
-                break
-        
-        badge_count = await db.user_badges.count_documents({"user_id": user_id})
+        entry = await leaderboard.entry(user_id)
+        total_users = await leaderboard.total("points")
+        
+        window = await leaderboard.around(user_id, "points", radius)
+        window_ids = [w["user_id"] for w in window]
+        users_map = await _user_cards(window_ids)
+        badge_counts = await leaderboard.scores("count", window_ids)
+        nearby_users = []
+        for w in window:
+            nearby_users.append({
+                "rank": w["rank"],
+                "user_id": w["user_id"],
+                "user_name": users_map.get(w["user_id"], {}).get("name", "Unknown"),
+                "badge_count": badge_counts.get(w["user_id"], 0),
+                "total_points": w["score"],
+                "is_current_user": w["user_id"] == user_id
+            })
         
+        rank = entry["rank"]
         return {
             "rank": rank,
-            "total_points": user_points,
-            "badge_count": badge_count,
-            "total_users": len(all_users)
+            "total_points": entry["total_points"],
+            "badge_count": entry["badge_count"],
+            "total_users": total_users,
+            "total_participants": total_users,
+            "percentile": round((1 - (rank - 1) / total_users) * 100, 1) if rank and total_users else None,
+            "nearby_users": nearby_users
         }
 
     @router.get("/share/{user_id}")
@@ -369,13 +368,8 @@ def create_badges_router(db, get_current_user, badge_service=None):
         showcase_ids = [s["badge_id"] for s in showcase]
         showcase_badges = [b for b in badges if b["id"] in showcase_ids]
         
-        # Calculate rank for this user
-        pipeline = [
-            {"$group": {"_id": "$user_id", "badge_count": {"$sum": 1}}},
-            {"$sort": {"badge_count": -1}},
-        ]
-        all_rankings = await db.user_badges.aggregate(pipeline).to_list(length=1000)
-        user_rank = next((i + 1 for i, r in enumerate(all_rankings) if r["_id"] == user_id), None)
+        # Rank by badges held
+        user_rank = await leaderboard.rank(user_id, "count")
         
         # Generate Open Graph meta data
         user_name = user.get("name", "User")
@@ -506,6 +500,7 @@ def create_badges_router(db, get_current_user, badge_service=None):
             "awarded_by": current_user.user_id,
             "awarded_at": datetime.now(timezone.utc)
         })
+        await leaderboard.record_award(user_id)
         
         return {"message": "Badge awarded"}
     
@@ -514,9 +509,10 @@ def create_badges_router(db, get_current_user, badge_service=None):
         """Revoke badge from user (admin)"""
         await require_admin(current_user)
         
-        result = await db.user_badges.delete_one({"badge_id": badge_id, "user_id": user_id})
-        if result.deleted_count == 0:
+        revoked = await db.user_badges.find_one_and_delete({"badge_id": badge_id, "user_id": user_id})
+        if not revoked:
             raise HTTPException(status_code=404, detail="Badge not found for user")
+        await leaderboard.record_revoke(user_id, revoked.get("points_value", 0))
         
         return {"message": "Badge revoked"}
 
@@ -12,13 +12,74 @@ from fastapi import APIRouter, HTTPException, Request, Query
 from pydantic import BaseModel
 import logging
 
+from utils.loaders import get_loaders
+from utils.pagination import InvalidCursorError, apply_seek, decode_cursor, encode_cursor, page_from_batch
+from utils.read_watermarks import (
+    advance_read_watermark, apply_read_state, participant_role, read_watermarks, unread_field, watermark_field
+)
+from utils.unread_counters import adjust_unread, get_unread_count
+
 logger = logging.getLogger(__name__)
 
+# Inbox order: most recent message first, id as the tie-breaker; conversations
+# without messages (last_message_time null) come last
+INBOX_SORT = [("last_message_time", -1), ("id", 1)]
+INBOX_MAX_LIMIT = 100
+
+# Message history is paged backwards from the newest message; id breaks ties
+# between messages stored in the same millisecond
+MESSAGE_SORT = [("created_at", -1), ("id", -1)]
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_MAX_LIMIT = 200
+
+
+def inbox_seek_filter(cursor: str):
+    """Conversations after the cursor in INBOX_SORT order, including the trailing null-time ones."""
+    last_time, last_id = decode_cursor(cursor, INBOX_SORT)
+    if last_time is None:
+        return {"last_message_time": None, "id": {"$gt": last_id}}
+    return {"$or": [
+        {"last_message_time": {"$lt": last_time}},
+        {"last_message_time": last_time, "id": {"$gt": last_id}},
+        {"last_message_time": None},
+    ]}
+
+
+async def assemble_inbox(conversations, user_id: str, loaders):
+    """
+    Attach the listing card, the other participant and the caller's unread
+    count to each conversation. Listings and users load in one batch each.
+    """
+    def other_user_id(conv):
+        return conv["seller_id"] if conv["buyer_id"] == user_id else conv["buyer_id"]
+    
+    listing_ids = [conv.get("listing_id") for conv in conversations]
+    listing_ids = [lid if lid and lid != "direct" else None for lid in listing_ids]
+    cards, other_users = await asyncio.gather(
+        loaders.listing_cards.load_many([lid for lid in listing_ids if lid]),
+        loaders.user_cards.load_many([other_user_id(conv) for conv in conversations]),
+    )
+    by_id = dict(zip([lid for lid in listing_ids if lid], cards))
+    listings = [by_id.get(lid) if lid else None for lid in listing_ids]
+    return [
+        {
+            **conv,
+            "listing": listing,
+            "other_user": other_user,
+            "unread": conv.get("buyer_unread", 0) if conv["buyer_id"] == user_id else conv.get("seller_unread", 0)
+        }
+        for conv, listing, other_user in zip(conversations, listings, other_users)
+    ]
+
 
 # =============================================================================
 # MODELS
 # =============================================================================
 
+class MarkRead(BaseModel):
+    message_id: Optional[str] = None  # Read up to this message; defaults to the newest
+
+
 class MessageCreate(BaseModel):
     content: str
     message_type: str = "text"  # text, audio, image, video
@@ -142,112 +203,169 @@ def create_conversations_router(db, require_auth, check_rate_limit, sio, create_
     
     @router.get("/unread-count")
     async def get_unread_message_count(request: Request):
-        """Get total unread message count across all conversations"""
+        """Get total unread message count across all conversations (also pushed as unread_count over Socket.IO)"""
         user = await require_auth(request)
-        
-        # Find all conversations where user is buyer or seller
-        conversations = await db.conversations.find({
-            "$or": [
-                {"buyer_id": user.user_id},
-                {"seller_id": user.user_id}
-            ]
-        }, {"_id": 0, "buyer_id": 1, "seller_id": 1, "buyer_unread": 1, "seller_unread": 1}).to_list(1000)
-        
-        # Sum up unread counts based on user's role in each conversation
-        total_unread = 0
-        for conv in conversations:
-            if conv.get("buyer_id") == user.user_id:
-                total_unread += conv.get("buyer_unread", 0)
-            else:
-                total_unread += conv.get("seller_unread", 0)
-        
-        return {"count": total_unread}
+        return {"count": await get_unread_count(db, user.user_id)}
     
     @router.get("")
-    async def get_conversations(request: Request):
-        """Get user's conversations"""
+    async def get_conversations(
+        request: Request,
+        limit: int = Query(INBOX_MAX_LIMIT, ge=1, le=INBOX_MAX_LIMIT),
+        cursor: Optional[str] = Query(None, description="Opaque keyset cursor from next_cursor"),
+        paginate: str = Query("list", description="list (plain array, first page) or cursor (keyset pages)")
+    ):
+        """
+        Get user's conversations, most recent first.
+        
+        Passing a cursor (or paginate=cursor) returns keyset pages with
+        next_cursor, so inboxes are no longer capped at the first 100.
+        """
         user = await require_auth(request)
         
-        conversations = await db.conversations.find({
+        query = {
             "$or": [
                 {"buyer_id": user.user_id},
                 {"seller_id": user.user_id}
             ]
-        }, {"_id": 0}).sort("last_message_time", -1).to_list(100)
+        }
+        if cursor:
+            try:
+                query = {"$and": [query, inbox_seek_filter(cursor)]}
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        # Enrich with listing and user info
-        result = []
-        for conv in conversations:
-            listing = await db.listings.find_one({"id": conv["listing_id"]}, {"_id": 0})
-            
-            other_user_id = conv["seller_id"] if conv["buyer_id"] == user.user_id else conv["buyer_id"]
-            other_user = await db.users.find_one({"user_id": other_user_id}, {"_id": 0})
-            
-            unread = conv["buyer_unread"] if conv["buyer_id"] == user.user_id else conv["seller_unread"]
-            
-            result.append({
-                **conv,
-                "listing": {
-                    "id": listing["id"],
-                    "title": listing["title"],
-                    "price": listing["price"],
-                    "images": listing.get("images", [])[:1]
-                } if listing else None,
-                "other_user": {
-                    "user_id": other_user["user_id"],
-                    "name": other_user["name"],
-                    "picture": other_user.get("picture")
-                } if other_user else None,
-                "unread": unread
-            })
-        
-        return result
-    
-    @router.get("/{conversation_id}")
-    async def get_conversation(conversation_id: str, request: Request):
-        """Get single conversation with messages"""
-        user = await require_auth(request)
+        batch = await db.conversations.find(query, {"_id": 0}).sort(INBOX_SORT).limit(limit + 1).to_list(limit + 1)
+        conversations = batch[:limit]
+        result = await assemble_inbox(conversations, user.user_id, get_loaders(request, db))
         
+        if not cursor and paginate != "cursor":
+            return result
+        
+        next_cursor = encode_cursor(conversations[-1], INBOX_SORT) if len(batch) > limit else None
+        return {
+            "conversations": result,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "limit": limit
+        }
+    
+    async def load_participant_conversation(conversation_id: str, user_id: str):
         conversation = await db.conversations.find_one({"id": conversation_id}, {"_id": 0})
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Check access
-        if user.user_id not in [conversation["buyer_id"], conversation["seller_id"]]:
+        if user_id not in [conversation["buyer_id"], conversation["seller_id"]]:
             raise HTTPException(status_code=403, detail="Not authorized")
+        return conversation
+    
+    async def load_message_page(conversation_id: str, limit: int, before: Optional[str]):
+        """One page of messages ending just before `before`, returned oldest first."""
+        try:
+            query = apply_seek({"conversation_id": conversation_id}, MESSAGE_SORT, before)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        batch = await db.messages.find(query, {"_id": 0}).sort(MESSAGE_SORT).limit(limit + 1).to_list(limit + 1)
+        messages, next_cursor = page_from_batch(batch, limit, MESSAGE_SORT)
+        messages.reverse()
+        return messages, next_cursor
+    
+    async def mark_conversation_read(conversation, user_id: str, up_to=None):
+        """Advance the caller's watermark, update their unread total and send read receipts."""
+        delta = await advance_read_watermark(db, conversation, user_id, up_to)
+        if delta is None:
+            return
+        await adjust_unread(db, user_id, delta, sio)
+        if sio:
+            read_at = conversation[watermark_field(participant_role(conversation, user_id))]
+            await sio.emit("messages_read", {
+                "conversation_id": conversation["id"],
+                "user_id": user_id,
+                "read_at": read_at.isoformat()
+            }, room=conversation["id"])
+    
+    @router.get("/{conversation_id}")
+    async def get_conversation(
+        conversation_id: str,
+        request: Request,
+        message_limit: int = Query(500, ge=1, le=500)
+    ):
+        """
+        Get single conversation with its newest messages (oldest first).
+        Older history is paged with GET /{conversation_id}/messages?before=messages_next_cursor.
+        """
+        user = await require_auth(request)
+        conversation = await load_participant_conversation(conversation_id, user.user_id)
         
-        # Get messages
-        messages = await db.messages.find(
-            {"conversation_id": conversation_id}, 
-            {"_id": 0}
-        ).sort("created_at", 1).to_list(500)
+        messages, next_cursor = await load_message_page(conversation_id, message_limit, None)
         
-        # Mark as read
-        if conversation["buyer_id"] == user.user_id:
-            await db.conversations.update_one({"id": conversation_id}, {"$set": {"buyer_unread": 0}})
-        else:
-            await db.conversations.update_one({"id": conversation_id}, {"$set": {"seller_unread": 0}})
+        # Mark as read: moves the caller's watermark, no per-message writes
+        if messages:
+            await mark_conversation_read(conversation, user.user_id, messages[-1].get("created_at"))
+        apply_read_state(messages, conversation)
         
-        # Mark messages as read
-        await db.messages.update_many(
-            {"conversation_id": conversation_id, "sender_id": {"$ne": user.user_id}},
-            {"$set": {"read": True}}
-        )
+        # Listing card and other user, loaded together
+        [enriched] = await assemble_inbox([conversation], user.user_id, get_loaders(request, db))
+        enriched.pop("unread", None)
         
-        # Get listing and other user
-        listing = await db.listings.find_one({"id": conversation["listing_id"]}, {"_id": 0})
-        other_user_id = conversation["seller_id"] if conversation["buyer_id"] == user.user_id else conversation["buyer_id"]
-        other_user = await db.users.find_one({"user_id": other_user_id}, {"_id": 0})
+        return {
+            **enriched,
+            "messages": messages,
+            "messages_next_cursor": next_cursor
+        }
+    
+    @router.get("/{conversation_id}/messages")
+    async def get_messages(
+        conversation_id: str,
+        request: Request,
+        limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MESSAGE_MAX_LIMIT),
+        before: Optional[str] = Query(None, description="Cursor from next_cursor: the page of older messages"),
+        mark_read: bool = Query(True, description="Move the caller's read watermark to the newest message returned")
+    ):
+        """
+        Message history, newest page first, each page ordered oldest first.
+        `read` on each message is derived from the recipient's watermark.
+        """
+        user = await require_auth(request)
+        conversation = await load_participant_conversation(conversation_id, user.user_id)
         
+        messages, next_cursor = await load_message_page(conversation_id, limit, before)
+        if mark_read and messages:
+            await mark_conversation_read(conversation, user.user_id, messages[-1].get("created_at"))
+        apply_read_state(messages, conversation)
+        
+        role = participant_role(conversation, user.user_id)
         return {
-            **conversation,
             "messages": messages,
-            "listing": listing,
-            "other_user": {
-                "user_id": other_user["user_id"],
-                "name": other_user["name"],
-                "picture": other_user.get("picture")
-            } if other_user else None
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "limit": limit,
+            "read_watermarks": read_watermarks(conversation),
+            "unread": conversation.get(unread_field(role), 0)
+        }
+    
+    @router.post("/{conversation_id}/read")
+    async def mark_conversation_as_read(conversation_id: str, request: Request, body: Optional[MarkRead] = None):
+        """Mark the conversation read up to a message (default: the newest)"""
+        user = await require_auth(request)
+        conversation = await load_participant_conversation(conversation_id, user.user_id)
+        
+        up_to = None
+        if body and body.message_id:
+            message = await db.messages.find_one(
+                {"id": body.message_id, "conversation_id": conversation_id}, {"_id": 0, "created_at": 1}
+            )
+            if not message:
+                raise HTTPException(status_code=404, detail="Message not found")
+            up_to = message.get("created_at")
+        
+        await mark_conversation_read(conversation, user.user_id, up_to)
+        
+        role = participant_role(conversation, user.user_id)
+        return {
+            "success": True,
+            "read_at": conversation.get(watermark_field(role)),
+            "unread": conversation.get(unread_field(role), 0)
         }
     
     @router.post("/{conversation_id}/messages")
@@ -294,7 +412,7 @@ def create_conversations_router(db, require_auth, check_rate_limit, sio, create_
                     )
         
         # Rate limiting
-        if not check_rate_limit(user.user_id, "message"):
+        if not await check_rate_limit(user.user_id, "message"):
             raise HTTPException(status_code=429, detail="Too many messages. Please wait.")
         
         conversation = await db.conversations.find_one({"id": conversation_id}, {"_id": 0})
@@ -374,17 +492,19 @@ def create_conversations_router(db, require_auth, check_rate_limit, sio, create_
         
         # Update conversation
         last_msg_preview = message.content[:100] if message.message_type == "text" else f"[{message.message_type.title()}]"
-        unread_field = "seller_unread" if conversation["buyer_id"] == user.user_id else "buyer_unread"
+        recipient_unread_field = "seller_unread" if conversation["buyer_id"] == user.user_id else "buyer_unread"
         await db.conversations.update_one(
             {"id": conversation_id},
             {
                 "$set": {
                     "last_message": last_msg_preview,
-                    "last_message_time": datetime.now(timezone.utc)
+                    # Same instant as the message, so a watermark at it means caught up
+                    "last_message_time": new_message["created_at"]
                 },
-                "$inc": {unread_field: 1}
+                "$inc": {recipient_unread_field: 1}
             }
         )
+        await adjust_unread(db, other_user_id, 1, sio)
         
         # Emit socket event
         if sio:
@@ -559,7 +679,12 @@ def create_conversations_router(db, require_auth, check_rate_limit, sio, create_
         
         # If both participants have deleted, actually remove
         if len(deleted_by) >= 2:
-            await db.conversations.delete_one({"id": conversation_id})
+            removed = await db.conversations.find_one_and_delete(
+                {"id": conversation_id}, {"_id": 0, "buyer_id": 1, "seller_id": 1, "buyer_unread": 1, "seller_unread": 1}
+            )
+            for role in ("buyer", "seller"):
+                if removed and removed.get(unread_field(role)):
+                    await adjust_unread(db, removed[f"{role}_id"], -removed[unread_field(role)], sio)
             await db.messages.delete_many({"conversation_id": conversation_id})
         
         return {"success": True, "message": "Conversation deleted"}
@@ -24,6 +24,10 @@ except ImportError:
     CACHE_AVAILABLE = False
     logger.warning("Cache module not available")
 
+from utils.search_service import get_search_service
+from utils.pagination import InvalidCursorError
+from utils.feed_snapshots import FEED_PROJECTION, to_feed_item, get_feed_snapshots
+
 # Import image optimizer for thumbnail compression
 try:
     from utils.image_optimizer import create_thumbnail, is_url
@@ -74,29 +78,7 @@ def get_compressed_thumbnail(img_source: str) -> str:
 def create_feed_router(db):
     """Create the feed router with database dependency."""
     
-    # Minimal fields for feed cards - reduces payload size by ~80%
-    # NOTE: Do NOT include "images" here - base64 images are huge and cause query timeouts
-    FEED_PROJECTION = {
-        "_id": 0,
-        "id": 1,
-        "title": 1,
-        "price": 1,
-        "currency": 1,
-        "location": 1,
-        "cityName": 1,  # Pre-computed for display
-        "category_id": 1,
-        "subcategory": 1,
-        "feed_thumbnail": 1,  # Pre-computed small thumbnail
-        "thumbnail": 1,  # Optimized thumbnail URL
-        "r2_images": 1,  # Cloudflare R2 CDN image URLs
-        "created_at": 1,
-        "is_boosted": 1,
-        "boost_expires_at": 1,
-        "user_id": 1,
-        "status": 1,
-        "views_count": 1,
-        "is_negotiable": 1,
-    }
+    snapshots = get_feed_snapshots(db)
     
     def generate_cache_key(params: dict) -> str:
         """Generate a unique cache key from query parameters."""
@@ -122,7 +104,9 @@ def create_feed_router(db):
         High-performance feed endpoint with cursor-based pagination.
         
         Features:
-        - Redis/memory caching (60s TTL)
+        - Country/category/sort pages served from materialized snapshots
+          (utils/feed_snapshots.py), including cursor pages
+        - Redis/memory caching (60s TTL) for other filter combinations
         - Minimal payload (only fields needed for feed cards)
         - Cursor-based pagination for stable results
         - ETag support for HTTP caching
@@ -132,6 +116,27 @@ def create_feed_router(db):
         """
         start_time = time.time()
         
+        # Materialized snapshot path (cursors from the query path fall through)
+        if snapshots.ready and snapshots.eligible(sort, region, city, subcategory, seller_id, search):
+            try:
+                page = await snapshots.page(country, category, sort, cursor, limit)
+            except InvalidCursorError:
+                page = None
+            if page is not None:
+                result = {**page, "serverTime": datetime.now(timezone.utc).isoformat()}
+                etag = hashlib.md5(
+                    f"{[i['id'] for i in result['items']]}:{result['nextCursor']}".encode()
+                ).hexdigest()
+                if request.headers.get("if-none-match") == etag:
+                    response.status_code = 304
+                    return None
+                response.headers["ETag"] = etag
+                response.headers["Cache-Control"] = "max-age=30, stale-while-revalidate=120"
+                response.headers["X-Total-Approx"] = str(result["totalApprox"])
+                response.headers["X-Cache"] = "SNAPSHOT"
+                response.headers["X-Response-Time"] = f"{(time.time() - start_time) * 1000:.0f}ms"
+                return result
+        
         # Generate cache key
         cache_params = {
             "country": country, "region": region, "city": city,
@@ -141,195 +146,165 @@ def create_feed_router(db):
         }
         cache_key = generate_cache_key(cache_params)
         
-        # Try cache first (skip if cursor-based pagination for freshness)
-        if CACHE_AVAILABLE and not cursor:
-            cached_result = await cache.get(cache_key)
-            if cached_result:
-                # Add cache header
-                response.headers["X-Cache"] = "HIT"
-                response.headers["X-Response-Time"] = f"{(time.time() - start_time) * 1000:.0f}ms"
-                return cached_result
-        
-        # Build query
-        query = {"status": "active"}
+        async def build_result():
+            """Run the feed queries for this request."""
+            # Build query
+            query = {"status": "active"}
         
-        # Build location filter using proper AND logic
-        location_conditions = []
+            # Build location filter using proper AND logic
+            location_conditions = []
         
-        if country:
-            location_conditions.append({
-                "$or": [
-                    {"location.country_code": country},
-                    {"location.country": country},
-                ]
-            })
+            if country:
+                location_conditions.append({
+                    "$or": [
+                        {"location.country_code": country},
+                        {"location.country": country},
+                    ]
+                })
         
-        if region:
-            location_conditions.append({
-                "$or": [
-                    {"location.region": region},
-                    {"location.region_code": region},
-                ]
-            })
+            if region:
+                location_conditions.append({
+                    "$or": [
+                        {"location.region": region},
+                        {"location.region_code": region},
+                    ]
+                })
         
-        if city:
-            location_conditions.append({
-                "$or": [
-                    {"location.city": city},
-                    {"location.city_id": city},
-                    {"location.city_code": city},
-                ]
-            })
+            if city:
+                location_conditions.append({
+                    "$or": [
+                        {"location.city": city},
+                        {"location.city_id": city},
+                        {"location.city_code": city},
+                    ]
+                })
         
-        # Apply location conditions with AND logic
-        if location_conditions:
-            if len(location_conditions) == 1:
-                query.update(location_conditions[0])
-            else:
-                query["$and"] = location_conditions
+            # Apply location conditions with AND logic
+            if location_conditions:
+                if len(location_conditions) == 1:
+                    query.update(location_conditions[0])
+                else:
+                    query["$and"] = location_conditions
             
-        if category:
-            query["category_id"] = category
+            if category:
+                query["category_id"] = category
             
-        if subcategory:
-            query["subcategory"] = subcategory
+            if subcategory:
+                query["subcategory"] = subcategory
             
-        if seller_id:
-            query["user_id"] = seller_id
+            if seller_id:
+                query["user_id"] = seller_id
             
-        if search:
-            query["$text"] = {"$search": search}
+            if search:
+                query.update(await get_search_service(db).match_filter(search))
         
-        # Determine sort order
-        now = datetime.now(timezone.utc)
-        sort_options = {
-            "newest": [("created_at", -1)],
-            "oldest": [("created_at", 1)],
-            "price_low": [("price", 1), ("created_at", -1)],
-            "price_high": [("price", -1), ("created_at", -1)],
-            "popular": [("views_count", -1), ("created_at", -1)],
-        }
-        sort_order = sort_options.get(sort, sort_options["newest"])
+            # Determine sort order
+            now = datetime.now(timezone.utc)
+            sort_options = {
+                "newest": [("created_at", -1)],
+                "oldest": [("created_at", 1)],
+                "price_low": [("price", 1), ("created_at", -1)],
+                "price_high": [("price", -1), ("created_at", -1)],
+                "popular": [("views_count", -1), ("created_at", -1)],
+            }
+            sort_order = sort_options.get(sort, sort_options["newest"])
         
-        # Handle cursor-based pagination
-        if cursor:
-            try:
-                cursor_data = json.loads(cursor)
-                cursor_id = cursor_data.get("id")
-                cursor_created = cursor_data.get("created_at")
+            # Handle cursor-based pagination
+            if cursor:
+                try:
+                    cursor_data = json.loads(cursor)
+                    cursor_id = cursor_data.get("id")
+                    cursor_created = cursor_data.get("created_at")
                 
-                if sort == "newest":
-                    query["$or"] = [
-                        {"created_at": {"$lt": cursor_created}},
-                        {"created_at": cursor_created, "id": {"$lt": cursor_id}}
-                    ]
-                elif sort == "oldest":
-                    query["$or"] = [
-                        {"created_at": {"$gt": cursor_created}},
-                        {"created_at": cursor_created, "id": {"$gt": cursor_id}}
-                    ]
-            except:
-                pass  # Invalid cursor, start from beginning
+                    if sort == "newest":
+                        query["$or"] = [
+                            {"created_at": {"$lt": cursor_created}},
+                            {"created_at": cursor_created, "id": {"$lt": cursor_id}}
+                        ]
+                    elif sort == "oldest":
+                        query["$or"] = [
+                            {"created_at": {"$gt": cursor_created}},
+                            {"created_at": cursor_created, "id": {"$gt": cursor_id}}
+                        ]
+                except:
+                    pass  # Invalid cursor, start from beginning
         
-        # Get boosted listings first (if not using cursor)
-        boosted_items = []
-        if not cursor:
-            boosted_query = {**query, "is_boosted": True, "boost_expires_at": {"$gt": now.isoformat()}}
-            boosted_cursor = db.listings.find(boosted_query, FEED_PROJECTION).sort("boost_expires_at", -1).limit(5)
-            boosted_items = await boosted_cursor.to_list(5)
+            # Get boosted listings first (if not using cursor)
+            boosted_items = []
+            if not cursor:
+                boosted_query = {**query, "is_boosted": True, "boost_expires_at": {"$gt": now.isoformat()}}
+                boosted_cursor = db.listings.find(boosted_query, FEED_PROJECTION).sort("boost_expires_at", -1).limit(5)
+                boosted_items = await boosted_cursor.to_list(5)
             
-            # Exclude boosted items from main query to avoid duplicates
-            if boosted_items:
-                boosted_ids = [item["id"] for item in boosted_items]
-                query["id"] = {"$nin": boosted_ids}
+                # Exclude boosted items from main query to avoid duplicates
+                if boosted_items:
+                    boosted_ids = [item["id"] for item in boosted_items]
+                    query["id"] = {**query.get("id", {}), "$nin": boosted_ids}
         
-        # Execute main query
-        cursor_obj = db.listings.find(query, FEED_PROJECTION).sort(sort_order).limit(limit + 1)
-        items = await cursor_obj.to_list(limit + 1)
+            # Execute main query
+            cursor_obj = db.listings.find(query, FEED_PROJECTION).sort(sort_order).limit(limit + 1)
+            items = await cursor_obj.to_list(limit + 1)
         
-        # Determine if there are more items
-        has_more = len(items) > limit
-        if has_more:
-            items = items[:limit]
+            # Determine if there are more items
+            has_more = len(items) > limit
+            if has_more:
+                items = items[:limit]
         
-        # Build next cursor
-        next_cursor = None
-        if has_more and items:
-            last_item = items[-1]
-            created_at = last_item.get("created_at")
-            # Handle datetime objects
-            if hasattr(created_at, 'isoformat'):
-                created_at = created_at.isoformat()
-            next_cursor = json.dumps({
-                "id": last_item.get("id"),
-                "created_at": created_at
-            })
+            # Build next cursor
+            next_cursor = None
+            if has_more and items:
+                last_item = items[-1]
+                created_at = last_item.get("created_at")
+                # Handle datetime objects
+                if hasattr(created_at, 'isoformat'):
+                    created_at = created_at.isoformat()
+                next_cursor = json.dumps({
+                    "id": last_item.get("id"),
+                    "created_at": created_at
+                })
         
-        # Combine boosted + regular items
-        all_items = boosted_items + items
+            # Combine boosted + regular items
+            all_items = boosted_items + items
         
-        # Transform items for feed
-        feed_items = []
-        for item in all_items:
-            # Get thumbnail URL: prefer R2 CDN images > feed_thumbnail > thumbnail
-            r2_imgs = item.get("r2_images", [])
-            if r2_imgs and isinstance(r2_imgs, list) and len(r2_imgs) > 0:
-                thumb_url = r2_imgs[0].get("thumb_url") or r2_imgs[0].get("url")
-            else:
-                thumb_url = item.get("feed_thumbnail") or item.get("thumbnail") or None
-            
-            # Handle location - it could be a string or an object
-            location = item.get("location", {})
-            if isinstance(location, str):
-                city_name = location
-                country_code = "TZ"
+            # Transform items for feed
+            feed_items = [to_feed_item(item) for item in all_items]
+        
+            # Get approximate total (for UI, not exact)
+            if snapshots.ready:
+                total_approx = await snapshots.total()
             else:
-                city_name = location.get("city", "Unknown") if location else "Unknown"
-                country_code = location.get("country_code", "TZ") if location else "TZ"
-            
-            # Handle created_at - it could be a datetime or string
-            created_at = item.get("created_at")
-            if hasattr(created_at, 'isoformat'):
-                created_at = created_at.isoformat()
-            
-            feed_items.append({
-                "id": item.get("id"),
-                "title": item.get("title", ""),
-                "price": item.get("price", 0),
-                "currency": item.get("currency", "TZS"),
-                "cityName": city_name,
-                "countryCode": country_code,
-                "category": item.get("category_id") or item.get("category"),
-                "subcategory": item.get("subcategory"),
-                "thumbUrl": thumb_url,
-                "createdAt": created_at,
-                "isBoosted": item.get("is_boosted", False),
-                "sellerId": item.get("user_id"),
-                "viewsCount": item.get("views_count", 0),
-                "isNegotiable": item.get("is_negotiable", False),
-            })
+                total_approx = await db.listings.count_documents({"status": "active"})
         
-        # Get approximate total (for UI, not exact)
-        total_approx = await db.listings.count_documents({"status": "active"})
+            # Build response
+            return {
+                "items": feed_items,
+                "nextCursor": next_cursor,
+                "totalApprox": total_approx,
+                "serverTime": now.isoformat(),
+                "hasMore": has_more,
+            }
         
-        # Build response
-        result = {
-            "items": feed_items,
-            "nextCursor": next_cursor,
-            "totalApprox": total_approx,
-            "serverTime": now.isoformat(),
-            "hasMore": has_more,
-        }
+        # First pages are cached with single-flight recomputation and served
+        # stale for up to 2 minutes while one refresh runs
+        x_cache = "MISS"
+        if CACHE_AVAILABLE and not cursor:
+            computed = []
+
+            async def compute():
+                computed.append(True)
+                return await build_result()
+
+            result = await cache.get_or_compute(cache_key, compute, ttl=60, stale_ttl=120)
+            if not computed:
+                x_cache = "HIT"
+        else:
+            result = await build_result()
         
         # Calculate response time
         response_time = (time.time() - start_time) * 1000
         
-        # Cache the result (for non-cursor requests)
-        if CACHE_AVAILABLE and not cursor:
-            await cache.set(cache_key, result, ttl=60)
-        
         # Generate ETag for caching
-        etag_content = f"{json.dumps(query)}:{sort}:{cursor}:{limit}"
+        etag_content = f"{[item['id'] for item in result['items']]}:{result['nextCursor']}"
         etag = hashlib.md5(etag_content.encode()).hexdigest()
         
         # Check If-None-Match header
@@ -341,8 +316,8 @@ def create_feed_router(db):
         # Set cache headers
         response.headers["ETag"] = etag
         response.headers["Cache-Control"] = "max-age=30, stale-while-revalidate=120"
-        response.headers["X-Total-Approx"] = str(total_approx)
-        response.headers["X-Cache"] = "MISS"
+        response.headers["X-Total-Approx"] = str(result["totalApprox"])
+        response.headers["X-Cache"] = x_cache
         response.headers["X-Response-Time"] = f"{response_time:.0f}ms"
         
         return result
@@ -359,7 +334,10 @@ def create_feed_router(db):
             sort=[("created_at", -1)]
         )
         
-        count = await db.listings.count_documents({"status": "active"})
+        if snapshots.ready:
+            count = await snapshots.total()
+        else:
+            count = await db.listings.count_documents({"status": "active"})
         
         return {
             "latestUpdate": latest.get("created_at") if latest else None,
@@ -407,11 +385,8 @@ FEED_INDEXES = [
         "keys": [("status", 1), ("category", 1), ("created_at", -1)],
         "name": "feed_category_idx"
     },
-    # Text search index
-    {
-        "keys": [("title", "text"), ("description", "text")],
-        "name": "feed_text_search_idx"
-    },
+    # Text search uses the shared weighted idx_listings_text_search index
+    # (utils/db_indexes.py); MongoDB allows only one text index per collection.
 ]
 
 
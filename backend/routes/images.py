@@ -25,8 +25,7 @@ def create_image_router(db, require_auth):
     ):
         """Upload an image to R2 CDN. Returns the image paths for storage."""
         from utils.r2_storage import (
-            is_configured, upload_bytes, compress_image, make_thumbnail,
-            get_public_url,
+            is_configured, upload_bytes, transcode_upload_async, get_public_url,
         )
         if not is_configured():
             raise HTTPException(status_code=503, detail="Image storage not configured")
@@ -43,13 +42,11 @@ def create_image_router(db, require_auth):
         uid = uuid.uuid4().hex[:12]
         lid = listing_id or "general"
 
-        # Compress full image
-        full_bytes, full_ct = compress_image(raw, max_width=1200, quality=80)
+        # Compress full image and create thumbnail (CPU pool)
+        (full_bytes, full_ct), (thumb_bytes, thumb_ct) = await transcode_upload_async(raw)
         full_path = f"listings/{user.user_id}/{lid}/{uid}.webp"
         full_result = await upload_bytes(full_bytes, full_path, full_ct)
 
-        # Create thumbnail
-        thumb_bytes, thumb_ct = make_thumbnail(raw, size=(300, 300), quality=60)
         thumb_path = f"listings/{user.user_id}/{lid}/thumb_{uid}.webp"
         thumb_result = await upload_bytes(thumb_bytes, thumb_path, thumb_ct)
 
@@ -143,8 +140,7 @@ def create_v1_image_router(db, require_auth):
     ):
         """Upload an image to R2 CDN. Returns the image key and CDN URLs."""
         from utils.r2_storage import (
-            is_configured, upload_bytes, compress_image, make_thumbnail,
-            get_public_url,
+            is_configured, upload_bytes, transcode_upload_async, get_public_url,
         )
         if not is_configured():
             raise HTTPException(status_code=503, detail="Image storage not configured")
@@ -161,11 +157,10 @@ def create_v1_image_router(db, require_auth):
         uid = uuid.uuid4().hex[:12]
         lid = listing_id or "general"
 
-        full_bytes, full_ct = compress_image(raw, max_width=1200, quality=80)
+        (full_bytes, full_ct), (thumb_bytes, thumb_ct) = await transcode_upload_async(raw)
         full_path = f"listings/{user.user_id}/{lid}/{uid}.webp"
         full_result = await upload_bytes(full_bytes, full_path, full_ct)
 
-        thumb_bytes, thumb_ct = make_thumbnail(raw, size=(300, 300), quality=60)
         thumb_path = f"listings/{user.user_id}/{lid}/thumb_{uid}.webp"
         thumb_result = await upload_bytes(thumb_bytes, thumb_path, thumb_ct)
 
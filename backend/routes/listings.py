@@ -11,6 +11,16 @@ from fastapi import APIRouter, HTTPException, Request, Query, Depends
 from pydantic import BaseModel
 import logging
 
+from utils.pagination import (
+    InvalidCursorError,
+    apply_seek,
+    compute_boost_tier,
+    page_from_batch,
+)
+from utils.search_service import get_search_service, search_fields_for
+from utils.event_bus import event_bus, DomainEvent, EventTypes
+from utils.geo import geo_point_from, geo_near_page, count_within
+
 logger = logging.getLogger(__name__)
 
 
@@ -152,6 +162,7 @@ def create_listings_router(
         APIRouter with listing endpoints
     """
     router = APIRouter(prefix="/listings", tags=["Listings"])
+    search_service = get_search_service(db)
     
     # Initialize notification service
     notification_service = None
@@ -167,7 +178,7 @@ def create_listings_router(
         user = await require_auth(request)
         
         # Rate limiting
-        if not check_rate_limit(user.user_id, "post_listing"):
+        if not await check_rate_limit(user.user_id, "post_listing"):
             raise HTTPException(status_code=429, detail="Too many listings. Please wait.")
         
         # Map legacy category ID if needed
@@ -193,10 +204,7 @@ def create_listings_router(
                 location_text = location_data['location_text']
             # Create GeoJSON point for geospatial queries
             if location_data.get('lat') and location_data.get('lng'):
-                geo_point = {
-                    "type": "Point",
-                    "coordinates": [location_data['lng'], location_data['lat']]  # GeoJSON is [lng, lat]
-                }
+                geo_point = geo_point_from(location_data['lat'], location_data['lng'])
         
         # Get category name for SEO
         category_name = None
@@ -254,6 +262,8 @@ def create_listings_router(
             "seo_data": seo_data,
             "status": "active",
             "featured": False,
+            "boost_tier": compute_boost_tier(False),
+            **search_fields_for({"title": listing.title}),
             "views": 0,
             "favorites_count": 0,
             "created_at": datetime.now(timezone.utc),
@@ -297,52 +307,20 @@ def create_listings_router(
 
         await db.listings.insert_one(new_listing)
         created_listing = await db.listings.find_one({"id": listing_id}, {"_id": 0})
-        
-        # Track cohort event for listing creation
-        try:
-            import httpx
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    "http://localhost:8001/api/cohort-analytics/events/track",
-                    json={
-                        "user_id": user.user_id,
-                        "event_type": "listing_created",
-                        "properties": {
-                            "listing_id": listing_id,
-                            "category_id": category_id,
-                            "price": listing.price
-                        }
-                    },
-                    timeout=2.0
-                )
-        except Exception as e:
-            logger.debug(f"Cohort event tracking failed: {e}")
-        
-        # Trigger smart notifications for users interested in this category
-        try:
-            from smart_notifications import SmartNotificationService
-            smart_service = SmartNotificationService(db)
-            import asyncio
-            asyncio.create_task(smart_service.check_new_listing_triggers(created_listing))
-        except Exception as e:
-            logger.debug(f"Smart notification trigger failed: {e}")
-        
-        # Check and award badges for listing creation (async, non-blocking)
-        try:
-            from services.badge_service import get_badge_service
-            badge_service = get_badge_service(db)
-            import asyncio
-            asyncio.create_task(badge_service.check_and_award_badges(user.user_id, trigger="listing"))
-        except Exception as e:
-            logger.debug(f"Badge check failed: {e}")
-        
-        # Notify user of stats update via WebSocket (real-time Quick Stats)
-        if notify_stats_update:
-            try:
-                import asyncio
-                asyncio.create_task(notify_stats_update(user.user_id))
-            except Exception as e:
-                logger.debug(f"Stats notification failed: {e}")
+        search_service.index_listing(created_listing)
+        
+        # Cohort tracking, smart notifications, badges and the stats push
+        # subscribe to this event; nothing here waits on them
+        event_bus.publish(DomainEvent(
+            type=EventTypes.LISTING_CREATED,
+            user_id=user.user_id,
+            properties={
+                "listing_id": listing_id,
+                "category_id": category_id,
+                "price": listing.price
+            },
+            context={"listing": created_listing}
+        ))
         
         return created_listing
     
@@ -362,9 +340,17 @@ def create_listings_router(
         sort: str = "newest",
         page: int = 1,
         limit: int = 20,
-        filters: Optional[str] = None  # JSON string of attribute filters
+        filters: Optional[str] = None,  # JSON string of attribute filters
+        cursor: Optional[str] = Query(None, description="Opaque keyset cursor from next_cursor"),
+        paginate: str = Query("page", description="page (page/total compatibility) or cursor (keyset)")
     ):
-        """Get listings with filters, subcategory filtering, and pagination"""
+        """
+        Get listings with filters, subcategory filtering, and pagination.
+
+        Boosted listings come first (stored boost_tier), then the requested sort.
+        Passing a cursor (or paginate=cursor) switches to keyset pagination,
+        which seeks through the boost-tier compound indexes and skips the count.
+        """
         query = {"status": "active"}
         
         # Handle legacy category IDs
@@ -377,10 +363,7 @@ def create_listings_router(
             query["subcategory"] = subcategory
         
         if search:
-            query["$or"] = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}}
-            ]
+            query.update(await search_service.match_filter(search))
         
         if min_price is not None:
             query["price"] = {"$gte": min_price}
@@ -407,24 +390,11 @@ def create_listings_router(
         # Fallback to text location search if no hierarchical codes provided
         if location and not any([country_code, region_code, district_code, city_code]):
             # Search in both legacy location field and new location_data.city_name
-            query["$or"] = query.get("$or", []) + [
+            query["$or"] = [
                 {"location": {"$regex": location, "$options": "i"}},
                 {"location_data.city_name": {"$regex": location, "$options": "i"}},
                 {"location_data.location_text": {"$regex": location, "$options": "i"}}
             ]
-            # If $or was already set for search, combine them with $and
-            if search:
-                search_or = [
-                    {"title": {"$regex": search, "$options": "i"}},
-                    {"description": {"$regex": search, "$options": "i"}}
-                ]
-                location_or = [
-                    {"location": {"$regex": location, "$options": "i"}},
-                    {"location_data.city_name": {"$regex": location, "$options": "i"}},
-                    {"location_data.location_text": {"$regex": location, "$options": "i"}}
-                ]
-                query["$and"] = [{"$or": search_or}, {"$or": location_or}]
-                del query["$or"]
         
         # Parse and apply dynamic attribute filters
         if filters:
@@ -464,51 +434,43 @@ def create_listings_router(
         elif sort == "oldest":
             sort_order = 1
         
-        # Pagination
-        skip = (page - 1) * limit
+        # Boosted listings first, then the requested sort; id breaks ties so
+        # keyset cursors are stable
+        sort_spec = [("boost_tier", -1), (sort_field, sort_order), ("id", sort_order)]
+        
+        # IMPORTANT: Exclude images and seo_data to avoid loading huge base64 data
+        projection = {"_id": 0, "images": 0, "seo_data": 0, "description": 0}
+        
+        if cursor or paginate == "cursor":
+            try:
+                seek_query = apply_seek(query, sort_spec, cursor)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            batch = await db.listings.find(seek_query, projection).sort(sort_spec).limit(limit + 1).to_list(limit + 1)
+            listings, next_cursor = page_from_batch(batch, limit, sort_spec)
+            
+            return {
+                "listings": listings,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+                "limit": limit
+            }
         
-        # Debug logging for friendship_dating
-        if category and "friendship" in category.lower():
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"DEBUG Friendship query: {query}")
+        # Pagination (page/total compatibility mode)
+        skip = (page - 1) * limit
         
         total = await db.listings.count_documents(query)
         
-        # Aggregation for boosted listings first
-        # IMPORTANT: Exclude images and seo_data EARLY to avoid loading huge base64 data
-        pipeline = [
-            {"$match": query},
-            {"$project": {
-                "images": 0,
-                "seo_data": 0,
-                "description": 0,
-            }},
-            {"$addFields": {
-                "is_boosted_val": {"$cond": [{"$eq": ["$is_boosted", True]}, 1, 0]},
-                "boost_priority_val": {"$ifNull": ["$boost_priority", 0]}
-            }},
-            {"$sort": {
-                "is_boosted_val": -1,
-                "boost_priority_val": -1,
-                sort_field: sort_order
-            }},
-            {"$skip": skip},
-            {"$limit": limit},
-            {"$project": {
-                "_id": 0,
-                "is_boosted_val": 0,
-                "boost_priority_val": 0,
-            }}
-        ]
-        
-        listings = await db.listings.aggregate(pipeline).to_list(limit)
+        batch = await db.listings.find(query, projection).sort(sort_spec).skip(skip).limit(limit + 1).to_list(limit + 1)
+        listings, next_cursor = page_from_batch(batch, limit, sort_spec)
         
         return {
             "listings": listings,
             "total": total,
             "page": page,
-            "pages": (total + limit - 1) // limit
+            "pages": (total + limit - 1) // limit,
+            "next_cursor": next_cursor
         }
     
     @router.get("/by-location")
@@ -522,7 +484,8 @@ def create_listings_router(
         subcategory: Optional[str] = None,
         page: int = 1,
         limit: int = 50,
-        only_my_city: bool = Query(False, description="Only show listings in selected city")
+        only_my_city: bool = Query(False, description="Only show listings in selected city"),
+        cursor: Optional[str] = Query(None, description="Opaque keyset cursor from next_cursor (nearby mode)")
     ):
         """
         Smart listing search by location.
@@ -530,6 +493,9 @@ def create_listings_router(
         1. First searches in the selected city
         2. If no results and include_nearby=True, expands to nearby cities
         3. Returns listings sorted by distance from selected city
+        
+        The nearby step uses $geoNear on geo_point (2dsphere) and pages by
+        (distance, id) cursors; total is capped at GEO_COUNT_CAP.
         """
         import math
         
@@ -600,98 +566,34 @@ def create_listings_router(
                 "message": "No listings in this city."
             }
         
-        # Find all listings with coordinates and calculate distances
-        # Using MongoDB aggregation for better performance
-        nearby_pipeline = [
-            {"$match": {
-                **base_query,
-                "location_data.lat": {"$exists": True},
-                "location_data.lng": {"$exists": True}
-            }},
-            {"$addFields": {
-                # Calculate approximate distance using spherical distance
-                "distance_km": {
-                    "$multiply": [
-                        6371,  # Earth radius in km
-                        {
-                            "$acos": {
-                                "$add": [
-                                    {"$multiply": [
-                                        {"$sin": {"$degreesToRadians": city_lat}},
-                                        {"$sin": {"$degreesToRadians": "$location_data.lat"}}
-                                    ]},
-                                    {"$multiply": [
-                                        {"$cos": {"$degreesToRadians": city_lat}},
-                                        {"$cos": {"$degreesToRadians": "$location_data.lat"}},
-                                        {"$cos": {
-                                            "$subtract": [
-                                                {"$degreesToRadians": "$location_data.lng"},
-                                                {"$degreesToRadians": city_lng}
-                                            ]
-                                        }}
-                                    ]}
-                                ]
-                            }
-                        }
-                    ]
-                }
-            }},
-            {"$match": {"distance_km": {"$lte": radius}}},
-            {"$sort": {"distance_km": 1}},
-            {"$skip": (page - 1) * limit},
-            {"$limit": limit},
-            {"$project": {"_id": 0, "images": 0, "seo_data": 0, "description": 0}}
-        ]
-        
-        nearby_listings = await db.listings.aggregate(nearby_pipeline).to_list(limit)
-        
-        # Count total nearby listings
-        count_pipeline = [
-            {"$match": {
-                **base_query,
-                "location_data.lat": {"$exists": True},
-                "location_data.lng": {"$exists": True}
-            }},
-            {"$addFields": {
-                "distance_km": {
-                    "$multiply": [
-                        6371,
-                        {"$acos": {
-                            "$add": [
-                                {"$multiply": [
-                                    {"$sin": {"$degreesToRadians": city_lat}},
-                                    {"$sin": {"$degreesToRadians": "$location_data.lat"}}
-                                ]},
-                                {"$multiply": [
-                                    {"$cos": {"$degreesToRadians": city_lat}},
-                                    {"$cos": {"$degreesToRadians": "$location_data.lat"}},
-                                    {"$cos": {"$subtract": [
-                                        {"$degreesToRadians": "$location_data.lng"},
-                                        {"$degreesToRadians": city_lng}
-                                    ]}}
-                                ]}
-                            ]
-                        }}
-                    ]
-                }
-            }},
-            {"$match": {"distance_km": {"$lte": radius}}},
-            {"$count": "total"}
-        ]
+        # Nearest listings first via $geoNear on the geo_point 2dsphere index
+        try:
+            nearby_listings, next_cursor = await geo_near_page(
+                db.listings, city_lat, city_lng, radius, base_query, limit,
+                projection=LOCATION_PROJECTION,
+                cursor=cursor,
+                skip=0 if cursor else (page - 1) * limit
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        count_result = await db.listings.aggregate(count_pipeline).to_list(1)
-        total = count_result[0]["total"] if count_result else 0
+        # Capped count: exact up to GEO_COUNT_CAP, then reported as "at least"
+        total, total_capped = await count_within(db.listings, city_lat, city_lng, radius, base_query)
+        total_label = f"{total}+" if total_capped else f"{total}"
         
         return {
             "listings": nearby_listings,
             "total": total,
+            "total_capped": total_capped,
             "page": page,
             "pages": (total + limit - 1) // limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
             "search_mode": "nearby_cities",
             "selected_city": city_code,
             "expanded_search": True,
             "search_radius_km": radius,
-            "message": f"No listings in selected city. Showing {total} listings within {radius}km."
+            "message": f"No listings in selected city. Showing {total_label} listings within {radius}km."
         }
     
     @router.get("/my")
@@ -940,6 +842,12 @@ def create_listings_router(
         
         update_data = {k: v for k, v in update.model_dump().items() if v is not None}
         update_data["updated_at"] = datetime.now(timezone.utc)
+        if "title" in update_data:
+            update_data.update(search_fields_for(update_data))
+        if "location_data" in update_data:
+            update_data["geo_point"] = geo_point_from(
+                update_data["location_data"].get("lat"), update_data["location_data"].get("lng")
+            )
         
         # Check for price drop to trigger notifications
         old_price = listing.get("price", 0)
@@ -958,6 +866,8 @@ def create_listings_router(
                 logger.debug(f"Price drop notification trigger failed: {e}")
         
         updated = await db.listings.find_one({"id": listing_id}, {"_id": 0})
+        search_service.index_listing(updated)
+        event_bus.emit(EventTypes.LISTING_UPDATED, user_id=user.user_id, properties={"listing_id": listing_id})
         return updated
     
     @router.delete("/{listing_id}")
@@ -973,6 +883,8 @@ def create_listings_router(
             raise HTTPException(status_code=403, detail="Not authorized")
         
         await db.listings.update_one({"id": listing_id}, {"$set": {"status": "deleted"}})
+        search_service.remove_listing(listing_id)
+        event_bus.emit(EventTypes.LISTING_DELETED, user_id=user.user_id, properties={"listing_id": listing_id})
         
         # Notify user of stats update via WebSocket (real-time Quick Stats)
         if notify_stats_update:
@@ -1009,6 +921,8 @@ def create_listings_router(
                 }
             }
         )
+        search_service.remove_listing(listing_id)
+        event_bus.emit(EventTypes.LISTING_UPDATED, user_id=user.user_id, properties={"listing_id": listing_id})
         
         # Send notification to seller about successful sale
         if notification_service:
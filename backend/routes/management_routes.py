@@ -15,6 +15,8 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Request, Depends, Query, Body
 from pydantic import BaseModel, Field
 
+from utils.leaderboard import get_badge_leaderboard as get_badge_leaderboard_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -68,6 +70,7 @@ def create_management_routes(db, get_current_user):
     """Create management API routes"""
     
     router = APIRouter(tags=["Management"])
+    badge_leaderboard = get_badge_leaderboard_service(db)
     
     async def require_auth(request: Request):
         user = await get_current_user(request)
@@ -839,17 +842,17 @@ def create_management_routes(db, get_current_user):
     @router.get("/badges/leaderboard")
     async def get_badge_leaderboard(admin = Depends(require_admin)):
         """Badge leaderboard"""
-        pipeline = [
-            {"$group": {"_id": "$user_id", "badge_count": {"$sum": 1}}},
-            {"$sort": {"badge_count": -1}},
-            {"$limit": 50}
-        ]
-        leaderboard = await db.user_badges.aggregate(pipeline).to_list(50)
-        
-        # Get user info
-        for entry in leaderboard:
-            user = await db.users.find_one({"user_id": entry["_id"]}, {"_id": 0, "name": 1})
-            entry["user_name"] = user.get("name") if user else "Unknown"
+        top = await badge_leaderboard.top("count", 0, 50)
+        users = await db.users.find(
+            {"user_id": {"$in": [t["user_id"] for t in top]}}, {"_id": 0, "user_id": 1, "name": 1}
+        ).to_list(50)
+        names = {u["user_id"]: u.get("name") for u in users}
+        
+        leaderboard = [{
+            "_id": t["user_id"],
+            "badge_count": t["score"],
+            "user_name": names.get(t["user_id"]) or "Unknown"
+        } for t in top]
         
         return {"leaderboard": leaderboard}
     
@@ -927,6 +930,7 @@ def create_management_routes(db, get_current_user):
             "awarded_by": admin.user_id,
             "awarded_at": datetime.now(timezone.utc)
         })
+        await badge_leaderboard.record_award(user_id)
         
         return {"message": "Badge awarded"}
     
@@ -939,9 +943,10 @@ def create_management_routes(db, get_current_user):
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id required")
         
-        result = await db.user_badges.delete_one({"badge_id": badge_id, "user_id": user_id})
-        if result.deleted_count == 0:
+        revoked = await db.user_badges.find_one_and_delete({"badge_id": badge_id, "user_id": user_id})
+        if not revoked:
             raise HTTPException(status_code=404, detail="Badge not found for user")
+        await badge_leaderboard.record_revoke(user_id, revoked.get("points_value", 0))
         
         return {"message": "Badge revoked"}
 
@@ -7,6 +7,8 @@ from fastapi import APIRouter, HTTPException, Request, Query
 from datetime import datetime, timezone
 import logging
 
+from utils.session_cache import session_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -101,6 +103,7 @@ def create_profile_router(db, require_auth, get_current_user):
             {"user_id": user.user_id},
             {"$set": update_data}
         )
+        session_cache.invalidate_user(user.user_id)
         
         # Get updated user
         updated_user = await db.users.find_one({"user_id": user.user_id}, {"_id": 0})
@@ -17,6 +17,13 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Request, Depends, Query, BackgroundTasks
 from pydantic import BaseModel
 
+from utils.analytics_rollups import (
+    AnalyticsRollups, CHAT_EVENT_TYPES, OFFER_EVENT_TYPES, SCOPE_LISTING, SCOPE_SELLER,
+    count_of, summarize,
+)
+from utils.analytics_ingest import analytics_ingestor
+from utils.rate_limit import rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -70,6 +77,8 @@ def create_seller_analytics_routes(db, get_current_user):
     """Create seller analytics API routes"""
     
     router = APIRouter(tags=["Seller Analytics"])
+    rollups = AnalyticsRollups(db)
+    analytics_ingestor.attach(db)
     
     # Bot/spam user agents to filter
     BOT_USER_AGENTS = [
@@ -99,10 +108,9 @@ def create_seller_analytics_routes(db, get_current_user):
         user_agent = request.headers.get("user-agent", "").lower()
         return any(bot in user_agent for bot in BOT_USER_AGENTS)
     
-    async def get_listing_owner(listing_id: str) -> Optional[str]:
-        """Get the owner user_id of a listing"""
-        listing = await db.listings.find_one({"id": listing_id}, {"user_id": 1})
-        return listing.get("user_id") if listing else None
+    async def get_listing_owner(listing_id: str) -> Optional[dict]:
+        """Get the owner user_id and boost state of a listing (briefly cached)"""
+        return await analytics_ingestor.listing_info(listing_id)
 
     # =========================================================================
     # ENHANCED EVENT TRACKING
@@ -115,7 +123,8 @@ def create_seller_analytics_routes(db, get_current_user):
     ):
         """
         Track analytics event with enhanced metadata.
-        Filters out self-views and bot traffic.
+        Filters out self-views and bot traffic. The event is written in a
+        batch by analytics_ingestor shortly after the response.
         """
         # Check for bot traffic
         if await is_bot_request(request):
@@ -126,20 +135,15 @@ def create_seller_analytics_routes(db, get_current_user):
         ip_hash = hash_ip(client_ip)
         
         # Filter self-views (seller viewing their own listing)
-        listing_owner = await get_listing_owner(event.listing_id)
+        owner = await get_listing_owner(event.listing_id) or {}
+        listing_owner = owner.get("user_id")
         if event.user_id and listing_owner and event.user_id == listing_owner:
             return {"success": True, "filtered": "self_view"}
         
         now = datetime.now(timezone.utc)
         
         # Rate limiting check (max 100 events per IP per minute)
-        one_minute_ago = (now - timedelta(minutes=1)).isoformat()
-        recent_events = await db.analytics_events.count_documents({
-            "ip_hash": ip_hash,
-            "timestamp": {"$gte": one_minute_ago}
-        })
-        
-        if recent_events > 100:
+        if not await rate_limiter.allow(ip_hash, "analytics_track"):
             return {"success": True, "filtered": "rate_limit"}
         
         # Create event document
@@ -160,16 +164,26 @@ def create_seller_analytics_routes(db, get_current_user):
             "date": now.strftime("%Y-%m-%d")
         }
         
-        await db.analytics_events.insert_one(event_doc)
+        rollup = {
+            "listing_id": event.listing_id,
+            "seller_id": listing_owner,
+            "event_type": event.event_type,
+            "timestamp": now,
+            "viewer_key": event.user_id or ip_hash,
+            "is_boosted": bool(owner.get("is_boosted")),
+            "device": event_doc["device"],
+            "referrer": event_doc["referrer"],
+            "location": event.city or event.region
+        }
         
-        # Update listing stats cache
-        await db.listings.update_one(
-            {"id": event.listing_id},
-            {
-                "$inc": {f"stats.{event.event_type}s": 1},
-                "$set": {f"stats.last_{event.event_type}": now.isoformat()}
-            }
-        )
+        # Update listing stats cache (coalesced per listing at flush time)
+        listing_update = {
+            "$inc": {f"stats.{event.event_type}s": 1},
+            "$max": {f"stats.last_{event.event_type}": now.isoformat()}
+        }
+        
+        if not await analytics_ingestor.submit(event_doc, rollup, listing_update):
+            return {"success": False, "filtered": "overloaded"}
         
         return {"success": True, "event_id": event_doc["id"]}
 
@@ -185,65 +199,28 @@ def create_seller_analytics_routes(db, get_current_user):
     ):
         """
         Get seller dashboard overview with aggregated metrics.
+        Reads the seller's hourly (24h) or daily rollup buckets.
         """
-        # Calculate date range
-        now = datetime.now(timezone.utc)
-        period_map = {
-            "24h": timedelta(hours=24),
-            "7d": timedelta(days=7),
-            "30d": timedelta(days=30),
-            "90d": timedelta(days=90)
-        }
-        start_date = (now - period_map[period]).isoformat()
-        
         # Get seller's listings
         listings = await db.listings.find(
             {"user_id": user.user_id},
             {"id": 1, "title": 1, "stats": 1, "status": 1}
         ).to_list(1000)
         
-        listing_ids = [l["id"] for l in listings]
-        
-        # Aggregate events for this period
-        pipeline = [
-            {
-                "$match": {
-                    "listing_id": {"$in": listing_ids},
-                    "timestamp": {"$gte": start_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$event_type",
-                    "count": {"$sum": 1},
-                    "unique_users": {"$addToSet": "$user_id"}
-                }
-            }
-        ]
-        
-        events = await db.analytics_events.aggregate(pipeline).to_list(100)
+        summary = summarize(await rollups.buckets(SCOPE_SELLER, user.user_id, period))
+        events = summary["events"]
         
         # Build metrics summary
         metrics = {
-            "views": 0,
-            "saves": 0,
-            "shares": 0,
-            "chat_starts": 0,
-            "offers": 0,
-            "purchases": 0,
-            "unique_viewers": 0
+            "views": events.get("view", 0),
+            "saves": events.get("save", 0),
+            "shares": events.get("share", 0),
+            "chat_starts": count_of(events, *CHAT_EVENT_TYPES),
+            "offers": count_of(events, *OFFER_EVENT_TYPES),
+            "purchases": events.get("purchase", 0),
+            "unique_viewers": summary["unique"].get("view", 0)
         }
         
-        all_unique_users = set()
-        for event in events:
-            event_type = event["_id"]
-            if event_type in metrics:
-                metrics[event_type] = event["count"]
-            if event_type == "view":
-                all_unique_users.update([u for u in event["unique_users"] if u])
-        
-        metrics["unique_viewers"] = len(all_unique_users)
-        
         # Calculate conversion rates
         if metrics["views"] > 0:
             metrics["save_rate"] = round(metrics["saves"] / metrics["views"] * 100, 2)
@@ -261,26 +238,6 @@ def create_seller_analytics_routes(db, get_current_user):
             reverse=True
         )[:5]
         
-        # Get daily trend
-        trend_pipeline = [
-            {
-                "$match": {
-                    "listing_id": {"$in": listing_ids},
-                    "timestamp": {"$gte": start_date},
-                    "event_type": "view"
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$date",
-                    "views": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id": 1}}
-        ]
-        
-        daily_trend = await db.analytics_events.aggregate(trend_pipeline).to_list(100)
-        
         return {
             "period": period,
             "metrics": metrics,
@@ -296,8 +253,8 @@ def create_seller_analytics_routes(db, get_current_user):
                 for l in top_listings
             ],
             "daily_trend": [
-                {"date": d["_id"], "views": d["views"]}
-                for d in daily_trend
+                {"date": date, "views": views}
+                for date, views in sorted(summary["daily_views"].items())
             ]
         }
 
@@ -325,58 +282,15 @@ def create_seller_analytics_routes(db, get_current_user):
             if user.email not in admin_emails:
                 raise HTTPException(status_code=403, detail="Access denied")
         
-        # Calculate date range
-        now = datetime.now(timezone.utc)
-        period_map = {
-            "24h": timedelta(hours=24),
-            "7d": timedelta(days=7),
-            "30d": timedelta(days=30),
-            "90d": timedelta(days=90)
-        }
-        start_date = (now - period_map[period]).isoformat()
-        
-        # Get previous period for comparison
-        prev_start = (now - period_map[period] * 2).isoformat()
-        prev_end = start_date
-        
-        # Current period metrics
-        current_pipeline = [
-            {
-                "$match": {
-                    "listing_id": listing_id,
-                    "timestamp": {"$gte": start_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$event_type",
-                    "count": {"$sum": 1},
-                    "unique_users": {"$addToSet": "$user_id"}
-                }
-            }
-        ]
-        
-        current_events = await db.analytics_events.aggregate(current_pipeline).to_list(100)
-        
-        # Previous period metrics
-        prev_pipeline = [
-            {
-                "$match": {
-                    "listing_id": listing_id,
-                    "timestamp": {"$gte": prev_start, "$lt": prev_end}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$event_type",
-                    "count": {"$sum": 1}
-                }
-            }
+        # Current and previous period from the listing's rollup buckets
+        current = summarize(await rollups.buckets(SCOPE_LISTING, listing_id, period))
+        previous = summarize(await rollups.buckets(SCOPE_LISTING, listing_id, period, offset=1, with_unique=False))
+        prev_metrics = previous["events"]
+        current_events = [
+            {"_id": event_type, "count": count, "unique": current["unique"].get(event_type, 0)}
+            for event_type, count in current["events"].items()
         ]
         
-        prev_events = await db.analytics_events.aggregate(prev_pipeline).to_list(100)
-        prev_metrics = {e["_id"]: e["count"] for e in prev_events}
-        
         # Build current metrics with trends
         metrics = {}
         for event in current_events:
@@ -391,7 +305,7 @@ def create_seller_analytics_routes(db, get_current_user):
             
             metrics[event_type] = {
                 "count": current_count,
-                "unique": len([u for u in event.get("unique_users", []) if u]),
+                "unique": event["unique"],
                 "previous": prev_count,
                 "change_percent": change_percent,
                 "trend": "up" if change_percent > 0 else ("down" if change_percent < 0 else "stable")
@@ -413,8 +327,8 @@ def create_seller_analytics_routes(db, get_current_user):
         funnel = {
             "views": views,
             "saves": metrics.get("save", {}).get("count", 0),
-            "chats": metrics.get("chat_start", {}).get("count", 0),
-            "offers": metrics.get("offer_made", {}).get("count", 0),
+            "chats": count_of(current["events"], *CHAT_EVENT_TYPES),
+            "offers": count_of(current["events"], *OFFER_EVENT_TYPES),
             "purchases": metrics.get("purchase", {}).get("count", 0)
         }
         
@@ -423,67 +337,6 @@ def create_seller_analytics_routes(db, get_current_user):
             funnel["chat_rate"] = round(funnel["chats"] / views * 100, 2)
             funnel["conversion_rate"] = round(funnel["purchases"] / views * 100, 2)
         
-        # Hourly distribution
-        hourly_pipeline = [
-            {
-                "$match": {
-                    "listing_id": listing_id,
-                    "timestamp": {"$gte": start_date},
-                    "event_type": "view"
-                }
-            },
-            {
-                "$project": {
-                    "hour": {"$hour": {"$dateFromString": {"dateString": "$timestamp"}}}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$hour",
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id": 1}}
-        ]
-        
-        hourly_data = await db.analytics_events.aggregate(hourly_pipeline).to_list(24)
-        
-        # Device breakdown
-        device_pipeline = [
-            {
-                "$match": {
-                    "listing_id": listing_id,
-                    "timestamp": {"$gte": start_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$device",
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        
-        device_data = await db.analytics_events.aggregate(device_pipeline).to_list(10)
-        
-        # Referrer breakdown
-        referrer_pipeline = [
-            {
-                "$match": {
-                    "listing_id": listing_id,
-                    "timestamp": {"$gte": start_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$referrer",
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        
-        referrer_data = await db.analytics_events.aggregate(referrer_pipeline).to_list(20)
-        
         return {
             "listing_id": listing_id,
             "listing_title": listing.get("title", ""),
@@ -491,17 +344,11 @@ def create_seller_analytics_routes(db, get_current_user):
             "metrics": metrics,
             "funnel": funnel,
             "hourly_distribution": [
-                {"hour": h["_id"], "views": h["count"]}
-                for h in hourly_data
+                {"hour": hour, "views": count}
+                for hour, count in enumerate(current["view_hours"]) if count
             ],
-            "device_breakdown": {
-                d["_id"] or "unknown": d["count"]
-                for d in device_data
-            },
-            "referrer_breakdown": {
-                r["_id"] or "direct": r["count"]
-                for r in referrer_data
-            }
+            "device_breakdown": current["device"],
+            "referrer_breakdown": current["referrer"]
         }
 
     # =========================================================================
@@ -8,6 +8,8 @@ from datetime import datetime, timezone
 import uuid
 import logging
 
+from utils.session_cache import session_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -134,6 +136,7 @@ def create_sessions_router(db, require_auth, get_session_token):
         
         await db.active_sessions.delete_one({"id": session_id})
         await db.sessions.delete_one({"token": session.get("session_token")})
+        session_cache.invalidate_token(session.get("session_token"))
         
         return {"message": "Session revoked"}
 
@@ -154,6 +157,7 @@ def create_sessions_router(db, require_auth, get_session_token):
             "user_id": user.user_id,
             "token": {"$ne": current_token}
         })
+        session_cache.invalidate_user(user.user_id)
         
         return {"message": f"Revoked {result.deleted_count} sessions"}
 
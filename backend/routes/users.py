@@ -4,11 +4,13 @@ Handles user profile management, blocking, and online status
 """
 
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Set
+from typing import List, Optional, Dict
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 import logging
 
+from utils.session_cache import session_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,7 +44,7 @@ class UserPublicProfile(BaseModel):
 # ROUTER FACTORY
 # =============================================================================
 
-def create_users_router(db, get_current_user, require_auth, online_users: Set[str]):
+def create_users_router(db, get_current_user, require_auth, presence):
     """
     Create the users router with dependencies injected
     
@@ -50,7 +52,7 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
         db: MongoDB database instance
         get_current_user: Function to get current user from request (optional auth)
         require_auth: Function to require authentication
-        online_users: Set of currently online user IDs (from Socket.IO)
+        presence: PresenceRegistry of users with a live Socket.IO connection (any worker)
     
     Returns:
         APIRouter with user endpoints
@@ -100,6 +102,7 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
         update_data = {k: v for k, v in update.model_dump().items() if v is not None}
         if update_data:
             await db.users.update_one({"user_id": user.user_id}, {"$set": update_data})
+            session_cache.invalidate_user(user.user_id)
         
         # Exclude sensitive fields from response
         updated_user = await db.users.find_one(
@@ -229,6 +232,7 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
             {"user_id": current_user.user_id},
             {"$addToSet": {"blocked_users": user_id}}
         )
+        session_cache.invalidate_user(current_user.user_id)
         return {"message": "User blocked", "id": blocked_record["id"]}
     
     @router.post("/unblock/{user_id}")
@@ -247,6 +251,7 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
             {"user_id": current_user.user_id},
             {"$pull": {"blocked_users": user_id}}
         )
+        session_cache.invalidate_user(current_user.user_id)
         return {"message": "User unblocked"}
     
     @router.get("/{user_id}/status")
@@ -262,8 +267,8 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
         show_online = privacy.get("show_online_status", True)
         show_last_seen = privacy.get("show_last_seen", True)
         
-        # Check if user is currently online (in memory)
-        is_online = user_id in online_users
+        # Check if user is currently online (shared presence registry)
+        is_online = await presence.is_online(user_id)
         
         # Convert last_seen to ISO string
         last_seen = user.get("last_seen")
@@ -290,6 +295,7 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
         ).to_list(length=100)
         
         user_map = {u["user_id"]: u for u in users}
+        online = await presence.online(list(user_map))
         
         for user_id in user_ids:
             user = user_map.get(user_id)
@@ -303,8 +309,8 @@ def create_users_router(db, get_current_user, require_auth, online_users: Set[st
             show_online = privacy.get("show_online_status", True)
             show_last_seen = privacy.get("show_last_seen", True)
             
-            # Check if user is currently online (in memory)
-            is_online = user_id in online_users
+            # Check if user is currently online (shared presence registry)
+            is_online = user_id in online
             
             # Convert last_seen to ISO string
             last_seen = user.get("last_seen")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Signup cohort retention benchmark: per-cohort count_documents with $in user
+lists vs. the single aggregation over cohort_user_activity.
+Seeds users, cohort events and the activity table into a scratch database and
+reports wall time and MongoDB round trips for a 12-month heatmap.
+
+The legacy path is measured on --legacy-users users (it issues two queries
+per cohort and interval with the cohort's user ids inlined, and only ever
+looked at the first 10k users of a cohort).
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python scripts/benchmark_cohort_retention.py --users 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cohort_analytics import RETENTION_INTERVALS  # noqa: E402
+from utils.cohort_activity import retention_matrix, signup_fields, cohort_start  # noqa: E402
+from utils.db_indexes import COHORT_USER_ACTIVITY_INDEXES, ensure_index  # noqa: E402
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('BENCH_DB_NAME', 'avida_cohort_bench')
+SEED_BATCH = 10_000
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (one per round trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def random_user(i: int, now: datetime):
+    signup_at = now - timedelta(days=random.uniform(0, 365), seconds=random.randint(0, 86400))
+    # Geometric-ish churn: most users are last seen shortly after signup
+    active_for = min(random.expovariate(1 / 30), (now - signup_at).days)
+    return f"bench_user_{i}", signup_at, signup_at + timedelta(days=active_for)
+
+
+async def seed(db, users: int, legacy_users: int):
+    existing = await db.cohort_user_activity.estimated_document_count()
+    if existing >= users:
+        return
+    print(f"Seeding {users - existing} users...")
+    now = datetime.now(timezone.utc)
+    activity, raw_users, events = [], [], []
+    for i in range(existing, users):
+        user_id, signup_at, last_active_at = random_user(i, now)
+        activity.append({
+            "_id": user_id,
+            **signup_fields(signup_at),
+            "last_active_at": last_active_at,
+            "listings_posted": random.randint(0, 3),
+            "chats_started": random.randint(0, 5),
+            "transactions_completed": random.randint(0, 1),
+            "boosts_used": 0,
+        })
+        if i < legacy_users:
+            raw_users.append({"id": user_id, "created_at": signup_at.isoformat()})
+            events.append({"user_id": user_id, "event_type": "login", "timestamp": last_active_at.isoformat()})
+        if len(activity) >= SEED_BATCH:
+            await db.cohort_user_activity.insert_many(activity, ordered=False)
+            activity = []
+    if activity:
+        await db.cohort_user_activity.insert_many(activity, ordered=False)
+    if raw_users:
+        await db.users.insert_many(raw_users, ordered=False)
+        await db.cohort_events.insert_many(events, ordered=False)
+    await db.users.create_index("created_at")
+    await db.cohort_events.create_index([("user_id", 1), ("timestamp", 1)])
+    for index_def in COHORT_USER_ACTIVITY_INDEXES:
+        await ensure_index(db.cohort_user_activity, index_def)
+
+
+def monthly_periods(now: datetime, months_back: int):
+    return sorted({cohort_start(now - timedelta(days=30 * i), "monthly") for i in range(months_back)})
+
+
+async def legacy(db, now: datetime, months_back: int) -> int:
+    """The previous compute_signup_cohorts retention queries (metrics excluded)."""
+    rows = 0
+    for period_start in monthly_periods(now, months_back):
+        period_end = (period_start + timedelta(days=32)).replace(day=1)
+        cohort_users = await db.users.find({
+            "created_at": {"$gte": period_start.isoformat(), "$lt": period_end.isoformat()}
+        }, {"_id": 0, "id": 1}).to_list(length=10000)
+        if not cohort_users:
+            continue
+        user_ids = [u["id"] for u in cohort_users]
+        for days in RETENTION_INTERVALS.values():
+            retention_date = period_start + timedelta(days=days)
+            if retention_date > now:
+                continue
+            await db.cohort_events.count_documents({
+                "user_id": {"$in": user_ids}, "timestamp": {"$gte": retention_date.isoformat()}
+            })
+            await db.listings.count_documents({
+                "seller_id": {"$in": user_ids}, "created_at": {"$gte": retention_date.isoformat()}
+            })
+        rows += 1
+    return rows
+
+
+async def set_based(db, now: datetime, months_back: int) -> int:
+    rows = await retention_matrix(db, "monthly", monthly_periods(now, months_back), RETENTION_INTERVALS)
+    return len(rows)
+
+
+async def measure(counter: CommandCounter, fn) -> dict:
+    counter.count = 0
+    start = time.perf_counter()
+    rows = await fn()
+    return {"ms": (time.perf_counter() - start) * 1000, "round_trips": counter.count, "rows": rows}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--legacy-users", type=int, default=100_000, help="users seeded for the legacy path")
+    parser.add_argument("--months-back", type=int, default=12)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[counter])
+    db = client[DB_NAME]
+    await seed(db, args.users, min(args.legacy_users, args.users))
+    now = datetime.now(timezone.utc)
+
+    print(f"{'path':<22} | {'users':>9} | {'ms':>9} | {'round trips':>11} | {'cohorts':>7}")
+    for name, users, fn in (
+        ("count_documents + $in", min(args.legacy_users, args.users), lambda: legacy(db, now, args.months_back)),
+        ("activity aggregation", args.users, lambda: set_based(db, now, args.months_back)),
+    ):
+        result = await measure(counter, fn)
+        print(f"{name:<22} | {users:>9} | {result['ms']:>9.1f} | {result['round_trips']:>11} | {result['rows']:>7}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
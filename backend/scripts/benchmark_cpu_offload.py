@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Event-loop lag under concurrent logins and image uploads, with bcrypt and
+Pillow run inline on the loop ("inline") versus in the CPU pool ("pool").
+Each login verifies a bcrypt hash; each upload transcodes a generated JPEG
+into the full-size WebP and thumbnail. A LoopLagMonitor samples how late the
+loop wakes up while the load runs. No database is needed.
+
+Usage:
+    python scripts/benchmark_cpu_offload.py --logins 200 --uploads 40 --concurrency 32
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from utils.cpu_pool import CpuPool, LoopLagMonitor  # noqa: E402
+from utils.passwords import hash_password, verify_password  # noqa: E402
+from utils.r2_storage import transcode_upload  # noqa: E402
+
+
+def sample_jpeg(width: int = 2400, height: int = 1600) -> bytes:
+    img = Image.effect_noise((width, height), 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+async def run_load(mode: str, pool: CpuPool, logins: int, uploads: int, concurrency: int,
+                   password_hash: str, image: bytes):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def call(fn, *args):
+        async with gate:
+            start = time.perf_counter()
+            if mode == "pool":
+                await pool.run(fn, *args)
+            else:
+                fn(*args)
+                await asyncio.sleep(0)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    jobs = [(verify_password, "password123", password_hash)] * logins + [(transcode_upload, image)] * uploads
+    random.shuffle(jobs)
+
+    lag = LoopLagMonitor(interval=0.01)
+    lag.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(call(fn, *args) for fn, *args in jobs))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.02)
+    lag.stop()
+
+    latencies.sort()
+    stats = lag.get_stats()
+    return {
+        "elapsed_s": elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "lag_avg_ms": stats["avg_ms"],
+        "lag_max_ms": stats["max_ms"],
+    }
+
+
+async def main_async(args):
+    password_hash = hash_password("password123")
+    image = sample_jpeg()
+    pool = CpuPool(mode=args.pool_mode, workers=args.workers)
+    pool.start()
+    # Warm the workers so spawn/import time is not counted
+    await asyncio.gather(*(pool.run(verify_password, "password123", password_hash) for _ in range(args.workers)))
+
+    rows = []
+    for mode in ("inline", "pool"):
+        rows.append((mode, await run_load(mode, pool, args.logins, args.uploads, args.concurrency,
+                                          password_hash, image)))
+    pool.stop()
+
+    print(f"{args.logins} logins + {args.uploads} uploads, concurrency {args.concurrency}, "
+          f"{args.workers} {args.pool_mode} worker(s)")
+    print(f"{'mode':<8} | {'total s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'loop lag avg':>12} | {'loop lag max':>12}")
+    for mode, r in rows:
+        print(f"{mode:<8} | {r['elapsed_s']:>8.2f} | {r['p50_ms']:>8.1f} | {r['p99_ms']:>8.1f} | "
+              f"{r['lag_avg_ms']:>10.1f}ms | {r['lag_max_ms']:>10.1f}ms")
+    print("pool task stats:", pool.get_stats()["tasks"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200, help="bcrypt verifications")
+    parser.add_argument("--uploads", type=int, default=40, help="image transcodes")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="CPU pool workers")
+    parser.add_argument("--pool-mode", choices=("process", "thread"), default="process")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Listings CSV import throughput: the legacy per-row find_one + update_one /
+insert_one loop vs. the streaming StreamingCsvImporter job.
+Generates a listings CSV where --update-share of the rows carry the id of a
+seeded listing, imports it into a scratch database both ways and reports
+rows per second and MongoDB round trips.
+
+The per-row path is measured on the first --sample rows and projected to the
+full file.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python scripts/benchmark_csv_import.py --rows 200000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.csv_stream import CsvImportSpec, RowError, StreamingCsvImporter, stable_id  # noqa: E402
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('BENCH_DB_NAME', 'avida_csv_import_bench')
+HEADERS = ["id", "name", "price", "description", "category_id", "location", "status", "condition", "currency"]
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (one per round trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def listing_row(row):
+    if not row.get("name") or not row.get("price"):
+        raise RowError("Missing required fields (name, price)")
+    fields = {
+        "name": row["name"],
+        "description": row.get("description", ""),
+        "price": float(row["price"]),
+        "currency": row.get("currency") or "EUR",
+        "category_id": row.get("category_id") or None,
+        "location": row.get("location") or None,
+        "status": row.get("status") or "active",
+        "condition": row.get("condition") or "new",
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if row.get("id"):
+        fields["id"] = row["id"]
+    return fields
+
+
+def new_listing(fields, row_id, now):
+    return {"id": stable_id("listing_", row_id), "created_at": now, "views": 0, "favorites": 0, "images": []}
+
+
+SPEC = CsvImportSpec("listings", "listings", "id", listing_row, new_listing, required=("name", "price"))
+
+
+def write_csv(path: str, rows: int, existing_ids, update_share: float):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        for i in range(rows):
+            listing_id = random.choice(existing_ids) if existing_ids and random.random() < update_share else ""
+            writer.writerow([
+                listing_id, f"Bench listing {i}", f"{random.randint(5, 5000)}.00",
+                "Imported by the CSV benchmark", "electronics", "Berlin", "active", "used", "EUR",
+            ])
+
+
+async def seed(db, count: int):
+    await db.listings.drop()
+    await db.listings.create_index("id", unique=True)
+    ids = [f"listing_{uuid.uuid4().hex[:12]}" for _ in range(count)]
+    for start in range(0, count, 10_000):
+        await db.listings.insert_many(
+            [{"id": listing_id, "name": "Seeded", "price": 1.0} for listing_id in ids[start:start + 10_000]],
+            ordered=False
+        )
+    return ids
+
+
+async def per_row(db, path: str, sample: int) -> int:
+    """Legacy path: decode the whole file, then one or two round trips per row."""
+    with open(path, "rb") as f:
+        reader = csv.DictReader(io.StringIO(f.read().decode("utf-8")))
+    done = 0
+    for row in reader:
+        if done >= sample:
+            break
+        fields = listing_row(row)
+        if row.get("id") and await db.listings.find_one({"id": row["id"]}):
+            await db.listings.update_one({"id": row["id"]}, {"$set": fields})
+        else:
+            fields.update(new_listing(fields, str(uuid.uuid4()), fields["updated_at"]))
+            await db.listings.insert_one(fields)
+        done += 1
+    return done
+
+
+class FileUpload:
+    """The part of UploadFile that StreamingCsvImporter.start reads."""
+
+    def __init__(self, path: str):
+        self.filename = os.path.basename(path)
+        self._file = open(path, "rb")
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+async def streaming(db, path: str, chunk_size: int) -> int:
+    importer = StreamingCsvImporter(db, [SPEC], chunk_size=chunk_size)
+    job = await importer.start(FileUpload(path), "listings")
+    summary = await importer.wait(job["id"], timeout=3600)
+    return summary["rows_done"]
+
+
+async def measure(counter: CommandCounter, fn) -> dict:
+    counter.count = 0
+    start = time.perf_counter()
+    rows = await fn()
+    return {"s": time.perf_counter() - start, "round_trips": counter.count, "rows": rows}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seeded", type=int, default=50_000, help="existing listings rows may update")
+    parser.add_argument("--update-share", type=float, default=0.25)
+    parser.add_argument("--sample", type=int, default=2_000, help="rows measured on the per-row path")
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[counter])
+    db = client[DB_NAME]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.csv")
+        print(f"Seeding {args.seeded} listings and writing {args.rows} rows...")
+        ids = await seed(db, args.seeded)
+        write_csv(path, args.rows, ids, args.update_share)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        legacy = await measure(counter, lambda: per_row(db, path, min(args.sample, args.rows)))
+        scale = args.rows / max(legacy["rows"], 1)
+
+        # Same starting state for the streaming run
+        await seed(db, 0)
+        if ids:
+            await db.listings.insert_many([{"id": i, "name": "Seeded", "price": 1.0} for i in ids], ordered=False)
+        stream = await measure(counter, lambda: streaming(db, path, args.chunk_size))
+
+    print(f"{args.rows} rows ({size_mb:.1f} MB), {args.update_share:.0%} updates, chunk size {args.chunk_size}")
+    print(f"{'path':<18} | {'seconds':>9} | {'rows/s':>9} | {'round trips':>11}")
+    print(f"{'per-row (proj.)':<18} | {legacy['s'] * scale:>9.1f} | {legacy['rows'] / legacy['s']:>9.0f} | "
+          f"{legacy['round_trips'] * scale:>11.0f}")
+    print(f"{'streaming':<18} | {stream['s']:>9.1f} | {stream['rows'] / stream['s']:>9.0f} | "
+          f"{stream['round_trips']:>11}")
+
+    await db.csv_import_stream_jobs.drop()
+    await db.csv_import_row_errors.drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Feature flag evaluation micro-benchmark for the in-process flag snapshot.
+Builds a snapshot with global flags for every feature plus country, role
+and seller overrides, then reports single evaluations and evaluate_all calls
+per second for random contexts. No database is needed.
+
+Usage:
+    python scripts/benchmark_feature_flags.py --sellers 10000 --seconds 2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.feature_flags import FlagSnapshot  # noqa: E402
+
+ENVIRONMENT = "production"
+FEATURES = [f"feature_{i}" for i in range(20)]
+COUNTRIES = ["TZ", "KE", "UG", "RW", "NG", "GH", "ZA", "DE"]
+ROLES = ["user", "seller", "verified_seller", "admin", "moderator"]
+
+
+def build_flags(sellers: int):
+    flags = []
+    for feature_id in FEATURES:
+        flags.append({"environment": ENVIRONMENT, "feature_id": feature_id, "scope": "global",
+                      "enabled": True, "rollout_percentage": random.choice([100, 50, 10])})
+        for country in random.sample(COUNTRIES, 3):
+            flags.append({"environment": ENVIRONMENT, "feature_id": feature_id, "scope": "country",
+                          "scope_value": country, "enabled": random.random() < 0.5})
+        flags.append({"environment": ENVIRONMENT, "feature_id": feature_id, "scope": "role",
+                      "scope_value": random.choice(ROLES), "enabled": True})
+    for i in range(sellers):
+        flags.append({"environment": ENVIRONMENT, "feature_id": random.choice(FEATURES), "scope": "seller",
+                      "scope_value": f"seller_{i}", "enabled": random.random() < 0.5})
+    return flags
+
+
+def contexts(count: int, sellers: int):
+    return [{
+        "country_code": random.choice(COUNTRIES),
+        "user_role": random.choice(ROLES),
+        "seller_id": f"seller_{random.randrange(sellers * 2)}" if random.random() < 0.3 else None,
+        "user_id": f"user_{random.randrange(100_000)}",
+    } for _ in range(count)]
+
+
+def rate(fn, samples, seconds: float) -> float:
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for args in samples:
+            fn(args)
+        calls += len(samples)
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sellers", type=int, default=10_000, help="seller override flags")
+    parser.add_argument("--seconds", type=float, default=2.0, help="run time per measurement")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    snapshot = FlagSnapshot(build_flags(args.sellers), version=1)
+    compile_ms = (time.perf_counter() - started) * 1000
+    samples = [(random.choice(FEATURES), ctx) for ctx in contexts(1_000, args.sellers)]
+
+    single = rate(lambda s: snapshot.evaluate(ENVIRONMENT, s[0], **s[1]), samples, args.seconds)
+    bulk = rate(lambda s: snapshot.evaluate_all(ENVIRONMENT, FEATURES, **s[1]), samples, args.seconds)
+
+    print(f"{len(snapshot)} flags compiled in {compile_ms:.1f} ms")
+    print(f"{'call':<14} | {'per second':>12} | {'us per call':>11}")
+    print(f"{'evaluate':<14} | {single:>12,.0f} | {1e6 / single:>11.2f}")
+    print(f"{'evaluate_all':<14} | {bulk:>12,.0f} | {1e6 / bulk:>11.2f}  ({len(FEATURES)} features)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+New-listing notification fan-out benchmark: per-user _queue_notification vs.
+the batched fan_out_notification pipeline.
+Seeds users, interest profiles and consent documents into a scratch database
+and reports wall time and MongoDB round trips per listing.
+
+The per-user path is measured on a sample of the audience and projected to the
+full audience (running it over 10k users takes minutes).
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python scripts/benchmark_notification_fanout.py --audiences 1000 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_notifications import SmartNotificationService  # noqa: E402
+from utils.db_indexes import (  # noqa: E402
+    NOTIFICATION_CONSENT_INDEXES,
+    SMART_NOTIFICATIONS_INDEXES,
+    USER_INTEREST_PROFILES_INDEXES,
+    USERS_INDEXES,
+    ensure_index,
+)
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('BENCH_DB_NAME', 'avida_fanout_bench')
+CATEGORY_ID = "electronics"
+OPT_OUT_RATE = 0.05
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (one per round trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def seed(db, size: int):
+    existing = await db.user_interest_profiles.count_documents({f"category_interests.{CATEGORY_ID}": {"$gte": 20}})
+    if existing >= size:
+        return
+    print(f"Seeding {size - existing} interested users...")
+    users, profiles, consents = [], [], []
+    for i in range(existing, size):
+        user_id = f"bench_user_{i}"
+        users.append({"user_id": user_id, "name": f"User {i}", "preferred_language": "en"})
+        profiles.append({"user_id": user_id, "category_interests": {CATEGORY_ID: random.randint(20, 100)}})
+        if random.random() < OPT_OUT_RATE:
+            consents.append({"user_id": user_id, "trigger_preferences": {"new_listing_in_category": False}})
+    await db.users.insert_many(users, ordered=False)
+    await db.user_interest_profiles.insert_many(profiles, ordered=False)
+    if consents:
+        await db.user_notification_consent.insert_many(consents, ordered=False)
+    for coll, index_defs in (
+        (db.users, USERS_INDEXES),
+        (db.user_interest_profiles, USER_INTEREST_PROFILES_INDEXES),
+        (db.user_notification_consent, NOTIFICATION_CONSENT_INDEXES),
+        (db.smart_notifications, SMART_NOTIFICATIONS_INDEXES),
+    ):
+        for index_def in index_defs:
+            await ensure_index(coll, index_def)
+
+
+def make_listing() -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": "bench_seller",
+        "category_id": CATEGORY_ID,
+        "title": "Bench listing",
+        "price": 100,
+        "images": [],
+    }
+
+
+async def per_user(service, sample: int) -> int:
+    """Legacy path: one _queue_notification call per recipient."""
+    listing = make_listing()
+    trigger = {
+        "id": "default_new_listing",
+        "trigger_type": "new_listing_in_category",
+        "title_template": "New {{category_name}} listing!",
+        "body_template": "{{listing_title}} - {{currency}}{{price}}",
+        "channels": ["push", "in_app"],
+        "priority": 5,
+        "min_interval_minutes": 60,
+        "max_per_day": 10,
+    }
+    profiles = await service.db.user_interest_profiles.find(
+        {f"category_interests.{CATEGORY_ID}": {"$gte": 20}}, {"user_id": 1}
+    ).to_list(sample)
+    for profile in profiles:
+        await service._queue_notification(
+            user_id=profile["user_id"],
+            trigger=trigger,
+            variables={"category_name": "Electronics", "listing_title": listing["title"],
+                       "price": listing["price"], "currency": "€"},
+            deep_link=f"/listing/{listing['id']}",
+            metadata={"listing_id": listing["id"], "category_id": CATEGORY_ID},
+        )
+    return len(profiles)
+
+
+async def measure(db, counter: CommandCounter, fn) -> dict:
+    await db.smart_notifications.delete_many({})
+    counter.count = 0
+    start = time.perf_counter()
+    recipients = await fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    queued = await db.smart_notifications.count_documents({})
+    return {"ms": elapsed, "round_trips": counter.count, "recipients": recipients, "queued": queued}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--audiences", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--sample", type=int, default=500, help="recipients measured on the per-user path")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[counter])
+    db = client[DB_NAME]
+    service = SmartNotificationService(db)
+
+    print(f"{'audience':>9} | {'path':<18} | {'ms':>9} | {'round trips':>11} | {'queued':>7}")
+    for audience in sorted(args.audiences):
+        await seed(db, audience)
+
+        sample = min(args.sample, audience)
+        legacy = await measure(db, counter, lambda: per_user(service, sample))
+        scale = audience / max(legacy["recipients"], 1)
+        print(f"{audience:>9} | {'per-user (proj.)':<18} | {legacy['ms'] * scale:>9.0f} | "
+              f"{legacy['round_trips'] * scale:>11.0f} | {'-':>7}")
+
+        listing = make_listing()
+
+        async def batched():
+            await service.check_new_listing_triggers(listing)
+            return audience
+
+        fanout = await measure(db, counter, batched)
+        print(f"{audience:>9} | {'batched fan-out':<18} | {fanout['ms']:>9.0f} | "
+              f"{fanout['round_trips']:>11} | {fanout['queued']:>7}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
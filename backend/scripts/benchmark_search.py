@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Search benchmark: legacy $regex scan vs. SearchService ($text index)
+Seeds synthetic listings into a scratch database and reports p50/p99 latency
+for the same queries through both paths.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python scripts/benchmark_search.py --sizes 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_indexes import LISTINGS_INDEXES, ensure_index  # noqa: E402
+from utils.search_service import MongoTextSearchBackend, search_fields_for  # noqa: E402
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('BENCH_DB_NAME', 'avida_search_bench')
+
+WORDS = [
+    "iphone", "samsung", "laptop", "sofa", "fahrrad", "gari", "toyota", "nyumba", "kitanda",
+    "kühlschrank", "waschmaschine", "camera", "guitar", "apartment", "simu", "baiskeli",
+    "mercedes", "schrank", "table", "chair", "stroller", "tv", "playstation", "jacket",
+]
+CATEGORIES = ["electronics", "vehicles", "home_furniture", "fashion", "properties", "friendship_dating"]
+QUERIES = ["iphone", "toyota gari", "kuhlschrank", "sofa", "guitar", "nyumba apartment", "playstation", "jacket"]
+
+
+def make_listing(i: int) -> dict:
+    title = " ".join(random.sample(WORDS, 3))
+    description = " ".join(random.choices(WORDS, k=40))
+    listing = {
+        "id": str(uuid.uuid4()),
+        "title": title,
+        "description": description,
+        "category_id": random.choice(CATEGORIES),
+        "subcategory": None,
+        "price": random.randint(10, 5000),
+        "status": "active",
+        "boost_tier": 0,
+        "created_at": datetime.now(timezone.utc) - timedelta(minutes=i),
+    }
+    listing.update(search_fields_for(listing))
+    return listing
+
+
+async def seed(db, size: int):
+    existing = await db.listings.estimated_document_count()
+    if existing >= size:
+        return
+    print(f"Seeding {size - existing} listings...")
+    batch = []
+    for i in range(existing, size):
+        batch.append(make_listing(i))
+        if len(batch) == 5000:
+            await db.listings.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.listings.insert_many(batch, ordered=False)
+    for index_def in LISTINGS_INDEXES:
+        await ensure_index(db.listings, index_def)
+
+
+async def regex_search(db, q: str):
+    query = {"status": "active", "$or": [
+        {"title": {"$regex": q, "$options": "i"}},
+        {"description": {"$regex": q, "$options": "i"}},
+        {"category_id": {"$regex": q, "$options": "i"}},
+        {"subcategory": {"$regex": q, "$options": "i"}},
+    ]}
+    await db.listings.count_documents(query)
+    await db.listings.find(query, {"_id": 0}).sort("created_at", -1).limit(20).to_list(20)
+
+
+async def service_search(service, q: str):
+    await service.ranked_search({"status": "active"}, q, {"_id": 0}, 0, 20)
+
+
+async def measure(fn, rounds: int) -> dict:
+    timings = []
+    for _ in range(rounds):
+        for q in QUERIES:
+            start = time.perf_counter()
+            await fn(q)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    service = MongoTextSearchBackend(db)
+
+    print(f"{'listings':>10} | {'path':<8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    for size in sorted(args.sizes):
+        await seed(db, size)
+        regex = await measure(lambda q: regex_search(db, q), args.rounds)
+        text = await measure(lambda q: service_search(service, q), args.rounds)
+        print(f"{size:>10} | {'regex':<8} | {regex['p50']:>8.1f} | {regex['p99']:>8.1f}")
+        print(f"{size:>10} | {'$text':<8} | {text['p50']:>8.1f} | {text['p99']:>8.1f}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Socket.IO scale-out load test: N workers x M concurrent sockets.
+Starts N Socket.IO servers sharing one client manager, connects M sockets
+round-robin across them into one room, and has one socket per worker relay
+--messages events to the room (as send_message does for a conversation).
+Reports the delivery ratio and delivery latency for receivers on the
+sender's worker and on the other workers.
+
+--manager redis runs every worker as its own process on the Redis manager
+(REDIS_URL / SOCKETIO_REDIS_URL); --manager memory runs them inside this
+process on the in-memory bus, no Redis needed; servers and clients then
+share one event loop, so its latencies are an upper bound.
+
+Usage:
+    python scripts/loadtest_socketio.py --workers 4 --sockets 400 --manager memory
+    REDIS_URL=redis://localhost:6379 python scripts/loadtest_socketio.py --workers 4 --sockets 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import socketio
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.realtime import create_client_manager  # noqa: E402
+
+ROOM = "loadtest"
+
+
+def build_app(manager_mode: str):
+    sio = socketio.AsyncServer(async_mode="asgi", client_manager=create_client_manager(manager_mode))
+
+    @sio.event
+    async def join(sid, room):
+        await sio.enter_room(sid, room)
+
+    @sio.event
+    async def relay(sid, data):
+        await sio.emit("relay", data, room=data["room"])
+
+    return socketio.ASGIApp(sio)
+
+
+def make_server(port: int, manager_mode: str) -> uvicorn.Server:
+    return uvicorn.Server(uvicorn.Config(build_app(manager_mode), host="127.0.0.1", port=port, log_level="warning"))
+
+
+class Probe:
+    """One client socket; records the latency of every relay it receives."""
+
+    def __init__(self, worker: int, port: int):
+        self.worker = worker
+        self.url = f"http://127.0.0.1:{port}"
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.latencies = {"same": [], "cross": []}
+        self.client.on("relay", self.on_relay)
+
+    async def on_relay(self, data):
+        path = "same" if data["worker"] == self.worker else "cross"
+        self.latencies[path].append(time.time() - data["sent"])
+
+    async def connect(self):
+        for _ in range(50):
+            try:
+                await self.client.connect(self.url, transports=["websocket"])
+                await self.client.call("join", ROOM, timeout=10)
+                return
+            except (socketio.exceptions.ConnectionError, socketio.exceptions.TimeoutError):
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Could not connect to {self.url}")
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sockets", type=int, default=400, help="client sockets across all workers")
+    parser.add_argument("--messages", type=int, default=20, help="relays sent by one socket per worker")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between relays of one sender")
+    parser.add_argument("--manager", choices=["redis", "memory"], default="redis")
+    parser.add_argument("--base-port", type=int, default=18100)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        await make_server(args.serve, "redis").serve()
+        return
+
+    ports = [args.base_port + i for i in range(args.workers)]
+    processes, servers = [], []
+    if args.manager == "redis":
+        processes = [subprocess.Popen([sys.executable, __file__, "--serve", str(port)]) for port in ports]
+    else:
+        servers = [make_server(port, "memory") for port in ports]
+    tasks = [asyncio.create_task(server.serve()) for server in servers]
+
+    try:
+        probes = [Probe(i % args.workers, ports[i % args.workers]) for i in range(args.sockets)]
+        connect_slots = asyncio.Semaphore(100)
+
+        async def connect(probe):
+            async with connect_slots:
+                await probe.connect()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(connect(probe) for probe in probes))
+        connect_s = time.perf_counter() - start
+        # Let room joins propagate through the manager
+        await asyncio.sleep(0.5)
+
+        async def send(probe):
+            for seq in range(args.messages):
+                await probe.client.emit("relay", {"room": ROOM, "worker": probe.worker, "seq": seq, "sent": time.time()})
+                await asyncio.sleep(args.interval)
+
+        senders = probes[:args.workers]
+        await asyncio.gather(*(send(probe) for probe in senders))
+
+        expected = len(senders) * args.messages * len(probes)
+        deadline = time.monotonic() + 30
+        received = 0
+        while time.monotonic() < deadline:
+            received = sum(len(p.latencies["same"]) + len(p.latencies["cross"]) for p in probes)
+            if received >= expected:
+                break
+            await asyncio.sleep(0.1)
+
+        print(f"{args.workers} workers x {args.sockets} sockets ({args.manager} manager), "
+              f"connected in {connect_s:.1f}s")
+        print(f"delivered {received}/{expected} ({received / expected:.1%})")
+        print(f"{'path':<14} | {'deliveries':>10} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'mean ms':>8}")
+        for path, label in (("same", "same worker"), ("cross", "cross worker")):
+            values = [v for p in probes for v in p.latencies[path]]
+            mean = statistics.mean(values) if values else float("nan")
+            print(f"{label:<14} | {len(values):>10} | {percentile(values, 0.50) * 1000:>8.1f} | "
+                  f"{percentile(values, 0.95) * 1000:>8.1f} | {percentile(values, 0.99) * 1000:>8.1f} | "
+                  f"{mean * 1000:>8.1f}")
+
+        await asyncio.gather(*(p.client.disconnect() for p in probes), return_exceptions=True)
+    finally:
+        for process in processes:
+            process.terminate()
+        for server in servers:
+            server.should_exit = True
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Rebuild the badge leaderboard from user_badges.
+Reconciles the points and badge-count boards with MongoDB, e.g. after bulk
+badge edits or writes that bypassed the leaderboard. Writes the shared Redis
+sorted sets when REDIS_URL is reachable; otherwise it only verifies the
+rebuild in this process.
+
+Usage:
+    python scripts/rebuild_leaderboards.py
+"""
+import asyncio
+import os
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cache import cache  # noqa: E402
+from utils.leaderboard import get_badge_leaderboard  # noqa: E402
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('DB_NAME', 'avida_marketplace')
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    await cache.connect()
+    leaderboard = get_badge_leaderboard(client[DB_NAME])
+    result = await leaderboard.rebuild()
+    if result["skipped"]:
+        print("Badge leaderboard is being rebuilt by another process, nothing done")
+    else:
+        print(f"Rebuilt badge leaderboard: {result['users']} users ({result['backend']})")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
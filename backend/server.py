@@ -1,10 +1,12 @@
 from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, Response, Query, UploadFile, File, Body
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
@@ -13,14 +15,39 @@ import uuid
 from datetime import datetime, timezone, timedelta
 import httpx
 import socketio
-from collections import defaultdict
-import time
 import base64
 import asyncio
 
 # Badge Awarding Service
 from services.badge_service import get_badge_service, BadgeAwardingService
 
+# Keyset pagination
+from utils.pagination import InvalidCursorError, apply_seek, page_from_batch, backfill_boost_tier
+
+# Listing search backend
+from utils.search_service import get_search_service, backfill_search_prefixes
+from utils.geo import backfill_geo_points
+from utils.read_watermarks import backfill_read_watermarks
+from utils.unread_counters import get_unread_count
+from utils.realtime import create_client_manager, presence, stats_subscribers, user_room, stats_room, admin_room
+from utils.scheduler import scheduler, IntervalTrigger, CronTrigger
+from utils.analytics_rollups import backfill_rollups, record_backfill_cutoff
+from utils.analytics_ingest import analytics_ingestor
+from utils.cohort_activity import cohort_activity
+from utils.feature_flags import feature_flags
+from utils.feed_snapshots import get_feed_snapshots
+from utils.boost_expiry import expire_boosts
+from utils.leaderboard import get_badge_leaderboard
+from utils.cpu_pool import cpu_pool
+
+# Session resolution cache and batched last_seen writes
+from utils.session_cache import session_cache, last_seen_tracker
+
+# Shared keep-alive HTTP clients for proxies and internal calls
+from utils.http_pool import http_pool, forwardable_headers
+from utils.event_bus import event_bus, EventTypes, EVENT_BUS_BATCH_SIZE
+from utils.rate_limit import rate_limiter, rate_limit
+
 # Expo Push Notifications
 try:
     from exponent_server_sdk import (
@@ -366,9 +393,11 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ.get('DB_NAME', 'classifieds_db')]
 
-# Socket.IO setup
+# Socket.IO setup (emits and room joins go through the shared pub/sub manager
+# when one is configured, so they reach sockets on every worker)
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=create_client_manager(),
     cors_allowed_origins='*',
     logger=True,
     engineio_logger=True
@@ -389,8 +418,7 @@ socket_app = socketio.ASGIApp(sio, other_asgi_app=app)
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Rate limiting storage
-rate_limits = defaultdict(list)
+# Rate limiting (GCRA, shared through Redis when the cache is connected)
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMITS = {
     "login": 5,
@@ -399,10 +427,6 @@ RATE_LIMITS = {
     "image_upload": 20
 }
 
-# Online users tracking
-online_users: Dict[str, str] = {}  # user_id -> socket_id
-user_sockets: Dict[str, str] = {}  # socket_id -> user_id
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -682,19 +706,11 @@ class UserStats(BaseModel):
 
 # ==================== RATE LIMITING ====================
 
-def check_rate_limit(key: str, action: str) -> bool:
-    """Check if action is rate limited"""
-    current_time = time.time()
-    limit_key = f"{key}:{action}"
-    
-    # Clean old entries
-    rate_limits[limit_key] = [t for t in rate_limits[limit_key] if current_time - t < RATE_LIMIT_WINDOW]
-    
-    if len(rate_limits[limit_key]) >= RATE_LIMITS.get(action, 100):
-        return False
-    
-    rate_limits[limit_key].append(current_time)
-    return True
+rate_limiter.configure(RATE_LIMITS, period=RATE_LIMIT_WINDOW)
+
+async def check_rate_limit(key: str, action: str) -> bool:
+    """Check if action is rate limited (True = allowed)"""
+    return await rate_limiter.allow(key, action)
 
 # ==================== AUTH HELPERS ====================
 
@@ -708,32 +724,33 @@ async def get_session_token(request: Request) -> Optional[str]:
     return token
 
 async def get_current_user(request: Request) -> Optional[User]:
-    """Get current authenticated user"""
+    """Get current authenticated user (served from the session cache when possible)"""
     token = await get_session_token(request)
     if not token:
         return None
     
-    session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
-    if not session:
-        return None
-    
-    # Check expiry with timezone awareness
-    expires_at = session.get("expires_at")
-    if expires_at:
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
-        if expires_at <= datetime.now(timezone.utc):
+    user_doc = session_cache.get(token)
+    if user_doc is None:
+        session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+        if not session:
             return None
+        
+        # Check expiry with timezone awareness
+        expires_at = session.get("expires_at")
+        if expires_at:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at <= datetime.now(timezone.utc):
+                return None
+        
+        user_doc = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0, "password_hash": 0})
+        if not user_doc:
+            return None
+        session_cache.put(token, user_doc, expires_at)
     
-    user_doc = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
-    if user_doc:
-        # Update last_seen timestamp for activity tracking
-        await db.users.update_one(
-            {"user_id": session["user_id"]},
-            {"$set": {"last_seen": datetime.now(timezone.utc)}}
-        )
-        return User(**user_doc)
-    return None
+    # last_seen is coalesced and written in batches by last_seen_tracker
+    last_seen_tracker.touch(user_doc["user_id"])
+    return User(**user_doc)
 
 async def require_auth(request: Request) -> User:
     """Require authentication, raise 401 if not authenticated"""
@@ -744,35 +761,8 @@ async def require_auth(request: Request) -> User:
 
 # ==================== AUTH ENDPOINTS ====================
 
-# Import bcrypt for password hashing
-import hashlib
 import secrets
 
-from passlib.context import CryptContext
-
-# Bcrypt password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return pwd_context.hash(password)
-
-def verify_password(password: str, stored_hash: str) -> bool:
-    """Verify password against stored hash (supports both bcrypt and legacy SHA-256)"""
-    try:
-        # Try bcrypt first
-        if stored_hash.startswith('$2'):
-            return pwd_context.verify(password, stored_hash)
-        
-        # Fallback to legacy SHA-256 format (salt:hash)
-        if ':' in stored_hash:
-            salt, password_hash = stored_hash.split(':')
-            return hashlib.sha256((password + salt).encode()).hexdigest() == password_hash
-        
-        return False
-    except Exception:
-        return False
-
 # AUTH ENDPOINTS - Moved to routes/auth.py
 # User endpoints (basic CRUD) - Moved to routes/users.py
 
@@ -785,7 +775,7 @@ def verify_password(password: str, stored_hash: str) -> bool:
 
 # ==================== MEDIA UPLOAD ENDPOINT ====================
 
-@api_router.post("/messages/upload-media")
+@api_router.post("/messages/upload-media", dependencies=[Depends(rate_limit("image_upload"))])
 async def upload_message_media(
     request: Request,
     file: UploadFile = File(...),
@@ -836,7 +826,7 @@ async def upload_message_media(
         "size": len(content)
     }
 
-@api_router.post("/media/upload")
+@api_router.post("/media/upload", dependencies=[Depends(rate_limit("image_upload"))])
 async def upload_media(
     request: Request,
     file: UploadFile = File(...),
@@ -926,12 +916,12 @@ async def connect(sid, environ):
 @sio.event
 async def disconnect(sid):
     logger.info(f"Client disconnected: {sid}")
-    # Remove user from online tracking
-    if sid in user_sockets:
-        user_id = user_sockets[sid]
-        del user_sockets[sid]
-        if user_id in online_users:
-            del online_users[user_id]
+    admin_socket_ids.pop(sid, None)
+    stats_socket_users.pop(sid, None)
+    await stats_subscribers.disconnect(sid)
+    # Remove user from online tracking; offline once their last socket on any worker is gone
+    user_id, offline = await presence.disconnect(sid)
+    if user_id and offline:
         # Update last_seen in database
         await db.users.update_one(
             {"user_id": user_id},
@@ -946,8 +936,7 @@ async def user_online(sid, data):
     """Track user as online"""
     user_id = data.get("user_id")
     if user_id:
-        online_users[user_id] = sid
-        user_sockets[sid] = user_id
+        await presence.connect(sid, user_id)
         # Update last_seen and online status in database
         await db.users.update_one(
             {"user_id": user_id},
@@ -956,6 +945,12 @@ async def user_online(sid, data):
         # Broadcast online status
         await sio.emit("user_online_status", {"user_id": user_id, "is_online": True})
         logger.info(f"User {user_id} is now online")
+        # Per-user room for pushed counters; send the current unread total right away
+        await sio.enter_room(sid, user_room(user_id))
+        try:
+            await sio.emit("unread_count", {"count": await get_unread_count(db, user_id)}, room=sid)
+        except Exception as e:
+            logger.error(f"Error sending initial unread count: {e}")
 
 @sio.event
 async def join_conversation(sid, data):
@@ -992,12 +987,9 @@ async def stop_typing(sid, data):
 
 # ==================== QA REAL-TIME ALERTS ====================
 
-# Track admin WebSocket connections for QA alerts
-admin_alert_sockets: Dict[str, str] = {}  # admin_id -> socket_id
+# Sockets on this worker; alerts and stats are addressed through admin_room /
+# stats_room so they reach sockets on any worker
 admin_socket_ids: Dict[str, str] = {}  # socket_id -> admin_id
-
-# Track user stats subscriptions
-user_stats_sockets: Dict[str, str] = {}  # user_id -> socket_id
 stats_socket_users: Dict[str, str] = {}  # socket_id -> user_id
 
 @sio.event
@@ -1005,8 +997,9 @@ async def subscribe_stats(sid, data):
     """Subscribe to real-time stats updates for a user"""
     user_id = data.get("user_id")
     if user_id:
-        user_stats_sockets[user_id] = sid
         stats_socket_users[sid] = user_id
+        await stats_subscribers.connect(sid, user_id)
+        await sio.enter_room(sid, stats_room(user_id))
         logger.info(f"User {user_id} subscribed to stats updates (socket: {sid})")
         
         # Send initial stats immediately
@@ -1019,12 +1012,10 @@ async def subscribe_stats(sid, data):
 @sio.event
 async def unsubscribe_stats(sid, data):
     """Unsubscribe from stats updates"""
-    user_id = stats_socket_users.get(sid)
+    user_id = stats_socket_users.pop(sid, None)
     if user_id:
-        if user_id in user_stats_sockets:
-            del user_stats_sockets[user_id]
-        if sid in stats_socket_users:
-            del stats_socket_users[sid]
+        await stats_subscribers.disconnect(sid)
+        await sio.leave_room(sid, stats_room(user_id))
         logger.info(f"User {user_id} unsubscribed from stats updates")
 
 async def get_user_quick_stats(user_id: str) -> dict:
@@ -1062,23 +1053,23 @@ async def get_user_quick_stats(user_id: str) -> dict:
 
 async def notify_stats_update(user_id: str):
     """Notify a user of stats changes via WebSocket"""
-    if user_id in user_stats_sockets:
+    if await stats_subscribers.is_online(user_id):
         try:
             stats = await get_user_quick_stats(user_id)
-            await sio.emit("stats_update", stats, room=user_stats_sockets[user_id])
+            await sio.emit("stats_update", stats, room=stats_room(user_id))
             logger.debug(f"Sent stats update to user {user_id}")
         except Exception as e:
             logger.error(f"Error sending stats update: {e}")
 
 async def notify_new_favorite(seller_id: str, favorited_by_name: str, listing_title: str, listing_id: str):
     """Notify a seller when someone favorites their listing via WebSocket"""
-    if seller_id in user_stats_sockets:
+    if await stats_subscribers.is_online(seller_id):
         try:
             await sio.emit("new_favorite", {
                 "user_name": favorited_by_name,
                 "listing_title": listing_title,
                 "listing_id": listing_id
-            }, room=user_stats_sockets[seller_id])
+            }, room=stats_room(seller_id))
             logger.debug(f"Sent new_favorite notification to seller {seller_id}")
         except Exception as e:
             logger.error(f"Error sending new_favorite notification: {e}")
@@ -1090,11 +1081,11 @@ async def admin_subscribe_alerts(sid, data):
     alert_types = data.get("alert_types", ["critical", "warning", "system_down"])
     
     if admin_id:
-        admin_alert_sockets[admin_id] = sid
         admin_socket_ids[sid] = admin_id
         
         # Join QA alerts room
         await sio.enter_room(sid, "qa_alerts")
+        await sio.enter_room(sid, admin_room(admin_id))
         
         # Store subscription in database
         await db.qa_realtime_subscriptions.update_one(
@@ -1124,12 +1115,10 @@ async def admin_unsubscribe_alerts(sid, data):
     admin_id = data.get("admin_id") or admin_socket_ids.get(sid)
     
     if admin_id:
-        if admin_id in admin_alert_sockets:
-            del admin_alert_sockets[admin_id]
-        if sid in admin_socket_ids:
-            del admin_socket_ids[sid]
+        admin_socket_ids.pop(sid, None)
         
         await sio.leave_room(sid, "qa_alerts")
+        await sio.leave_room(sid, admin_room(admin_id))
         
         # Update subscription in database
         await db.qa_realtime_subscriptions.update_one(
@@ -1171,8 +1160,7 @@ async def broadcast_qa_alert(alert_data: Dict, target_admin_ids: List[str] = Non
     if target_admin_ids:
         # Send to specific admins
         for admin_id in target_admin_ids:
-            if admin_id in admin_alert_sockets:
-                await sio.emit("qa_alert", alert_data, room=admin_alert_sockets[admin_id])
+            await sio.emit("qa_alert", alert_data, room=admin_room(admin_id))
     else:
         # Broadcast to all subscribed admins
         await sio.emit("qa_alert", alert_data, room="qa_alerts")
@@ -1250,17 +1238,13 @@ async def search_listings(
     sort: str = Query("relevance", description="Sort: relevance, newest, price_asc, price_desc"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=50),
+    cursor: str = Query(None, description="Opaque keyset cursor from next_cursor"),
+    paginate: str = Query("page", description="page (page/total compatibility) or cursor (keyset)"),
 ):
     """Search listings by query, category, location, price range"""
     query_filter = {"status": "active"}
+    search_service = get_search_service(db)
 
-    if q:
-        query_filter["$or"] = [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"description": {"$regex": q, "$options": "i"}},
-            {"category_id": {"$regex": q, "$options": "i"}},
-            {"subcategory": {"$regex": q, "$options": "i"}},
-        ]
     if category:
         query_filter["category_id"] = category
     if location:
@@ -1272,19 +1256,54 @@ async def search_listings(
     if condition:
         query_filter["condition"] = condition
 
-    sort_spec = [("created_at", -1)]
+    # Every sort ends on id so keyset cursors are stable
+    sort_spec = [("created_at", -1), ("id", -1)]
     if sort == "newest":
-        sort_spec = [("created_at", -1)]
+        sort_spec = [("created_at", -1), ("id", -1)]
     elif sort == "price_asc":
-        sort_spec = [("price", 1)]
+        sort_spec = [("price", 1), ("id", 1)]
     elif sort == "price_desc":
-        sort_spec = [("price", -1)]
+        sort_spec = [("price", -1), ("id", -1)]
     elif sort == "relevance" and q:
-        sort_spec = [("featured", -1), ("boost_score", -1), ("created_at", -1)]
+        sort_spec = [("boost_tier", -1), ("created_at", -1), ("id", -1)]
 
+    projection = {"_id": 0, "images": 0, "seo_data": 0}
     skip = (page - 1) * limit
+
+    # Relevance pages are ranked by the search backend (text score); cursors
+    # seek on stored keys, so cursor mode orders by boost tier/recency instead
+    if q and sort == "relevance" and not (cursor or paginate == "cursor"):
+        listings, total = await search_service.ranked_search(query_filter, q, projection, skip, limit)
+        return {
+            "listings": listings,
+            "total": total,
+            "page": page,
+            "pages": (total + limit - 1) // limit if limit else 1,
+            "query": q,
+            "next_cursor": None,
+        }
+
+    if q:
+        query_filter.update(await search_service.match_filter(q))
+
+    if cursor or paginate == "cursor":
+        try:
+            seek_filter = apply_seek(query_filter, sort_spec, cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        batch = await db.listings.find(seek_filter, projection).sort(sort_spec).limit(limit + 1).to_list(length=limit + 1)
+        listings, next_cursor = page_from_batch(batch, limit, sort_spec)
+        return {
+            "listings": listings,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "limit": limit,
+            "query": q,
+        }
+
     total = await db.listings.count_documents(query_filter)
-    listings = await db.listings.find(query_filter, {"_id": 0, "images": 0, "seo_data": 0}).sort(sort_spec).skip(skip).limit(limit).to_list(length=limit)
+    batch = await db.listings.find(query_filter, projection).sort(sort_spec).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+    listings, next_cursor = page_from_batch(batch, limit, sort_spec)
 
     return {
         "listings": listings,
@@ -1292,6 +1311,7 @@ async def search_listings(
         "page": page,
         "pages": (total + limit - 1) // limit if limit else 1,
         "query": q,
+        "next_cursor": next_cursor,
     }
 
 
@@ -1307,8 +1327,9 @@ async def get_search_suggestions(
     query = q.strip().lower()
     suggestions = []
 
-    # 1. Match from tracked search history
-    match_conditions = {"query": {"$regex": f"^{query}", "$options": "i"}}
+    # 1. Match from tracked search history (queries are stored lowercased, so an
+    # anchored case-sensitive prefix can use the query index)
+    match_conditions = {"query": {"$regex": f"^{re.escape(query)}"}}
     if category_id:
         match_conditions["category_id"] = category_id
 
@@ -1325,15 +1346,12 @@ async def get_search_suggestions(
     if len(suggestions) < limit:
         remaining = limit - len(suggestions)
         seen = {s["query"] for s in suggestions}
-        title_filter = {
-            "status": "active",
-            "title": {"$regex": query, "$options": "i"},
-        }
+        title_filter = {"status": "active"}
         if category_id:
             title_filter["category_id"] = category_id
-        listings = await db.listings.find(title_filter, {"_id": 0, "title": 1}).limit(remaining * 2).to_list(length=remaining * 2)
-        for listing_item in listings:
-            t = listing_item["title"].strip()
+        titles = await get_search_service(db).suggest_titles(query, title_filter, remaining * 2)
+        for title in titles:
+            t = title.strip()
             if t.lower() not in seen:
                 suggestions.append({"query": t, "count": 0})
                 seen.add(t.lower())
@@ -2727,6 +2745,20 @@ async def performance_stats():
         
         return {
             "cache_status": cache_status,
+            "cache_metrics": cache.get_stats(),
+            "session_cache": session_cache.get_stats(),
+            "last_seen_writes": last_seen_tracker.get_stats(),
+            "http_upstreams": http_pool.get_stats(),
+            "event_bus": event_bus.get_stats(),
+            "feed_snapshots": get_feed_snapshots(db).get_stats(),
+            "rate_limits": rate_limiter.get_stats(),
+            "presence": [presence.get_stats(), stats_subscribers.get_stats()],
+            "job_scheduler": scheduler.get_stats(),
+            "analytics_ingest": analytics_ingestor.get_stats(),
+            "cohort_activity": cohort_activity.get_stats(),
+            "feature_flags": feature_flags.get_stats(),
+            "badge_leaderboard": get_badge_leaderboard(db).get_stats(),
+            "cpu_pool": cpu_pool.get_stats(),
             "index_stats": index_stats,
             "counts": {
                 "listings": listings_count,
@@ -2949,25 +2981,15 @@ if SUBSCRIPTION_SERVICES_AVAILABLE:
     # =========================================================================
     
     async def subscription_renewal_checker():
-        """Background task to check for expiring subscriptions"""
-        while True:
-            try:
-                # Run checks
-                expiring_result = await _auto_renewal_service.check_expiring_subscriptions()
-                expired_result = await _auto_renewal_service.process_expired_subscriptions()
-                
-                logger.info(f"Subscription check: {expiring_result}, Expired: {expired_result}")
-            except Exception as e:
-                logger.error(f"Subscription renewal check error: {e}")
-            
-            # Run every 6 hours
-            await asyncio.sleep(6 * 60 * 60)
+        """Check for expiring subscriptions and expire lapsed ones"""
+        expiring_result = await _auto_renewal_service.check_expiring_subscriptions()
+        expired_result = await _auto_renewal_service.process_expired_subscriptions()
+        
+        logger.info(f"Subscription check: {expiring_result}, Expired: {expired_result}")
+        return {"expiring": expiring_result, "expired": expired_result}
     
-    @app.on_event("startup")
-    async def start_subscription_checker():
-        """Start subscription renewal background task"""
-        asyncio.create_task(subscription_renewal_checker())
-        logger.info("Started subscription renewal checker background task")
+    # Every 6 hours, once across the cluster
+    scheduler.register("subscription_renewal", subscription_renewal_checker, IntervalTrigger(6 * 60 * 60), jitter=300)
     
     # Admin endpoint to manually trigger subscription checks
     @app.post("/api/admin/subscriptions/check-renewals")
@@ -3952,6 +3974,9 @@ ADMIN_LOCAL_PATHS = [
     # Note: challenges is handled by admin-dashboard backend
 ]
 
+# Admin user ban/unban routes (session cache must be invalidated on success)
+ADMIN_BAN_PATH = re.compile(r"^users/([^/]+)/(?:ban|unban)$")
+
 def is_local_admin_path(path: str) -> bool:
     """Check if a path should be handled locally instead of proxied"""
     for local_path in ADMIN_LOCAL_PATHS:
@@ -4014,68 +4039,55 @@ async def admin_proxy(request: Request, path: str):
     
     logger.info(f"Admin proxy: forwarding {request.method} /api/admin/{path}")
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Build the target URL
-        url = f"{ADMIN_BACKEND_URL}/api/admin/{path}"
-        
-        # Get query string
-        query_string = str(request.query_params)
-        if query_string:
-            url = f"{url}?{query_string}"
-        
-        # Get request body if any
-        body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
-            body = await request.body()
-        
-        # Forward headers (make sure Authorization is properly forwarded)
-        headers = {}
-        auth_header = None
-        for key, value in request.headers.items():
-            key_lower = key.lower()
-            if key_lower not in ["host", "content-length"]:
-                # Preserve the Authorization header properly
-                if key_lower == "authorization":
-                    headers["Authorization"] = value
-                    auth_header = value[:50] + "..." if len(value) > 50 else value
-                else:
-                    headers[key] = value
-        
-        logger.info(f"Admin proxy: Auth header present: {auth_header is not None}")
-        
-        # Make the request
-        try:
-            response = await client.request(
-                method=request.method,
-                url=url,
-                headers=headers,
-                content=body
-            )
-            
-            # Return the response
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.headers.get("content-type")
-            )
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="Admin service unavailable")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    # Build the target URL
+    url = f"{ADMIN_BACKEND_URL}/api/admin/{path}"
+    
+    # Get query string
+    query_string = str(request.query_params)
+    if query_string:
+        url = f"{url}?{query_string}"
+    
+    # Forward headers (Authorization and Content-Length included) and stream
+    # the request body straight through instead of buffering it
+    headers = forwardable_headers(request.headers)
+    body = request.stream() if request.method in ["POST", "PUT", "PATCH"] else None
+    
+    client = http_pool.client("admin_backend")
+    upstream_request = client.build_request(request.method, url, headers=headers, content=body)
+    
+    try:
+        response = await http_pool.send_stream("admin_backend", upstream_request)
+    except httpx.ConnectError:
+        raise HTTPException(status_code=503, detail="Admin service unavailable")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Bans change who may authenticate; drop cached sessions right away
+    ban_match = ADMIN_BAN_PATH.match(path)
+    if ban_match and request.method == "POST" and response.status_code < 400:
+        session_cache.invalidate_user(ban_match.group(1))
+    
+    # Stream the raw (still encoded) body back so large exports never sit in memory
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=forwardable_headers(response.headers),
+        background=BackgroundTask(response.aclose)
+    )
 
 # Public form config endpoint - proxy to admin backend (no auth required)
 @app.get("/api/form-config/public")
 async def get_public_form_configs():
     """Proxy public form config request to admin backend."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{ADMIN_BACKEND_URL}/api/form-config/public")
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers={"Content-Type": "application/json"}
-            )
+        response = await http_pool.request(
+            "admin_backend", "GET", f"{ADMIN_BACKEND_URL}/api/form-config/public", timeout=10.0
+        )
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            headers={"Content-Type": "application/json"}
+        )
     except httpx.ConnectError:
         # Return empty config for graceful fallback
         return {
@@ -4100,13 +4112,14 @@ async def get_public_form_configs():
 async def get_public_photography_guides(category_id: str):
     """Proxy public photography guides request to admin backend."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{ADMIN_BACKEND_URL}/api/photography-guides/public/{category_id}")
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers={"Content-Type": "application/json"}
-            )
+        response = await http_pool.request(
+            "admin_backend", "GET", f"{ADMIN_BACKEND_URL}/api/photography-guides/public/{category_id}", timeout=10.0
+        )
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            headers={"Content-Type": "application/json"}
+        )
     except httpx.ConnectError:
         # Return empty guides for graceful fallback
         return {"guides": [], "count": 0}
@@ -4128,8 +4141,8 @@ if MODULAR_ROUTES_AVAILABLE:
     auth_router = create_auth_router(db, get_current_user, get_session_token, check_rate_limit)
     api_router.include_router(auth_router)
     
-    # Create users router - needs online_users set for status tracking
-    users_router = create_users_router(db, get_current_user, require_auth, set(online_users.keys()))
+    # Create users router - online status comes from the shared presence registry
+    users_router = create_users_router(db, get_current_user, require_auth, presence)
     api_router.include_router(users_router)
     
     # Create listings router
@@ -4139,6 +4152,25 @@ if MODULAR_ROUTES_AVAILABLE:
         notify_stats_update=notify_stats_update
     )
     api_router.include_router(listings_router)
+
+    # Listing side effects run as event bus subscribers, off the request path
+    async def _award_listing_badges(event):
+        await get_badge_service(db).check_and_award_badges(event.user_id, trigger="listing")
+
+    async def _push_listing_stats(event):
+        await notify_stats_update(event.user_id)
+
+    event_bus.subscribe("listing_badges", _award_listing_badges,
+                        event_types=[EventTypes.LISTING_CREATED], concurrency=4)
+    event_bus.subscribe("listing_stats_push", _push_listing_stats,
+                        event_types=[EventTypes.LISTING_CREATED], concurrency=4)
+
+    # Boost/ownership state cached by the analytics ingest path
+    async def _invalidate_analytics_listing(event):
+        analytics_ingestor.invalidate_listing(event.properties.get("listing_id"))
+
+    event_bus.subscribe("analytics_listing_cache", _invalidate_analytics_listing,
+                        event_types=[EventTypes.LISTING_BOOST_CHANGED, EventTypes.LISTING_DELETED])
     
     # Create categories router
     categories_router = create_categories_router(db)
@@ -4431,7 +4463,8 @@ if ANALYTICS_ROUTES_AVAILABLE:
         db, 
         get_current_user_for_analytics, 
         get_current_admin_for_analytics,
-        create_notification_func=create_notification
+        create_notification_func=create_notification,
+        scheduler=scheduler
     )
     api_router.include_router(analytics_router)
     logger.info("Analytics routes loaded successfully")
@@ -4476,7 +4509,8 @@ if ESCROW_ROUTES_AVAILABLE:
     escrow_router, escrow_service = create_escrow_router(
         db,
         get_current_user_for_escrow,
-        get_current_admin_for_escrow
+        get_current_admin_for_escrow,
+        scheduler=scheduler
     )
     api_router.include_router(escrow_router)
     logger.info("Escrow & Online Selling routes loaded successfully")
@@ -4522,16 +4556,15 @@ if NOTIFICATION_QUEUE_AVAILABLE and NOTIFICATION_SERVICE_AVAILABLE:
     notification_queue.set_notification_service(notification_service)
     escrow_notification_integration = EscrowNotificationIntegration(db, notification_queue)
     
-    # Start background queue processor
-    @app.on_event("startup")
-    async def start_notification_queue():
-        notification_queue.start(interval=15)
-        logger.info("Notification queue processor started")
+    # Queue processing runs as a scheduled job (one worker at a time per batch)
+    async def process_notification_queue():
+        """Deliver a batch of queued notifications"""
+        results = await notification_queue.process_batch()
+        if results["processed"] > 0:
+            logger.info(f"Queue batch processed: {results}")
+        return results
     
-    @app.on_event("shutdown")
-    async def stop_notification_queue():
-        notification_queue.stop()
-        logger.info("Notification queue processor stopped")
+    scheduler.register("notification_queue", process_notification_queue, IntervalTrigger(15), jitter=2)
     
     logger.info("Notification queue and escrow integration loaded successfully")
 
@@ -4544,6 +4577,10 @@ try:
         try:
             await asyncio.wait_for(cache.connect(), timeout=5.0)
             logger.info("Cache system initialized")
+            if cache.connected:
+                rate_limiter.use_redis(cache.redis_client)
+                presence.use_redis(cache.redis_client)
+                stats_subscribers.use_redis(cache.redis_client)
         except asyncio.TimeoutError:
             logger.warning("Cache connection timed out, using memory cache")
         except Exception as e:
@@ -4638,13 +4675,24 @@ if SMART_NOTIFICATIONS_AVAILABLE:
         db, get_current_user, require_auth
     )
     api_router.include_router(smart_notification_router)
+
+    async def _smart_new_listing_triggers(event):
+        listing = event.context.get("listing")
+        if listing:
+            await smart_notification_service.check_new_listing_triggers(listing)
+
+    event_bus.subscribe("smart_new_listing", _smart_new_listing_triggers,
+                        event_types=[EventTypes.LISTING_CREATED], concurrency=2)
     
-    # Start background processor for smart notifications
-    @app.on_event("startup")
-    async def start_smart_notification_processor():
-        if smart_notification_service:
-            smart_notification_service.start(interval=30)
-            logger.info("Smart Notification processor started")
+    # Background processing of smart notifications
+    async def process_smart_notifications():
+        """Send pending smart notifications"""
+        result = await smart_notification_service.process_pending_notifications()
+        if result and result.get("processed", 0) > 0:
+            logger.info(f"Processed {result['processed']} notifications")
+        return result
+    
+    scheduler.register("smart_notifications", process_smart_notifications, IntervalTrigger(30), jitter=3)
     
     logger.info("Smart Notification System loaded successfully")
 
@@ -4795,19 +4843,22 @@ if COHORT_ANALYTICS_AVAILABLE:
     # asyncio.create_task(cohort_analytics_service.initialize_default_cohorts())
     logger.info("Cohort & Retention Analytics loaded successfully")
     
+    # Cohort events published on the event bus are stored in batches
+    from cohort_analytics import EventType as CohortEventType
+
+    async def _store_cohort_events(events):
+        await cohort_analytics_service.track_events_batch([e.to_record() for e in events])
+
+    event_bus.subscribe(
+        "cohort_event_store", _store_cohort_events,
+        event_types=[e.value for e in CohortEventType],
+        batch_size=EVENT_BUS_BATCH_SIZE
+    )
+
     # Global event tracking helper
     async def track_cohort_event(user_id: str, event_type: str, properties: dict = None, session_id: str = None):
-        """Helper function to track events for cohort analytics"""
-        try:
-            from cohort_analytics import EventType
-            await cohort_analytics_service.track_event(
-                user_id=user_id,
-                event_type=EventType(event_type),
-                properties=properties or {},
-                session_id=session_id
-            )
-        except Exception as e:
-            logger.warning(f"Failed to track cohort event: {e}")
+        """Helper function to track events for cohort analytics (via the event bus)"""
+        event_bus.emit(event_type, user_id=user_id, properties=properties or {}, session_id=session_id)
     
     # Background scheduled task for alert checking
     async def scheduled_alert_checker():
@@ -4920,7 +4971,6 @@ logger.info("API router included with all sub-routes")
 # =============================================================================
 # BACKGROUND: Migrate base64 images to Cloudflare R2 CDN
 # =============================================================================
-@app.on_event("startup")
 async def migrate_images_to_r2():
     """Migrate base64 images from listings to R2 CDN in the background."""
     async def _migrate():
@@ -5034,7 +5084,7 @@ async def migrate_images_to_r2():
     async def _fallback_thumbnails():
         """Fallback: pre-compute thumbnails without R2."""
         try:
-            from utils.image_optimizer import create_thumbnail
+            from utils.image_optimizer import create_thumbnail_async
             ids_cursor = db.listings.find(
                 {"feed_thumbnail": {"$exists": False}, "status": "active"},
                 {"_id": 1, "id": 1}
@@ -5058,7 +5108,7 @@ async def migrate_images_to_r2():
                             if img_src.startswith(("http://", "https://")):
                                 thumb = img_src
                             else:
-                                thumb = create_thumbnail(img_src, size=(150, 150))
+                                thumb = await create_thumbnail_async(img_src, size=(150, 150))
                     await db.listings.update_one(
                         {"_id": ref["_id"]},
                         {"$set": {"feed_thumbnail": thumb or ""}}
@@ -5068,7 +5118,11 @@ async def migrate_images_to_r2():
         except Exception as e:
             logger.error(f"Fallback thumbnails failed: {e}")
 
-    asyncio.create_task(_migrate())
+    await _migrate()
+
+
+# Up to 300 listings per run until none are left
+scheduler.register("r2_image_migration", migrate_images_to_r2, IntervalTrigger(30 * 60, initial_delay=60), jitter=60)
 
 # =============================================================================
 # VOUCHER SYSTEM
@@ -5392,6 +5446,14 @@ if ADMIN_TOOLS_AVAILABLE:
         from routes.feed import create_feed_router, ensure_feed_indexes
         feed_router = create_feed_router(db)
         app.include_router(feed_router, prefix="/api")
+        event_bus.subscribe(
+            "feed_snapshots", get_feed_snapshots(db).handle_events,
+            event_types=[
+                EventTypes.LISTING_CREATED, EventTypes.LISTING_UPDATED,
+                EventTypes.LISTING_DELETED, EventTypes.LISTING_BOOST_CHANGED,
+            ],
+            batch_size=100, batch_wait=0.2
+        )
         print("Instant Feed routes loaded successfully")
     except Exception as e:
         print(f"Failed to load Feed routes: {e}")
@@ -5452,50 +5514,37 @@ ADMIN_FRONTEND_URL = "http://localhost:3001"
 @app.api_route("/api/admin-ui/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "HEAD", "OPTIONS"])
 async def admin_frontend_proxy(request: Request, path: str):
     """Proxy admin frontend requests to Next.js dev server"""
-    async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-        # Build the target URL - include /api/admin-ui prefix for Next.js basePath
-        url = f"{ADMIN_FRONTEND_URL}/api/admin-ui/{path}" if path else f"{ADMIN_FRONTEND_URL}/api/admin-ui"
-        
-        # Get query string
-        query_string = str(request.query_params)
-        if query_string:
-            url = f"{url}?{query_string}"
-        
-        # Get request body if any
-        body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
-            body = await request.body()
-        
-        # Forward headers
-        headers = dict(request.headers)
-        headers.pop("host", None)
-        headers.pop("content-length", None)
-        
-        try:
-            response = await client.request(
-                method=request.method,
-                url=url,
-                headers=headers,
-                content=body
-            )
-            
-            # Build response headers
-            resp_headers = dict(response.headers)
-            resp_headers.pop("content-encoding", None)
-            resp_headers.pop("content-length", None)
-            resp_headers.pop("transfer-encoding", None)
-            
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=resp_headers,
-                media_type=response.headers.get("content-type")
-            )
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="Admin frontend service unavailable")
-        except Exception as e:
-            logger.error(f"Admin frontend proxy error: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+    # Build the target URL - include /api/admin-ui prefix for Next.js basePath
+    url = f"{ADMIN_FRONTEND_URL}/api/admin-ui/{path}" if path else f"{ADMIN_FRONTEND_URL}/api/admin-ui"
+    
+    # Get query string
+    query_string = str(request.query_params)
+    if query_string:
+        url = f"{url}?{query_string}"
+    
+    # Forward headers and stream the request body
+    headers = forwardable_headers(request.headers)
+    body = request.stream() if request.method in ["POST", "PUT", "PATCH"] else None
+    
+    client = http_pool.client("admin_frontend")
+    upstream_request = client.build_request(
+        request.method, url, headers=headers, content=body, timeout=60.0
+    )
+    
+    try:
+        response = await http_pool.send_stream("admin_frontend", upstream_request, follow_redirects=True)
+    except httpx.ConnectError:
+        raise HTTPException(status_code=503, detail="Admin frontend service unavailable")
+    except Exception as e:
+        logger.error(f"Admin frontend proxy error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=forwardable_headers(response.headers),
+        background=BackgroundTask(response.aclose)
+    )
 
 @app.get("/api/admin-ui")
 async def admin_frontend_root():
@@ -5504,60 +5553,20 @@ async def admin_frontend_root():
     return RedirectResponse(url="/api/admin-ui/", status_code=307)
 
 # Background task for expiring boosts
+async def _publish_boost_expiry(listing_ids):
+    for listing_id in listing_ids:
+        event_bus.emit(EventTypes.LISTING_BOOST_CHANGED, properties={"listing_id": listing_id})
+
 async def expire_boosts_task():
-    """Background task that runs every 60 seconds to expire boosts"""
-    while True:
-        try:
-            now = datetime.now(timezone.utc).isoformat()
-            
-            # Find all expired but still active boosts
-            expired_boosts = await db.listing_boosts.find({
-                "status": "active",
-                "expires_at": {"$lte": now}
-            }).to_list(100)
-            
-            for boost in expired_boosts:
-                # Update boost status
-                await db.listing_boosts.update_one(
-                    {"id": boost["id"]},
-                    {"$set": {"status": "expired"}}
-                )
-                
-                # Update listing - remove boost flag if no other active boosts
-                listing_id = boost.get("listing_id")
-                if listing_id:
-                    # Check if listing has other active boosts
-                    other_active = await db.listing_boosts.count_documents({
-                        "listing_id": listing_id,
-                        "status": "active",
-                        "id": {"$ne": boost["id"]}
-                    })
-                    
-                    if other_active == 0:
-                        # No other active boosts, remove is_boosted flag
-                        await db.listings.update_one(
-                            {"id": listing_id},
-                            {"$set": {"is_boosted": False, "boost_priority": 0}}
-                        )
-                    
-                    # Remove specific boost type from listing
-                    boost_type = boost.get("boost_type")
-                    if boost_type:
-                        await db.listings.update_one(
-                            {"id": listing_id},
-                            {"$unset": {f"boosts.{boost_type}": ""}}
-                        )
-                
-                logger.info(f"Expired boost {boost['id']} for listing {listing_id}")
-            
-            if expired_boosts:
-                logger.info(f"Expired {len(expired_boosts)} boosts")
-                
-        except Exception as e:
-            logger.error(f"Error in expire_boosts_task: {e}")
-        
-        # Wait 60 seconds before next check
-        await asyncio.sleep(60)
+    """Expire boosts whose end time has passed (every 60 seconds)"""
+    stats = await expire_boosts(db, on_listings_changed=_publish_boost_expiry)
+    if stats["boosts"]:
+        logger.info(
+            f"Expired {stats['boosts']} boosts on {stats['listings']} listings in {stats['batches']} batch(es)"
+        )
+    return stats
+
+scheduler.register("expire_boosts", expire_boosts_task, IntervalTrigger(60), jitter=5)
 
 @app.on_event("startup")
 async def startup_event():
@@ -5568,554 +5577,501 @@ async def startup_event():
         init_push_service(db)
         logger.info("Push notification service initialized")
     
-    asyncio.create_task(expire_boosts_task())
-    logger.info("Started boost expiration background task")
+    last_seen_tracker.start(db)
+    presence.start()
+    stats_subscribers.start()
+    # Before live rollups start, so the backfill never reaches events they count
+    await record_backfill_cutoff(db)
+    analytics_ingestor.start(db)
+    feature_flags.start(db)
+    event_bus.start()
+    get_feed_snapshots(db).start()
+    cpu_pool.start()
     
     # Initialize badge service and predefined badges
     badge_svc = get_badge_service(db)
     await badge_svc.initialize_badges()
-    asyncio.create_task(periodic_badge_check_task())
     logger.info("Started badge awarding service")
     
-    # Start scheduled reports background task
-    if SCHEDULED_REPORTS_AVAILABLE:
-        asyncio.create_task(scheduled_reports_task())
-        logger.info("Started scheduled reports background task")
-    
     # Initialize database indexes for performance
     try:
         from utils.db_indexes import ensure_all_indexes
         index_results = await ensure_all_indexes(db)
         logger.info(f"Database indexes initialized: {index_results}")
+        await backfill_boost_tier(db)
+        asyncio.create_task(backfill_search_prefixes(db))
+        asyncio.create_task(backfill_geo_points(db))
+        asyncio.create_task(backfill_read_watermarks(db))
+        asyncio.create_task(backfill_rollups(db))
+        cohort_activity.start(db)
+        search_service = get_search_service(db)
+        if hasattr(search_service, "load"):
+            asyncio.create_task(search_service.load())
     except ImportError as e:
         logger.warning(f"Index module not available: {e}")
     except Exception as e:
         logger.warning(f"Failed to initialize indexes (non-fatal): {e}")
+    
+    # Background jobs registered across this module run once cluster-wide
+    scheduler.start(db)
     logger.info("STARTUP: Main startup_event completed!")
 
 
 async def periodic_badge_check_task():
-    """Background task to check time-based badges periodically (every 6 hours)"""
-    badge_svc = get_badge_service(db)
-    while True:
-        try:
-            await asyncio.sleep(6 * 60 * 60)  # 6 hours
-            awarded = await badge_svc.run_periodic_badge_check(batch_size=500)
-            if awarded > 0:
-                logger.info(f"Periodic badge check awarded {awarded} badges")
-        except Exception as e:
-            logger.error(f"Error in periodic badge check: {e}")
-            await asyncio.sleep(60)  # Wait a minute on error
+    """Check time-based badges (every 6 hours)"""
+    awarded = await get_badge_service(db).run_periodic_badge_check(batch_size=500)
+    if awarded > 0:
+        logger.info(f"Periodic badge check awarded {awarded} badges")
+    return {"awarded": awarded}
+
+scheduler.register("periodic_badge_check", periodic_badge_check_task,
+                   IntervalTrigger(6 * 60 * 60, initial_delay=6 * 60 * 60), jitter=300)
 
 
 async def scheduled_reports_task():
-    """Background task to send scheduled analytics reports (weekly by default)."""
+    """Send the scheduled analytics report when it is due (checked every 5 minutes)"""
     reports_service = get_reports_service(db)
     
-    while True:
-        try:
-            # Get report settings
-            settings = await reports_service.get_report_settings()
-            
-            if not settings.get("enabled", True):
-                # Reports disabled, check again in 1 hour
-                await asyncio.sleep(60 * 60)
-                continue
-            
-            frequency = settings.get("frequency", "weekly")
-            target_day = settings.get("day_of_week", 1)  # Monday
-            target_hour = settings.get("hour", 9)  # 9 AM UTC
-            
-            now = datetime.now(timezone.utc)
-            
-            # Check if it's time to send the report
-            should_send = False
-            
-            if frequency == "daily":
-                # Send at target hour every day
-                should_send = now.hour == target_hour and now.minute < 5
-            elif frequency == "weekly":
-                # Send at target hour on target day
-                should_send = (now.weekday() == target_day and 
-                             now.hour == target_hour and 
-                             now.minute < 5)
-            elif frequency == "monthly":
-                # Send at target hour on the 1st of each month
-                should_send = (now.day == 1 and 
-                             now.hour == target_hour and 
-                             now.minute < 5)
-            
-            if should_send:
-                # Check if we already sent today
-                today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                already_sent = await db.report_history.find_one({
-                    "type": "weekly_analytics",
-                    "created_at": {"$gte": today_start}
-                })
-                
-                if not already_sent:
-                    logger.info("Running scheduled analytics report...")
-                    result = await reports_service.run_scheduled_report()
-                    logger.info(f"Scheduled report result: {result}")
-            
-            # Check every 5 minutes
-            await asyncio.sleep(5 * 60)
-            
-        except Exception as e:
-            logger.error(f"Error in scheduled reports task: {e}")
-            await asyncio.sleep(60)  # Wait a minute on error
+    # Get report settings
+    settings = await reports_service.get_report_settings()
+    if not settings.get("enabled", True):
+        return {"sent": False, "reason": "disabled"}
+    
+    frequency = settings.get("frequency", "weekly")
+    target_day = settings.get("day_of_week", 1)  # Monday
+    target_hour = settings.get("hour", 9)  # 9 AM UTC
+    
+    now = datetime.now(timezone.utc)
+    
+    # Due any time during the target hour; report_history keeps it to one a day
+    should_send = False
+    
+    if frequency == "daily":
+        # Send at target hour every day
+        should_send = now.hour == target_hour
+    elif frequency == "weekly":
+        # Send at target hour on target day
+        should_send = now.weekday() == target_day and now.hour == target_hour
+    elif frequency == "monthly":
+        # Send at target hour on the 1st of each month
+        should_send = now.day == 1 and now.hour == target_hour
+    
+    if not should_send:
+        return {"sent": False, "reason": "not due"}
+    
+    # Check if we already sent today
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    already_sent = await db.report_history.find_one({
+        "type": "weekly_analytics",
+        "created_at": {"$gte": today_start}
+    })
+    if already_sent:
+        return {"sent": False, "reason": "already sent today"}
+    
+    logger.info("Running scheduled analytics report...")
+    result = await reports_service.run_scheduled_report()
+    logger.info(f"Scheduled report result: {result}")
+    return {"sent": True, "result": result}
+
+if SCHEDULED_REPORTS_AVAILABLE:
+    scheduler.register("scheduled_reports", scheduled_reports_task, IntervalTrigger(5 * 60), jitter=30)
 
 
 # =============================================================================
 # SELLER ANALYTICS CRON JOBS
 # =============================================================================
 
+async def seller_analytics_enabled() -> bool:
+    """The analytics cron jobs below do nothing while seller analytics is switched off"""
+    settings = await db.admin_settings.find_one({"id": "seller_analytics"})
+    return not settings or settings.get("seller_analytics_enabled", True)
+
+
 async def spike_detection_cron_task():
     """
-    Background task to detect engagement spikes every 30 minutes.
+    Detect engagement spikes (every 30 minutes).
     Notifies sellers when their listings see unusual traffic increases.
     """
-    logger.info("Spike detection cron job started")
+    if not await seller_analytics_enabled():
+        return {"skipped": "seller analytics disabled"}
     
-    while True:
-        try:
-            # Wait 30 minutes between checks
-            await asyncio.sleep(30 * 60)
-            
-            logger.info("Running spike detection check...")
-            now = datetime.now(timezone.utc)
-            lookback_hours = 24
-            comparison_hours = 168  # Previous week
-            
-            lookback_start = (now - timedelta(hours=lookback_hours)).isoformat()
-            comparison_start = (now - timedelta(hours=comparison_hours)).isoformat()
-            comparison_end = lookback_start
-            
-            # Get all active listings
-            active_listings = await db.listings.find(
-                {"status": "active"},
-                {"id": 1, "user_id": 1, "title": 1}
-            ).to_list(10000)
-            
-            spikes_detected = 0
-            notifications_sent = 0
+    logger.info("Running spike detection check...")
+    now = datetime.now(timezone.utc)
+    lookback_hours = 24
+    comparison_hours = 168  # Previous week
+    
+    lookback_start = (now - timedelta(hours=lookback_hours)).isoformat()
+    comparison_start = (now - timedelta(hours=comparison_hours)).isoformat()
+    comparison_end = lookback_start
+    
+    # Get all active listings
+    active_listings = await db.listings.find(
+        {"status": "active"},
+        {"id": 1, "user_id": 1, "title": 1}
+    ).to_list(10000)
+    
+    spikes_detected = 0
+    notifications_sent = 0
+    
+    for listing in active_listings[:500]:  # Process up to 500 per run
+        listing_id = listing["id"]
+        
+        # Recent period views
+        recent_views = await db.analytics_events.count_documents({
+            "listing_id": listing_id,
+            "event_type": "view",
+            "timestamp": {"$gte": lookback_start}
+        })
+        
+        # Skip if too few views
+        if recent_views < 10:
+            continue
+        
+        # Comparison period views
+        comparison_views = await db.analytics_events.count_documents({
+            "listing_id": listing_id,
+            "event_type": "view",
+            "timestamp": {"$gte": comparison_start, "$lt": comparison_end}
+        })
+        
+        # Normalize to same duration
+        normalized_comparison = comparison_views * (lookback_hours / comparison_hours)
+        
+        # Check for spike (50% or more increase)
+        if normalized_comparison > 0:
+            increase_percent = (recent_views - normalized_comparison) / normalized_comparison * 100
             
-            for listing in active_listings[:500]:  # Process up to 500 per run
-                listing_id = listing["id"]
+            if increase_percent >= 50:
+                spikes_detected += 1
                 
-                # Recent period views
-                recent_views = await db.analytics_events.count_documents({
+                # Check if we already notified about this spike recently
+                recent_notification = await db.engagement_notifications.find_one({
                     "listing_id": listing_id,
-                    "event_type": "view",
-                    "timestamp": {"$gte": lookback_start}
+                    "type": "spike",
+                    "detected_at": {"$gte": (now - timedelta(hours=24)).isoformat()}
                 })
                 
-                # Skip if too few views
-                if recent_views < 10:
-                    continue
-                
-                # Comparison period views
-                comparison_views = await db.analytics_events.count_documents({
-                    "listing_id": listing_id,
-                    "event_type": "view",
-                    "timestamp": {"$gte": comparison_start, "$lt": comparison_end}
-                })
-                
-                # Normalize to same duration
-                normalized_comparison = comparison_views * (lookback_hours / comparison_hours)
-                
-                # Check for spike (50% or more increase)
-                if normalized_comparison > 0:
-                    increase_percent = (recent_views - normalized_comparison) / normalized_comparison * 100
+                if not recent_notification:
+                    # Create spike notification
+                    notification = {
+                        "id": f"spike_{uuid.uuid4().hex[:12]}",
+                        "type": "spike",
+                        "listing_id": listing_id,
+                        "listing_title": listing.get("title", ""),
+                        "user_id": listing.get("user_id"),
+                        "recent_views": recent_views,
+                        "baseline_views": round(normalized_comparison, 1),
+                        "increase_percent": round(increase_percent, 1),
+                        "detected_at": now.isoformat(),
+                        "notification_sent": True
+                    }
                     
-                    if increase_percent >= 50:
-                        spikes_detected += 1
-                        
-                        # Check if we already notified about this spike recently
-                        recent_notification = await db.engagement_notifications.find_one({
-                            "listing_id": listing_id,
-                            "type": "spike",
-                            "detected_at": {"$gte": (now - timedelta(hours=24)).isoformat()}
-                        })
-                        
-                        if not recent_notification:
-                            # Create spike notification
-                            notification = {
-                                "id": f"spike_{uuid.uuid4().hex[:12]}",
-                                "type": "spike",
+                    await db.engagement_notifications.insert_one(notification)
+                    
+                    # Check user settings before sending push notification
+                    user_settings = await db.seller_analytics_settings.find_one({
+                        "user_id": listing.get("user_id")
+                    })
+                    
+                    if not user_settings or user_settings.get("badge_notifications_enabled", True):
+                        # Create user notification
+                        user_notif = {
+                            "id": f"notif_{uuid.uuid4().hex[:12]}",
+                            "type": "engagement_spike",
+                            "user_id": listing.get("user_id"),
+                            "title": "Traffic Spike Detected!",
+                            "message": f"Your listing '{listing.get('title', '')[:30]}...' is getting {round(increase_percent)}% more views than usual!",
+                            "data": {
                                 "listing_id": listing_id,
-                                "listing_title": listing.get("title", ""),
-                                "user_id": listing.get("user_id"),
-                                "recent_views": recent_views,
-                                "baseline_views": round(normalized_comparison, 1),
-                                "increase_percent": round(increase_percent, 1),
-                                "detected_at": now.isoformat(),
-                                "notification_sent": True
-                            }
-                            
-                            await db.engagement_notifications.insert_one(notification)
-                            
-                            # Check user settings before sending push notification
-                            user_settings = await db.seller_analytics_settings.find_one({
-                                "user_id": listing.get("user_id")
-                            })
-                            
-                            if not user_settings or user_settings.get("badge_notifications_enabled", True):
-                                # Create user notification
-                                user_notif = {
-                                    "id": f"notif_{uuid.uuid4().hex[:12]}",
-                                    "type": "engagement_spike",
-                                    "user_id": listing.get("user_id"),
-                                    "title": "Traffic Spike Detected!",
-                                    "message": f"Your listing '{listing.get('title', '')[:30]}...' is getting {round(increase_percent)}% more views than usual!",
-                                    "data": {
-                                        "listing_id": listing_id,
-                                        "increase_percent": round(increase_percent, 1)
-                                    },
-                                    "created_at": now.isoformat(),
-                                    "read": False
-                                }
-                                await db.notifications.insert_one(user_notif)
-                                notifications_sent += 1
-            
-            if spikes_detected > 0:
-                logger.info(f"Spike detection: {spikes_detected} spikes found, {notifications_sent} notifications sent")
-            
-        except Exception as e:
-            logger.error(f"Error in spike detection cron: {e}")
-            await asyncio.sleep(60)  # Wait a minute on error
+                                "increase_percent": round(increase_percent, 1)
+                            },
+                            "created_at": now.isoformat(),
+                            "read": False
+                        }
+                        await db.notifications.insert_one(user_notif)
+                        notifications_sent += 1
+    
+    if spikes_detected > 0:
+        logger.info(f"Spike detection: {spikes_detected} spikes found, {notifications_sent} notifications sent")
+    return {"spikes_detected": spikes_detected, "notifications_sent": notifications_sent}
 
 
 async def daily_badge_evaluation_task():
     """
-    Background task to evaluate and award badges daily.
-    Runs at 2 AM UTC to process seller achievements.
+    Evaluate and award badges (daily at 2 AM UTC).
+    Processes seller achievements.
     """
-    logger.info("Daily badge evaluation task started")
+    if not await seller_analytics_enabled():
+        return {"skipped": "seller analytics disabled"}
     
-    while True:
+    now = datetime.now(timezone.utc)
+    
+    logger.info("Running daily badge evaluation...")
+    
+    # Get all active sellers
+    sellers = await db.users.find(
+        {"role": {"$in": ["seller", "user"]}},
+        {"user_id": 1, "email": 1, "name": 1}
+    ).to_list(10000)
+    
+    badges_awarded = 0
+    
+    for seller in sellers:
+        user_id = seller["user_id"]
+        
         try:
-            now = datetime.now(timezone.utc)
+            # Get seller's listings
+            listings = await db.listings.find(
+                {"user_id": user_id},
+                {"id": 1, "status": 1, "created_at": 1}
+            ).to_list(1000)
             
-            # Calculate time until next 2 AM UTC
-            target_hour = 2
-            if now.hour >= target_hour:
-                # Schedule for tomorrow
-                next_run = now.replace(hour=target_hour, minute=0, second=0, microsecond=0) + timedelta(days=1)
-            else:
-                # Schedule for today
-                next_run = now.replace(hour=target_hour, minute=0, second=0, microsecond=0)
+            listing_ids = [l["id"] for l in listings]
             
-            sleep_seconds = (next_run - now).total_seconds()
-            logger.info(f"Next badge evaluation scheduled in {sleep_seconds/3600:.1f} hours")
-            await asyncio.sleep(sleep_seconds)
+            # Calculate metrics for the last 30 days
+            thirty_days_ago = (now - timedelta(days=30)).isoformat()
             
-            logger.info("Running daily badge evaluation...")
+            # Total views
+            total_views = await db.analytics_events.count_documents({
+                "listing_id": {"$in": listing_ids},
+                "event_type": "view",
+                "timestamp": {"$gte": thirty_days_ago}
+            })
             
-            # Get all active sellers
-            sellers = await db.users.find(
-                {"role": {"$in": ["seller", "user"]}},
-                {"user_id": 1, "email": 1, "name": 1}
-            ).to_list(10000)
+            # Total sales
+            total_sales = await db.analytics_events.count_documents({
+                "listing_id": {"$in": listing_ids},
+                "event_type": "purchase",
+                "timestamp": {"$gte": thirty_days_ago}
+            })
             
-            badges_awarded = 0
+            # Check for badge achievements
+            badges_to_award = []
             
-            for seller in sellers:
-                user_id = seller["user_id"]
-                
-                try:
-                    # Get seller's listings
-                    listings = await db.listings.find(
-                        {"user_id": user_id},
-                        {"id": 1, "status": 1, "created_at": 1}
-                    ).to_list(1000)
-                    
-                    listing_ids = [l["id"] for l in listings]
-                    
-                    # Calculate metrics for the last 30 days
-                    thirty_days_ago = (now - timedelta(days=30)).isoformat()
-                    
-                    # Total views
-                    total_views = await db.analytics_events.count_documents({
-                        "listing_id": {"$in": listing_ids},
-                        "event_type": "view",
-                        "timestamp": {"$gte": thirty_days_ago}
+            # First listing badge
+            if len(listings) >= 1:
+                existing = await db.user_badges.find_one({
+                    "user_id": user_id,
+                    "badge_id": "first_listing"
+                })
+                if not existing:
+                    badges_to_award.append({
+                        "badge_id": "first_listing",
+                        "name": "First Steps",
+                        "description": "Created your first listing"
                     })
-                    
-                    # Total sales
-                    total_sales = await db.analytics_events.count_documents({
-                        "listing_id": {"$in": listing_ids},
-                        "event_type": "purchase",
-                        "timestamp": {"$gte": thirty_days_ago}
+            
+            # 10 listings badge
+            if len(listings) >= 10:
+                existing = await db.user_badges.find_one({
+                    "user_id": user_id,
+                    "badge_id": "ten_listings"
+                })
+                if not existing:
+                    badges_to_award.append({
+                        "badge_id": "ten_listings",
+                        "name": "Active Seller",
+                        "description": "Created 10 listings"
                     })
-                    
-                    # Check for badge achievements
-                    badges_to_award = []
-                    
-                    # First listing badge
-                    if len(listings) >= 1:
-                        existing = await db.user_badges.find_one({
-                            "user_id": user_id,
-                            "badge_id": "first_listing"
-                        })
-                        if not existing:
-                            badges_to_award.append({
-                                "badge_id": "first_listing",
-                                "name": "First Steps",
-                                "description": "Created your first listing"
-                            })
-                    
-                    # 10 listings badge
-                    if len(listings) >= 10:
-                        existing = await db.user_badges.find_one({
-                            "user_id": user_id,
-                            "badge_id": "ten_listings"
-                        })
-                        if not existing:
-                            badges_to_award.append({
-                                "badge_id": "ten_listings",
-                                "name": "Active Seller",
-                                "description": "Created 10 listings"
-                            })
-                    
-                    # 100 views badge
-                    if total_views >= 100:
-                        existing = await db.user_badges.find_one({
-                            "user_id": user_id,
-                            "badge_id": "hundred_views"
-                        })
-                        if not existing:
-                            badges_to_award.append({
-                                "badge_id": "hundred_views",
-                                "name": "Getting Noticed",
-                                "description": "Received 100 listing views"
-                            })
-                    
-                    # 1000 views badge
-                    if total_views >= 1000:
-                        existing = await db.user_badges.find_one({
-                            "user_id": user_id,
-                            "badge_id": "thousand_views"
-                        })
-                        if not existing:
-                            badges_to_award.append({
-                                "badge_id": "thousand_views",
-                                "name": "Popular Seller",
-                                "description": "Received 1,000 listing views"
-                            })
-                    
-                    # First sale badge
-                    if total_sales >= 1:
-                        existing = await db.user_badges.find_one({
-                            "user_id": user_id,
-                            "badge_id": "first_sale"
-                        })
-                        if not existing:
-                            badges_to_award.append({
-                                "badge_id": "first_sale",
-                                "name": "First Sale",
-                                "description": "Completed your first sale"
-                            })
-                    
-                    # Award badges
-                    for badge in badges_to_award:
-                        badge_doc = {
-                            "id": f"ub_{uuid.uuid4().hex[:12]}",
-                            "user_id": user_id,
-                            "badge_id": badge["badge_id"],
-                            "badge_name": badge["name"],
-                            "awarded_at": now.isoformat(),
-                            "source": "daily_evaluation"
-                        }
-                        await db.user_badges.insert_one(badge_doc)
-                        badges_awarded += 1
-                        
-                        # Check user settings before sending notification
-                        user_settings = await db.seller_analytics_settings.find_one({
-                            "user_id": user_id
-                        })
-                        
-                        if not user_settings or user_settings.get("badge_notifications_enabled", True):
-                            # Send notification
-                            notif = {
-                                "id": f"notif_{uuid.uuid4().hex[:12]}",
-                                "type": "badge_unlock",
-                                "user_id": user_id,
-                                "title": "Badge Unlocked!",
-                                "message": f"You've earned the '{badge['name']}' badge! {badge['description']}",
-                                "data": {"badge_id": badge["badge_id"]},
-                                "created_at": now.isoformat(),
-                                "read": False
-                            }
-                            await db.notifications.insert_one(notif)
-                
-                except Exception as e:
-                    logger.warning(f"Error evaluating badges for user {user_id}: {e}")
-                    continue
             
-            logger.info(f"Daily badge evaluation complete: {badges_awarded} badges awarded to {len(sellers)} sellers")
+            # 100 views badge
+            if total_views >= 100:
+                existing = await db.user_badges.find_one({
+                    "user_id": user_id,
+                    "badge_id": "hundred_views"
+                })
+                if not existing:
+                    badges_to_award.append({
+                        "badge_id": "hundred_views",
+                        "name": "Getting Noticed",
+                        "description": "Received 100 listing views"
+                    })
             
-            # Record evaluation run
-            await db.cron_history.insert_one({
-                "task": "daily_badge_evaluation",
-                "run_at": now.isoformat(),
-                "sellers_processed": len(sellers),
-                "badges_awarded": badges_awarded
-            })
+            # 1000 views badge
+            if total_views >= 1000:
+                existing = await db.user_badges.find_one({
+                    "user_id": user_id,
+                    "badge_id": "thousand_views"
+                })
+                if not existing:
+                    badges_to_award.append({
+                        "badge_id": "thousand_views",
+                        "name": "Popular Seller",
+                        "description": "Received 1,000 listing views"
+                    })
+            
+            # First sale badge
+            if total_sales >= 1:
+                existing = await db.user_badges.find_one({
+                    "user_id": user_id,
+                    "badge_id": "first_sale"
+                })
+                if not existing:
+                    badges_to_award.append({
+                        "badge_id": "first_sale",
+                        "name": "First Sale",
+                        "description": "Completed your first sale"
+                    })
             
+            # Award badges
+            for badge in badges_to_award:
+                badge_doc = {
+                    "id": f"ub_{uuid.uuid4().hex[:12]}",
+                    "user_id": user_id,
+                    "badge_id": badge["badge_id"],
+                    "badge_name": badge["name"],
+                    "awarded_at": now.isoformat(),
+                    "source": "daily_evaluation"
+                }
+                await db.user_badges.insert_one(badge_doc)
+                await get_badge_leaderboard(db).record_award(user_id)
+                badges_awarded += 1
+                
+                # Check user settings before sending notification
+                user_settings = await db.seller_analytics_settings.find_one({
+                    "user_id": user_id
+                })
+                
+                if not user_settings or user_settings.get("badge_notifications_enabled", True):
+                    # Send notification
+                    notif = {
+                        "id": f"notif_{uuid.uuid4().hex[:12]}",
+                        "type": "badge_unlock",
+                        "user_id": user_id,
+                        "title": "Badge Unlocked!",
+                        "message": f"You've earned the '{badge['name']}' badge! {badge['description']}",
+                        "data": {"badge_id": badge["badge_id"]},
+                        "created_at": now.isoformat(),
+                        "read": False
+                    }
+                    await db.notifications.insert_one(notif)
+        
         except Exception as e:
-            logger.error(f"Error in daily badge evaluation: {e}")
-            await asyncio.sleep(60 * 60)  # Wait an hour on error
+            logger.warning(f"Error evaluating badges for user {user_id}: {e}")
+            continue
+    
+    logger.info(f"Daily badge evaluation complete: {badges_awarded} badges awarded to {len(sellers)} sellers")
+    
+    # Record evaluation run
+    await db.cron_history.insert_one({
+        "task": "daily_badge_evaluation",
+        "run_at": now.isoformat(),
+        "sellers_processed": len(sellers),
+        "badges_awarded": badges_awarded
+    })
+    return {"sellers_processed": len(sellers), "badges_awarded": badges_awarded}
 
 
 async def weekly_digest_cron_task():
     """
-    Background task to send weekly digests to sellers.
-    Runs every Monday at 9 AM UTC.
+    Send weekly digests to sellers (Mondays at 9 AM UTC).
     """
-    logger.info("Weekly digest cron job started")
+    if not await seller_analytics_enabled():
+        return {"skipped": "seller analytics disabled"}
+    
+    logger.info("Running weekly digest distribution...")
+    
+    # Import notification service
+    try:
+        from services.analytics_notification_service import AnalyticsNotificationService
+        from utils.email_service import email_service
+        service = AnalyticsNotificationService(db, email_service=email_service)
+    except Exception as e:
+        logger.error(f"Failed to initialize notification service: {e}")
+        raise
     
-    while True:
+    # Get all sellers with weekly digest enabled
+    sellers = await db.users.find(
+        {"role": {"$in": ["seller", "user"]}},
+        {"user_id": 1, "email": 1}
+    ).to_list(10000)
+    
+    digests_sent = 0
+    digests_skipped = 0
+    
+    for seller in sellers:
         try:
-            now = datetime.now(timezone.utc)
-            
-            # Calculate time until next Monday 9 AM UTC
-            days_until_monday = (7 - now.weekday()) % 7
-            if days_until_monday == 0 and now.hour >= 9:
-                days_until_monday = 7  # Already past Monday 9 AM, schedule for next week
-            
-            next_run = (now + timedelta(days=days_until_monday)).replace(
-                hour=9, minute=0, second=0, microsecond=0
-            )
-            
-            sleep_seconds = (next_run - now).total_seconds()
-            logger.info(f"Next weekly digest scheduled in {sleep_seconds/3600:.1f} hours ({next_run.strftime('%A %H:%M UTC')})")
-            await asyncio.sleep(sleep_seconds)
-            
-            logger.info("Running weekly digest distribution...")
-            
-            # Import notification service
-            try:
-                from services.analytics_notification_service import AnalyticsNotificationService
-                from utils.email_service import email_service
-                service = AnalyticsNotificationService(db, email_service=email_service)
-            except Exception as e:
-                logger.error(f"Failed to initialize notification service: {e}")
-                await asyncio.sleep(60 * 60)
-                continue
-            
-            # Get all sellers with weekly digest enabled
-            sellers = await db.users.find(
-                {"role": {"$in": ["seller", "user"]}},
-                {"user_id": 1, "email": 1}
-            ).to_list(10000)
-            
-            digests_sent = 0
-            digests_skipped = 0
-            
-            for seller in sellers:
-                try:
-                    result = await service.send_weekly_digest(seller["user_id"])
-                    if result.get("success"):
-                        digests_sent += 1
-                    else:
-                        digests_skipped += 1
-                except Exception as e:
-                    logger.warning(f"Error sending digest to {seller['user_id']}: {e}")
-                    digests_skipped += 1
-                
-                # Rate limit to avoid overwhelming email service
-                await asyncio.sleep(0.5)
-            
-            logger.info(f"Weekly digest complete: {digests_sent} sent, {digests_skipped} skipped")
-            
-            # Record run
-            await db.cron_history.insert_one({
-                "task": "weekly_digest",
-                "run_at": datetime.now(timezone.utc).isoformat(),
-                "sellers_processed": len(sellers),
-                "digests_sent": digests_sent,
-                "digests_skipped": digests_skipped
-            })
-            
+            result = await service.send_weekly_digest(seller["user_id"])
+            if result.get("success"):
+                digests_sent += 1
+            else:
+                digests_skipped += 1
         except Exception as e:
-            logger.error(f"Error in weekly digest cron: {e}")
-            await asyncio.sleep(60 * 60)  # Wait an hour on error
+            logger.warning(f"Error sending digest to {seller['user_id']}: {e}")
+            digests_skipped += 1
+        
+        # Rate limit to avoid overwhelming email service
+        await asyncio.sleep(0.5)
+    
+    logger.info(f"Weekly digest complete: {digests_sent} sent, {digests_skipped} skipped")
+    
+    # Record run
+    await db.cron_history.insert_one({
+        "task": "weekly_digest",
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "sellers_processed": len(sellers),
+        "digests_sent": digests_sent,
+        "digests_skipped": digests_skipped
+    })
+    return {"sellers_processed": len(sellers), "digests_sent": digests_sent, "digests_skipped": digests_skipped}
 
 
 async def sms_spike_alerts_cron_task():
     """
-    Background task to send SMS alerts for high-value spikes.
-    Runs every hour to check for new significant spikes.
+    Send SMS alerts for high-value spikes (hourly).
     """
-    logger.info("SMS spike alerts cron job started")
-    
-    while True:
-        try:
-            # Wait 1 hour between checks
-            await asyncio.sleep(60 * 60)
-            
-            logger.info("Checking for high-value spikes to send SMS alerts...")
-            
-            # Import notification service
-            try:
-                from services.analytics_notification_service import AnalyticsNotificationService
-                from sms_service import SMSService
-                sms_service = SMSService(db)
-                service = AnalyticsNotificationService(db, sms_service=sms_service)
-            except Exception as e:
-                logger.warning(f"SMS service not available: {e}")
-                continue
-            
-            result = await service.check_and_send_spike_alerts()
-            
-            if result.get("alerts_sent", 0) > 0:
-                logger.info(f"SMS alerts: {result['alerts_sent']} sent, {result['alerts_skipped']} skipped")
-                
-                # Record run
-                await db.cron_history.insert_one({
-                    "task": "sms_spike_alerts",
-                    "run_at": datetime.now(timezone.utc).isoformat(),
-                    "spikes_checked": result.get("spikes_checked", 0),
-                    "alerts_sent": result.get("alerts_sent", 0),
-                    "alerts_skipped": result.get("alerts_skipped", 0)
-                })
-            
-        except Exception as e:
-            logger.error(f"Error in SMS spike alerts cron: {e}")
-            await asyncio.sleep(60 * 10)  # Wait 10 minutes on error
-
-
-@app.on_event("startup")
-async def start_analytics_cron_jobs():
-    """Start analytics background cron jobs"""
-    logger.info("Starting analytics cron jobs...")
-    
-    # Check if seller analytics is enabled
-    settings = await db.admin_settings.find_one({"id": "seller_analytics"})
-    if settings and not settings.get("seller_analytics_enabled", True):
-        logger.info("Seller analytics disabled, skipping cron jobs")
-        return
+    if not await seller_analytics_enabled():
+        return {"skipped": "seller analytics disabled"}
     
-    # Start spike detection (every 30 minutes)
-    asyncio.create_task(spike_detection_cron_task())
-    logger.info("Spike detection cron job scheduled (every 30 min)")
+    logger.info("Checking for high-value spikes to send SMS alerts...")
     
-    # Start daily badge evaluation (at 2 AM UTC)
-    asyncio.create_task(daily_badge_evaluation_task())
-    logger.info("Daily badge evaluation scheduled (2 AM UTC)")
+    # Import notification service
+    try:
+        from services.analytics_notification_service import AnalyticsNotificationService
+        from sms_service import SMSService
+        sms_service = SMSService(db)
+        service = AnalyticsNotificationService(db, sms_service=sms_service)
+    except Exception as e:
+        logger.warning(f"SMS service not available: {e}")
+        return {"skipped": f"SMS service not available: {e}"}
     
-    # Start weekly digest (Monday 9 AM UTC)
-    asyncio.create_task(weekly_digest_cron_task())
-    logger.info("Weekly digest scheduled (Monday 9 AM UTC)")
+    result = await service.check_and_send_spike_alerts()
     
-    # Start SMS spike alerts (hourly)
-    asyncio.create_task(sms_spike_alerts_cron_task())
-    logger.info("SMS spike alerts scheduled (hourly)")
+    if result.get("alerts_sent", 0) > 0:
+        logger.info(f"SMS alerts: {result['alerts_sent']} sent, {result['alerts_skipped']} skipped")
+        
+        # Record run
+        await db.cron_history.insert_one({
+            "task": "sms_spike_alerts",
+            "run_at": datetime.now(timezone.utc).isoformat(),
+            "spikes_checked": result.get("spikes_checked", 0),
+            "alerts_sent": result.get("alerts_sent", 0),
+            "alerts_skipped": result.get("alerts_skipped", 0)
+        })
+    return result
+
+
+scheduler.register("spike_detection", spike_detection_cron_task,
+                   IntervalTrigger(30 * 60, initial_delay=30 * 60), jitter=60)
+scheduler.register("daily_badge_evaluation", daily_badge_evaluation_task, CronTrigger("0 2 * * *"))
+scheduler.register("weekly_digest", weekly_digest_cron_task, CronTrigger("0 9 * * 1"))
+scheduler.register("sms_spike_alerts", sms_spike_alerts_cron_task,
+                   IntervalTrigger(60 * 60, initial_delay=60 * 60), jitter=120)
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    get_feed_snapshots(db).stop()
+    cohort_activity.stop()
+    feature_flags.stop()
+    await event_bus.stop()
+    await analytics_ingestor.stop()
+    await last_seen_tracker.stop()
+    await scheduler.stop()
+    await presence.stop()
+    await stats_subscribers.stop()
+    await http_pool.aclose()
+    cpu_pool.stop()
     client.close()
 
 # For Socket.IO, we need to use the socket_app
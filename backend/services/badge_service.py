@@ -8,6 +8,8 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict, Any
 import uuid
 
+from utils.leaderboard import get_badge_leaderboard
+
 logger = logging.getLogger("badge_service")
 
 # Predefined badge definitions with auto-award criteria
@@ -302,10 +304,12 @@ class BadgeAwardingService:
                 "awarded_at": datetime.now(timezone.utc),
                 "awarded_by": "system",
                 "reason": reason,
-                "auto_awarded": True
+                "auto_awarded": True,
+                "points_value": badge.get("points_value", 0)
             }
             
             await self.db.user_badges.insert_one(user_badge)
+            await get_badge_leaderboard(self.db).record_award(user_id, badge.get("points_value", 0))
             
             # Create notification for user
             notification = {
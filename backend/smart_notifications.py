@@ -18,11 +18,12 @@ import logging
 import uuid
 import asyncio
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, AsyncIterable, Set
 from enum import Enum
 from pydantic import BaseModel, Field
 import hashlib
 import json
+from collections import defaultdict
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -1463,6 +1464,12 @@ EMAIL_TEMPLATES = {
 # SMART NOTIFICATION SERVICE
 # =============================================================================
 
+# Recipients resolved per batch when fanning one notification out to an audience
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.environ.get("NOTIFICATION_FANOUT_CHUNK_SIZE", "500"))
+# Concurrent AI personalization calls per chunk (only used when AI personalization is on)
+NOTIFICATION_FANOUT_PERSONALIZE_CONCURRENCY = int(os.environ.get("NOTIFICATION_FANOUT_PERSONALIZE_CONCURRENCY", "10"))
+
+
 class SmartNotificationService:
     """
     Main service for smart notifications.
@@ -1625,26 +1632,14 @@ class SmartNotificationService:
     async def check_new_listing_triggers(self, listing: Dict):
         """
         Check if a new listing should trigger notifications.
-        Called when a new listing is created.
+        Called when a new listing is created. Every interested user is
+        considered; the audience is streamed and queued in chunks.
         """
         try:
             category_id = listing.get("category_id")
             if not category_id:
                 return
             
-            # Find users interested in this category
-            interested_users = await self.db.user_interest_profiles.find({
-                f"category_interests.{category_id}": {"$gte": 20}  # Minimum interest score
-            }, {"user_id": 1}).to_list(1000)
-            
-            if not interested_users:
-                return
-            
-            user_ids = [u["user_id"] for u in interested_users]
-            
-            # Exclude the listing owner
-            user_ids = [uid for uid in user_ids if uid != listing.get("user_id")]
-            
             # Get trigger config
             trigger = await self.db.notification_triggers.find_one({
                 "trigger_type": TriggerType.NEW_LISTING_IN_CATEGORY,
@@ -1668,24 +1663,29 @@ class SmartNotificationService:
             category = await self.db.categories.find_one({"id": category_id})
             category_name = category.get("name", "Items") if category else "Items"
             
-            # Queue notifications for each user
-            for user_id in user_ids[:100]:  # Limit to 100 users per listing
-                await self._queue_notification(
-                    user_id=user_id,
-                    trigger=trigger,
-                    variables={
-                        "category_name": category_name,
-                        "listing_title": listing.get("title", ""),
-                        "price": listing.get("price", 0),
-                        "currency": "€",
-                        "location": listing.get("location", ""),
-                        "listing_image": listing.get("images", [None])[0]
-                    },
-                    deep_link=f"/listing/{listing.get('id')}",
-                    metadata={"listing_id": listing.get("id"), "category_id": category_id}
-                )
+            # Users interested in this category, excluding the listing owner
+            cursor = self.db.user_interest_profiles.find({
+                f"category_interests.{category_id}": {"$gte": 20},  # Minimum interest score
+                "user_id": {"$ne": listing.get("user_id")}
+            }, {"_id": 0, "user_id": 1}).batch_size(NOTIFICATION_FANOUT_CHUNK_SIZE)
+            
+            stats = await self.fan_out_notification(
+                recipients=(doc["user_id"] async for doc in cursor),
+                trigger=trigger,
+                variables={
+                    "category_name": category_name,
+                    "listing_title": listing.get("title", ""),
+                    "price": listing.get("price", 0),
+                    "currency": "€",
+                    "location": listing.get("location", ""),
+                    "listing_image": (listing.get("images") or [None])[0]
+                },
+                deep_link=f"/listing/{listing.get('id')}",
+                metadata={"listing_id": listing.get("id"), "category_id": category_id}
+            )
             
-            logger.info(f"Queued new listing notifications for {len(user_ids)} users")
+            if stats.get("audience"):
+                logger.info(f"New listing {listing.get('id')} fan-out: {stats}")
             
         except Exception as e:
             logger.error(f"Error checking new listing triggers: {e}")
@@ -1874,15 +1874,7 @@ class SmartNotificationService:
                 logger.warning(f"AI personalization failed, using template content: {e}")
             
             # Determine channels based on user preferences
-            channels = []
-            requested_channels = trigger.get("channels", ["push", "in_app"])
-            
-            if "push" in requested_channels and consent.get("push_enabled", True):
-                channels.append("push")
-            if "email" in requested_channels and consent.get("email_enabled", True):
-                channels.append("email")
-            if "in_app" in requested_channels and consent.get("in_app_enabled", True):
-                channels.append("in_app")
+            channels = self._select_channels(trigger, consent)
             
             if not channels:
                 logger.info(f"No enabled channels for user {user_id}")
@@ -1915,6 +1907,19 @@ class SmartNotificationService:
         except Exception as e:
             logger.error(f"Error queueing notification: {e}")
     
+    def _select_channels(self, trigger: Dict, consent: Dict) -> List[str]:
+        """Channels requested by the trigger that the user has enabled"""
+        channels = []
+        requested_channels = trigger.get("channels", ["push", "in_app"])
+        
+        if "push" in requested_channels and consent.get("push_enabled", True):
+            channels.append("push")
+        if "email" in requested_channels and consent.get("email_enabled", True):
+            channels.append("email")
+        if "in_app" in requested_channels and consent.get("in_app_enabled", True):
+            channels.append("in_app")
+        return channels
+    
     async def _get_user_consent(self, user_id: str) -> Optional[Dict]:
         """Get user's notification consent preferences"""
         return await self.db.user_notification_consent.find_one({"user_id": user_id}, {"_id": 0})
@@ -1976,6 +1981,250 @@ class SmartNotificationService:
             result = result.replace(f"{{{{{key}}}}}", str(value) if value is not None else "")
         return result
     
+    # =========================================================================
+    # BATCHED FAN-OUT
+    # =========================================================================
+    
+    async def fan_out_notification(
+        self,
+        recipients: AsyncIterable[str],
+        trigger: Dict,
+        variables: Dict[str, Any],
+        deep_link: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        chunk_size: int = NOTIFICATION_FANOUT_CHUNK_SIZE
+    ) -> Dict[str, int]:
+        """
+        Queue the same notification for every user yielded by `recipients`.
+        
+        Same rules as _queue_notification (consent, throttle, dedup, channels),
+        but resolved per chunk: consent, throttle state, dedup keys and user
+        info are each read with one $in query and the chunk is written with
+        one insert_many, so the cost per listing grows with the number of
+        chunks rather than the number of users.
+        
+        Returns counters: audience, queued, opted_out, no_channels,
+        throttled, duplicate, failed.
+        """
+        stats: Dict[str, int] = defaultdict(int)
+        personalize = await self._personalization_active()
+        chunk: List[str] = []
+        
+        async for user_id in recipients:
+            chunk.append(user_id)
+            if len(chunk) >= chunk_size:
+                await self._queue_notification_chunk(chunk, trigger, variables, deep_link, metadata, personalize, stats)
+                chunk = []
+        if chunk:
+            await self._queue_notification_chunk(chunk, trigger, variables, deep_link, metadata, personalize, stats)
+        
+        return dict(stats)
+    
+    async def _personalization_active(self) -> bool:
+        """Whether AI personalization would change content (checked once per fan-out)"""
+        if not AI_PERSONALIZATION_ENABLED:
+            return False
+        config = await self.ai_personalization.get_config()
+        return bool(config.get("enabled", True))
+    
+    async def _queue_notification_chunk(
+        self,
+        user_ids: List[str],
+        trigger: Dict,
+        variables: Dict[str, Any],
+        deep_link: Optional[str],
+        metadata: Optional[Dict[str, Any]],
+        personalize: bool,
+        stats: Dict[str, int]
+    ):
+        """Resolve and queue one chunk of a fan-out"""
+        user_ids = list(dict.fromkeys(user_ids))
+        stats["audience"] += len(user_ids)
+        trigger_type = getattr(trigger.get("trigger_type", ""), "value", trigger.get("trigger_type", ""))
+        
+        try:
+            # Consent and channels
+            consents = await self._get_user_consents(user_ids)
+            default_consent = UserNotificationConsent(user_id="").model_dump()
+            candidates: Dict[str, List[str]] = {}
+            for user_id in user_ids:
+                consent = consents.get(user_id) or default_consent
+                if not consent.get("trigger_preferences", {}).get(trigger_type, True):
+                    stats["opted_out"] += 1
+                    continue
+                channels = self._select_channels(trigger, consent)
+                if not channels:
+                    stats["no_channels"] += 1
+                    continue
+                candidates[user_id] = channels
+            
+            # Throttling
+            if candidates:
+                throttled = await self._throttled_users(list(candidates), trigger)
+                for user_id in throttled:
+                    candidates.pop(user_id, None)
+                stats["throttled"] += len(throttled)
+            
+            # Deduplication
+            dedup_keys = {
+                user_id: self._generate_dedup_key(user_id, trigger_type, metadata)
+                for user_id in candidates
+            }
+            if dedup_keys:
+                existing = await self._existing_dedup_keys(list(dedup_keys.values()))
+                for user_id, key in list(dedup_keys.items()):
+                    if key in existing:
+                        candidates.pop(user_id)
+                        dedup_keys.pop(user_id)
+                        stats["duplicate"] += 1
+            
+            if not candidates:
+                return
+            
+            # User info for personalization
+            users = {}
+            async for user in self.db.users.find(
+                {"user_id": {"$in": list(candidates)}},
+                {"_id": 0, "user_id": 1, "name": 1, "preferred_language": 1}
+            ):
+                users[user["user_id"]] = user
+            
+            base_url = os.environ.get("APP_BASE_URL", "https://marketplace.example.com")
+            action_url = f"{base_url}{deep_link}" if deep_link else base_url
+            
+            contents = await self._render_chunk_contents(
+                list(candidates), users, trigger, trigger_type, variables, metadata, personalize
+            )
+            
+            notifications = [
+                SmartNotification(
+                    user_id=user_id,
+                    trigger_id=trigger.get("id", ""),
+                    trigger_type=trigger_type,
+                    title=contents[user_id]["title"],
+                    body=contents[user_id]["body"],
+                    deep_link=deep_link,
+                    action_url=action_url,
+                    image_url=variables.get("listing_image"),
+                    channels=channels,
+                    priority=trigger.get("priority", 5),
+                    dedup_key=dedup_keys[user_id],
+                    metadata=metadata or {}
+                ).model_dump()
+                for user_id, channels in candidates.items()
+            ]
+            
+            await self.db.smart_notifications.insert_many(notifications, ordered=False)
+            stats["queued"] += len(notifications)
+            
+        except Exception as e:
+            stats["failed"] += len(user_ids)
+            logger.error(f"Error queueing notification chunk of {len(user_ids)} users: {e}")
+    
+    async def _render_chunk_contents(
+        self,
+        user_ids: List[str],
+        users: Dict[str, Dict],
+        trigger: Dict,
+        trigger_type: str,
+        variables: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]],
+        personalize: bool
+    ) -> Dict[str, Dict[str, str]]:
+        """Rendered title/body per user, AI-personalized when enabled"""
+        contents = {}
+        for user_id in user_ids:
+            user = users.get(user_id)
+            user_vars = {**variables, "user_name": user.get("name", "there") if user else "there"}
+            contents[user_id] = {
+                "title": self._render_template(trigger.get("title_template", ""), user_vars),
+                "body": self._render_template(trigger.get("body_template", ""), user_vars),
+            }
+        
+        if not personalize:
+            return contents
+        
+        semaphore = asyncio.Semaphore(NOTIFICATION_FANOUT_PERSONALIZE_CONCURRENCY)
+        
+        async def personalize_one(user_id: str):
+            user = users.get(user_id)
+            async with semaphore:
+                try:
+                    personalized = await self.ai_personalization.personalize_notification(
+                        user_id=user_id,
+                        trigger_type=trigger_type,
+                        base_content=contents[user_id],
+                        context={
+                            "listing_id": metadata.get("listing_id") if metadata else None,
+                            "listing_title": variables.get("listing_title"),
+                            "price": variables.get("price"),
+                            "old_price": variables.get("old_price"),
+                            "category": variables.get("category_name"),
+                            "sender_name": variables.get("sender_name")
+                        },
+                        language=user.get("preferred_language", "en") if user else "en"
+                    )
+                    contents[user_id] = {
+                        "title": personalized.get("title", contents[user_id]["title"]),
+                        "body": personalized.get("body", contents[user_id]["body"]),
+                    }
+                except Exception as e:
+                    logger.warning(f"AI personalization failed, using template content: {e}")
+        
+        await asyncio.gather(*(personalize_one(user_id) for user_id in user_ids))
+        return contents
+    
+    async def _get_user_consents(self, user_ids: List[str]) -> Dict[str, Dict]:
+        """Consent documents for many users, keyed by user_id"""
+        consents = {}
+        async for consent in self.db.user_notification_consent.find(
+            {"user_id": {"$in": user_ids}}, {"_id": 0}
+        ):
+            consents[consent["user_id"]] = consent
+        return consents
+    
+    async def _throttled_users(self, user_ids: List[str], trigger: Dict) -> Set[str]:
+        """Batched _check_throttle: users that are inside min_interval or at max_per_day"""
+        trigger_type = trigger.get("trigger_type", "")
+        min_interval = trigger.get("min_interval_minutes", 60)
+        max_per_day = trigger.get("max_per_day", 10)
+        
+        now = datetime.now(timezone.utc)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        interval_cutoff = (now - timedelta(minutes=min_interval)).isoformat() if min_interval > 0 else None
+        since = min(today_start, interval_cutoff) if interval_cutoff else today_start
+        
+        pipeline = [
+            {"$match": {
+                "user_id": {"$in": user_ids},
+                "trigger_type": trigger_type,
+                "created_at": {"$gte": since}
+            }},
+            {"$group": {
+                "_id": "$user_id",
+                "today": {"$sum": {"$cond": [{"$gte": ["$created_at", today_start]}, 1, 0]}},
+                "last": {"$max": "$created_at"}
+            }}
+        ]
+        throttled = set()
+        async for row in self.db.smart_notifications.aggregate(pipeline):
+            if interval_cutoff and row["last"] >= interval_cutoff:
+                throttled.add(row["_id"])
+            elif row["today"] >= max_per_day:
+                throttled.add(row["_id"])
+        return throttled
+    
+    async def _existing_dedup_keys(self, dedup_keys: List[str]) -> Set[str]:
+        """Batched _is_duplicate: the keys already used within the last 24 hours"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
+        existing = set()
+        async for doc in self.db.smart_notifications.find(
+            {"dedup_key": {"$in": dedup_keys}, "created_at": {"$gte": cutoff}},
+            {"_id": 0, "dedup_key": 1}
+        ):
+            existing.add(doc["dedup_key"])
+        return existing
+    
     # =========================================================================
     # NOTIFICATION DELIVERY
     # =========================================================================
@@ -0,0 +1,66 @@
+"""
+Test Suite for the write-behind analytics ingestion path
+Tests that tracked events are buffered and flushed in batches, and that the
+ingest counters are exposed in /api/perf/stats.
+"""
+
+import time
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+# python-requests is filtered as bot traffic by the tracking endpoint
+BROWSER_HEADERS = {"User-Agent": "Mozilla/5.0 (Linux; Android 14) Mobile"}
+
+
+def ingest_stats():
+    response = requests.get(f"{BASE_URL}/api/perf/stats")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert "analytics_ingest" in data
+    return data["analytics_ingest"]
+
+
+class TestAnalyticsIngestStats:
+    """Tests for analytics_ingest in GET /api/perf/stats"""
+
+    def test_perf_stats_exposes_ingest_counters(self):
+        """GET /api/perf/stats - Includes buffer depth, flush and drop counters"""
+        stats = ingest_stats()
+        for field in ("buffered", "max_buffer", "accepted", "dropped", "flushed", "flushes", "duplicates"):
+            assert field in stats, f"analytics_ingest should have '{field}'"
+        assert stats["buffered"] <= stats["max_buffer"]
+
+
+class TestWriteBehindTracking:
+    """Tests for POST /api/analytics/track through the ingest buffer"""
+
+    def test_tracked_events_are_flushed(self):
+        """POST /api/analytics/track - Accepted events are flushed within a few seconds"""
+        listings = requests.get(f"{BASE_URL}/api/listings", params={"limit": 1}).json()
+        items = listings.get("listings", []) if isinstance(listings, dict) else listings
+        if not items:
+            pytest.skip("No listings available")
+        listing_id = items[0]["id"]
+
+        before = ingest_stats()
+        for i in range(5):
+            response = requests.post(f"{BASE_URL}/api/analytics/track", headers=BROWSER_HEADERS, json={
+                "listing_id": listing_id,
+                "event_type": "share",
+                "user_id": f"TEST_ingest_viewer_{i}"
+            })
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+            assert response.json().get("success") is True
+
+        # Counters are per worker; with several workers the requests may be spread out
+        for _ in range(10):
+            after = ingest_stats()
+            if after["flushed"] > before["flushed"] and after["buffered"] == 0:
+                break
+            time.sleep(0.5)
+        assert after["accepted"] >= before["accepted"]
+        assert after["flushed"] >= before["flushed"]
@@ -0,0 +1,74 @@
+"""
+Unit tests for utils.boost_expiry.listing_updates
+Tests:
+1. Expired types are unset while other boost types stay active
+2. A type re-boosted before the batch ran is left alone
+3. Boost flags are cleared only when nothing is left active
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne  # noqa: E402
+from utils.boost_expiry import listing_updates  # noqa: E402
+
+CLEARED_FLAGS = {"is_boosted": False, "boost_priority": 0, "boost_tier": 0}
+
+
+def updates_by_listing(expired, still_active):
+    return {op._filter["id"]: op._doc for op in listing_updates(expired, still_active)}
+
+
+class TestListingUpdatesMixedTypes:
+    """One listing with expired and unexpired boost types"""
+
+    def test_only_expired_types_unset(self):
+        expired = [
+            {"id": "b1", "listing_id": "L1", "boost_type": "featured"},
+            {"id": "b2", "listing_id": "L1", "boost_type": "urgent"},
+        ]
+        updates = updates_by_listing(expired, {"L1": {"homepage"}})
+        assert updates == {"L1": {"$unset": {"boosts.featured": "", "boosts.urgent": ""}}}
+
+    def test_reboosted_type_kept(self):
+        """featured expired but an active featured boost remains; only urgent goes"""
+        expired = [
+            {"id": "b1", "listing_id": "L1", "boost_type": "featured"},
+            {"id": "b2", "listing_id": "L1", "boost_type": "urgent"},
+        ]
+        updates = updates_by_listing(expired, {"L1": {"featured", "homepage"}})
+        assert updates == {"L1": {"$unset": {"boosts.urgent": ""}}}
+
+    def test_all_types_reboosted_no_update(self):
+        expired = [{"id": "b1", "listing_id": "L1", "boost_type": "featured"}]
+        assert listing_updates(expired, {"L1": {"featured"}}) == []
+
+
+class TestListingUpdatesFlags:
+    """is_boosted/boost_priority/boost_tier are reset when no boost is left"""
+
+    def test_flags_cleared_when_nothing_active(self):
+        expired = [
+            {"id": "b1", "listing_id": "L1", "boost_type": "featured"},
+            {"id": "b2", "listing_id": "L2", "boost_type": "urgent"},
+            {"id": "b3", "listing_id": "L2", "boost_type": "homepage"},
+        ]
+        updates = updates_by_listing(expired, {"L1": {"category"}})
+        assert updates["L1"] == {"$unset": {"boosts.featured": ""}}
+        assert updates["L2"] == {
+            "$unset": {"boosts.homepage": "", "boosts.urgent": ""},
+            "$set": CLEARED_FLAGS,
+        }
+
+    def test_boost_without_type_or_listing(self):
+        expired = [
+            {"id": "b1", "listing_id": "L1"},
+            {"id": "b2", "boost_type": "featured"},
+        ]
+        assert listing_updates(expired, {}) == [UpdateOne({"id": "L1"}, {"$set": CLEARED_FLAGS})]
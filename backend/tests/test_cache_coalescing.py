@@ -0,0 +1,52 @@
+"""
+Test Suite for cache stampede protection
+Tests single-flight coalescing and stale-while-revalidate on the feed cache
+and the per-prefix counters in /api/perf/stats.
+"""
+
+import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestCacheMetrics:
+    """Tests for cache_metrics in GET /api/perf/stats"""
+
+    def test_perf_stats_exposes_cache_metrics(self):
+        """GET /api/perf/stats - Includes backend, LRU size and per-prefix counters"""
+        response = requests.get(f"{BASE_URL}/api/perf/stats")
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        metrics = response.json()["cache_metrics"]
+        for field in ("backend", "memory_entries", "memory_max_entries", "prefixes"):
+            assert field in metrics
+
+    def test_feed_prefix_counters(self):
+        """Cached feed requests are counted under the feed prefix"""
+        params = {"search": "phone", "limit": 5}
+        requests.get(f"{BASE_URL}/api/feed/listings", params=params)
+        requests.get(f"{BASE_URL}/api/feed/listings", params=params)
+        prefixes = requests.get(f"{BASE_URL}/api/perf/stats").json()["cache_metrics"]["prefixes"]
+        if "feed" in prefixes:
+            feed = prefixes["feed"]
+            assert feed.get("hits", 0) + feed.get("stale_hits", 0) + feed.get("misses", 0) >= 1
+
+
+class TestConcurrentMisses:
+    """Tests that concurrent misses for the same key return consistent results"""
+
+    def test_concurrent_requests_share_result(self):
+        """Parallel identical feed requests all succeed with the same items"""
+        params = {"search": "coalesce-test", "limit": 5}
+
+        def fetch(_):
+            return requests.get(f"{BASE_URL}/api/feed/listings", params=params)
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(fetch, range(10)))
+
+        assert all(r.status_code == 200 for r in responses)
+        item_sets = {tuple(i["id"] for i in r.json()["items"]) for r in responses}
+        assert len(item_sets) == 1
@@ -0,0 +1,60 @@
+"""
+Test Suite for set-based signup cohort retention
+Tests that the retention heatmap, computed from the per-user activity table,
+returns one row per cohort with rates that are percentages of that cohort.
+"""
+
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestSignupCohortRetention:
+    """Tests for GET /api/cohort-analytics/retention/heatmap (signup_date)"""
+
+    @pytest.mark.parametrize("granularity", ["daily", "weekly", "monthly"])
+    def test_heatmap_rows(self, granularity):
+        """GET /api/cohort-analytics/retention/heatmap - One row per cohort, rates within 0-100"""
+        response = requests.get(
+            f"{BASE_URL}/api/cohort-analytics/retention/heatmap",
+            params={"dimension": "signup_date", "granularity": granularity, "months_back": 12}
+        )
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        data = response.json()
+
+        assert data["granularity"] == granularity
+        assert len(data["periods"]) == len(set(data["periods"])), "Cohort periods should not repeat"
+        assert data["periods"] == sorted(data["periods"], reverse=True), "Newest cohort first"
+        for row in data["data"]:
+            assert row["user_count"] > 0
+            for interval in data["intervals"]:
+                if interval in row:
+                    assert 0 <= row[interval] <= 100
+
+    def test_retention_is_monotonic(self):
+        """GET /api/cohort-analytics/retention/cohorts - Later intervals never retain more users"""
+        response = requests.get(
+            f"{BASE_URL}/api/cohort-analytics/retention/cohorts",
+            params={"dimension": "signup_date", "granularity": "monthly"}
+        )
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        for cohort in response.json():
+            rates = list(cohort["retention_data"].values())
+            assert rates == sorted(rates, reverse=True), f"{cohort['period']}: {rates}"
+            assert "listings_posted" in cohort["metrics"]
+
+
+class TestCohortActivityStats:
+    """Tests for the cohort activity sync counters in GET /api/perf/stats"""
+
+    def test_perf_stats_include_cohort_activity(self):
+        """GET /api/perf/stats - cohort_activity reports sync runs and rows applied"""
+        response = requests.get(f"{BASE_URL}/api/perf/stats")
+        if response.status_code != 200:
+            pytest.skip(f"Perf stats not available: {response.status_code}")
+        stats = response.json().get("cohort_activity")
+        assert stats is not None
+        assert set(stats["applied"]) == {"users", "listings", "events"}
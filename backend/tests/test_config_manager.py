@@ -185,6 +185,36 @@ class TestConfigManagerFeatureFlags:
         assert len(data.get("features", [])) >= 20
         print(f"Available features: {len(data.get('features', []))}, roles: {data.get('roles')}")
 
+    def test_evaluate_all_features(self, api_client):
+        """GET /api/config-manager/features/{environment}/evaluate returns every feature for a context"""
+        params = {"country_code": "KE", "user_role": "seller", "user_id": "TEST_flag_user"}
+        response = api_client.get(f"{BASE_URL}/api/config-manager/features/development/evaluate", params=params)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert set(FEATURE_FLAGS) <= set(data["features"])
+        # Bulk evaluation agrees with the single-feature check
+        check = api_client.get(
+            f"{BASE_URL}/api/config-manager/features/development/check/escrow_system", params=params
+        ).json()
+        assert data["features"]["escrow_system"] == check
+
+    def test_flag_change_is_visible_immediately(self, api_client):
+        """PUT /api/config-manager/features/{environment}/{feature_id} - Seller override applies on the next check"""
+        seller_id = f"TEST_seller_{uuid.uuid4().hex[:8]}"
+        response = api_client.put(
+            f"{BASE_URL}/api/config-manager/features/development/price_negotiation",
+            json={"enabled": False, "scope": "seller", "scope_value": seller_id, "updated_by": "TEST_admin"}
+        )
+        assert response.status_code == 200
+
+        check = api_client.get(
+            f"{BASE_URL}/api/config-manager/features/development/check/price_negotiation",
+            params={"seller_id": seller_id}
+        ).json()
+        assert check["enabled"] is False
+        assert check["source"] == f"seller:{seller_id}"
+
 
 class TestConfigManagerCountryConfigs:
     """Tests for Country Configurations endpoints"""
@@ -0,0 +1,77 @@
+"""
+Test Suite for the in-process event bus
+Tests that listing creation publishes listing_created to the bus (instead of a
+loopback HTTP call) and that queue depth/drop counters appear in /api/perf/stats.
+"""
+
+import time
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+@pytest.fixture
+def auth_headers():
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": "testuser@test.com", "password": "password"})
+    if response.status_code != 200:
+        pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
+    data = response.json()
+    return {"Authorization": f"Bearer {data.get('token') or data.get('session_token')}"}
+
+
+class TestEventBusStats:
+    """Tests for event bus counters in GET /api/perf/stats"""
+
+    def test_perf_stats_exposes_event_bus(self):
+        """GET /api/perf/stats - Includes event_bus with per-subscription counters"""
+        response = requests.get(f"{BASE_URL}/api/perf/stats")
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        data = response.json()
+        assert "event_bus" in data
+        bus = data["event_bus"]
+        assert "published" in bus
+        for name, sub in bus["subscriptions"].items():
+            for field in ("depth", "max_depth", "dropped", "delivered", "failed"):
+                assert field in sub, f"subscription '{name}' should have '{field}'"
+
+
+class TestListingCreatedEvent:
+    """Tests that POST /api/listings records a cohort event via the bus"""
+
+    def test_listing_created_event_is_stored(self, auth_headers):
+        """Creating a listing stores a listing_created cohort event shortly after"""
+        me = requests.get(f"{BASE_URL}/api/auth/me", headers=auth_headers).json()
+        payload = {
+            "title": "TEST_event_bus listing",
+            "description": "Created by test_event_bus",
+            "price": 10,
+            "category_id": "electronics",
+            "location": "Dar es Salaam",
+            "images": []
+        }
+        response = requests.post(f"{BASE_URL}/api/listings", headers=auth_headers, json=payload)
+        if response.status_code not in (200, 201):
+            pytest.skip(f"Listing creation not available: {response.status_code}")
+        listing_id = response.json()["id"]
+
+        try:
+            found = False
+            for _ in range(10):
+                events = requests.get(
+                    f"{BASE_URL}/api/cohort-analytics/events/{me['user_id']}",
+                    params={"event_type": "listing_created", "limit": 20}
+                )
+                if events.status_code != 200:
+                    pytest.skip("Cohort analytics not available")
+                data = events.json()
+                items = data if isinstance(data, list) else data.get("events", [])
+                if any(e.get("properties", {}).get("listing_id") == listing_id for e in items):
+                    found = True
+                    break
+                time.sleep(0.5)
+            assert found, "listing_created event should be flushed to cohort_events"
+        finally:
+            requests.delete(f"{BASE_URL}/api/listings/{listing_id}", headers=auth_headers)
@@ -296,7 +296,31 @@ class TestExecutiveSummaryGeneration:
         assert "generated_at" in data, "Force regenerated summary should have timestamp"
         
         print(f"PASS: Force regenerated at: {data['generated_at']}")
-    
+
+    def test_generate_summary_section_timings(self):
+        """POST /api/executive-summary/generate - Per-section timings; closed previous period is reused"""
+        session = get_auth_session()
+        for _ in range(2):
+            response = session.post(
+                f"{BASE_URL}/api/executive-summary/generate",
+                headers=get_auth_headers(),
+                params={"period": "weekly", "force": "true"},
+                timeout=90
+            )
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+
+        timings = response.json()["section_timings"]
+        for section in ("escrow:current", "escrow:previous", "revenue:current", "revenue:previous", "live", "system_health"):
+            assert section in timings, f"Missing timing for {section}"
+            assert timings[section]["ms"] >= 0
+        # The second run finds the previous week's immutable sections already stored
+        assert timings["escrow:previous"]["source"] == "closed_period"
+        assert timings["escrow:current"]["source"] == "computed"
+        # Revenue reads the banners' current status, so it is never stored
+        assert timings["revenue:previous"]["source"] == "computed"
+
+        print(f"PASS: Section timings: {timings}")
+
     def test_generate_summary_invalid_period(self):
         """POST /api/executive-summary/generate - should reject invalid period"""
         session = get_auth_session()
@@ -0,0 +1,64 @@
+"""
+Test Suite for materialized feed snapshots
+Tests that /api/feed/listings serves country/category/sort pages (including
+cursor pages) from snapshots with a maintained total.
+"""
+
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestSnapshotPages:
+    """Tests for snapshot-served feed pages"""
+
+    @pytest.mark.parametrize("sort", ["newest", "oldest", "price_low", "price_high", "popular"])
+    def test_cursor_walk_has_no_duplicates(self, sort):
+        """Following nextCursor for every sort never repeats a listing"""
+        seen = []
+        cursor = None
+        for _ in range(5):
+            params = {"sort": sort, "limit": 10}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/api/feed/listings", params=params)
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+            data = response.json()
+            seen += [item["id"] for item in data["items"]]
+            cursor = data["nextCursor"]
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)), f"Duplicate listings across {sort} pages"
+
+    def test_snapshot_header_and_total(self):
+        """Category pages report a maintained totalApprox"""
+        response = requests.get(f"{BASE_URL}/api/feed/listings", params={"category": "electronics"})
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data["totalApprox"], int)
+        assert response.headers.get("X-Cache") in ("SNAPSHOT", "HIT", "MISS")
+
+    def test_price_sort_order(self):
+        """price_low pages are ordered by price (after boosted items)"""
+        data = requests.get(f"{BASE_URL}/api/feed/listings", params={"sort": "price_low", "limit": 20}).json()
+        prices = [item["price"] or 0 for item in data["items"] if not item.get("isBoosted")]
+        assert prices == sorted(prices)
+
+    def test_filtered_requests_still_work(self):
+        """Filters outside the snapshot (city/search) use the query path"""
+        response = requests.get(f"{BASE_URL}/api/feed/listings", params={"search": "phone"})
+        assert response.status_code == 200
+        assert response.headers.get("X-Cache") != "SNAPSHOT"
+
+
+class TestSnapshotStats:
+    """Tests for snapshot counters in /api/perf/stats"""
+
+    def test_perf_stats_exposes_feed_snapshots(self):
+        """GET /api/perf/stats - Includes feed_snapshots"""
+        data = requests.get(f"{BASE_URL}/api/perf/stats").json()
+        assert "feed_snapshots" in data
+        assert "ready" in data["feed_snapshots"]
@@ -0,0 +1,71 @@
+"""
+Test Suite for geospatial nearby listings
+Tests the $geoNear path of GET /api/listings/by-location: distance ordering,
+(distance, id) cursor paging and capped totals.
+"""
+
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+# A city code with no listings forces the nearby (expanded) search
+NEARBY_PARAMS = {
+    "city_code": "TEST_NO_LISTINGS",
+    "city_lat": -6.7924,
+    "city_lng": 39.2083,
+    "radius": 500,
+    "limit": 5,
+}
+
+
+class TestNearbyListings:
+    """Tests for GET /api/listings/by-location nearby mode"""
+
+    def test_nearby_mode_shape(self):
+        """Nearby search returns distance-ordered listings with capped total"""
+        response = requests.get(f"{BASE_URL}/api/listings/by-location", params=NEARBY_PARAMS)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        data = response.json()
+        assert data["search_mode"] == "nearby_cities"
+        assert "total_capped" in data
+        assert "next_cursor" in data
+        distances = [l["distance_km"] for l in data["listings"]]
+        assert distances == sorted(distances), "Listings should be nearest first"
+        assert all(d <= NEARBY_PARAMS["radius"] for d in distances)
+
+    def test_cursor_pages_do_not_overlap(self):
+        """Following next_cursor yields new listings in non-decreasing distance"""
+        first = requests.get(f"{BASE_URL}/api/listings/by-location", params=NEARBY_PARAMS).json()
+        if not first.get("next_cursor"):
+            pytest.skip("Not enough nearby listings for a second page")
+
+        second = requests.get(
+            f"{BASE_URL}/api/listings/by-location",
+            params={**NEARBY_PARAMS, "cursor": first["next_cursor"]}
+        ).json()
+        first_ids = {l["id"] for l in first["listings"]}
+        assert not first_ids & {l["id"] for l in second["listings"]}
+        if second["listings"]:
+            assert second["listings"][0]["distance_km"] >= first["listings"][-1]["distance_km"]
+
+    def test_cursor_bound_to_center(self):
+        """A cursor issued for one center is rejected for another"""
+        first = requests.get(f"{BASE_URL}/api/listings/by-location", params=NEARBY_PARAMS).json()
+        if not first.get("next_cursor"):
+            pytest.skip("Not enough nearby listings for a second page")
+        response = requests.get(
+            f"{BASE_URL}/api/listings/by-location",
+            params={**NEARBY_PARAMS, "city_lat": -3.3869, "cursor": first["next_cursor"]}
+        )
+        assert response.status_code == 400
+
+    def test_invalid_cursor(self):
+        """Tampered cursors return 400"""
+        response = requests.get(
+            f"{BASE_URL}/api/listings/by-location",
+            params={**NEARBY_PARAMS, "cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
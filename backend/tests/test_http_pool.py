@@ -0,0 +1,58 @@
+"""
+Test Suite for the pooled HTTP client
+Tests the admin proxy and public admin-backed endpoints after moving to the
+shared keep-alive client, and the per-upstream latency histograms.
+"""
+
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestPooledProxies:
+    """Tests for endpoints proxied through the shared client pool"""
+
+    def test_public_form_config(self):
+        """GET /api/form-config/public - Still proxied to the admin backend"""
+        response = requests.get(f"{BASE_URL}/api/form-config/public")
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        assert isinstance(response.json(), dict)
+
+    def test_public_photography_guides(self):
+        """GET /api/photography-guides/public/{category} - Returns guides"""
+        response = requests.get(f"{BASE_URL}/api/photography-guides/public/electronics")
+        assert response.status_code == 200
+        assert "guides" in response.json()
+
+    def test_admin_proxy_streams_upstream_status(self):
+        """GET /api/admin/users without auth - Upstream 401/403 is passed through"""
+        response = requests.get(f"{BASE_URL}/api/admin/users")
+        assert response.status_code in (401, 403), f"Expected auth error, got {response.status_code}"
+
+    def test_repeated_proxy_calls(self):
+        """Sequential proxy calls reuse the pool without errors"""
+        for _ in range(5):
+            response = requests.get(f"{BASE_URL}/api/form-config/public")
+            assert response.status_code == 200
+
+
+class TestUpstreamHistograms:
+    """Tests for per-upstream latency histograms in /api/perf/stats"""
+
+    def test_perf_stats_has_upstream_histograms(self):
+        """GET /api/perf/stats - Includes http_upstreams with latency buckets"""
+        requests.get(f"{BASE_URL}/api/form-config/public")
+        response = requests.get(f"{BASE_URL}/api/perf/stats")
+        assert response.status_code == 200
+        data = response.json()
+        assert "http_upstreams" in data
+        assert "limits" in data["http_upstreams"]
+        upstreams = data["http_upstreams"]["upstreams"]
+        if "admin_backend" in upstreams:
+            histogram = upstreams["admin_backend"]
+            assert histogram["count"] >= 1
+            assert "p50_ms" in histogram
+            assert "p99_ms" in histogram
+            assert "buckets" in histogram
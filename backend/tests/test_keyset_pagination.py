@@ -0,0 +1,98 @@
+"""
+Test Suite for Keyset (Seek) Pagination
+Tests cursor mode on GET /api/listings and GET /api/search, and that the
+page/total compatibility shape is preserved.
+"""
+
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestListingsCursorMode:
+    """Tests for cursor pagination on GET /api/listings"""
+
+    def test_cursor_mode_response_shape(self):
+        """GET /api/listings?paginate=cursor - Returns next_cursor instead of total/pages"""
+        response = requests.get(f"{BASE_URL}/api/listings", params={"paginate": "cursor", "limit": 5})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+
+        data = response.json()
+        assert "listings" in data
+        assert "next_cursor" in data
+        assert "has_more" in data
+        assert "total" not in data, "Cursor mode should not run a count"
+        assert len(data["listings"]) <= 5
+
+    def test_cursor_pages_do_not_overlap(self):
+        """Following next_cursor never repeats a listing"""
+        seen = set()
+        params = {"paginate": "cursor", "limit": 5}
+        for _ in range(3):
+            response = requests.get(f"{BASE_URL}/api/listings", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            ids = [l["id"] for l in data["listings"]]
+            assert not seen.intersection(ids), "Cursor page repeated a listing"
+            seen.update(ids)
+            if not data["next_cursor"]:
+                break
+            params = {"cursor": data["next_cursor"], "limit": 5}
+
+    def test_cursor_matches_page_mode_order(self):
+        """Second cursor page matches page=2 in compatibility mode"""
+        first = requests.get(f"{BASE_URL}/api/listings", params={"limit": 4}).json()
+        if not first.get("next_cursor"):
+            pytest.skip("Not enough listings for a second page")
+
+        by_page = requests.get(f"{BASE_URL}/api/listings", params={"limit": 4, "page": 2}).json()
+        by_cursor = requests.get(f"{BASE_URL}/api/listings", params={"limit": 4, "cursor": first["next_cursor"]}).json()
+        assert [l["id"] for l in by_cursor["listings"]] == [l["id"] for l in by_page["listings"]]
+
+    def test_page_mode_is_default(self):
+        """GET /api/listings - Keeps the page/total/pages response shape"""
+        response = requests.get(f"{BASE_URL}/api/listings", params={"page": 1, "limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert "total" in data
+        assert "page" in data
+        assert "pages" in data
+
+    def test_tampered_cursor_rejected(self):
+        """A forged cursor returns 400"""
+        response = requests.get(f"{BASE_URL}/api/listings", params={"cursor": "eyJzIjoiYm9vc3RfdGllciJ9AAAA"})
+        assert response.status_code == 400
+
+    def test_cursor_from_other_sort_rejected(self):
+        """A cursor issued for one sort cannot be replayed on another"""
+        first = requests.get(f"{BASE_URL}/api/listings", params={"paginate": "cursor", "limit": 2}).json()
+        if not first.get("next_cursor"):
+            pytest.skip("Not enough listings for a second page")
+        response = requests.get(f"{BASE_URL}/api/listings", params={
+            "cursor": first["next_cursor"], "sort": "price_asc", "limit": 2
+        })
+        assert response.status_code == 400
+
+
+class TestSearchCursorMode:
+    """Tests for cursor pagination on GET /api/search"""
+
+    def test_search_cursor_mode(self):
+        """GET /api/search?paginate=cursor - Returns next_cursor and query"""
+        response = requests.get(f"{BASE_URL}/api/search", params={"q": "a", "paginate": "cursor", "limit": 5})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        data = response.json()
+        assert "next_cursor" in data
+        assert data["query"] == "a"
+        assert "total" not in data
+
+    def test_search_page_mode_unchanged(self):
+        """GET /api/search - Keeps page/total response shape"""
+        response = requests.get(f"{BASE_URL}/api/search", params={"q": "a", "limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert "total" in data
+        assert "pages" in data
@@ -0,0 +1,119 @@
+"""
+Unit tests for leaderboard rebuilds racing with awards and revokes
+Tests:
+1. Awards made while the rebuild loads are counted once, seen by the load or not
+2. Revokes made while the rebuild loads are not brought back
+3. The same for the Redis backend (needs fakeredis)
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.leaderboard import BadgeLeaderboard, MemoryLeaderboardBackend, RedisLeaderboardBackend  # noqa: E402
+
+
+class FakeBadges:
+    """user_badges as a list, with load/reload in the shape BadgeLeaderboard passes to replace_all"""
+
+    def __init__(self, board: BadgeLeaderboard, badges):
+        self.board = board
+        self.badges = list(badges)
+
+    def totals(self, user_ids=None):
+        result = {"points": {}, "count": {}}
+        for user_id, points in self.badges:
+            if user_ids is None or user_id in user_ids:
+                result["points"][user_id] = result["points"].get(user_id, 0.0) + points
+                result["count"][user_id] = result["count"].get(user_id, 0.0) + 1
+        return result
+
+    async def award(self, user_id, points):
+        self.badges.append((user_id, points))
+        await self.board.record_award(user_id, points)
+
+    async def revoke(self, user_id, points):
+        self.badges.remove((user_id, points))
+        await self.board.record_revoke(user_id, points)
+
+    async def rebuild(self, before_read=(), after_read=()):
+        async def load():
+            for write in before_read:
+                await write()
+            totals = self.totals()
+            for write in after_read:
+                await write()
+            return {board: list(scores.items()) for board, scores in totals.items()}
+
+        async def reload(user_ids):
+            return self.totals(user_ids)
+
+        return await self.board.backend.replace_all(load, reload)
+
+
+def make_board(backend) -> BadgeLeaderboard:
+    board = BadgeLeaderboard(db=None)
+    board.backend = backend
+    board._ready = True
+    board._built_at = time.monotonic()
+    return board
+
+
+async def assert_matches(board: BadgeLeaderboard, badges: FakeBadges):
+    expected = badges.totals()
+    for name in BadgeLeaderboard.BOARDS:
+        rows = await board.top(name, 0, 100)
+        assert {r["user_id"]: r["score"] for r in rows} == {u: int(s) for u, s in expected[name].items()}
+
+
+async def race(backend):
+    board = make_board(backend)
+    badges = FakeBadges(board, [("alice", 10), ("alice", 5), ("bob", 7), ("carol", 3)])
+    assert await badges.rebuild()
+    await assert_matches(board, badges)
+
+    assert await badges.rebuild(
+        before_read=[lambda: badges.award("alice", 20), lambda: badges.revoke("bob", 7)],
+        after_read=[lambda: badges.award("dave", 4), lambda: badges.revoke("carol", 3),
+                    lambda: badges.award("alice", 1)],
+    )
+    await assert_matches(board, badges)
+    assert await board.rank("carol") is None
+    assert await board.rank("bob") is None
+
+
+class TestMemoryRebuildRace:
+    """MemoryLeaderboardBackend.replace_all"""
+
+    def test_awards_and_revokes_during_load(self):
+        asyncio.run(race(MemoryLeaderboardBackend()))
+
+
+class TestRedisRebuildRace:
+    """RedisLeaderboardBackend.replace_all"""
+
+    def test_awards_and_revokes_during_load(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        asyncio.run(race(RedisLeaderboardBackend(fakeredis.aioredis.FakeRedis(decode_responses=True))))
+
+    def test_concurrent_rebuild_skipped(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def run():
+            backend = RedisLeaderboardBackend(fakeredis.aioredis.FakeRedis(decode_responses=True))
+            badges = FakeBadges(make_board(backend), [("alice", 1)])
+            nested = []
+
+            async def rebuild_again():
+                nested.append(await badges.rebuild())
+
+            assert await badges.rebuild(before_read=[rebuild_again])
+            assert nested == [False]
+
+        asyncio.run(run())
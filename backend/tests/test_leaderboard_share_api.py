@@ -214,6 +214,26 @@ class TestLeaderboardAPI:
         
         print(f"✓ Nearby users structure valid - {len(nearby_users)} nearby users, {len(current_user_entries)} marked as current")
 
+    def test_my_rank_around_me_window(self):
+        """Test nearby users are consecutive ranks within the requested radius"""
+        user_data = self.register_and_login()
+        assert user_data is not None, "Failed to register/login"
+        
+        response = self.session.get(f"{BASE_URL}/api/badges/leaderboard/my-rank?radius=2")
+        
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        
+        data = response.json()
+        nearby_users = data.get("nearby_users", [])
+        ranks = [u["rank"] for u in nearby_users]
+        
+        assert len(nearby_users) <= 5, f"Radius 2 should return at most 5 users, got {len(nearby_users)}"
+        assert ranks == list(range(ranks[0], ranks[0] + len(ranks))) if ranks else True, f"Ranks not consecutive: {ranks}"
+        if data["rank"] is not None:
+            assert data["rank"] in ranks, "Ranked user should be inside their own window"
+        
+        print(f"✓ Around-me window ranks: {ranks}")
+
     # ==================== GET /api/badges/share/{user_id} ====================
 
     def test_share_profile_public_access(self):
@@ -0,0 +1,91 @@
+"""
+Test Suite for the batched new-listing notification fan-out
+Tests that a user interested in a category receives a queued smart notification
+when someone else lists in that category.
+"""
+
+import time
+import uuid
+import pytest
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+CATEGORY_ID = "electronics"
+
+
+@pytest.fixture
+def seller_headers():
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": "testuser@test.com", "password": "password"})
+    if response.status_code != 200:
+        pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
+    data = response.json()
+    return {"Authorization": f"Bearer {data.get('token') or data.get('session_token')}"}
+
+
+@pytest.fixture
+def interested_headers():
+    """A fresh user with a category interest score of at least 20"""
+    response = requests.post(f"{BASE_URL}/api/auth/register", json={
+        "email": f"TEST_fanout_{uuid.uuid4().hex[:8]}@test.com",
+        "password": "password123",
+        "name": "Fanout Test User"
+    })
+    if response.status_code != 200:
+        pytest.skip(f"Registration failed: {response.status_code} - {response.text}")
+    headers = {"Authorization": f"Bearer {response.json().get('session_token')}"}
+
+    for i in range(20):
+        tracked = requests.post(f"{BASE_URL}/api/smart-notifications/track", headers=headers, json={
+            "event_type": "view_listing",
+            "entity_id": f"TEST_fanout_view_{i}",
+            "entity_type": "listing",
+            "metadata": {"category_id": CATEGORY_ID}
+        })
+        if tracked.status_code != 200:
+            pytest.skip(f"Behavior tracking not available: {tracked.status_code}")
+    return headers
+
+
+class TestNewListingFanOut:
+    """Tests for new-listing notifications queued by the batched fan-out"""
+
+    def test_interested_user_gets_notification(self, seller_headers, interested_headers):
+        """POST /api/listings - Interested users get a new_listing_in_category notification"""
+        response = requests.post(f"{BASE_URL}/api/listings", headers=seller_headers, json={
+            "title": "TEST_fanout listing",
+            "description": "Created by test_notification_fanout",
+            "price": 10,
+            "category_id": CATEGORY_ID,
+            "location": "Dar es Salaam",
+            "images": []
+        })
+        if response.status_code not in (200, 201):
+            pytest.skip(f"Listing creation not available: {response.status_code}")
+        listing_id = response.json()["id"]
+
+        try:
+            matches = []
+            for _ in range(10):
+                history = requests.get(
+                    f"{BASE_URL}/api/smart-notifications/history",
+                    headers=interested_headers,
+                    params={"trigger_type": "new_listing_in_category", "limit": 50}
+                )
+                assert history.status_code == 200, f"Expected 200, got {history.status_code}: {history.text}"
+                matches = [
+                    n for n in history.json()["notifications"]
+                    if n.get("metadata", {}).get("listing_id") == listing_id
+                ]
+                if matches:
+                    break
+                time.sleep(0.5)
+            assert len(matches) == 1, "Exactly one notification should be queued for the listing"
+            notification = matches[0]
+            assert notification["deep_link"] == f"/listing/{listing_id}"
+            assert notification["dedup_key"]
+            assert notification["channels"]
+        finally:
+            requests.delete(f"{BASE_URL}/api/listings/{listing_id}", headers=seller_headers)
@@ -431,7 +431,37 @@ class TestConversationsRoutes:
             "Seller should also see the conversation"
         
         print("✓ Seller correctly sees conversation")
-    
+
+    def test_get_conversations_cursor_pages(self):
+        """Test GET /api/conversations keyset pages with card-sized listings"""
+        headers = {"Authorization": f"Bearer {TestConversationsRoutes.buyer_session_token}"}
+        seen = []
+        cursor = None
+        for _ in range(20):
+            params = {"paginate": "cursor", "limit": 1}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/api/conversations", params=params, headers=headers)
+            assert response.status_code == 200, f"GET conversations page failed: {response.text}"
+            data = response.json()
+            assert len(data["conversations"]) <= 1
+            seen.extend(c["id"] for c in data["conversations"])
+            for conv in data["conversations"]:
+                if conv["listing"]:
+                    assert "seo_data" not in conv["listing"]
+                    assert len(conv["listing"]["images"]) <= 1
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        assert TestConversationsRoutes.conversation_id in seen, "Test conversation should be on a page"
+        assert len(seen) == len(set(seen)), "Pages should not repeat conversations"
+
+        response = requests.get(f"{BASE_URL}/api/conversations", params={"cursor": "tampered"}, headers=headers)
+        assert response.status_code == 400
+
+        print(f"✓ Paged through {len(seen)} conversations one at a time")
+
     def test_get_single_conversation(self):
         """Test GET /api/conversations/{id}"""
         headers = {"Authorization": f"Bearer {TestConversationsRoutes.buyer_session_token}"}
@@ -528,7 +558,72 @@ class TestConversationsRoutes:
         assert TestConversationsRoutes.seller_user_id in sender_ids, "Seller message missing"
         
         print(f"✓ Verified {len(messages)} messages in conversation")
-    
+
+    def test_message_history_pages_and_read_watermarks(self):
+        """Test GET /api/conversations/{id}/messages keyset pages and POST /read watermarks"""
+        conversation_url = f"{BASE_URL}/api/conversations/{TestConversationsRoutes.conversation_id}"
+        buyer_headers = {"Authorization": f"Bearer {TestConversationsRoutes.buyer_session_token}"}
+        seller_headers = {"Authorization": f"Bearer {TestConversationsRoutes.seller_session_token}"}
+
+        # Page backwards one message at a time, newest first
+        pages = []
+        cursor = None
+        for _ in range(20):
+            params = {"limit": 1}
+            if cursor:
+                params["before"] = cursor
+            response = requests.get(f"{conversation_url}/messages", params=params, headers=buyer_headers)
+            assert response.status_code == 200, f"GET messages page failed: {response.text}"
+            data = response.json()
+            pages.append(data["messages"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        history = [m for page in reversed(pages) for m in page]
+        assert len(history) >= 2
+        assert len({m["id"] for m in history}) == len(history), "Pages should not repeat messages"
+        assert [m["created_at"] for m in history] == sorted(m["created_at"] for m in history)
+
+        # The buyer has read the seller's reply; the seller has not opened the chat yet
+        response = requests.get(f"{conversation_url}/messages", params={"mark_read": "false"}, headers=seller_headers)
+        assert response.status_code == 200
+        data = response.json()
+        by_sender = {m["sender_id"]: m for m in data["messages"]}
+        assert by_sender[TestConversationsRoutes.seller_user_id]["read"] is True
+        assert by_sender[TestConversationsRoutes.buyer_user_id]["read"] is False
+        assert data["unread"] >= 1
+
+        response = requests.post(f"{conversation_url}/read", headers=seller_headers)
+        assert response.status_code == 200
+        assert response.json()["unread"] == 0
+
+        response = requests.get(f"{conversation_url}/messages", headers=buyer_headers)
+        assert all(m["read"] for m in response.json()["messages"])
+
+        response = requests.get(f"{conversation_url}/messages", params={"before": "tampered"}, headers=buyer_headers)
+        assert response.status_code == 400
+
+        print(f"✓ Paged {len(history)} messages and moved read watermarks")
+
+    def test_unread_count_follows_sends_and_reads(self):
+        """Test GET /api/conversations/unread-count tracks new messages and reads"""
+        conversation_url = f"{BASE_URL}/api/conversations/{TestConversationsRoutes.conversation_id}"
+        buyer_headers = {"Authorization": f"Bearer {TestConversationsRoutes.buyer_session_token}"}
+        seller_headers = {"Authorization": f"Bearer {TestConversationsRoutes.seller_session_token}"}
+
+        before = requests.get(f"{BASE_URL}/api/conversations/unread-count", headers=seller_headers).json()["count"]
+        response = requests.post(f"{conversation_url}/messages", json={"content": "Still available?"}, headers=buyer_headers)
+        assert response.status_code == 200
+
+        response = requests.get(f"{BASE_URL}/api/conversations/unread-count", headers=seller_headers)
+        assert response.json()["count"] == before + 1
+
+        requests.post(f"{conversation_url}/read", headers=seller_headers)
+        response = requests.get(f"{BASE_URL}/api/conversations/unread-count", headers=seller_headers)
+        assert response.json()["count"] == 0, "Seller's only conversation is read"
+
+        print("✓ Unread count follows sends and reads")
+
     def test_send_message_unauthorized(self):
         """Test sending message to conversation you're not part of returns 403"""
         # Create third user
@@ -0,0 +1,46 @@
+"""
+Test Suite for the GCRA rate limiter
+Tests the per-route rate_limit dependency (429 + Retry-After) and the
+throttle counters in /api/perf/stats.
+"""
+
+import uuid
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestRateLimitDependency:
+    """Tests for Depends(rate_limit("image_upload")) on /api/media/upload"""
+
+    def test_burst_is_throttled_with_retry_after(self):
+        """More than 20 uploads per minute from one client returns 429"""
+        # A unique (invalid) token gives this test its own limiter key
+        headers = {"Authorization": f"Bearer TEST_rl_{uuid.uuid4().hex}"}
+        statuses = []
+        for _ in range(22):
+            response = requests.post(f"{BASE_URL}/api/media/upload", headers=headers)
+            statuses.append(response.status_code)
+            if response.status_code == 429:
+                assert "Retry-After" in response.headers
+                assert int(response.headers["Retry-After"]) >= 1
+                break
+        assert 429 in statuses, f"Expected a 429 after the burst, got {statuses}"
+        assert statuses.index(429) == 20, "The first 20 requests should pass the limiter"
+
+
+class TestRateLimitStats:
+    """Tests for rate limiter counters in GET /api/perf/stats"""
+
+    def test_perf_stats_exposes_rate_limits(self):
+        """GET /api/perf/stats - Includes backend, rules and per-action counters"""
+        response = requests.get(f"{BASE_URL}/api/perf/stats")
+        assert response.status_code == 200
+        stats = response.json()["rate_limits"]
+        assert stats["backend"] in ("memory", "redis")
+        assert stats["rules"]["login"]["limit"] == 5
+        for counts in stats["actions"].values():
+            assert "allowed" in counts
+            assert "throttled" in counts
@@ -0,0 +1,145 @@
+"""
+Unit tests for Socket.IO scale-out and presence
+Tests:
+1. A user stays online until their last socket disconnects
+2. Sockets expire after the TTL unless the heartbeat refreshes them
+3. The same for the Redis presence backend (needs fakeredis)
+4. Emits to a room reach a socket held by another server on the memory bus
+"""
+import asyncio
+import os
+import sys
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import realtime  # noqa: E402
+from utils.realtime import MemoryPresenceBackend, PresenceRegistry, RedisPresenceBackend, user_room  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the wall clock presence expiries are computed from"""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(realtime, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def make_backend(kind):
+    if kind == "memory":
+        return MemoryPresenceBackend()
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisPresenceBackend(fakeredis.aioredis.FakeRedis(decode_responses=True))
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+class TestPresenceRegistry:
+    """Presence shared through a backend, with sid -> user kept per worker"""
+
+    def make_registry(self, kind, ttl=10, heartbeat=30):
+        registry = PresenceRegistry("online", ttl=ttl, heartbeat=heartbeat)
+        registry.backend = make_backend(kind)
+        return registry
+
+    def test_multiple_sockets(self, kind, clock):
+        async def run():
+            registry = self.make_registry(kind)
+            assert await registry.connect("sid-1", "alice") is True
+            assert await registry.connect("sid-2", "alice") is False
+            assert await registry.is_online("alice")
+
+            assert await registry.disconnect("sid-1") == ("alice", False)
+            assert await registry.is_online("alice")
+            assert await registry.disconnect("sid-2") == ("alice", True)
+            assert not await registry.is_online("alice")
+            assert await registry.disconnect("sid-2") == (None, False)
+
+        asyncio.run(run())
+
+    def test_workers_share_presence(self, kind, clock):
+        async def run():
+            worker_a = self.make_registry(kind)
+            worker_b = self.make_registry(kind)
+            worker_b.backend = worker_a.backend
+            await worker_a.connect("sid-a", "alice")
+            assert await worker_b.connect("sid-b", "alice") is False
+            await worker_a.disconnect("sid-a")
+            assert await worker_b.online(["alice", "bob"]) == {"alice"}
+
+        asyncio.run(run())
+
+    def test_ttl_expiry(self, kind, clock):
+        async def run():
+            registry = self.make_registry(kind, ttl=10)
+            await registry.connect("sid-1", "alice")
+            clock.value += 9
+            assert await registry.is_online("alice")
+            clock.value += 2
+            assert not await registry.is_online("alice")
+            # A new socket after expiry is the user's only live one
+            assert await registry.connect("sid-2", "alice") is True
+
+        asyncio.run(run())
+
+    def test_heartbeat_refresh(self, kind, clock):
+        async def run():
+            registry = self.make_registry(kind, ttl=10, heartbeat=0.01)
+            await registry.connect("sid-1", "alice")
+            registry.start()
+            clock.value += 8
+            await asyncio.sleep(0.05)
+            clock.value += 8
+            assert await registry.is_online("alice")
+            await registry.stop()
+            assert not await registry.is_online("alice")
+            assert registry.get_stats()["local_sockets"] == 0
+
+        asyncio.run(run())
+
+
+class TestMemoryPubSub:
+    """Two servers on the in-memory bus act like two workers sharing Redis"""
+
+    def test_cross_server_delivery(self):
+        socketio = pytest.importorskip("socketio")
+
+        async def run():
+            channel = f"test-{uuid.uuid4().hex}"
+            servers = [
+                socketio.AsyncServer(async_mode="asgi", client_manager=realtime.InMemoryPubSubManager(channel=channel))
+                for _ in range(2)
+            ]
+            received = {0: [], 1: []}
+            for index, server in enumerate(servers):
+                async def send(eio_sid, pkt, index=index):
+                    received[index].append((eio_sid, pkt.data))
+                server._send_eio_packet = send
+                server.manager_initialized = True
+                server.manager.initialize()
+
+            sid = await servers[0].manager.connect("eio-alice", "/")
+            await servers[0].enter_room(sid, user_room("alice"))
+
+            await servers[1].emit("notification", {"id": "n1"}, room=user_room("alice"))
+            await servers[0].emit("notification", {"id": "n2"}, room=user_room("alice"))
+            await servers[1].emit("notification", {"id": "n3"}, room=user_room("bob"))
+            for _ in range(50):
+                if len(received[0]) >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+
+            assert [eio_sid for eio_sid, _ in received[0]] == ["eio-alice", "eio-alice"]
+            # One copy of each emit, local or relayed, and nothing for rooms without members
+            delivered = sorted(n for n in ("n1", "n2", "n3") for _, data in received[0] if f'"{n}"' in data)
+            assert delivered == ["n1", "n2"]
+            assert received[1] == []
+            for server in servers:
+                server.manager.thread.cancel()
+
+        asyncio.run(run())
@@ -0,0 +1,79 @@
+"""
+Unit tests for CronTrigger.next_run
+Tests:
+1. Minute, hour and day-of-month steps
+2. Day-of-week 0 and 7 are both Sunday
+3. Restricted day-of-month and day-of-week fire when either matches
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.scheduler import CronTrigger  # noqa: E402
+
+
+def runs(expression: str, after: datetime, count: int):
+    trigger = CronTrigger(expression)
+    result = []
+    for _ in range(count):
+        after = trigger.next_run(after)
+        result.append(after)
+    return result
+
+
+class TestCronSteps:
+    """*/N and range/N fields"""
+
+    def test_minute_step(self):
+        assert runs("*/15 * * * *", datetime(2026, 3, 1, 10, 7), 3) == [
+            datetime(2026, 3, 1, 10, 15), datetime(2026, 3, 1, 10, 30), datetime(2026, 3, 1, 10, 45)
+        ]
+
+    def test_hour_range_step(self):
+        assert runs("0 8-17/4 * * *", datetime(2026, 3, 1, 9, 0), 3) == [
+            datetime(2026, 3, 1, 12, 0), datetime(2026, 3, 1, 16, 0), datetime(2026, 3, 2, 8, 0)
+        ]
+
+    def test_day_of_month_step_with_any_weekday(self):
+        """*/10 in day-of-month means days 1, 11, 21, 31 - not every day"""
+        assert [r.day for r in runs("0 0 */10 * *", datetime(2026, 3, 1, 12, 0), 4)] == [11, 21, 31, 1]
+
+    def test_strictly_after(self):
+        assert CronTrigger("30 9 * * *").next_run(datetime(2026, 3, 1, 9, 30, 0)) == datetime(2026, 3, 2, 9, 30)
+
+
+class TestCronWeekdays:
+    """Day-of-week counts from Sunday, 7 is Sunday too"""
+
+    def test_seven_is_sunday(self):
+        # 2026-03-01 is a Sunday
+        expected = [datetime(2026, 3, 8, 9, 0), datetime(2026, 3, 15, 9, 0)]
+        assert runs("0 9 * * 7", datetime(2026, 3, 1, 12, 0), 2) == expected
+        assert runs("0 9 * * 0", datetime(2026, 3, 1, 12, 0), 2) == expected
+
+    def test_monday(self):
+        assert runs("0 9 * * 1", datetime(2026, 3, 1, 12, 0), 1) == [datetime(2026, 3, 2, 9, 0)]
+
+    def test_weekday_with_day_step(self):
+        """A */N day field narrows day-of-week instead of being ignored"""
+        # Mondays that are also day 1, 3, 5, ...: 2026-03-09 is the first one after the 2nd
+        assert runs("0 9 */2 * 1", datetime(2026, 3, 2, 12, 0), 2) == [
+            datetime(2026, 3, 9, 9, 0), datetime(2026, 3, 23, 9, 0)
+        ]
+
+
+class TestCronDayOr:
+    """Both day fields restricted - either one matching is enough"""
+
+    def test_day_of_month_or_weekday(self):
+        # The 15th (a Sunday in March 2026) or any Friday
+        assert runs("0 0 15 * 5", datetime(2026, 3, 1, 0, 0), 4) == [
+            datetime(2026, 3, 6), datetime(2026, 3, 13), datetime(2026, 3, 15), datetime(2026, 3, 20)
+        ]
@@ -0,0 +1,75 @@
+"""
+Test Suite for the indexed listing search
+Tests that /api/search, /api/search/suggestions and /api/listings?search=
+go through the SearchService (text index) instead of regex scans.
+"""
+
+import requests
+import os
+
+# Base URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://r2-storage-hub.preview.emergentagent.com').rstrip('/')
+
+
+class TestSearchRelevance:
+    """Tests for GET /api/search relevance ranking"""
+
+    def test_relevance_search_returns_page_shape(self):
+        """GET /api/search?q=phone - Returns ranked listings with total"""
+        response = requests.get(f"{BASE_URL}/api/search", params={"q": "phone", "limit": 10})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        data = response.json()
+        assert "listings" in data
+        assert "total" in data
+        assert data["query"] == "phone"
+
+    def test_title_match_ranks_before_description_match(self):
+        """Listings with the term in the title come before description-only hits"""
+        response = requests.get(f"{BASE_URL}/api/search", params={"q": "sofa", "limit": 20})
+        assert response.status_code == 200
+        listings = response.json()["listings"]
+        in_title = ["sofa" in (l.get("title") or "").lower() for l in listings]
+        # Once a description-only hit appears, no title hit may follow it
+        if False in in_title:
+            assert True not in in_title[in_title.index(False):], "Title hits should rank first"
+
+    def test_diacritics_are_folded(self):
+        """Accented and unaccented queries return the same listings"""
+        accented = requests.get(f"{BASE_URL}/api/search", params={"q": "Kühlschrank", "sort": "newest"}).json()
+        plain = requests.get(f"{BASE_URL}/api/search", params={"q": "kuhlschrank", "sort": "newest"}).json()
+        assert accented["total"] == plain["total"]
+
+    def test_regex_metacharacters_are_safe(self):
+        """Queries with regex metacharacters no longer error"""
+        response = requests.get(f"{BASE_URL}/api/search", params={"q": "iphone (12"})
+        assert response.status_code == 200
+
+
+class TestListingsSearchParam:
+    """Tests for GET /api/listings?search="""
+
+    def test_listings_search_filter(self):
+        """GET /api/listings?search=car - Uses the search backend"""
+        response = requests.get(f"{BASE_URL}/api/listings", params={"search": "car", "limit": 5})
+        assert response.status_code == 200
+        assert "listings" in response.json()
+
+    def test_listings_search_with_location(self):
+        """search and location filters combine"""
+        response = requests.get(f"{BASE_URL}/api/listings", params={"search": "car", "location": "Dar", "limit": 5})
+        assert response.status_code == 200
+
+
+class TestSearchSuggestions:
+    """Tests for GET /api/search/suggestions"""
+
+    def test_suggestions_prefix(self):
+        """GET /api/search/suggestions?q=ip - Partial words produce suggestions"""
+        response = requests.get(f"{BASE_URL}/api/search/suggestions", params={"q": "ip", "limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert "suggestions" in data
+        assert len(data["suggestions"]) <= 5
+        for suggestion in data["suggestions"]:
+            assert "query" in suggestion
+            assert "count" in suggestion
@@ -0,0 +1,62 @@
+"""
+Unit tests for queries without searchable tokens
+Tests:
+1. CJK and emoji queries fold to no tokens
+2. Both backends restrict such queries to a title substring match
+3. Ranked search returns only listings whose title contains the query
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.search_service import (  # noqa: E402
+    InMemorySearchBackend,
+    MongoTextSearchBackend,
+    tokenize,
+)
+
+LISTINGS = [
+    {"id": "l1", "title": "二手手机 iPhone", "boost_tier": 0, "created_at": "2026-01-01"},
+    {"id": "l2", "title": "Bike 🚲 for sale", "boost_tier": 0, "created_at": "2026-01-02"},
+    {"id": "l3", "title": "Wooden table", "boost_tier": 0, "created_at": "2026-01-03"},
+]
+
+
+class TestUntokenizedQueries:
+    """Queries made only of characters outside [a-z0-9] never match everything"""
+
+    @pytest.mark.parametrize("q", ["手机", "🚲", "  ¿¡  "])
+    def test_no_tokens(self, q):
+        assert tokenize(q) == []
+
+    @pytest.mark.parametrize("backend", [MongoTextSearchBackend, InMemorySearchBackend])
+    def test_match_filter_restricts(self, backend):
+        query = asyncio.run(backend(None).match_filter("手机"))
+        assert query == {"title": {"$regex": "手机", "$options": "i"}}
+
+    @pytest.mark.parametrize("backend", [MongoTextSearchBackend, InMemorySearchBackend])
+    def test_empty_query_is_unrestricted(self, backend):
+        assert asyncio.run(backend(None).match_filter("   ")) == {}
+
+    @pytest.mark.parametrize("backend", [MongoTextSearchBackend, InMemorySearchBackend])
+    def test_ranked_search(self, backend):
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        db = mongomock_motor.AsyncMongoMockClient()["search_test"]
+
+        async def run(q):
+            await db.listings.delete_many({})
+            await db.listings.insert_many([dict(doc) for doc in LISTINGS])
+            return await backend(db).ranked_search({}, q, {"_id": 0}, 0, 10)
+
+        docs, total = asyncio.run(run("手机"))
+        assert total == 1 and [d["id"] for d in docs] == ["l1"]
+        docs, total = asyncio.run(run("🚲"))
+        assert total == 1 and [d["id"] for d in docs] == ["l2"]
+        docs, total = asyncio.run(run("😀"))
+        assert total == 0 and docs == []
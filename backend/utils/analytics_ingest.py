@@ -0,0 +1,290 @@
+"""
+Analytics Event Ingestion for Avida
+Write-behind path for listing analytics events (page views, saves, ...).
+
+- Duplicate views are rejected in memory with a short-TTL (listing, ip_hash) set
+- A listing's seller and boost state come from a small TTL cache
+- Accepted events are buffered and flushed every ANALYTICS_INGEST_FLUSH_INTERVAL
+  seconds, or as soon as a batch is full. Each flush does one insert_many for the
+  raw events, one bulk_write of coalesced rollup upserts and one bulk_write of
+  coalesced listing counter updates
+- Backpressure: when the buffer is full, callers wait briefly for a flush,
+  then the event is dropped and counted
+- stop() drains the buffer on shutdown
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from utils.analytics_rollups import HyperLogLog, coalesce_ops, rollup_updates
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_INGEST_MAX_BUFFER = int(os.environ.get("ANALYTICS_INGEST_MAX_BUFFER", "20000"))
+ANALYTICS_INGEST_BATCH_SIZE = int(os.environ.get("ANALYTICS_INGEST_BATCH_SIZE", "1000"))
+ANALYTICS_INGEST_FLUSH_INTERVAL = float(os.environ.get("ANALYTICS_INGEST_FLUSH_INTERVAL", "1"))  # seconds
+ANALYTICS_INGEST_BACKPRESSURE_WAIT = float(os.environ.get("ANALYTICS_INGEST_BACKPRESSURE_WAIT", "0.5"))  # seconds
+ANALYTICS_DEDUP_TTL = int(os.environ.get("ANALYTICS_DEDUP_TTL", "300"))  # same listing + IP within 5 minutes
+ANALYTICS_DEDUP_MAX_KEYS = int(os.environ.get("ANALYTICS_DEDUP_MAX_KEYS", "200000"))
+ANALYTICS_LISTING_CACHE_TTL = int(os.environ.get("ANALYTICS_LISTING_CACHE_TTL", "30"))
+ANALYTICS_LISTING_CACHE_MAX = int(os.environ.get("ANALYTICS_LISTING_CACHE_MAX", "10000"))
+
+
+@dataclass
+class PendingEvent:
+    event: Dict[str, Any]             # analytics_events document
+    rollup: Dict[str, Any]            # rollup_updates() keyword arguments
+    listing_update: Optional[Dict[str, Any]] = None  # update on the listing (coalesced per listing)
+
+
+class _TTLMap:
+    """Insertion-ordered map with per-entry deadlines and a size bound."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def __contains__(self, key) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key, value=True):
+        now = time.monotonic()
+        self._data.pop(key, None)
+        self._data[key] = (now + self.ttl, value)
+        # Entries share one TTL, so the oldest are the first to expire
+        while self._data:
+            oldest_key, (deadline, _) = next(iter(self._data.items()))
+            if deadline > now and len(self._data) <= self.max_entries:
+                break
+            del self._data[oldest_key]
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AnalyticsIngestor:
+    """
+    Buffers analytics events and writes them in batches.
+    attach(db) at construction time of the services using it, start() from
+    the startup event and stop() on shutdown. Until start() is called events
+    are written through immediately.
+    """
+
+    def __init__(
+        self,
+        max_buffer: int = ANALYTICS_INGEST_MAX_BUFFER,
+        batch_size: int = ANALYTICS_INGEST_BATCH_SIZE,
+        flush_interval: float = ANALYTICS_INGEST_FLUSH_INTERVAL,
+        backpressure_wait: float = ANALYTICS_INGEST_BACKPRESSURE_WAIT
+    ):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure_wait = backpressure_wait
+        self._db = None
+        self._buffer: List[PendingEvent] = []
+        self._seen = _TTLMap(ANALYTICS_DEDUP_TTL, ANALYTICS_DEDUP_MAX_KEYS)
+        self._listings = _TTLMap(ANALYTICS_LISTING_CACHE_TTL, ANALYTICS_LISTING_CACHE_MAX)
+        self._hll = HyperLogLog()
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.accepted = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed = 0
+        self.listing_cache_hits = 0
+        self.listing_cache_misses = 0
+
+    def attach(self, db):
+        self._db = db
+
+    # -------------------------------------------------------------------------
+    # Request path
+    # -------------------------------------------------------------------------
+
+    async def listing_info(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        """Seller and boost state of a listing (None if it does not exist), cached briefly."""
+        cached = self._listings.get(listing_id, False)
+        if cached is not False:
+            self.listing_cache_hits += 1
+            return cached
+        self.listing_cache_misses += 1
+        listing = await self._db.listings.find_one(
+            {"id": listing_id}, {"_id": 0, "user_id": 1, "is_boosted": 1}
+        )
+        self._listings.set(listing_id, listing)
+        return listing
+
+    def invalidate_listing(self, listing_id: str):
+        self._listings.pop(listing_id)
+
+    def is_duplicate_view(self, listing_id: str, ip_hash: Optional[str]) -> bool:
+        """True if this IP viewed the listing within ANALYTICS_DEDUP_TTL; otherwise records the view."""
+        if not ip_hash:
+            return False
+        key = (listing_id, ip_hash)
+        if key in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen.set(key)
+        return False
+
+    async def submit(
+        self,
+        event: Dict[str, Any],
+        rollup: Dict[str, Any],
+        listing_update: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Queue an event for the next flush. Returns False if it was dropped under load."""
+        pending = PendingEvent(event, rollup, listing_update)
+        if self._task is None:
+            await self._write([pending])
+            return True
+
+        if len(self._buffer) >= self.max_buffer:
+            self.backpressure_waits += 1
+            self._has_space.clear()
+            self._wake.set()
+            try:
+                await asyncio.wait_for(self._has_space.wait(), self.backpressure_wait)
+            except asyncio.TimeoutError:
+                pass
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Analytics ingest buffer full, dropped {self.dropped} events so far")
+                return False
+
+        self._buffer.append(pending)
+        self.accepted += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    # -------------------------------------------------------------------------
+    # Flushing
+    # -------------------------------------------------------------------------
+
+    async def _write(self, batch: List[PendingEvent]) -> int:
+        try:
+            await self._db.analytics_events.insert_many([p.event for p in batch], ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything but the reported writes was inserted and still needs counting
+            rejected = {err["index"] for err in e.details.get("writeErrors", [])}
+            self.failed += len(rejected)
+            logger.warning(f"Analytics ingest insert failed for {len(rejected)} of {len(batch)} events: {e}")
+            batch = [p for i, p in enumerate(batch) if i not in rejected]
+            if not batch:
+                return 0
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Analytics ingest insert failed ({len(batch)} events): {e}")
+            return 0
+
+        updates = []
+        listing_updates = []
+        for p in batch:
+            updates += rollup_updates(**p.rollup, hll=self._hll)
+            if p.listing_update:
+                listing_updates.append((p.event["listing_id"], p.listing_update))
+        try:
+            if updates:
+                await self._db.analytics_rollups.bulk_write(coalesce_ops(updates), ordered=False)
+            if listing_updates:
+                await self._db.listings.bulk_write(
+                    coalesce_ops(listing_updates, key="id", upsert=False), ordered=False
+                )
+        except Exception as e:
+            logger.warning(f"Analytics ingest counter update failed ({len(batch)} events): {e}")
+
+        self.flushed += len(batch)
+        self.flushes += 1
+        return len(batch)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far, batch_size events at a time."""
+        if self._db is None:
+            return 0
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                self._has_space.set()
+                written += await self._write(batch)
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Analytics ingest flush error: {e}")
+
+    def start(self, db=None):
+        if db is not None:
+            self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Analytics ingest flusher started (every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flusher and drain the buffer."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        pending = len(self._buffer)
+        written = await self.flush()
+        if pending:
+            logger.info(f"Analytics ingest drained {written}/{pending} buffered events")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed": self.failed,
+            "dedup_keys": len(self._seen),
+            "listing_cache": {
+                "entries": len(self._listings),
+                "hits": self.listing_cache_hits,
+                "misses": self.listing_cache_misses,
+            },
+        }
+
+
+# Singleton instance
+analytics_ingestor = AnalyticsIngestor()
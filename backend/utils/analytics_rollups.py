@@ -0,0 +1,450 @@
+"""
+Listing Analytics Rollups for Avida
+Hourly and daily buckets per listing and per seller, maintained at write time
+so the metrics endpoints read O(buckets) documents instead of raw
+analytics_events.
+
+- One document per (scope, owner, grain, bucket) in analytics_rollups,
+  written with $inc/$max upserts (4 per event, coalesced per bucket when
+  events are written in batches)
+- Counts per event type, boosted vs organic views, and view breakdowns by
+  hour of day, device, referrer and location
+- Unique viewers per event type as HyperLogLog registers ($max per register),
+  merged across buckets at read time
+- Hourly buckets expire after ANALYTICS_ROLLUP_HOURLY_RETENTION_DAYS, daily
+  ones after ANALYTICS_ROLLUP_DAILY_RETENTION_DAYS; the "all" period covers
+  exactly that daily retention window
+- backfill_rollups: resumable migration that rolls up existing raw events, up
+  to the cutoff record_backfill_cutoff() fixes before live rollups start
+"""
+
+import os
+import math
+import hashlib
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUP_HLL_PRECISION = int(os.environ.get("ANALYTICS_ROLLUP_HLL_PRECISION", "11"))  # 2048 registers, ~2.3% error
+ANALYTICS_ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get("ANALYTICS_ROLLUP_HOURLY_RETENTION_DAYS", "14"))
+ANALYTICS_ROLLUP_DAILY_RETENTION_DAYS = int(os.environ.get("ANALYTICS_ROLLUP_DAILY_RETENTION_DAYS", "400"))
+
+ROLLUP_BACKFILL_MIGRATION_ID = "analytics_rollups_backfill"
+ROLLUP_BACKFILL_LEASE_SECONDS = 300
+
+SCOPE_LISTING = "listing"
+SCOPE_SELLER = "seller"
+GRAIN_HOUR = "hour"
+GRAIN_DAY = "day"
+
+# Both tracking endpoints write analytics_events with different names for the same actions
+CHAT_EVENT_TYPES = ("chat_initiated", "chat_start")
+OFFER_EVENT_TYPES = ("offer_received", "offer_made")
+
+# View breakdown dimensions stored in each bucket
+DIMENSIONS = ("device", "referrer", "location")
+
+
+# =============================================================================
+# HYPERLOGLOG
+# =============================================================================
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch with sparse registers ({"index": rank}), so a single
+    observation can be applied in Mongo as {"$max": {"hll.<type>.<index>": rank}}.
+    """
+
+    def __init__(self, precision: int = ANALYTICS_ROLLUP_HLL_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers: Dict[int, int] = {}
+
+    def position(self, value: str) -> Tuple[int, int]:
+        """(register index, rank) for a value."""
+        h = int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        return index, rank
+
+    def add(self, value: str):
+        index, rank = self.position(value)
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, registers: Optional[Dict[str, int]]):
+        """Merge stored registers (string keys, as read back from Mongo)."""
+        for key, rank in (registers or {}).items():
+            index = int(key)
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+
+    def estimate(self) -> int:
+        if not self.registers:
+            return 0
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        zeros = m - len(self.registers)
+        harmonic = zeros + sum(2.0 ** -rank for rank in self.registers.values())
+        estimate = alpha * m * m / harmonic
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+# =============================================================================
+# BUCKETS
+# =============================================================================
+
+def _as_datetime(ts: Any) -> datetime:
+    if isinstance(ts, str) and ts:
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if not isinstance(ts, datetime):
+        return datetime.now(timezone.utc)
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def bucket_key(ts: datetime, grain: str) -> str:
+    """Sortable bucket label: 2026-10-16T12 (hour) or 2026-10-16 (day)."""
+    return ts.strftime("%Y-%m-%dT%H" if grain == GRAIN_HOUR else "%Y-%m-%d")
+
+
+def _field(value: Any) -> str:
+    """Breakdown values become field names: no dots, no leading $."""
+    text = str(value).strip()[:64] or "unknown"
+    return text.replace(".", "_").lstrip("$") or "unknown"
+
+
+def rollup_updates(
+    listing_id: str,
+    seller_id: Optional[str],
+    event_type: str,
+    timestamp: Any = None,
+    viewer_key: Optional[str] = None,
+    is_boosted: bool = False,
+    device: Optional[str] = None,
+    referrer: Optional[str] = None,
+    location: Optional[str] = None,
+    hll: Optional[HyperLogLog] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """(bucket _id, update) pairs applying one event to its listing and seller buckets."""
+    ts = _as_datetime(timestamp)
+    hll = hll or HyperLogLog()
+    event_type = _field(event_type)
+
+    inc: Dict[str, int] = {f"events.{event_type}": 1}
+    if event_type == "view":
+        inc["views_boosted" if is_boosted else "views_organic"] = 1
+        inc[f"view_hours.{ts.hour}"] = 1
+        for dim, value in zip(DIMENSIONS, (device, referrer, location)):
+            inc[f"{dim}.{_field(value or ('direct' if dim == 'referrer' else 'unknown'))}"] = 1
+
+    update: Dict[str, Any] = {"$inc": inc}
+    if viewer_key:
+        index, rank = hll.position(viewer_key)
+        update["$max"] = {f"hll.{event_type}.{index}": rank}
+
+    updates = []
+    scopes = [(SCOPE_LISTING, listing_id)]
+    if seller_id:
+        scopes.append((SCOPE_SELLER, seller_id))
+    for scope, owner_id in scopes:
+        for grain, retention in (
+            (GRAIN_HOUR, ANALYTICS_ROLLUP_HOURLY_RETENTION_DAYS),
+            (GRAIN_DAY, ANALYTICS_ROLLUP_DAILY_RETENTION_DAYS),
+        ):
+            bucket = bucket_key(ts, grain)
+            start = ts.replace(minute=0, second=0, microsecond=0)
+            if grain == GRAIN_DAY:
+                start = start.replace(hour=0)
+            on_insert = {
+                "scope": scope,
+                "owner_id": owner_id,
+                "grain": grain,
+                "bucket": bucket,
+                "expires_at": start + timedelta(days=retention),
+            }
+            bucket_update = {**update, "$setOnInsert": on_insert}
+            if scope == SCOPE_LISTING and seller_id:
+                # Set on every event so a bucket first written without a seller picks it up later
+                bucket_update["$set"] = {"seller_id": seller_id}
+            updates.append((f"{scope}:{owner_id}:{grain}:{bucket}", bucket_update))
+    return updates
+
+
+def rollup_ops(*args, **kwargs) -> List[UpdateOne]:
+    """Upserts applying one event to its listing and seller buckets."""
+    return [UpdateOne({"_id": _id}, update, upsert=True) for _id, update in rollup_updates(*args, **kwargs)]
+
+
+def merge_update(into: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two updates of the same document: $inc adds, $max keeps the max, other operators keep the first value."""
+    for op, fields in update.items():
+        target = into.setdefault(op, {})
+        for path, value in fields.items():
+            if path not in target:
+                target[path] = value
+            elif op == "$inc":
+                target[path] += value
+            elif op == "$max":
+                target[path] = max(target[path], value)
+    return into
+
+
+def coalesce_ops(updates: Iterable[Tuple[str, Dict[str, Any]]], key: str = "_id", upsert: bool = True) -> List[UpdateOne]:
+    """One UpdateOne per document for many (id, update) pairs."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for doc_id, update in updates:
+        merge_update(merged.setdefault(doc_id, {}), update)
+    return [UpdateOne({key: doc_id}, update, upsert=upsert) for doc_id, update in merged.items()]
+
+
+# =============================================================================
+# PERIODS
+# =============================================================================
+
+PERIOD_DELTAS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "90d": timedelta(days=90),
+    "all": None,
+}
+
+
+def period_range(period: str, now: Optional[datetime] = None, offset: int = 0) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    (grain, first bucket, end bucket exclusive) covering the period, aligned to
+    bucket boundaries. offset=1 gives the period immediately before.
+    24h reads hourly buckets; longer periods read daily buckets. "all" is
+    capped at the daily bucket retention (older buckets have expired) and
+    has no previous period to offset into.
+    """
+    now = now or datetime.now(timezone.utc)
+    delta = PERIOD_DELTAS.get(period)
+    if delta is None:
+        start = now - timedelta(days=ANALYTICS_ROLLUP_DAILY_RETENTION_DAYS)
+        return GRAIN_DAY, bucket_key(start, GRAIN_DAY), None
+    grain = GRAIN_HOUR if delta <= timedelta(hours=24) else GRAIN_DAY
+    end = now - delta * offset
+    start = end - delta
+    return grain, bucket_key(start, grain), (bucket_key(end, grain) if offset else None)
+
+
+# =============================================================================
+# SERVICE
+# =============================================================================
+
+class AnalyticsRollups:
+    """Reads the analytics_rollups collection (writes go through utils.analytics_ingest)."""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.analytics_rollups
+
+    async def buckets(
+        self,
+        scope: str,
+        owner_id: str,
+        period: str,
+        offset: int = 0,
+        with_unique: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Buckets for one listing or seller over a period, oldest first."""
+        grain, start, end = period_range(period, offset=offset)
+        query: Dict[str, Any] = {"scope": scope, "owner_id": owner_id, "grain": grain}
+        if start or end:
+            query["bucket"] = {k: v for k, v in (("$gte", start), ("$lt", end)) if v}
+        projection = {"_id": 0} if with_unique else {"_id": 0, "hll": 0}
+        return await self.collection.find(query, projection).sort("bucket", 1).to_list(None)
+
+    async def per_listing_totals(self, seller_id: str, period: str) -> List[Dict[str, Any]]:
+        """Event counts per listing of a seller over a period, grouped in Mongo."""
+        grain, start, _ = period_range(period)
+        match: Dict[str, Any] = {"scope": SCOPE_LISTING, "seller_id": seller_id, "grain": grain}
+        if start:
+            match["bucket"] = {"$gte": start}
+        pipeline = [
+            {"$match": match},
+            {"$project": {"owner_id": 1, "events": {"$objectToArray": {"$ifNull": ["$events", {}]}}}},
+            {"$unwind": "$events"},
+            {"$group": {"_id": {"listing_id": "$owner_id", "type": "$events.k"}, "count": {"$sum": "$events.v"}}},
+        ]
+        totals: Dict[str, Dict[str, int]] = {}
+        async for row in self.collection.aggregate(pipeline):
+            totals.setdefault(row["_id"]["listing_id"], {})[row["_id"]["type"]] = row["count"]
+        return [{"listing_id": listing_id, "events": events} for listing_id, events in totals.items()]
+
+
+def summarize(buckets: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fold buckets into totals: events per type, unique estimates per type,
+    boosted/organic views, hour-of-day views, views per day and per-dimension views.
+    """
+    events: Dict[str, int] = {}
+    sketches: Dict[str, HyperLogLog] = {}
+    view_hours = [0] * 24
+    daily_views: Dict[str, int] = {}
+    dims: Dict[str, Dict[str, int]] = {dim: {} for dim in DIMENSIONS}
+    boosted = organic = 0
+
+    for bucket in buckets:
+        for event_type, count in (bucket.get("events") or {}).items():
+            events[event_type] = events.get(event_type, 0) + count
+        for event_type, registers in (bucket.get("hll") or {}).items():
+            sketches.setdefault(event_type, HyperLogLog()).merge(registers)
+        for hour, count in (bucket.get("view_hours") or {}).items():
+            view_hours[int(hour)] += count
+        views = (bucket.get("events") or {}).get("view", 0)
+        if views:
+            day = bucket["bucket"][:10]
+            daily_views[day] = daily_views.get(day, 0) + views
+        for dim in DIMENSIONS:
+            for value, count in (bucket.get(dim) or {}).items():
+                dims[dim][value] = dims[dim].get(value, 0) + count
+        boosted += bucket.get("views_boosted", 0)
+        organic += bucket.get("views_organic", 0)
+
+    return {
+        "events": events,
+        "unique": {event_type: sketch.estimate() for event_type, sketch in sketches.items()},
+        "views_boosted": boosted,
+        "views_organic": organic,
+        "view_hours": view_hours,
+        "daily_views": daily_views,
+        **dims,
+    }
+
+
+def count_of(events: Dict[str, int], *event_types: str) -> int:
+    return sum(events.get(t, 0) for t in event_types)
+
+
+# =============================================================================
+# BACKFILL
+# =============================================================================
+
+async def _claim_backfill(db) -> Optional[Dict[str, Any]]:
+    """Take (or renew) the backfill lease so only one worker applies $inc for an event."""
+    now = datetime.now(timezone.utc)
+    try:
+        return await db.migrations.find_one_and_update(
+            {
+                "_id": ROLLUP_BACKFILL_MIGRATION_ID,
+                "completed_at": {"$exists": False},
+                "$or": [{"locked_until": {"$exists": False}}, {"locked_until": {"$lt": now}}],
+            },
+            {"$set": {"locked_until": now + timedelta(seconds=ROLLUP_BACKFILL_LEASE_SECONDS)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return None  # completed, or another worker holds the lease
+
+
+async def record_backfill_cutoff(db):
+    """
+    Fix the newest _id backfill_rollups may read. Call before the analytics
+    ingestor starts: everything it writes is rolled up at write time and so
+    must sort above the cutoff. The first worker to record one wins.
+    """
+    state = await db.migrations.find_one({"_id": ROLLUP_BACKFILL_MIGRATION_ID}, {"upper_id": 1, "completed_at": 1})
+    if state and ("upper_id" in state or state.get("completed_at")):
+        return
+    newest = await db.analytics_events.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(1)
+    try:
+        await db.migrations.update_one(
+            {"_id": ROLLUP_BACKFILL_MIGRATION_ID, "upper_id": {"$exists": False}, "completed_at": {"$exists": False}},
+            {"$set": {"upper_id": newest[0]["_id"] if newest else None, "started_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # another worker recorded its cutoff first
+
+
+async def backfill_rollups(db, batch_size: int = 1000) -> int:
+    """
+    Roll up analytics_events written before rollups existed.
+    Resumable: progress is checkpointed by _id in db.migrations under a lease,
+    so a restart continues where the last batch ended and concurrent workers
+    do not count the same events twice. Events are only read up to the
+    cutoff from record_backfill_cutoff(), since newer events are already
+    rolled up by the ingestor.
+    """
+    state = await _claim_backfill(db)
+    if not state:
+        return 0
+
+    upper_id = state.get("upper_id")
+    if "upper_id" not in state:
+        # No cutoff recorded before the ingestor started; the newest event is the best guess
+        newest = await db.analytics_events.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(1)
+        if newest:
+            upper_id = newest[0]["_id"]
+            await db.migrations.update_one(
+                {"_id": ROLLUP_BACKFILL_MIGRATION_ID},
+                {"$set": {"upper_id": upper_id, "started_at": datetime.now(timezone.utc)}}
+            )
+
+    hll = HyperLogLog()
+    last_id = state.get("last_id")
+    processed = 0
+    while upper_id is not None:
+        id_range: Dict[str, Any] = {"$lte": upper_id}
+        if last_id is not None:
+            id_range["$gt"] = last_id
+        batch = await db.analytics_events.find({"_id": id_range}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        # Events from the seller analytics endpoint carry no seller_id
+        missing = {e["listing_id"] for e in batch if not e.get("seller_id") and e.get("listing_id")}
+        owners = {}
+        if missing:
+            async for listing in db.listings.find({"id": {"$in": list(missing)}}, {"_id": 0, "id": 1, "user_id": 1}):
+                owners[listing["id"]] = listing.get("user_id")
+
+        updates = []
+        for event in batch:
+            if not event.get("listing_id") or not event.get("event_type"):
+                continue
+            updates += rollup_updates(
+                event["listing_id"],
+                event.get("seller_id") or owners.get(event["listing_id"]),
+                event["event_type"],
+                event.get("timestamp"),
+                event.get("viewer_id") or event.get("user_id") or event.get("viewer_ip_hash") or event.get("ip_hash"),
+                bool(event.get("is_boosted")),
+                event.get("device_type") or event.get("device"),
+                event.get("referrer"),
+                event.get("location") or event.get("city") or event.get("region"),
+                hll
+            )
+        if updates:
+            await db.analytics_rollups.bulk_write(coalesce_ops(updates), ordered=False)
+
+        processed += len(batch)
+        last_id = batch[-1]["_id"]
+        now = datetime.now(timezone.utc)
+        await db.migrations.update_one(
+            {"_id": ROLLUP_BACKFILL_MIGRATION_ID},
+            {"$set": {
+                "last_id": last_id,
+                "updated_at": now,
+                "locked_until": now + timedelta(seconds=ROLLUP_BACKFILL_LEASE_SECONDS),
+            }, "$inc": {"scanned": len(batch)}}
+        )
+
+    await db.migrations.update_one(
+        {"_id": ROLLUP_BACKFILL_MIGRATION_ID},
+        {"$set": {"completed_at": datetime.now(timezone.utc)}, "$unset": {"locked_until": ""}}
+    )
+    if processed:
+        logger.info(f"Rolled up {processed} existing analytics events")
+    return processed
@@ -0,0 +1,118 @@
+"""
+Boost Expiry for Avida
+Set-based expiry of listing boosts, run by the expire_boosts background task.
+
+Each batch costs a fixed number of round-trips regardless of its size:
+- one find for the ids of due boosts (oldest expiry first)
+- one update_many flipping them to expired
+- one aggregation for the boosts still active on the affected listings
+- one bulk_write for the listing flags
+
+Batches repeat until the backlog is drained. The ids of listings whose boost
+state changed are handed to a callback so caches can invalidate precisely.
+"""
+
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BOOST_EXPIRY_BATCH_SIZE = int(os.environ.get("BOOST_EXPIRY_BATCH_SIZE", "1000"))
+
+ListingsChanged = Callable[[List[str]], Awaitable[Any]]
+
+
+def expired_boost_query(now: datetime) -> Dict[str, Any]:
+    """Active boosts due at `now`; expires_at is an ISO string or a BSON date depending on the writer."""
+    return {
+        "status": "active",
+        "$or": [
+            {"expires_at": {"$lte": now.isoformat()}},
+            {"expires_at": {"$lte": now}},
+        ],
+    }
+
+
+def listing_updates(expired: Iterable[Dict[str, Any]], still_active: Dict[str, set]) -> List[UpdateOne]:
+    """
+    One UpdateOne per listing: unset the expired boost types (unless the
+    listing was re-boosted with the same type) and clear the boost flags when
+    nothing is left active.
+    """
+    expired_types: Dict[str, set] = {}
+    for boost in expired:
+        listing_id = boost.get("listing_id")
+        if not listing_id:
+            continue
+        types = expired_types.setdefault(listing_id, set())
+        if boost.get("boost_type"):
+            types.add(boost["boost_type"])
+
+    ops = []
+    for listing_id, types in expired_types.items():
+        active_types = still_active.get(listing_id)
+        update: Dict[str, Any] = {}
+        unset = {f"boosts.{t}": "" for t in sorted(types - (active_types or set()))}
+        if unset:
+            update["$unset"] = unset
+        if active_types is None:
+            update["$set"] = {"is_boosted": False, "boost_priority": 0, "boost_tier": 0}
+        if update:
+            ops.append(UpdateOne({"id": listing_id}, update))
+    return ops
+
+
+async def expire_boosts(
+    db,
+    now: Optional[datetime] = None,
+    batch_size: int = BOOST_EXPIRY_BATCH_SIZE,
+    on_listings_changed: Optional[ListingsChanged] = None
+) -> Dict[str, int]:
+    """Expire every boost due at `now`, batch by batch. Returns boost/listing/batch counts."""
+    now = now or datetime.now(timezone.utc)
+    query = expired_boost_query(now)
+    stats = {"boosts": 0, "listings": 0, "batches": 0}
+
+    while True:
+        expired = await db.listing_boosts.find(
+            query, {"_id": 0, "id": 1, "listing_id": 1, "boost_type": 1}
+        ).sort("expires_at", 1).limit(batch_size).to_list(batch_size)
+        if not expired:
+            break
+
+        result = await db.listing_boosts.update_many(
+            {"id": {"$in": [b["id"] for b in expired]}, "status": "active"},
+            {"$set": {"status": "expired", "expired_at": now.isoformat()}}
+        )
+
+        listing_ids = list({b["listing_id"] for b in expired if b.get("listing_id")})
+        still_active: Dict[str, set] = {}
+        if listing_ids:
+            async for row in db.listing_boosts.aggregate([
+                {"$match": {"listing_id": {"$in": listing_ids}, "status": "active"}},
+                {"$group": {"_id": "$listing_id", "types": {"$addToSet": "$boost_type"}}},
+            ]):
+                still_active[row["_id"]] = {t for t in row.get("types", []) if t}
+
+        ops = listing_updates(expired, still_active)
+        if ops:
+            await db.listings.bulk_write(ops, ordered=False)
+
+        stats["boosts"] += result.modified_count
+        stats["listings"] += len(listing_ids)
+        stats["batches"] += 1
+
+        if on_listings_changed and listing_ids:
+            try:
+                await on_listings_changed(listing_ids)
+            except Exception as e:
+                logger.error(f"Boost expiry listener failed for {len(listing_ids)} listing(s): {e}")
+
+        if len(expired) < batch_size:
+            break
+
+    return stats
@@ -1,14 +1,24 @@
 """
 Redis Caching Layer for Avida
 High-performance caching for listings, categories, and feed data.
+
+- Soft/hard TTLs: after the soft TTL a value is served stale while one
+  background refresh runs; after the hard TTL it is gone
+- Single-flight: concurrent misses for a key share one computation per
+  process, and a short Redis lock coalesces them across workers
+- The in-memory fallback is a size-bounded LRU
+- Per-prefix hit/miss/refresh counters via get_stats()
 """
 
 import os
 import json
+import time
+import uuid
+import asyncio
 import hashlib
 import logging
-from typing import Optional, Any, Callable
-from datetime import datetime, timezone
+from collections import OrderedDict, defaultdict
+from typing import Optional, Any, Awaitable, Callable, Dict, Tuple
 from functools import wraps
 
 logger = logging.getLogger(__name__)
@@ -36,9 +46,57 @@ CACHE_TTL = {
     "listing_detail": 60,          # 1 minute for listing details
 }
 
+CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get("CACHE_MEMORY_MAX_ENTRIES", "5000"))
+CACHE_LOCK_TTL_MS = int(os.environ.get("CACHE_LOCK_TTL_MS", "10000"))
+CACHE_LOCK_WAIT_SECONDS = float(os.environ.get("CACHE_LOCK_WAIT_SECONDS", "2"))
+
+# Marks values stored with a soft-expiry envelope
+_ENVELOPE = "__cache_v1"
+
+
+class MemoryLRU:
+    """Size-bounded LRU map of key -> (value, soft deadline, hard deadline)."""
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, soft, hard = entry
+        if hard <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value, soft
+
+    def set(self, key: str, value: Any, soft_ttl: float, hard_ttl: float):
+        now = time.time()
+        self._data[key] = (value, now + soft_ttl, now + hard_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def __len__(self):
+        return len(self._data)
+
+
 # In-memory cache fallback (when Redis unavailable)
-_memory_cache = {}
-_memory_cache_expires = {}
+_memory_cache = MemoryLRU()
+
+
+def _prefix(key: str) -> str:
+    return key.split(":", 1)[0]
 
 
 class CacheService:
@@ -50,6 +108,10 @@ class CacheService:
     def __init__(self):
         self.redis_client = None
         self.connected = False
+        # Per-process single-flight: key -> future of the running computation
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: set = set()
+        self._metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
         
     async def connect(self):
         """Initialize Redis connection."""
@@ -75,51 +137,188 @@ class CacheService:
             self.connected = False
             return False
     
+    async def _get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, soft deadline) if the key has not hard-expired."""
+        if self.connected and self.redis_client:
+            raw = await self.redis_client.get(key)
+            if not raw:
+                return None
+            value = json.loads(raw)
+            if isinstance(value, dict) and _ENVELOPE in value:
+                return value["v"], value[_ENVELOPE]
+            return value, float("inf")
+        return _memory_cache.get(key)
+
     async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
+        """Get value from cache (stale values are returned until the hard TTL)."""
         try:
-            if self.connected and self.redis_client:
-                value = await self.redis_client.get(key)
-                if value:
-                    return json.loads(value)
-            else:
-                # Memory cache fallback
-                if key in _memory_cache:
-                    expires = _memory_cache_expires.get(key, 0)
-                    if expires > datetime.now(timezone.utc).timestamp():
-                        return _memory_cache[key]
-                    else:
-                        # Expired
-                        del _memory_cache[key]
-                        del _memory_cache_expires[key]
+            entry = await self._get_entry(key)
+            if entry:
+                return entry[0]
         except Exception as e:
             logger.debug(f"Cache get error: {e}")
         return None
     
-    async def set(self, key: str, value: Any, ttl: int = 60) -> bool:
-        """Set value in cache with TTL."""
+    async def set(self, key: str, value: Any, ttl: int = 60, stale_ttl: int = 0) -> bool:
+        """
+        Set value in cache. It is fresh for `ttl` seconds and may be served
+        stale for `stale_ttl` more seconds while it is refreshed.
+        """
         try:
-            serialized = json.dumps(value, default=str)
-            
+            hard_ttl = ttl + max(stale_ttl, 0)
             if self.connected and self.redis_client:
-                await self.redis_client.setex(key, ttl, serialized)
+                if stale_ttl:
+                    payload = {_ENVELOPE: time.time() + ttl, "v": value}
+                else:
+                    payload = value
+                await self.redis_client.setex(key, hard_ttl, json.dumps(payload, default=str))
             else:
                 # Memory cache fallback
-                _memory_cache[key] = value
-                _memory_cache_expires[key] = datetime.now(timezone.utc).timestamp() + ttl
+                _memory_cache.set(key, value, ttl, hard_ttl)
             return True
         except Exception as e:
             logger.debug(f"Cache set error: {e}")
             return False
     
+    # -------------------------------------------------------------------------
+    # Single-flight + stale-while-revalidate
+    # -------------------------------------------------------------------------
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Cross-worker lock for recomputing `key`; returns a token or None."""
+        if not (self.connected and self.redis_client):
+            return "local"
+        token = uuid.uuid4().hex
+        try:
+            if await self.redis_client.set(f"lock:{key}", token, nx=True, px=CACHE_LOCK_TTL_MS):
+                return token
+        except Exception as e:
+            logger.debug(f"Cache lock error: {e}")
+            return "local"
+        return None
+
+    async def _release_lock(self, key: str, token: Optional[str]):
+        if token in (None, "local") or not self.redis_client:
+            return
+        try:
+            # Only delete the lock if we still own it
+            await self.redis_client.eval(
+                "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+                1, f"lock:{key}", token
+            )
+        except Exception as e:
+            logger.debug(f"Cache unlock error: {e}")
+
+    async def _compute_and_store(self, key, compute, ttl, stale_ttl):
+        value = await compute()
+        if value is not None:
+            await self.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+        return value
+
+    async def _refresh(self, key, compute, ttl, stale_ttl):
+        metrics = self._metrics[_prefix(key)]
+        token = await self._acquire_lock(key)
+        if token is None:
+            self._refreshing.discard(key)
+            return  # another worker is refreshing
+        try:
+            await self._compute_and_store(key, compute, ttl, stale_ttl)
+            metrics["refreshes"] += 1
+        except Exception as e:
+            metrics["errors"] += 1
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            await self._release_lock(key, token)
+            self._refreshing.discard(key)
+
+    async def _load(self, key, compute, ttl, stale_ttl):
+        metrics = self._metrics[_prefix(key)]
+        token = await self._acquire_lock(key)
+        if token is None:
+            # Another worker holds the lock: wait briefly for its value
+            metrics["lock_waits"] += 1
+            deadline = time.monotonic() + CACHE_LOCK_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await self._get_entry(key)
+                if entry:
+                    return entry[0]
+        try:
+            return await self._compute_and_store(key, compute, ttl, stale_ttl)
+        finally:
+            await self._release_lock(key, token)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 60,
+        stale_ttl: int = 0
+    ) -> Any:
+        """
+        Return the cached value for `key`, computing it at most once at a time.
+
+        - fresh: returned directly
+        - stale (past ttl, within ttl + stale_ttl): returned directly while a
+          single background refresh runs
+        - missing: concurrent callers share one computation
+        """
+        metrics = self._metrics[_prefix(key)]
+        try:
+            entry = await self._get_entry(key)
+        except Exception as e:
+            logger.debug(f"Cache get error: {e}")
+            entry = None
+
+        if entry:
+            value, soft_deadline = entry
+            if soft_deadline > time.time():
+                metrics["hits"] += 1
+                return value
+            metrics["stale_hits"] += 1
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                asyncio.create_task(self._refresh(key, compute, ttl, stale_ttl))
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            metrics["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        metrics["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, compute, ttl, stale_ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            metrics["errors"] += 1
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.connected else "memory",
+            "memory_entries": len(_memory_cache),
+            "memory_max_entries": _memory_cache.max_entries,
+            "memory_evictions": _memory_cache.evictions,
+            "inflight": len(self._inflight),
+            "prefixes": {prefix: dict(counts) for prefix, counts in self._metrics.items()},
+        }
+    
     async def delete(self, key: str) -> bool:
         """Delete key from cache."""
         try:
             if self.connected and self.redis_client:
                 await self.redis_client.delete(key)
             else:
-                _memory_cache.pop(key, None)
-                _memory_cache_expires.pop(key, None)
+                _memory_cache.pop(key)
             return True
         except Exception as e:
             logger.debug(f"Cache delete error: {e}")
@@ -130,15 +329,21 @@ class CacheService:
         count = 0
         try:
             if self.connected and self.redis_client:
-                async for key in self.redis_client.scan_iter(match=pattern):
-                    await self.redis_client.delete(key)
-                    count += 1
+                # Collect keys per SCAN page and UNLINK them in batches
+                # instead of one DELETE round trip per key
+                batch = []
+                async for key in self.redis_client.scan_iter(match=pattern, count=1000):
+                    batch.append(key)
+                    if len(batch) >= 500:
+                        count += await self.redis_client.unlink(*batch)
+                        batch = []
+                if batch:
+                    count += await self.redis_client.unlink(*batch)
             else:
                 # Memory cache
                 keys_to_delete = [k for k in _memory_cache.keys() if pattern.replace("*", "") in k]
                 for key in keys_to_delete:
-                    _memory_cache.pop(key, None)
-                    _memory_cache_expires.pop(key, None)
+                    _memory_cache.pop(key)
                     count += 1
         except Exception as e:
             logger.debug(f"Cache delete_pattern error: {e}")
@@ -170,33 +375,22 @@ def generate_cache_key(*args, **kwargs) -> str:
     return hashlib.md5(key_data.encode()).hexdigest()[:16]
 
 
-def cached(prefix: str, ttl: int = 60):
+def cached(prefix: str, ttl: int = 60, stale_ttl: int = 0):
     """
-    Decorator to cache function results.
+    Decorator to cache function results with single-flight recomputation.
     
     Usage:
-        @cached("feed", ttl=60)
+        @cached("feed", ttl=60, stale_ttl=120)
         async def get_listings(category, page):
             ...
     """
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generate cache key
             key = f"{prefix}:{generate_cache_key(*args, **kwargs)}"
-            
-            # Try to get from cache
-            cached_value = await cache.get(key)
-            if cached_value is not None:
-                return cached_value
-            
-            # Execute function
-            result = await func(*args, **kwargs)
-            
-            # Store in cache
-            await cache.set(key, result, ttl)
-            
-            return result
+            return await cache.get_or_compute(
+                key, lambda: func(*args, **kwargs), ttl=ttl, stale_ttl=stale_ttl
+            )
         return wrapper
     return decorator
 
@@ -0,0 +1,314 @@
+"""
+Cohort Activity Table for Avida
+One compact document per user in cohort_user_activity, so signup cohort
+retention is a single aggregation instead of count_documents with giant
+$in arrays per cohort and interval.
+
+- Each document holds the user's signup time, the start of their daily,
+  weekly and monthly signup cohort, the last time they were active, and
+  lifetime counters (listings, chats, transactions, boosts)
+- Materialized incrementally: users, listings and cohort_events are read
+  in _id order from per-source checkpoints stored in db.migrations, under
+  a lease so one worker applies each batch. Reads stop at ids generated
+  COHORT_ACTIVITY_SETTLE_SECONDS ago: ObjectIds come from each writer's
+  clock, so a newer document can commit with a lower _id than one already
+  read
+- retention_matrix: cohort x interval retention counts and metric totals
+  for a set of cohorts in one $group
+"""
+
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+COHORT_ACTIVITY_SYNC_INTERVAL = int(os.environ.get("COHORT_ACTIVITY_SYNC_INTERVAL", "60"))  # seconds
+COHORT_ACTIVITY_BATCH_SIZE = int(os.environ.get("COHORT_ACTIVITY_BATCH_SIZE", "5000"))
+COHORT_ACTIVITY_SETTLE_SECONDS = int(os.environ.get("COHORT_ACTIVITY_SETTLE_SECONDS", "30"))
+COHORT_ACTIVITY_LEASE_SECONDS = 300
+
+COHORT_ACTIVITY_SYNC_ID = "cohort_activity_sync"
+
+GRANULARITIES = ("daily", "weekly", "monthly")
+
+# Lifetime counters kept per user, by the cohort event that increments them
+EVENT_COUNTERS = {
+    "chat_started": "chats_started",
+    "checkout_completed": "transactions_completed",
+    "boost_used": "boosts_used",
+}
+LISTINGS_COUNTER = "listings_posted"
+COUNTERS = (LISTINGS_COUNTER, *EVENT_COUNTERS.values())
+
+_DAY_MS = 24 * 60 * 60 * 1000
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _to_utc(ts: Any) -> Optional[datetime]:
+    """ISO string or datetime (naive values are UTC) -> aware datetime, None if unusable."""
+    if isinstance(ts, str) and ts:
+        try:
+            ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(ts, datetime):
+        return None
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def cohort_start(ts: datetime, granularity: str) -> datetime:
+    """Start of the daily, weekly (Monday) or monthly cohort containing ts."""
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "monthly":
+        return day.replace(day=1)
+    if granularity == "weekly":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def cohort_field(granularity: str) -> str:
+    return f"cohort_{granularity}"
+
+
+def signup_fields(signup_at: datetime) -> Dict[str, Any]:
+    fields = {"signup_at": signup_at}
+    for granularity in GRANULARITIES:
+        fields[cohort_field(granularity)] = cohort_start(signup_at, granularity)
+    return fields
+
+
+# =============================================================================
+# RETENTION
+# =============================================================================
+
+async def retention_matrix(
+    db,
+    granularity: str,
+    period_starts: Iterable[datetime],
+    intervals: Dict[str, int]
+) -> Dict[datetime, Dict[str, int]]:
+    """
+    For each cohort start: user count, users active at or after
+    cohort start + N days for every interval, and counter totals.
+    One aggregation over cohort_user_activity, whatever the number of cohorts.
+    """
+    field = f"${cohort_field(granularity)}"
+    group: Dict[str, Any] = {"_id": field, "user_count": {"$sum": 1}}
+    for name, days in intervals.items():
+        group[name] = {"$sum": {"$cond": [
+            {"$gte": ["$last_active_at", {"$add": [field, days * _DAY_MS]}]}, 1, 0
+        ]}}
+    for counter in COUNTERS:
+        group[counter] = {"$sum": {"$ifNull": [f"${counter}", 0]}}
+
+    pipeline = [
+        {"$match": {cohort_field(granularity): {"$in": list(period_starts)}}},
+        {"$group": group},
+    ]
+    rows = {}
+    async for row in db.cohort_user_activity.aggregate(pipeline):
+        rows[_to_utc(row.pop("_id"))] = row
+    return rows
+
+
+# =============================================================================
+# MATERIALIZATION
+# =============================================================================
+
+def _user_updates(batch: List[Dict[str, Any]]) -> List[UpdateOne]:
+    ops = []
+    for user in batch:
+        user_id = user.get("id") or user.get("user_id")
+        signup_at = _to_utc(user.get("created_at"))
+        if not user_id or not signup_at:
+            continue
+        ops.append(UpdateOne({"_id": user_id}, {"$set": signup_fields(signup_at)}, upsert=True))
+    return ops
+
+
+def _listing_updates(batch: List[Dict[str, Any]]) -> List[UpdateOne]:
+    per_user: Dict[str, Dict[str, Any]] = {}
+    for listing in batch:
+        user_id = listing.get("user_id") or listing.get("seller_id")
+        if not user_id:
+            continue
+        entry = per_user.setdefault(user_id, {"count": 0, "last": None})
+        entry["count"] += 1
+        created_at = _to_utc(listing.get("created_at"))
+        if created_at and (entry["last"] is None or created_at > entry["last"]):
+            entry["last"] = created_at
+    ops = []
+    for user_id, entry in per_user.items():
+        update: Dict[str, Any] = {"$inc": {LISTINGS_COUNTER: entry["count"]}}
+        if entry["last"]:
+            update["$max"] = {"last_active_at": entry["last"]}
+        ops.append(UpdateOne({"_id": user_id}, update, upsert=True))
+    return ops
+
+
+def _event_updates(batch: List[Dict[str, Any]]) -> List[UpdateOne]:
+    last: Dict[str, datetime] = {}
+    counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for event in batch:
+        user_id = event.get("user_id")
+        ts = _to_utc(event.get("timestamp"))
+        if not user_id or not ts:
+            continue
+        if user_id not in last or ts > last[user_id]:
+            last[user_id] = ts
+        counter = EVENT_COUNTERS.get(event.get("event_type"))
+        if counter:
+            counts[user_id][counter] += 1
+    ops = []
+    for user_id, ts in last.items():
+        update: Dict[str, Any] = {"$max": {"last_active_at": ts}}
+        if counts.get(user_id):
+            update["$inc"] = dict(counts[user_id])
+        ops.append(UpdateOne({"_id": user_id}, update, upsert=True))
+    return ops
+
+
+# Source collection, projection and update builder, by checkpoint name
+SOURCES = {
+    "users": ("users", {"id": 1, "user_id": 1, "created_at": 1}, _user_updates),
+    "listings": ("listings", {"user_id": 1, "seller_id": 1, "created_at": 1}, _listing_updates),
+    "events": ("cohort_events", {"user_id": 1, "event_type": 1, "timestamp": 1}, _event_updates),
+}
+
+
+class CohortActivityTable:
+    """
+    Keeps cohort_user_activity up to date from users, listings and
+    cohort_events. start(db) from the startup event runs sync() every
+    COHORT_ACTIVITY_SYNC_INTERVAL seconds; the first run is the backfill.
+    Counters are at-least-once: a batch applied just before a crash (before
+    its checkpoint is saved) is counted again.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = COHORT_ACTIVITY_BATCH_SIZE,
+        interval: int = COHORT_ACTIVITY_SYNC_INTERVAL
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.applied = {name: 0 for name in SOURCES}
+        self.last_sync_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        try:
+            return await self._db.migrations.find_one_and_update(
+                {
+                    "_id": COHORT_ACTIVITY_SYNC_ID,
+                    "$or": [{"locked_until": {"$exists": False}}, {"locked_until": {"$lt": now}}],
+                },
+                {"$set": {"locked_until": now + timedelta(seconds=COHORT_ACTIVITY_LEASE_SECONDS)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return None  # another worker holds the lease
+
+    async def _sync_source(self, name: str, last_id) -> int:
+        collection, projection, build = SOURCES[name]
+        applied = 0
+        # Newer ids may still be joined by late commits with lower ids; the next sync reads them
+        settled = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=COHORT_ACTIVITY_SETTLE_SECONDS))
+        while True:
+            query = {"_id": {"$lt": settled}}
+            if last_id is not None:
+                query["_id"]["$gt"] = last_id
+            batch = await self._db[collection].find(query, projection).sort("_id", 1).limit(
+                self.batch_size
+            ).to_list(self.batch_size)
+            if not batch:
+                return applied
+
+            ops = build(batch)
+            if ops:
+                await self._db.cohort_user_activity.bulk_write(ops, ordered=False)
+            last_id = batch[-1]["_id"]
+            applied += len(batch)
+            self.applied[name] += len(batch)
+            now = datetime.now(timezone.utc)
+            await self._db.migrations.update_one(
+                {"_id": COHORT_ACTIVITY_SYNC_ID},
+                {"$set": {
+                    f"checkpoints.{name}": last_id,
+                    "updated_at": now,
+                    "locked_until": now + timedelta(seconds=COHORT_ACTIVITY_LEASE_SECONDS),
+                }}
+            )
+
+    async def sync(self, db=None) -> Dict[str, int]:
+        """Apply everything written since the last checkpoints. Returns documents read per source."""
+        if db is not None:
+            self._db = db
+        state = await self._claim()
+        if not state:
+            return {}
+        checkpoints = state.get("checkpoints", {})
+        applied = {}
+        try:
+            # Users first so new users get their cohort before their activity
+            for name in SOURCES:
+                applied[name] = await self._sync_source(name, checkpoints.get(name))
+        finally:
+            await self._db.migrations.update_one(
+                {"_id": COHORT_ACTIVITY_SYNC_ID}, {"$unset": {"locked_until": ""}}
+            )
+        self.runs += 1
+        self.last_sync_at = datetime.now(timezone.utc).isoformat()
+        if any(applied.values()):
+            logger.info(f"Cohort activity table synced: {applied}")
+        return applied
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Cohort activity sync error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, db=None):
+        if db is not None:
+            self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Cohort activity sync started (every {self.interval}s)")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "applied": dict(self.applied),
+            "last_sync_at": self.last_sync_at,
+            "last_error": self.last_error,
+        }
+
+
+# Singleton instance
+cohort_activity = CohortActivityTable()
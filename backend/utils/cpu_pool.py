@@ -0,0 +1,216 @@
+"""
+CPU Offload Pool for Avida
+Runs CPU-bound work (bcrypt, Pillow decode/resize/encode) off the event loop
+so one login or image upload does not stall every other request on the worker.
+
+- A process pool of CPU_POOL_WORKERS processes (spawned, not forked, so
+  workers do not inherit the loop, sockets or driver threads). Set
+  CPU_POOL_MODE=thread to use a thread pool instead
+- Functions passed to run() must be module-level so they can be pickled;
+  their module is imported once per worker process
+- At most CPU_POOL_MAX_PENDING tasks are submitted at once; the rest wait
+  on the loop, which is counted as queue wait
+- Per-label queue wait and execution time, plus event-loop lag sampled every
+  CPU_POOL_LAG_INTERVAL seconds, are exposed via get_stats()
+"""
+
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CPU_POOL_MODE = os.environ.get("CPU_POOL_MODE", "process")  # process, thread
+CPU_POOL_WORKERS = int(os.environ.get("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+CPU_POOL_MAX_PENDING = int(os.environ.get("CPU_POOL_MAX_PENDING", str(CPU_POOL_WORKERS * 8)))
+CPU_POOL_LAG_INTERVAL = float(os.environ.get("CPU_POOL_LAG_INTERVAL", "0.5"))  # seconds
+
+
+def _timed_call(fn: Callable, args: Tuple, kwargs: Dict) -> Tuple[Any, float, float]:
+    """Runs in the worker: the result plus wall-clock start/end for queue-wait accounting."""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time()
+
+
+class TaskStats:
+    """Counters for one label."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.exec_ms_total = 0.0
+        self.exec_ms_max = 0.0
+
+    def record(self, wait_ms: float, exec_ms: float):
+        self.calls += 1
+        self.wait_ms_total += wait_ms
+        self.exec_ms_total += exec_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        self.exec_ms_max = max(self.exec_ms_max, exec_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        done = self.calls or 1
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_wait_ms": round(self.wait_ms_total / done, 2),
+            "max_wait_ms": round(self.wait_ms_max, 2),
+            "avg_exec_ms": round(self.exec_ms_total / done, 2),
+            "max_exec_ms": round(self.exec_ms_max, 2),
+        }
+
+
+class LoopLagMonitor:
+    """Measures how late the loop wakes a sleeper: a direct reading of event-loop stalls."""
+
+    def __init__(self, interval: float = CPU_POOL_LAG_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.lag_ms_total = 0.0
+        self.lag_ms_max = 0.0
+        self.lag_ms_last = 0.0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, (loop.time() - expected) * 1000)
+            self.samples += 1
+            self.lag_ms_total += lag
+            self.lag_ms_max = max(self.lag_ms_max, lag)
+            self.lag_ms_last = lag
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def reset(self):
+        self.samples = 0
+        self.lag_ms_total = self.lag_ms_max = self.lag_ms_last = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "avg_ms": round(self.lag_ms_total / self.samples, 2) if self.samples else 0.0,
+            "max_ms": round(self.lag_ms_max, 2),
+            "last_ms": round(self.lag_ms_last, 2),
+        }
+
+
+class CpuPool:
+    """Shared executor for CPU-bound helpers; created lazily on first use."""
+
+    def __init__(
+        self,
+        mode: str = CPU_POOL_MODE,
+        workers: int = CPU_POOL_WORKERS,
+        max_pending: int = CPU_POOL_MAX_PENDING
+    ):
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stats: Dict[str, TaskStats] = defaultdict(TaskStats)
+        self.in_flight = 0
+        self.waiting = 0
+        self.restarts = 0
+        self.lag = LoopLagMonitor()
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu-pool")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _ensure(self):
+        if self._executor is None:
+            self._executor = self._create_executor()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    async def run(self, fn: Callable, *args, label: Optional[str] = None, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) in the pool and await its result."""
+        self._ensure()
+        stats = self._stats[label or fn.__name__]
+        queued = time.time()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        executor = self._executor
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(
+                executor, _timed_call, fn, args, kwargs
+            )
+        except BrokenProcessPool:
+            # A worker died (OOM, crash in a codec); replace the pool for later calls
+            stats.errors += 1
+            self._restart(executor)
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+        stats.record((started - queued) * 1000, (finished - started) * 1000)
+        return result
+
+    async def map(self, fn: Callable, items: Iterable[Any], label: Optional[str] = None) -> List[Any]:
+        """fn(item) for every item, run concurrently in the pool; results in input order."""
+        return list(await asyncio.gather(*(self.run(fn, item, label=label) for item in items)))
+
+    def _restart(self, broken: Executor):
+        if self._executor is not broken:
+            return  # already replaced by a concurrent failure
+        self._executor = self._create_executor()
+        self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"CPU pool restarted after a worker failure ({self.restarts} so far)")
+
+    def start(self):
+        """Create the pool and start the lag monitor (call from the startup event)."""
+        self._ensure()
+        self.lag.start()
+        logger.info(f"CPU pool started: {self.workers} {self.mode} worker(s)")
+
+    def stop(self):
+        self.lag.stop()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "restarts": self.restarts,
+            "loop_lag": self.lag.get_stats(),
+            "tasks": {label: s.get_stats() for label, s in self._stats.items()},
+        }
+
+
+# Singleton instance
+cpu_pool = CpuPool()
@@ -0,0 +1,469 @@
+"""
+Streaming CSV Import for Avida
+Runs bulk CSV imports (listings, users, categories) as background jobs that
+never hold the whole file in memory and never touch MongoDB once per row.
+
+- The upload is copied to a staging file in CSV_IMPORT_DIR block by block,
+  checking the size limit and the encoding on the way
+- Rows are parsed incrementally from the staged file and applied
+  CSV_IMPORT_CHUNK_SIZE at a time
+- Existing documents for a chunk are found with one $in query on the spec's
+  key, and the chunk is written with one unordered bulk_write of upserts
+- New documents get ids derived from the job and row number, so replaying a
+  chunk after a crash upserts the same documents instead of duplicating them
+- After every chunk the job document in csv_import_stream_jobs records a
+  checkpoint; resume() continues from the last committed row
+- Row-level failures go to csv_import_row_errors and can be downloaded as CSV
+"""
+
+import os
+import io
+import csv
+import uuid
+import codecs
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+CSV_IMPORT_DIR = os.environ.get("CSV_IMPORT_DIR", "/tmp/avida-csv-imports")
+CSV_IMPORT_CHUNK_SIZE = int(os.environ.get("CSV_IMPORT_CHUNK_SIZE", "1000"))
+CSV_IMPORT_MAX_BYTES = int(os.environ.get("CSV_IMPORT_MAX_BYTES", str(512 * 1024 * 1024)))
+CSV_IMPORT_STALE_AFTER = int(os.environ.get("CSV_IMPORT_STALE_AFTER", "120"))  # seconds without a checkpoint
+CSV_IMPORT_READ_BLOCK = 1024 * 1024
+CSV_IMPORT_ERRORS_PREVIEW = 10
+
+JOBS_COLLECTION = "csv_import_stream_jobs"
+ERRORS_COLLECTION = "csv_import_row_errors"
+
+
+class RowError(ValueError):
+    """Raised by a spec's build_row to reject one row; `field` and `value` go into the error report."""
+
+    def __init__(self, message: str, field: str = "_row", value: Any = ""):
+        super().__init__(message)
+        self.field = field
+        self.value = "" if value is None else str(value)
+
+
+class CsvImportSpec:
+    """
+    How one kind of CSV maps onto a collection.
+
+    build_row(row) returns the fields to $set (raise RowError to reject the
+    row); a value for `key` marks the row as targeting an existing document.
+    new_document(fields, row_id, now) returns the fields written only on
+    insert, including `key` when build_row left it empty. row_id is stable
+    for a job and row, so ids derived from it survive a replay.
+    With update_existing=False a row whose key already exists is an error.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        collection: str,
+        key: str,
+        build_row: Callable[[Dict[str, str]], Dict[str, Any]],
+        new_document: Callable[[Dict[str, Any], str, str], Dict[str, Any]],
+        required: Tuple[str, ...] = (),
+        update_existing: bool = True
+    ):
+        self.kind = kind
+        self.collection = collection
+        self.key = key
+        self.build_row = build_row
+        self.new_document = new_document
+        self.required = required
+        self.update_existing = update_existing
+
+
+def stable_id(prefix: str, row_id: str, length: int = 12) -> str:
+    """A document id that is the same every time a given job row is applied."""
+    return f"{prefix}{uuid.uuid5(uuid.NAMESPACE_URL, row_id).hex[:length]}"
+
+
+def normalize_header(name: str) -> str:
+    return (name or "").lower().strip().replace(" ", "_")
+
+
+def iter_csv_file(path: str, encoding: str, after_row: int = 1) -> Iterator[Tuple[int, Dict[str, str], float]]:
+    """
+    Yield (row_number, row, fraction_read) from a staged CSV for the rows
+    numbered above `after_row`. Headers are normalized, values stripped and
+    blank rows dropped; row numbers count the header as row 1, as the import
+    reports always have, and blank rows keep their number.
+    """
+    with open(path, "rb") as raw:
+        size = os.fstat(raw.fileno()).st_size or 1
+        text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+        reader = csv.reader(text)
+        try:
+            headers = [normalize_header(h) for h in next(reader)]
+        except StopIteration:
+            return
+        for index, values in enumerate(reader):
+            if index + 2 <= after_row or not any(v.strip() for v in values):
+                continue
+            row = {h: (values[i].strip() if i < len(values) else "") for i, h in enumerate(headers) if h}
+            yield index + 2, row, min(1.0, raw.tell() / size)
+
+
+def read_headers(path: str, encoding: str) -> List[str]:
+    with open(path, "r", encoding=encoding, newline="") as f:
+        first = next(csv.reader(f), [])
+    return [normalize_header(h) for h in first]
+
+
+async def stage_upload(upload, path: str, max_bytes: int = CSV_IMPORT_MAX_BYTES) -> Tuple[int, str]:
+    """
+    Copy an UploadFile to `path` a block at a time. Returns (size, encoding);
+    the encoding is utf-8-sig when every byte decodes as UTF-8, else latin-1.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    utf8 = True
+    size = 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path, "wb") as out:
+            while True:
+                block = await upload.read(CSV_IMPORT_READ_BLOCK)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise ValueError(f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+                if utf8:
+                    try:
+                        decoder.decode(block)
+                    except UnicodeDecodeError:
+                        utf8 = False
+                out.write(block)
+        if utf8:
+            try:
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                utf8 = False
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return size, "utf-8-sig" if utf8 else "latin-1"
+
+
+class StreamingCsvImporter:
+    """Starts, runs, resumes and reports on streaming import jobs for a set of specs."""
+
+    def __init__(self, db, specs: List[CsvImportSpec], chunk_size: int = CSV_IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.jobs = db[JOBS_COLLECTION]
+        self.row_errors = db[ERRORS_COLLECTION]
+        self.specs = {spec.kind: spec for spec in specs}
+        self.chunk_size = max(1, chunk_size)
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stats = {"jobs_started": 0, "jobs_resumed": 0, "rows": 0, "chunks": 0}
+
+    # ------------------------------------------------------------------ jobs
+
+    async def start(self, upload, kind: str, admin_id: Optional[str] = None) -> Dict[str, Any]:
+        """Stage the upload, record the job and run it in the background. Raises ValueError for a bad file."""
+        spec = self.specs[kind]
+        job_id = f"csvjob_{uuid.uuid4().hex[:12]}"
+        path = os.path.join(CSV_IMPORT_DIR, f"{job_id}.csv")
+        size, encoding = await stage_upload(upload, path)
+
+        headers = read_headers(path, encoding)
+        missing = [f for f in spec.required if f not in headers]
+        if not headers or missing:
+            os.remove(path)
+            detail = f"Missing required columns: {', '.join(missing)}" if headers else "CSV file has no headers"
+            raise ValueError(detail)
+
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "admin_id": admin_id,
+            "filename": getattr(upload, "filename", None),
+            "path": path,
+            "encoding": encoding,
+            "bytes_total": size,
+            "status": "queued",
+            "progress": 0,
+            "rows_done": 0,
+            "last_row": 1,
+            "created": 0,
+            "updated": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now,
+            "heartbeat_at": now,
+        }
+        await self.jobs.insert_one(dict(job))
+        self._stats["jobs_started"] += 1
+        self._launch(job)
+        return job
+
+    def _launch(self, job: Dict[str, Any]):
+        async def runner():
+            try:
+                await self._run(job)
+            finally:
+                self._running.pop(job["id"], None)
+
+        self._running[job["id"]] = asyncio.create_task(runner())
+
+    async def _checkpoint(self, job_id: str, **fields):
+        now = datetime.now(timezone.utc).isoformat()
+        await self.jobs.update_one({"id": job_id}, {"$set": {**fields, "updated_at": now, "heartbeat_at": now}})
+
+    async def _run(self, job: Dict[str, Any]):
+        spec = self.specs[job["kind"]]
+        counts = {k: job.get(k, 0) for k in ("rows_done", "last_row", "created", "updated", "failed")}
+        await self._checkpoint(job["id"], status="running", started_at=job.get("started_at") or datetime.now(timezone.utc).isoformat())
+        try:
+            # Errors recorded after the last checkpoint are reported again by the replayed chunk
+            await self.row_errors.delete_many({"job_id": job["id"], "row": {"$gt": counts["last_row"]}})
+            replay = bool(job.get("resumes"))
+            # Resume by row number: rows_done does not count blank rows
+            async for chunk, fraction in self._chunks(job["path"], job["encoding"], counts["last_row"]):
+                result = await self.apply_chunk(spec, job["id"], chunk, replay=replay)
+                replay = False
+                counts["rows_done"] += len(chunk)
+                counts["last_row"] = chunk[-1][0]
+                counts["created"] += result["created"]
+                counts["updated"] += result["updated"]
+                counts["failed"] += len(result["errors"])
+                if result["errors"]:
+                    await self.row_errors.insert_many(
+                        [{"job_id": job["id"], **e} for e in result["errors"]], ordered=False
+                    )
+                await self._checkpoint(job["id"], progress=int(fraction * 100), **counts)
+                self._stats["rows"] += len(chunk)
+                self._stats["chunks"] += 1
+        except asyncio.CancelledError:
+            # Leave the job resumable from its last checkpoint
+            await self._checkpoint(job["id"], status="interrupted")
+            raise
+        except Exception as e:
+            logger.error(f"CSV import {job['id']} failed after {counts['rows_done']} rows: {e}")
+            await self._checkpoint(job["id"], status="failed", error=str(e))
+            return
+
+        await self._checkpoint(
+            job["id"], status="completed", progress=100, finished_at=datetime.now(timezone.utc).isoformat(), **counts
+        )
+        try:
+            os.remove(job["path"])
+        except OSError:
+            pass
+        logger.info(
+            f"CSV import {job['id']} ({job['kind']}): {counts['created']} created, "
+            f"{counts['updated']} updated, {counts['failed']} failed"
+        )
+
+    async def _chunks(self, path: str, encoding: str, after_row: int) -> AsyncIterator[Tuple[List[Tuple[int, Dict[str, str]]], float]]:
+        rows = iter_csv_file(path, encoding, after_row)
+        chunk: List[Tuple[int, Dict[str, str]]] = []
+        fraction = 0.0
+        for row_number, row, fraction in rows:
+            chunk.append((row_number, row))
+            if len(chunk) >= self.chunk_size:
+                yield chunk, fraction
+                chunk = []
+                await asyncio.sleep(0)
+        if chunk:
+            yield chunk, fraction
+
+    # ---------------------------------------------------------------- chunks
+
+    async def apply_chunk(
+        self,
+        spec: CsvImportSpec,
+        job_id: str,
+        chunk: List[Tuple[int, Dict[str, str]]],
+        replay: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Validate a chunk, look up its existing keys with one $in query and
+        write it with one unordered bulk_write.
+        Returns created/updated counts and the row errors. With replay=True
+        (the first chunk after a resume) documents this job already inserted
+        are skipped rather than reported as duplicates.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        errors: List[Dict[str, Any]] = []
+        prepared: List[Tuple[int, Dict[str, Any]]] = []
+        for row_number, row in chunk:
+            try:
+                prepared.append((row_number, spec.build_row(row)))
+            except RowError as e:
+                errors.append({"row": row_number, "field": e.field, "value": e.value, "error": str(e)})
+            except (ValueError, TypeError) as e:
+                errors.append({"row": row_number, "field": "_row", "value": "", "error": str(e)})
+
+        keys = list({fields[spec.key] for _, fields in prepared if fields.get(spec.key)})
+        existing: Dict[Any, Optional[str]] = {}
+        if keys:
+            async for doc in self.db[spec.collection].find(
+                {spec.key: {"$in": keys}}, {"_id": 0, spec.key: 1, "import_job_id": 1}
+            ):
+                existing[doc[spec.key]] = doc.get("import_job_id")
+
+        # One write per key: a key repeated within the chunk merges into its first row's write
+        pending: Dict[Any, Dict[str, Any]] = {}
+        for row_number, fields in prepared:
+            key = fields.get(spec.key)
+            if key in pending:
+                if not spec.update_existing:
+                    errors.append({
+                        "row": row_number, "field": spec.key, "value": str(key),
+                        "error": f"Duplicate {spec.key} in CSV (also on row {pending[key]['row']})"
+                    })
+                    continue
+                pending[key]["set"].update(fields)
+            elif key and key in existing:
+                if replay and existing[key] == job_id:
+                    continue  # written by this job before its last checkpoint
+                if not spec.update_existing:
+                    errors.append({
+                        "row": row_number, "field": spec.key, "value": str(key),
+                        "error": f"{spec.key} {key} already exists"
+                    })
+                    continue
+                pending[key] = {"row": row_number, "set": fields, "insert": None}
+            else:
+                on_insert = spec.new_document(fields, f"{job_id}:{row_number}", now)
+                on_insert["import_job_id"] = job_id
+                key = key or on_insert[spec.key]
+                pending[key] = {"row": row_number, "set": fields, "insert": on_insert}
+
+        ops: List[UpdateOne] = []
+        op_rows: List[int] = []
+        for key, write in pending.items():
+            update: Dict[str, Any] = {"$set": write["set"]}
+            if write["insert"] is not None:
+                update["$setOnInsert"] = {k: v for k, v in write["insert"].items() if k not in write["set"]}
+            ops.append(UpdateOne({spec.key: key}, update, upsert=write["insert"] is not None))
+            op_rows.append(write["row"])
+
+        created = updated = 0
+        if ops:
+            try:
+                result = await self.db[spec.collection].bulk_write(ops, ordered=False)
+                created, updated = result.upserted_count, result.matched_count
+            except BulkWriteError as e:
+                details = e.details or {}
+                created, updated = details.get("nUpserted", 0), details.get("nMatched", 0)
+                for failure in details.get("writeErrors", []):
+                    errors.append({
+                        "row": op_rows[failure["index"]], "field": "_row", "value": "",
+                        "error": failure.get("errmsg", "write failed")
+                    })
+        errors.sort(key=lambda e: e["row"])
+        return {"created": created, "updated": updated, "errors": errors}
+
+    # -------------------------------------------------------------- control
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.jobs.find_one({"id": job_id}, {"_id": 0, "path": 0})
+        if job:
+            job["running_here"] = job_id in self._running
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to `timeout` seconds for a job to finish, then return its summary either way."""
+        task = self._running.get(job_id)
+        if task and timeout > 0:
+            await asyncio.wait({task}, timeout=timeout)
+        return await self.summary(job_id)
+
+    async def summary(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Counts plus the first row errors, in the shape the import endpoints have always returned."""
+        job = await self.get_job(job_id)
+        if not job:
+            return None
+        preview = await self.row_errors.find({"job_id": job_id}, {"_id": 0}).sort("row", 1).limit(CSV_IMPORT_ERRORS_PREVIEW).to_list(CSV_IMPORT_ERRORS_PREVIEW)
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "progress": job.get("progress", 0),
+            "rows_done": job.get("rows_done", 0),
+            "imported": job.get("created", 0) + job.get("updated", 0),
+            "created": job.get("created", 0),
+            "updated": job.get("updated", 0),
+            "errors": [f"Row {e['row']}: {e['error']}" for e in preview],
+            "total_errors": job.get("failed", 0),
+            "error": job.get("error"),
+        }
+
+    async def iter_error_report(self, job_id: str) -> AsyncIterator[str]:
+        """The job's row errors as CSV text, a line at a time."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["row", "field", "value", "error"])
+        async for e in self.row_errors.find({"job_id": job_id}, {"_id": 0}).sort("row", 1):
+            writer.writerow([e["row"], e.get("field", ""), e.get("value", ""), e["error"]])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    async def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Continue a failed, interrupted or stale job from its last checkpoint.
+        Returns the job, or None if it is not resumable (finished, running
+        elsewhere, or its staged file is gone).
+        """
+        if job_id in self._running:
+            return None
+        stale = (datetime.now(timezone.utc) - timedelta(seconds=CSV_IMPORT_STALE_AFTER)).isoformat()
+        job = await self.jobs.find_one_and_update(
+            {"id": job_id, "$or": [
+                {"status": {"$in": ["failed", "interrupted"]}},
+                {"status": {"$in": ["queued", "running"]}, "heartbeat_at": {"$lt": stale}},
+            ]},
+            {
+                "$set": {"status": "running", "heartbeat_at": datetime.now(timezone.utc).isoformat()},
+                "$inc": {"resumes": 1},
+                "$unset": {"error": ""}
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if not job or job["kind"] not in self.specs:
+            return None
+        if not os.path.exists(job["path"]):
+            await self._checkpoint(job_id, status="failed", error="Staged file is no longer available; upload it again")
+            return None
+        self._stats["jobs_resumed"] += 1
+        self._launch(job)
+        return {k: v for k, v in job.items() if k != "path"}
+
+    async def resume_interrupted(self) -> int:
+        """Pick up jobs left running or interrupted by a restart (call from the startup event)."""
+        resumed = 0
+        async for job in self.jobs.find(
+            {"status": {"$in": ["queued", "running", "interrupted"]}, "kind": {"$in": list(self.specs)}},
+            {"_id": 0, "id": 1}
+        ):
+            if await self.resume(job["id"]):
+                resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} CSV import job(s)")
+        return resumed
+
+    async def stop(self):
+        """Cancel running jobs; each is checkpointed as interrupted (app shutdown)."""
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "running": len(self._running), "chunk_size": self.chunk_size}
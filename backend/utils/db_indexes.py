@@ -71,10 +71,50 @@ LISTINGS_INDEXES = [
         "name": "idx_listings_seller",
         "background": True
     },
-    # Text search index for title and description
+    # Keyset pagination indexes - stored boost tier, sort key, id tie-breaker
     {
-        "keys": [("title", "text"), ("description", "text")],
+        "keys": [("status", 1), ("boost_tier", -1), ("created_at", -1), ("id", -1)],
+        "name": "idx_listings_boost_created",
+        "background": True
+    },
+    {
+        "keys": [("status", 1), ("category_id", 1), ("boost_tier", -1), ("created_at", -1), ("id", -1)],
+        "name": "idx_listings_category_boost_created",
+        "background": True
+    },
+    {
+        "keys": [("status", 1), ("boost_tier", -1), ("price", 1), ("id", 1)],
+        "name": "idx_listings_boost_price_asc",
+        "background": True
+    },
+    {
+        "keys": [("status", 1), ("boost_tier", -1), ("price", -1), ("id", -1)],
+        "name": "idx_listings_boost_price_desc",
+        "background": True
+    },
+    # Weighted text search index (see utils/search_service.py FIELD_WEIGHTS).
+    # default_language "none" keeps EN/DE/SW tokens unstemmed; accents are
+    # folded by the version 3 text index.
+    {
+        "keys": [("title", "text"), ("description", "text"), ("category_id", "text"), ("subcategory", "text")],
         "name": "idx_listings_text_search",
+        "weights": {"title": 10, "subcategory": 4, "category_id": 3, "description": 1},
+        "default_language": "none",
+        "language_override": "search_language",
+        "replace_on_conflict": True,
+        "background": True
+    },
+    # As-you-type title suggestions (edge n-grams)
+    {
+        "keys": [("status", 1), ("search_prefixes", 1)],
+        "name": "idx_listings_search_prefixes",
+        "background": True
+    },
+    # Nearby search ($geoNear / $geoWithin). Same name as the one
+    # location_system creates so the two never coexist as duplicates
+    {
+        "keys": [("geo_point", "2dsphere")],
+        "name": "geo_point_2dsphere",
         "background": True
     },
     # Single field indexes for common queries
@@ -195,26 +235,186 @@ FAVORITES_INDEXES = [
 
 # Index definitions for conversations/messages
 CONVERSATIONS_INDEXES = [
+    # Inbox keyset pages: each $or branch walks one index in
+    # (last_message_time desc, id) order
     {
-        "keys": [("buyer_id", 1), ("last_message_time", -1)],
+        "keys": [("buyer_id", 1), ("last_message_time", -1), ("id", 1)],
         "name": "idx_conv_buyer",
-        "background": True
+        "background": True,
+        "replace_on_conflict": True
     },
     {
-        "keys": [("seller_id", 1), ("last_message_time", -1)],
+        "keys": [("seller_id", 1), ("last_message_time", -1), ("id", 1)],
         "name": "idx_conv_seller",
-        "background": True
+        "background": True,
+        "replace_on_conflict": True
     },
 ]
 
 MESSAGES_INDEXES = [
     {
-        "keys": [("conversation_id", 1), ("created_at", -1)],
+        # Backs keyset paging of message history (MESSAGE_SORT) and unread counts
+        "keys": [("conversation_id", 1), ("created_at", -1), ("id", -1)],
         "name": "idx_msg_conversation",
+        "background": True,
+        "replace_on_conflict": True
+    },
+]
+
+# One maintained unread total per user (utils/unread_counters.py)
+USER_UNREAD_COUNTS_INDEXES = [
+    {
+        "keys": [("user_id", 1)],
+        "name": "idx_user_unread_user",
+        "unique": True,
+        "background": True
+    },
+]
+
+# Run history of the job scheduler (utils/scheduler.py)
+SCHEDULED_JOB_RUNS_INDEXES = [
+    # Latest runs of one job
+    {
+        "keys": [("job", 1), ("started_at", -1)],
+        "name": "idx_job_runs_job_started",
+        "background": True
+    },
+    {
+        "keys": [("expires_at", 1)],
+        "name": "idx_job_runs_ttl",
+        "background": True,
+        "expireAfterSeconds": 0
+    },
+]
+
+SMART_NOTIFICATIONS_INDEXES = [
+    # Throttle checks: recent notifications per user and trigger type
+    {
+        "keys": [("user_id", 1), ("trigger_type", 1), ("created_at", -1)],
+        "name": "idx_sn_user_trigger",
+        "background": True
+    },
+    # Dedup checks
+    {
+        "keys": [("dedup_key", 1), ("created_at", -1)],
+        "name": "idx_sn_dedup",
+        "background": True
+    },
+]
+
+NOTIFICATION_CONSENT_INDEXES = [
+    {
+        "keys": [("user_id", 1)],
+        "name": "idx_consent_user",
+        "background": True
+    },
+]
+
+USER_INTEREST_PROFILES_INDEXES = [
+    {
+        "keys": [("user_id", 1)],
+        "name": "idx_interest_user",
+        "background": True
+    },
+    # Audience lookups filter on category_interests.<category_id> (dynamic keys)
+    {
+        "keys": [("category_interests.$**", 1)],
+        "name": "idx_interest_categories",
+        "background": True
+    },
+]
+
+ANALYTICS_ROLLUPS_INDEXES = [
+    # Bucket range reads per listing/seller
+    {
+        "keys": [("scope", 1), ("owner_id", 1), ("grain", 1), ("bucket", 1)],
+        "name": "idx_rollup_owner_bucket",
+        "background": True
+    },
+    # Per-listing totals for a seller
+    {
+        "keys": [("seller_id", 1), ("grain", 1), ("bucket", 1)],
+        "name": "idx_rollup_seller_bucket",
+        "background": True,
+        "sparse": True
+    },
+    # Hourly buckets expire; daily buckets after the long retention
+    {
+        "keys": [("expires_at", 1)],
+        "name": "idx_rollup_ttl",
+        "background": True,
+        "expireAfterSeconds": 0
+    },
+]
+
+COHORT_USER_ACTIVITY_INDEXES = [
+    # Retention aggregation matches one granularity's cohort starts
+    {
+        "keys": [("cohort_daily", 1)],
+        "name": "idx_cohort_activity_daily",
+        "background": True
+    },
+    {
+        "keys": [("cohort_weekly", 1)],
+        "name": "idx_cohort_activity_weekly",
+        "background": True
+    },
+    {
+        "keys": [("cohort_monthly", 1)],
+        "name": "idx_cohort_activity_monthly",
         "background": True
     },
 ]
 
+LISTING_BOOSTS_INDEXES = [
+    # Expiry job: due active boosts, oldest first
+    {
+        "keys": [("status", 1), ("expires_at", 1)],
+        "name": "idx_boosts_status_expires",
+        "background": True
+    },
+    # Boosts still active on a listing
+    {
+        "keys": [("listing_id", 1), ("status", 1)],
+        "name": "idx_boosts_listing_status",
+        "background": True
+    },
+]
+
+# Streaming CSV import jobs and their row error reports
+CSV_IMPORT_STREAM_JOBS_INDEXES = [
+    {
+        "keys": [("id", 1)],
+        "name": "idx_csv_stream_jobs_id",
+        "unique": True,
+        "background": True
+    },
+    # Startup resume of interrupted jobs
+    {
+        "keys": [("status", 1), ("heartbeat_at", 1)],
+        "name": "idx_csv_stream_jobs_status",
+        "background": True
+    },
+]
+
+CSV_IMPORT_ROW_ERRORS_INDEXES = [
+    {
+        "keys": [("job_id", 1), ("row", 1)],
+        "name": "idx_csv_row_errors_job_row",
+        "background": True
+    },
+]
+
+# Executive summary sections memoized per closed window
+EXECUTIVE_SUMMARY_SECTIONS_INDEXES = [
+    {
+        "keys": [("expires_at", 1)],
+        "name": "idx_exec_sections_ttl",
+        "background": True,
+        "expireAfterSeconds": 0
+    },
+]
+
 
 async def ensure_index(collection, index_def: Dict[str, Any]) -> bool:
     """Create a single index if it doesn't exist."""
@@ -224,14 +424,39 @@ async def ensure_index(collection, index_def: Dict[str, Any]) -> bool:
         background = index_def.get("background", True)
         unique = index_def.get("unique", False)
         sparse = index_def.get("sparse", False)
+        # Optional text/TTL index options
+        extra = {
+            opt: index_def[opt]
+            for opt in ("weights", "default_language", "language_override", "expireAfterSeconds")
+            if opt in index_def
+        }
         
-        await collection.create_index(
-            keys,
-            name=name,
-            background=background,
-            unique=unique,
-            sparse=sparse
-        )
+        try:
+            await collection.create_index(
+                keys,
+                name=name,
+                background=background,
+                unique=unique,
+                sparse=sparse,
+                **extra
+            )
+        except Exception as e:
+            # Only one text index is allowed per collection; replace outdated definitions
+            if not index_def.get("replace_on_conflict"):
+                raise
+            logger.info(f"Replacing index {name} on {collection.name}: {e}")
+            existing = await collection.index_information()
+            for existing_name, info in existing.items():
+                if existing_name == name or any(v == "text" for _, v in info.get("key", [])):
+                    await collection.drop_index(existing_name)
+            await collection.create_index(
+                keys,
+                name=name,
+                background=background,
+                unique=unique,
+                sparse=sparse,
+                **extra
+            )
         logger.debug(f"Index {name} ensured on {collection.name}")
         return True
     except Exception as e:
@@ -306,6 +531,80 @@ async def ensure_all_indexes(db) -> Dict[str, int]:
             count += 1
     results["messages"] = count
     
+    # Per-user unread totals
+    count = 0
+    for index_def in USER_UNREAD_COUNTS_INDEXES:
+        if await ensure_index(db.user_unread_counts, index_def):
+            count += 1
+    results["user_unread_counts"] = count
+    
+    # Job scheduler run history
+    count = 0
+    for index_def in SCHEDULED_JOB_RUNS_INDEXES:
+        if await ensure_index(db.scheduled_job_runs, index_def):
+            count += 1
+    results["scheduled_job_runs"] = count
+    
+    # Smart notification indexes
+    count = 0
+    for index_def in SMART_NOTIFICATIONS_INDEXES:
+        if await ensure_index(db.smart_notifications, index_def):
+            count += 1
+    results["smart_notifications"] = count
+    
+    count = 0
+    for index_def in NOTIFICATION_CONSENT_INDEXES:
+        if await ensure_index(db.user_notification_consent, index_def):
+            count += 1
+    results["user_notification_consent"] = count
+    
+    count = 0
+    for index_def in USER_INTEREST_PROFILES_INDEXES:
+        if await ensure_index(db.user_interest_profiles, index_def):
+            count += 1
+    results["user_interest_profiles"] = count
+    
+    # Analytics rollup indexes
+    count = 0
+    for index_def in ANALYTICS_ROLLUPS_INDEXES:
+        if await ensure_index(db.analytics_rollups, index_def):
+            count += 1
+    results["analytics_rollups"] = count
+    
+    # Cohort activity table indexes
+    count = 0
+    for index_def in COHORT_USER_ACTIVITY_INDEXES:
+        if await ensure_index(db.cohort_user_activity, index_def):
+            count += 1
+    results["cohort_user_activity"] = count
+    
+    # Boost expiry indexes
+    count = 0
+    for index_def in LISTING_BOOSTS_INDEXES:
+        if await ensure_index(db.listing_boosts, index_def):
+            count += 1
+    results["listing_boosts"] = count
+    
+    # Streaming CSV import indexes
+    count = 0
+    for index_def in CSV_IMPORT_STREAM_JOBS_INDEXES:
+        if await ensure_index(db.csv_import_stream_jobs, index_def):
+            count += 1
+    results["csv_import_stream_jobs"] = count
+    
+    count = 0
+    for index_def in CSV_IMPORT_ROW_ERRORS_INDEXES:
+        if await ensure_index(db.csv_import_row_errors, index_def):
+            count += 1
+    results["csv_import_row_errors"] = count
+    
+    # Executive summary section memo
+    count = 0
+    for index_def in EXECUTIVE_SUMMARY_SECTIONS_INDEXES:
+        if await ensure_index(db.executive_summary_sections, index_def):
+            count += 1
+    results["executive_summary_sections"] = count
+    
     total = sum(results.values())
     logger.info(f"Database indexes verified/created: {total} indexes across {len(results)} collections")
     
@@ -316,7 +615,9 @@ async def get_index_stats(db) -> Dict[str, Any]:
     """Get statistics about indexes for monitoring."""
     stats = {}
     
-    collections = ["listings", "auto_listings", "properties", "users", "favorites", "conversations", "messages"]
+    collections = ["listings", "auto_listings", "properties", "users", "favorites", "conversations", "messages",
+                   "smart_notifications", "user_notification_consent", "user_interest_profiles",
+                   "analytics_rollups", "cohort_user_activity", "listing_boosts"]
     
     for coll_name in collections:
         try:
@@ -0,0 +1,268 @@
+"""
+In-Process Event Bus for Avida
+Domain events (listing_created, ...) are published once from the request path
+and fanned out to subscribers (cohort event store, badges, smart
+notifications, stats push) without HTTP round-trips back into this process.
+
+- publish() never blocks: each subscription has a bounded queue and events
+  are dropped (and counted) when it is full
+- Subscriptions are drained by their own worker task(s), optionally in
+  batches for sinks that write with insert_many
+- Queue depth, drops and failures are exposed via get_stats()
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUS_QUEUE_SIZE = int(os.environ.get("EVENT_BUS_QUEUE_SIZE", "10000"))
+EVENT_BUS_BATCH_SIZE = int(os.environ.get("EVENT_BUS_BATCH_SIZE", "200"))
+EVENT_BUS_BATCH_WAIT = float(os.environ.get("EVENT_BUS_BATCH_WAIT", "0.5"))  # seconds
+EVENT_BUS_DRAIN_TIMEOUT = float(os.environ.get("EVENT_BUS_DRAIN_TIMEOUT", "5"))
+
+
+class EventTypes:
+    """Event names published on the bus (cohort-tracked names match cohort_analytics.EventType)"""
+    SIGNUP = "signup"
+    LOGIN = "login"
+    LISTING_CREATED = "listing_created"
+    LISTING_UPDATED = "listing_updated"
+    LISTING_DELETED = "listing_deleted"
+    LISTING_BOOST_CHANGED = "listing_boost_changed"
+    LISTING_VIEWED = "listing_viewed"
+    CHAT_STARTED = "chat_started"
+    CHECKOUT_COMPLETED = "checkout_completed"
+    ESCROW_RELEASED = "escrow_released"
+    BOOST_USED = "boost_used"
+    PROFILE_VIEWED = "profile_viewed"
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """
+    A published event. `properties` are persisted by store subscribers;
+    `context` carries in-process objects (e.g. the full listing) and is never stored.
+    """
+    type: str
+    user_id: Optional[str] = None
+    properties: Dict[str, Any] = field(default_factory=dict)
+    context: Dict[str, Any] = field(default_factory=dict)
+    session_id: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_record(self) -> Dict[str, Any]:
+        """Event document in the cohort_events shape."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "event_type": self.type,
+            "timestamp": self.timestamp.isoformat(),
+            "properties": self.properties,
+            "session_id": self.session_id,
+        }
+
+
+EventHandler = Callable[[DomainEvent], Awaitable[Any]]
+BatchHandler = Callable[[List[DomainEvent]], Awaitable[Any]]
+
+
+class Subscription:
+    """One subscriber: a bounded queue plus the worker(s) draining it."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        event_types: Optional[Set[str]],
+        batch_size: int,
+        batch_wait: float,
+        max_queue: int,
+        concurrency: int
+    ):
+        self.name = name
+        self.handler = handler
+        self.event_types = event_types
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.concurrency = max(1, concurrency)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.tasks: List[asyncio.Task] = []
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.high_water = 0
+
+    def accepts(self, event_type: str) -> bool:
+        return self.event_types is None or event_type in self.event_types
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "event_types": sorted(self.event_types) if self.event_types is not None else "*",
+            "depth": self.queue.qsize(),
+            "max_depth": self.queue.maxsize,
+            "high_water": self.high_water,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "workers": len([t for t in self.tasks if not t.done()]),
+        }
+
+
+class EventBus:
+    """
+    Async publish/subscribe bus living in the API process.
+    Subscribe at import/startup time, call start() from the startup event
+    and stop() on shutdown to drain what is queued.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._running = False
+        self.published = 0
+        self.unrouted = 0
+
+    def subscribe(
+        self,
+        name: str,
+        handler: Callable,
+        event_types: Optional[Iterable[str]] = None,
+        batch_size: int = 1,
+        batch_wait: float = EVENT_BUS_BATCH_WAIT,
+        max_queue: int = EVENT_BUS_QUEUE_SIZE,
+        concurrency: int = 1
+    ) -> Subscription:
+        """
+        Register a handler. With batch_size == 1 the handler receives one
+        DomainEvent; otherwise it receives a list of up to batch_size events,
+        collected for at most batch_wait seconds.
+        """
+        if name in self._subscriptions:
+            raise ValueError(f"Event bus subscription '{name}' already exists")
+        sub = Subscription(
+            name, handler,
+            set(event_types) if event_types is not None else None,
+            batch_size, batch_wait, max_queue, concurrency
+        )
+        self._subscriptions[name] = sub
+        if self._running:
+            self._start_workers(sub)
+        return sub
+
+    def publish(self, event: DomainEvent) -> int:
+        """Enqueue an event for every matching subscription. Never blocks."""
+        self.published += 1
+        routed = 0
+        for sub in self._subscriptions.values():
+            if not sub.accepts(event.type):
+                continue
+            try:
+                sub.queue.put_nowait(event)
+                routed += 1
+                depth = sub.queue.qsize()
+                if depth > sub.high_water:
+                    sub.high_water = depth
+            except asyncio.QueueFull:
+                sub.dropped += 1
+                if sub.dropped % 1000 == 1:
+                    logger.warning(f"Event bus queue '{sub.name}' full, dropped {sub.dropped} events so far")
+        if not routed:
+            self.unrouted += 1
+        return routed
+
+    def emit(self, event_type: str, user_id: Optional[str] = None, **kwargs) -> int:
+        """Shorthand for publish(DomainEvent(...))."""
+        return self.publish(DomainEvent(type=event_type, user_id=user_id, **kwargs))
+
+    # -------------------------------------------------------------------------
+    # Workers
+    # -------------------------------------------------------------------------
+
+    async def _next_batch(self, sub: Subscription) -> List[DomainEvent]:
+        batch = [await sub.queue.get()]
+        if sub.batch_size == 1:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + sub.batch_wait
+        while len(batch) < sub.batch_size:
+            try:
+                batch.append(sub.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(sub.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _deliver(self, sub: Subscription, batch: List[DomainEvent]):
+        try:
+            if sub.batch_size == 1:
+                await sub.handler(batch[0])
+            else:
+                await sub.handler(batch)
+            sub.delivered += len(batch)
+            sub.batches += 1
+        except Exception as e:
+            sub.failed += len(batch)
+            logger.error(f"Event bus subscriber '{sub.name}' failed on {len(batch)} event(s): {e}")
+
+    async def _worker(self, sub: Subscription):
+        while True:
+            batch = await self._next_batch(sub)
+            try:
+                await self._deliver(sub, batch)
+            finally:
+                for _ in batch:
+                    sub.queue.task_done()
+
+    def _start_workers(self, sub: Subscription):
+        sub.tasks = [t for t in sub.tasks if not t.done()]
+        while len(sub.tasks) < sub.concurrency:
+            sub.tasks.append(asyncio.create_task(self._worker(sub)))
+
+    def start(self):
+        """Start worker tasks (call from the startup event)."""
+        self._running = True
+        for sub in self._subscriptions.values():
+            self._start_workers(sub)
+        logger.info(f"Event bus started with {len(self._subscriptions)} subscription(s)")
+
+    async def stop(self, timeout: float = EVENT_BUS_DRAIN_TIMEOUT):
+        """Give queued events up to `timeout` seconds to drain, then cancel workers."""
+        self._running = False
+        subs = [s for s in self._subscriptions.values() if s.tasks]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(s.queue.join() for s in subs)), timeout)
+        except asyncio.TimeoutError:
+            pending = sum(s.queue.qsize() for s in subs)
+            logger.warning(f"Event bus stopped with {pending} undelivered event(s)")
+        for sub in subs:
+            for task in sub.tasks:
+                task.cancel()
+            sub.tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "published": self.published,
+            "unrouted": self.unrouted,
+            "subscriptions": {name: sub.get_stats() for name, sub in self._subscriptions.items()},
+        }
+
+
+# Singleton instance
+event_bus = EventBus()
@@ -0,0 +1,262 @@
+"""
+Feature Flag Engine for Avida
+In-process snapshot of the config manager's feature flags
+(config_feature_flags) and the QA kill switches (qa_feature_flags), so a
+flag check is a few dict lookups instead of up to four Mongo reads.
+
+- FlagSnapshot compiles all flags into dicts keyed by
+  (environment, feature, scope, scope_value); it is immutable and swapped
+  atomically on reload
+- Precedence and rollout are those of ConfigManagerService: seller > role >
+  country > global, with the global rollout decided by md5(user_id) % 100
+- Reloads are driven by a change stream on both collections. Without a
+  replica set the engine polls a version counter that writers bump through
+  mark_changed() every FEATURE_FLAG_POLL_INTERVAL seconds
+- evaluate_all(context) answers every feature for one context in one call
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+FEATURE_FLAG_POLL_INTERVAL = float(os.environ.get("FEATURE_FLAG_POLL_INTERVAL", "5"))  # seconds
+FEATURE_FLAG_RELOAD_DEBOUNCE = float(os.environ.get("FEATURE_FLAG_RELOAD_DEBOUNCE", "0.2"))  # seconds
+
+FLAG_COLLECTIONS = ("config_feature_flags", "qa_feature_flags")
+VERSION_ID = "feature_flags"
+
+SCOPE_GLOBAL = "global"
+# Override scopes, highest precedence first, with the context field that selects them
+OVERRIDE_SCOPES = (("seller", "seller_id"), ("role", "user_role"), ("country", "country_code"))
+
+
+@lru_cache(maxsize=100_000)
+def rollout_bucket(user_id: str) -> int:
+    """Deterministic 0-99 bucket for percentage rollouts."""
+    return int(hashlib.md5(user_id.encode()).hexdigest()[:8], 16) % 100
+
+
+class FlagSnapshot:
+    """Compiled, read-only view of all flags at one version."""
+
+    def __init__(self, config_flags: Iterable[Dict[str, Any]] = (), qa_flags: Iterable[Dict[str, Any]] = (), version: int = 0):
+        self.version = version
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        # (environment, feature_id, scope, scope_value) -> (enabled, rollout_percentage)
+        self._rules: Dict[Tuple[str, str, str, Optional[str]], Tuple[bool, int]] = {}
+        self._features: Dict[str, List[str]] = {}
+        for flag in config_flags:
+            environment, feature_id = flag.get("environment"), flag.get("feature_id")
+            if not environment or not feature_id:
+                continue
+            scope = flag.get("scope") or SCOPE_GLOBAL
+            # Global lookups ignore scope_value; first document wins, as with find_one
+            scope_value = None if scope == SCOPE_GLOBAL else flag.get("scope_value")
+            self._rules.setdefault(
+                (environment, feature_id, scope, scope_value),
+                (bool(flag.get("enabled")), flag.get("rollout_percentage", 100))
+            )
+            self._features.setdefault(environment, [])
+            if feature_id not in self._features[environment]:
+                self._features[environment].append(feature_id)
+        self._switches: Dict[str, bool] = {}
+        for flag in qa_flags:
+            if flag.get("key"):
+                self._switches.setdefault(flag["key"], bool(flag.get("enabled", False)))
+
+    def __len__(self):
+        return len(self._rules) + len(self._switches)
+
+    def features(self, environment: str) -> List[str]:
+        return list(self._features.get(environment, ()))
+
+    def evaluate(
+        self,
+        environment: str,
+        feature_id: str,
+        country_code: Optional[str] = None,
+        user_role: Optional[str] = None,
+        seller_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Same result shape as ConfigManagerService.check_feature_enabled."""
+        context = {"seller_id": seller_id, "user_role": user_role, "country_code": country_code}
+        rules = self._rules
+        for scope, field in OVERRIDE_SCOPES:
+            value = context[field]
+            if value:
+                rule = rules.get((environment, feature_id, scope, value))
+                if rule:
+                    return {
+                        "feature_id": feature_id,
+                        "enabled": rule[0],
+                        "source": f"{scope}:{value}",
+                        "rollout_percentage": rule[1]
+                    }
+
+        rule = rules.get((environment, feature_id, SCOPE_GLOBAL, None))
+        if not rule:
+            return {"feature_id": feature_id, "enabled": False, "source": "default", "rollout_percentage": 0}
+        enabled, rollout = rule
+        if enabled and rollout < 100 and user_id:
+            enabled = rollout_bucket(user_id) < rollout
+        return {"feature_id": feature_id, "enabled": enabled, "source": "global", "rollout_percentage": rollout}
+
+    def evaluate_all(
+        self,
+        environment: str,
+        feature_ids: Optional[Iterable[str]] = None,
+        **context
+    ) -> Dict[str, Dict[str, Any]]:
+        """Every feature (or the given ones) for one context."""
+        if feature_ids is None:
+            feature_ids = self._features.get(environment, ())
+        return {feature_id: self.evaluate(environment, feature_id, **context) for feature_id in feature_ids}
+
+    def is_enabled(self, key: str) -> bool:
+        """QA kill switch state (unknown keys are off)."""
+        return self._switches.get(key, False)
+
+
+class FeatureFlagEngine:
+    """
+    Holds the current FlagSnapshot and keeps it fresh. start(db) from the
+    startup event; services call ensure_loaded(db) before reading so they
+    also work before start() (and in scripts).
+    """
+
+    def __init__(self, poll_interval: float = FEATURE_FLAG_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._db = None
+        self._snapshot = FlagSnapshot()
+        self._loaded = False
+        self._reload_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.mode = "stopped"
+        self.reloads = 0
+        self.reload_errors = 0
+
+    @property
+    def snapshot(self) -> FlagSnapshot:
+        return self._snapshot
+
+    async def _read_version(self) -> int:
+        doc = await self._db.feature_flag_versions.find_one({"_id": VERSION_ID}, {"version": 1})
+        return doc.get("version", 0) if doc else 0
+
+    async def reload(self):
+        """Read both flag collections and swap in a new snapshot."""
+        async with self._reload_lock:
+            version = await self._read_version()
+            config_flags, qa_flags = await asyncio.gather(
+                self._db.config_feature_flags.find(
+                    {}, {"_id": 0, "environment": 1, "feature_id": 1, "scope": 1,
+                         "scope_value": 1, "enabled": 1, "rollout_percentage": 1}
+                ).to_list(length=None),
+                self._db.qa_feature_flags.find({}, {"_id": 0, "key": 1, "enabled": 1}).to_list(length=None)
+            )
+            self._snapshot = FlagSnapshot(config_flags, qa_flags, version)
+            self._loaded = True
+            self.reloads += 1
+
+    async def ensure_loaded(self, db):
+        if not self._loaded:
+            if self._db is None:
+                self._db = db
+            await self.reload()
+
+    async def mark_changed(self):
+        """Call after writing flags: bumps the version other workers poll and reloads here."""
+        if self._db is None:
+            return
+        await self._db.feature_flag_versions.update_one(
+            {"_id": VERSION_ID}, {"$inc": {"version": 1}}, upsert=True
+        )
+        await self.reload()
+
+    # -------------------------------------------------------------------------
+    # Evaluation (synchronous: no I/O)
+    # -------------------------------------------------------------------------
+
+    def evaluate(self, environment: str, feature_id: str, **context) -> Dict[str, Any]:
+        return self._snapshot.evaluate(environment, feature_id, **context)
+
+    def evaluate_all(self, environment: str, feature_ids: Optional[Iterable[str]] = None, **context) -> Dict[str, Dict[str, Any]]:
+        return self._snapshot.evaluate_all(environment, feature_ids, **context)
+
+    def is_enabled(self, key: str) -> bool:
+        return self._snapshot.is_enabled(key)
+
+    # -------------------------------------------------------------------------
+    # Refresh
+    # -------------------------------------------------------------------------
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(FLAG_COLLECTIONS)}}}]
+        async with self._db.watch(pipeline) as stream:
+            self.mode = "change_stream"
+            logger.info("Feature flags: watching change stream")
+            async for _ in stream:
+                # Coalesce bursts (e.g. default flags inserted one by one)
+                await asyncio.sleep(FEATURE_FLAG_RELOAD_DEBOUNCE)
+                await self.reload()
+
+    async def _poll(self):
+        self.mode = "polling"
+        logger.info(f"Feature flags: polling version every {self.poll_interval}s")
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if await self._read_version() != self._snapshot.version:
+                    await self.reload()
+            except Exception as e:
+                self.reload_errors += 1
+                logger.warning(f"Feature flag reload failed, keeping version {self._snapshot.version}: {e}")
+
+    async def _run(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            self.reload_errors += 1
+            logger.warning(f"Feature flag initial load failed: {e}")
+        try:
+            await self._watch()
+        except PyMongoError as e:
+            # Standalone servers have no change streams
+            logger.info(f"Feature flag change stream unavailable ({e})")
+        await self._poll()
+
+    def start(self, db=None):
+        if db is not None:
+            self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.mode = "stopped"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "version": self._snapshot.version,
+            "flags": len(self._snapshot),
+            "loaded_at": self._snapshot.loaded_at,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "rollout_bucket_cache": rollout_bucket.cache_info()._asdict(),
+        }
+
+
+# Singleton instance
+feature_flags = FeatureFlagEngine()
@@ -0,0 +1,641 @@
+"""
+Materialized Feed Snapshots for Avida
+Precomputed, ordered id lists for /api/feed/listings so common feed pages are
+read from a sorted set instead of querying and counting MongoDB per request.
+
+- One sorted set per (score field, country, category), with "*" for "any":
+  created (newest/oldest), price (price_low/price_high), views (popular)
+  and boosted (active boost expiry)
+- Feed cards are stored alongside so a page never touches MongoDB
+- Updated incrementally from listing events on the event bus; a full rebuild
+  runs at startup and then only as an hourly reconciliation (view counts,
+  admin-side edits, missed events), once across workers sharing Redis
+- Redis sorted sets when the cache is connected, otherwise an in-memory
+  equivalent per worker
+"""
+
+import os
+import json
+import time
+import bisect
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Full reconciliation rebuilds; everything in between is incremental
+FEED_SNAPSHOT_REBUILD_INTERVAL = int(os.environ.get("FEED_SNAPSHOT_REBUILD_INTERVAL", "3600"))  # seconds
+FEED_SNAPSHOT_BACKEND = os.environ.get("FEED_SNAPSHOT_BACKEND", "auto")  # auto, redis, memory
+FEED_SNAPSHOT_BOOSTED_LIMIT = 5
+FEED_SNAPSHOT_OLD_VERSION_TTL = int(os.environ.get("FEED_SNAPSHOT_OLD_VERSION_TTL", "60"))  # seconds
+REDIS_PREFIX = "feedsnap"
+
+# Minimal fields for feed cards
+# NOTE: Do NOT include "images" here - base64 images are huge and cause query timeouts
+FEED_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "price": 1,
+    "currency": 1,
+    "location": 1,
+    "cityName": 1,  # Pre-computed for display
+    "category_id": 1,
+    "subcategory": 1,
+    "feed_thumbnail": 1,  # Pre-computed small thumbnail
+    "thumbnail": 1,  # Optimized thumbnail URL
+    "r2_images": 1,  # Cloudflare R2 CDN image URLs
+    "created_at": 1,
+    "is_boosted": 1,
+    "boost_expires_at": 1,
+    "user_id": 1,
+    "status": 1,
+    "views_count": 1,
+    "is_negotiable": 1,
+}
+
+# Feed sort -> (score field, descending)
+SNAPSHOT_SORTS = {
+    "newest": ("created", True),
+    "oldest": ("created", False),
+    "price_low": ("price", False),
+    "price_high": ("price", True),
+    "popular": ("views", True),
+}
+SCORE_FIELDS = ("created", "price", "views")
+
+
+# =============================================================================
+# FEED CARDS
+# =============================================================================
+
+def _timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, str) and value:
+        try:
+            return _timestamp(datetime.fromisoformat(value.replace("Z", "+00:00")))
+        except ValueError:
+            return None
+    return None
+
+
+def to_feed_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Transform a listing document (FEED_PROJECTION) into a feed card."""
+    # Get thumbnail URL: prefer R2 CDN images > feed_thumbnail > thumbnail
+    r2_imgs = item.get("r2_images", [])
+    if r2_imgs and isinstance(r2_imgs, list) and len(r2_imgs) > 0:
+        thumb_url = r2_imgs[0].get("thumb_url") or r2_imgs[0].get("url")
+    else:
+        thumb_url = item.get("feed_thumbnail") or item.get("thumbnail") or None
+
+    # Handle location - it could be a string or an object
+    location = item.get("location", {})
+    if isinstance(location, str):
+        city_name = location
+        country_code = "TZ"
+    else:
+        city_name = location.get("city", "Unknown") if location else "Unknown"
+        country_code = location.get("country_code", "TZ") if location else "TZ"
+
+    # Handle created_at - it could be a datetime or string
+    created_at = item.get("created_at")
+    if hasattr(created_at, 'isoformat'):
+        created_at = created_at.isoformat()
+
+    return {
+        "id": item.get("id"),
+        "title": item.get("title", ""),
+        "price": item.get("price", 0),
+        "currency": item.get("currency", "TZS"),
+        "cityName": city_name,
+        "countryCode": country_code,
+        "category": item.get("category_id") or item.get("category"),
+        "subcategory": item.get("subcategory"),
+        "thumbUrl": thumb_url,
+        "createdAt": created_at,
+        "isBoosted": item.get("is_boosted", False),
+        "sellerId": item.get("user_id"),
+        "viewsCount": item.get("views_count", 0),
+        "isNegotiable": item.get("is_negotiable", False),
+    }
+
+
+def snapshot_entries(doc: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """
+    (set name, score) pairs an active listing belongs to. Country matching
+    mirrors the feed query: location.country_code or location.country.
+    """
+    location = doc.get("location")
+    countries: Set[str] = {"*"}
+    if isinstance(location, dict):
+        for field in ("country_code", "country"):
+            if location.get(field):
+                countries.add(str(location[field]))
+    categories = {"*"}
+    if doc.get("category_id"):
+        categories.add(str(doc["category_id"]))
+
+    scores = {
+        "created": _timestamp(doc.get("created_at")) or 0.0,
+        "price": float(doc.get("price") or 0),
+        "views": float(doc.get("views_count") or 0),
+    }
+    boost_expires = _timestamp(doc.get("boost_expires_at")) if doc.get("is_boosted") else None
+
+    entries = []
+    for country in countries:
+        for category in categories:
+            scope = f"{country}:{category}"
+            entries += [(f"{field}:{scope}", scores[field]) for field in SCORE_FIELDS]
+            if boost_expires:
+                entries.append((f"boosted:{scope}", boost_expires))
+    return entries
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class _SortedSet:
+    """Sorted (score, member) list with member -> score lookup."""
+
+    def __init__(self):
+        self.items: List[Tuple[float, str]] = []
+        self.scores: Dict[str, float] = {}
+
+    def add(self, member: str, score: float):
+        self.remove(member)
+        bisect.insort(self.items, (score, member))
+        self.scores[member] = score
+
+    def remove(self, member: str):
+        score = self.scores.pop(member, None)
+        if score is not None:
+            i = bisect.bisect_left(self.items, (score, member))
+            if i < len(self.items) and self.items[i] == (score, member):
+                del self.items[i]
+
+    def after(self, after: Optional[Tuple[float, str]], descending: bool, limit: int) -> List[Tuple[str, float]]:
+        if descending:
+            end = bisect.bisect_left(self.items, after) if after else len(self.items)
+            window = self.items[max(0, end - limit):end][::-1]
+        else:
+            start = bisect.bisect_right(self.items, after) if after else 0
+            window = self.items[start:start + limit]
+        return [(member, score) for score, member in window]
+
+
+class MemorySnapshotBackend:
+    """Per-process snapshot store."""
+    name = "memory"
+
+    def __init__(self):
+        self._sets: Dict[str, _SortedSet] = {}
+        self._cards: Dict[str, Dict[str, Any]] = {}
+        self._members: Dict[str, List[str]] = {}
+        # Writes made while a rebuild is loading, replayed into the fresh copy
+        self._pending: Optional[List[Tuple[str, Optional[List[Tuple[str, float]]], Optional[Dict[str, Any]]]]] = None
+        self._built_at: Optional[float] = None
+
+    async def age(self) -> Optional[float]:
+        """Seconds since the last full rebuild, None before the first."""
+        return None if self._built_at is None else time.monotonic() - self._built_at
+
+    async def upsert(self, listing_id: str, entries: List[Tuple[str, float]], card: Dict[str, Any]):
+        if self._pending is not None:
+            self._pending.append((listing_id, entries, card))
+        self._apply_upsert(listing_id, entries, card)
+
+    async def remove(self, listing_id: str):
+        if self._pending is not None:
+            self._pending.append((listing_id, None, None))
+        self._apply_remove(listing_id)
+
+    def _apply_upsert(self, listing_id, entries, card):
+        self._apply_remove(listing_id)
+        for name, score in entries:
+            self._sets.setdefault(name, _SortedSet()).add(listing_id, score)
+        self._members[listing_id] = [name for name, _ in entries]
+        self._cards[listing_id] = card
+
+    def _apply_remove(self, listing_id):
+        for name in self._members.pop(listing_id, ()):
+            zset = self._sets.get(name)
+            if zset:
+                zset.remove(listing_id)
+        self._cards.pop(listing_id, None)
+
+    async def replace_all(self, load_rows) -> bool:
+        """
+        Build from `await load_rows()` into fresh structures, replay the writes
+        made meanwhile, then swap.
+        """
+        self._pending = []
+        try:
+            fresh = MemorySnapshotBackend()
+            for listing_id, entries, card in await load_rows():
+                fresh._apply_upsert(listing_id, entries, card)
+            for listing_id, entries, card in self._pending:
+                if entries is None:
+                    fresh._apply_remove(listing_id)
+                else:
+                    fresh._apply_upsert(listing_id, entries, card)
+            self._sets, self._cards, self._members = fresh._sets, fresh._cards, fresh._members
+            self._built_at = time.monotonic()
+        finally:
+            self._pending = None
+        return True
+
+    async def range_after(self, name, after, descending, limit) -> List[Tuple[str, float]]:
+        zset = self._sets.get(name)
+        return zset.after(after, descending, limit) if zset else []
+
+    async def boosted(self, name: str, now: float, limit: int) -> List[str]:
+        zset = self._sets.get(name)
+        if not zset:
+            return []
+        return [m for m, score in zset.after(None, True, limit) if score > now]
+
+    async def cards(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return {i: self._cards[i] for i in ids if i in self._cards}
+
+    async def count(self, name: str) -> int:
+        zset = self._sets.get(name)
+        return len(zset.items) if zset else 0
+
+
+class RedisSnapshotBackend:
+    """
+    Snapshot store in Redis sorted sets, shared by all workers. Full rebuilds
+    write a new key version and flip a pointer. Incremental writes made while
+    a rebuild runs are also queued and replayed into the new version; the old
+    version's keys expire after FEED_SNAPSHOT_OLD_VERSION_TTL, so workers
+    still caching the old pointer keep reading complete pages.
+    """
+    name = "redis"
+    VERSION_CACHE_SECONDS = 2.0
+
+    def __init__(self, client):
+        self.client = client
+        self._version: Optional[str] = None
+        self._version_read_at = 0.0
+
+    async def _current(self) -> str:
+        now = time.monotonic()
+        if self._version is None or now - self._version_read_at > self.VERSION_CACHE_SECONDS:
+            self._version = await self.client.get(f"{REDIS_PREFIX}:version") or "0"
+            self._version_read_at = now
+        return self._version
+
+    def _key(self, version: str, name: str) -> str:
+        return f"{REDIS_PREFIX}:{version}:z:{name}"
+
+    async def age(self) -> Optional[float]:
+        """Seconds since any worker last switched to a fully rebuilt version."""
+        built_at = await self.client.get(f"{REDIS_PREFIX}:built_at")
+        if built_at is None or not await self.client.exists(f"{REDIS_PREFIX}:version"):
+            return None
+        return max(0.0, time.time() - float(built_at))
+
+    def _queue_upsert(self, pipe, version, listing_id, entries, card):
+        for name, score in entries:
+            pipe.zadd(self._key(version, name), {listing_id: score})
+        pipe.hset(f"{REDIS_PREFIX}:{version}:cards", listing_id, json.dumps(
+            {**card, "_k": [name for name, _ in entries]}, default=str
+        ))
+
+    async def _queue_remove(self, pipe, version, listing_id):
+        raw = await self.client.hget(f"{REDIS_PREFIX}:{version}:cards", listing_id)
+        if raw:
+            for name in json.loads(raw).get("_k", []):
+                pipe.zrem(self._key(version, name), listing_id)
+        pipe.hdel(f"{REDIS_PREFIX}:{version}:cards", listing_id)
+
+    async def _record_for_rebuild(self, pipe, listing_id, entries=None, card=None):
+        """Queue the write for the version being built, if a rebuild is running."""
+        building = await self.client.get(f"{REDIS_PREFIX}:building")
+        if building:
+            key = f"{REDIS_PREFIX}:{building}:pending"
+            pipe.rpush(key, json.dumps({"id": listing_id, "entries": entries, "card": card}, default=str))
+            pipe.expire(key, 300)
+
+    async def upsert(self, listing_id, entries, card):
+        version = await self._current()
+        pipe = self.client.pipeline(transaction=False)
+        await self._queue_remove(pipe, version, listing_id)
+        self._queue_upsert(pipe, version, listing_id, entries, card)
+        await self._record_for_rebuild(pipe, listing_id, entries, card)
+        await pipe.execute()
+
+    async def remove(self, listing_id):
+        version = await self._current()
+        pipe = self.client.pipeline(transaction=False)
+        await self._queue_remove(pipe, version, listing_id)
+        await self._record_for_rebuild(pipe, listing_id)
+        await pipe.execute()
+
+    async def _replay_pending(self, version: str):
+        """Apply writes queued during the rebuild to `version`, oldest first."""
+        key = f"{REDIS_PREFIX}:{version}:pending"
+        while True:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.lrange(key, 0, 499)
+            pipe.ltrim(key, 500, -1)
+            raw, _ = await pipe.execute()
+            if not raw:
+                return
+            for item in raw:
+                write = json.loads(item)
+                pipe = self.client.pipeline(transaction=False)
+                await self._queue_remove(pipe, version, write["id"])
+                if write["entries"] is not None:
+                    entries = [(name, score) for name, score in write["entries"]]
+                    self._queue_upsert(pipe, version, write["id"], entries, write["card"])
+                await pipe.execute()
+
+    async def _expire_version(self, version: str):
+        pipe = self.client.pipeline(transaction=False)
+        queued = 0
+        async for key in self.client.scan_iter(match=f"{REDIS_PREFIX}:{version}:*", count=1000):
+            pipe.expire(key, FEED_SNAPSHOT_OLD_VERSION_TTL)
+            queued += 1
+            if queued % 500 == 0:
+                await pipe.execute()
+        await pipe.execute()
+
+    async def replace_all(self, load_rows) -> bool:
+        """
+        Rebuild into a new version. Only one worker rebuilds at a time; the
+        others keep serving the current version. Returns whether a built
+        snapshot is available.
+        """
+        if not await self.client.set(f"{REDIS_PREFIX}:rebuild_lock", "1", nx=True, ex=300):
+            return bool(await self.client.exists(f"{REDIS_PREFIX}:version"))
+        version, switched = None, False
+        try:
+            old = await self.client.get(f"{REDIS_PREFIX}:version")
+            version = str(await self.client.incr(f"{REDIS_PREFIX}:seq"))
+            # From here on incremental writes are also queued for the new version
+            await self.client.set(f"{REDIS_PREFIX}:building", version, ex=300)
+            pipe = self.client.pipeline(transaction=False)
+            for i, (listing_id, entries, card) in enumerate(await load_rows(), 1):
+                self._queue_upsert(pipe, version, listing_id, entries, card)
+                if i % 500 == 0:
+                    await pipe.execute()
+            await pipe.execute()
+            await self._replay_pending(version)
+            pipe = self.client.pipeline(transaction=True)
+            pipe.set(f"{REDIS_PREFIX}:version", version)
+            pipe.set(f"{REDIS_PREFIX}:built_at", time.time())
+            await pipe.execute()
+            switched = True
+            self._version, self._version_read_at = version, time.monotonic()
+
+            # Workers caching the old pointer still write there until their cache lapses
+            await asyncio.sleep(self.VERSION_CACHE_SECONDS + 0.5)
+            await self._replay_pending(version)
+            await self.client.delete(f"{REDIS_PREFIX}:building")
+            await self._replay_pending(version)
+            if old:
+                await self._expire_version(old)
+        except Exception:
+            if version:
+                await self.client.delete(f"{REDIS_PREFIX}:building")
+                # Let whichever version is no longer current lapse
+                stale = old if switched else version
+                if stale:
+                    await self._expire_version(stale)
+            raise
+        finally:
+            await self.client.delete(f"{REDIS_PREFIX}:rebuild_lock")
+        return True
+
+    async def range_after(self, name, after, descending, limit) -> List[Tuple[str, float]]:
+        key = self._key(await self._current(), name)
+        if after is None:
+            fetch = self.client.zrevrange if descending else self.client.zrange
+            return await fetch(key, 0, limit - 1, withscores=True)
+
+        score, member = after
+        if await self.client.zscore(key, member) == score:
+            rank = await (self.client.zrevrank if descending else self.client.zrank)(key, member)
+            fetch = self.client.zrevrange if descending else self.client.zrange
+            return await fetch(key, rank + 1, rank + limit, withscores=True)
+
+        # Cursor member left the set: seek by score and drop ties at or before it
+        if descending:
+            rows = await self.client.zrevrangebyscore(key, score, "-inf", start=0, num=limit + 50, withscores=True)
+            rows = [(m, s) for m, s in rows if (s, m) < (score, member)]
+        else:
+            rows = await self.client.zrangebyscore(key, score, "+inf", start=0, num=limit + 50, withscores=True)
+            rows = [(m, s) for m, s in rows if (s, m) > (score, member)]
+        return rows[:limit]
+
+    async def boosted(self, name, now, limit) -> List[str]:
+        key = self._key(await self._current(), name)
+        return await self.client.zrevrangebyscore(key, "+inf", f"({now}", start=0, num=limit)
+
+    async def cards(self, ids):
+        if not ids:
+            return {}
+        raw = await self.client.hmget(f"{REDIS_PREFIX}:{await self._current()}:cards", ids)
+        out = {}
+        for listing_id, value in zip(ids, raw):
+            if value:
+                card = json.loads(value)
+                card.pop("_k", None)
+                out[listing_id] = card
+        return out
+
+    async def count(self, name) -> int:
+        return await self.client.zcard(self._key(await self._current(), name))
+
+
+# =============================================================================
+# SERVICE
+# =============================================================================
+
+class FeedSnapshotService:
+    """Builds, maintains and serves materialized feed pages."""
+
+    def __init__(self, db):
+        self.db = db
+        self.backend = None
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        self.rebuilds = 0
+        self.last_rebuild_ms: Optional[float] = None
+        self.incremental_updates = 0
+        self.pages_served = 0
+
+    @staticmethod
+    def eligible(sort: str, region=None, city=None, subcategory=None, seller_id=None, search=None) -> bool:
+        """Only country/category/sort combinations are materialized."""
+        return sort in SNAPSHOT_SORTS and not any((region, city, subcategory, seller_id, search))
+
+    def _select_backend(self):
+        from utils.cache import cache
+        if FEED_SNAPSHOT_BACKEND != "memory" and cache.connected and cache.redis_client:
+            return RedisSnapshotBackend(cache.redis_client)
+        return MemorySnapshotBackend()
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    async def rebuild(self, force: bool = False):
+        """
+        Recompute every snapshot from active listings, unless (without
+        `force`) a rebuild within FEED_SNAPSHOT_REBUILD_INTERVAL is already
+        in place, e.g. one another worker made.
+        """
+        if not force:
+            age = await self.backend.age()
+            if age is not None and age < FEED_SNAPSHOT_REBUILD_INTERVAL:
+                self.ready = True
+                return
+        start = time.perf_counter()
+        loaded = []
+
+        async def load_rows():
+            rows = []
+            async for doc in self.db.listings.find({"status": "active"}, FEED_PROJECTION):
+                if doc.get("id"):
+                    rows.append((doc["id"], snapshot_entries(doc), to_feed_item(doc)))
+            loaded.append(len(rows))
+            return rows
+
+        self.ready = await self.backend.replace_all(load_rows) or self.ready
+        if loaded:
+            self.rebuilds += 1
+            self.last_rebuild_ms = round((time.perf_counter() - start) * 1000, 1)
+            logger.info(f"Feed snapshots rebuilt: {loaded[0]} listings in {self.last_rebuild_ms}ms ({self.backend.name})")
+
+    async def refresh_listings(self, listing_ids: Iterable[str]):
+        """Re-read listings and upsert/remove them in every snapshot they touch."""
+        if not self.ready:
+            return
+        ids = list(dict.fromkeys(i for i in listing_ids if i))
+        if not ids:
+            return
+        docs = await self.db.listings.find({"id": {"$in": ids}}, FEED_PROJECTION).to_list(len(ids))
+        found = {doc["id"]: doc for doc in docs}
+        for listing_id in ids:
+            doc = found.get(listing_id)
+            if doc and doc.get("status") == "active":
+                await self.backend.upsert(listing_id, snapshot_entries(doc), to_feed_item(doc))
+            else:
+                await self.backend.remove(listing_id)
+        self.incremental_updates += len(ids)
+
+    async def handle_events(self, events):
+        """Event bus subscriber for listing create/update/delete/boost events."""
+        await self.refresh_listings(e.properties.get("listing_id") for e in events)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Feed snapshot rebuild failed: {e}")
+            await asyncio.sleep(FEED_SNAPSHOT_REBUILD_INTERVAL)
+
+    def start(self):
+        self.backend = self._select_backend()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    async def total(self, country: Optional[str] = None, category: Optional[str] = None) -> int:
+        """Maintained count of active listings in a snapshot (O(1))."""
+        return await self.backend.count(f"created:{country or '*'}:{category or '*'}")
+
+    async def page(
+        self,
+        country: Optional[str],
+        category: Optional[str],
+        sort: str,
+        cursor: Optional[str],
+        limit: int
+    ) -> Dict[str, Any]:
+        """
+        One feed page from the snapshot. Raises InvalidCursorError for cursors
+        not issued by this snapshot (callers fall back to the query path).
+        """
+        field, descending = SNAPSHOT_SORTS[sort]
+        scope = f"{country or '*'}:{category or '*'}"
+        name = f"{field}:{scope}"
+        direction = -1 if descending else 1
+        sort_spec = [("score", direction), ("id", direction)]
+
+        after = None
+        if cursor:
+            score, last_id = decode_cursor(cursor, sort_spec, scope=name)
+            after = (float(score), last_id)
+
+        # Boosted listings lead the first page and are left out of every page's main list
+        boosted_ids = await self.backend.boosted(
+            f"boosted:{scope}", datetime.now(timezone.utc).timestamp(), FEED_SNAPSHOT_BOOSTED_LIMIT
+        )
+
+        rows = await self.backend.range_after(name, after, descending, limit + len(boosted_ids) + 1)
+        skip = set(boosted_ids)
+        rows = [(m, s) for m, s in rows if m not in skip]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        ids = ([] if cursor else boosted_ids) + [m for m, _ in rows]
+        cards = await self.backend.cards(ids)
+        missing = [i for i in ids if i not in cards]
+        if missing:
+            docs = await self.db.listings.find({"id": {"$in": missing}}, FEED_PROJECTION).to_list(len(missing))
+            cards.update({doc["id"]: to_feed_item(doc) for doc in docs})
+
+        next_cursor = None
+        if has_more and rows:
+            last_id, last_score = rows[-1]
+            next_cursor = encode_cursor({"score": last_score, "id": last_id}, sort_spec, scope=name)
+
+        self.pages_served += 1
+        return {
+            "items": [cards[i] for i in ids if i in cards],
+            "nextCursor": next_cursor,
+            "totalApprox": await self.total(country, category),
+            "hasMore": has_more,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.backend else None,
+            "ready": self.ready,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_ms": self.last_rebuild_ms,
+            "incremental_updates": self.incremental_updates,
+            "pages_served": self.pages_served,
+        }
+
+
+_feed_snapshots: Optional[FeedSnapshotService] = None
+
+
+def get_feed_snapshots(db) -> FeedSnapshotService:
+    """Get or create the feed snapshot service singleton."""
+    global _feed_snapshots
+    if _feed_snapshots is None:
+        _feed_snapshots = FeedSnapshotService(db)
+    return _feed_snapshots
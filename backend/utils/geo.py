@@ -0,0 +1,215 @@
+"""
+Geospatial Listing Queries for Avida
+Nearby search over the 2dsphere index on listings.geo_point:
+
+- geo_near_page: $geoNear with maxDistance, ordered by (distance, id) with
+  signed keyset cursors instead of skip
+- count_within: capped count via $geoWithin (index-backed, never a full scan)
+- backfill_geo_points: resumable migration writing geo_point on legacy
+  listings that only have location_data.lat/lng
+"""
+
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6378.1
+GEO_COUNT_CAP = int(os.environ.get("GEO_COUNT_CAP", "1000"))
+
+# Nearby results are ordered by distance, then id to break ties
+# (listings geocoded to a city centre share the exact same distance)
+GEO_SORT_SPEC = [("distance_km", 1), ("id", 1)]
+
+# Slack when turning a stored km distance back into a meters bound;
+# the exact comparison happens on distance_km in $match
+_BOUND_SLACK_M = 0.01
+
+GEO_BACKFILL_MIGRATION_ID = "listings_geo_point_backfill"
+
+
+def geo_point_from(lat: Any, lng: Any) -> Optional[Dict[str, Any]]:
+    """GeoJSON Point for a lat/lng pair, or None if the values are not usable."""
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {"type": "Point", "coordinates": [lng, lat]}  # GeoJSON is [lng, lat]
+
+
+def _cursor_scope(lat: float, lng: float, radius_km: float, query: Dict[str, Any]) -> str:
+    filters = ",".join(f"{k}={v}" for k, v in sorted(query.items()))
+    return f"geo:{lat:.6f},{lng:.6f},{radius_km}:{filters}"
+
+
+def _geo_near_stage(
+    lat: float,
+    lng: float,
+    query: Dict[str, Any],
+    max_distance_m: float,
+    min_distance_m: Optional[float] = None
+) -> Dict[str, Any]:
+    stage = {
+        "near": {"type": "Point", "coordinates": [lng, lat]},
+        "key": "geo_point",
+        "distanceField": "distance_km",
+        "distanceMultiplier": 0.001,
+        "spherical": True,
+        "maxDistance": max_distance_m,
+        "query": query,
+    }
+    if min_distance_m:
+        stage["minDistance"] = max(min_distance_m, 0)
+    return {"$geoNear": stage}
+
+
+async def geo_near_page(
+    collection,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    query: Dict[str, Any],
+    limit: int,
+    projection: Dict[str, Any],
+    cursor: Optional[str] = None,
+    skip: int = 0
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of listings within radius_km of (lat, lng), nearest first.
+    Returns (listings, next_cursor). Raises InvalidCursorError for bad cursors.
+
+    $geoNear streams in distance order but leaves ties unordered, so the page
+    is read in two steps: the next limit+1 documents, then the complete tie
+    group at the boundary distance sorted by id.
+    """
+    scope = _cursor_scope(lat, lng, radius_km, query)
+    max_distance_m = radius_km * 1000
+    min_distance_m = None
+    seek: Dict[str, Any] = {}
+    if cursor:
+        last_distance, last_id = decode_cursor(cursor, GEO_SORT_SPEC, scope)
+        min_distance_m = last_distance * 1000 - _BOUND_SLACK_M
+        seek = {"$or": [
+            {"distance_km": {"$gt": last_distance}},
+            {"distance_km": last_distance, "id": {"$gt": last_id}},
+        ]}
+        skip = 0
+
+    # $project is applied last so distance_km/id stay available for seeking
+    pipeline = [_geo_near_stage(lat, lng, query, max_distance_m, min_distance_m)]
+    if seek:
+        pipeline.append({"$match": seek})
+    if skip:
+        pipeline.append({"$skip": skip})
+    pipeline += [{"$limit": limit + 1}, {"$project": projection}]
+    batch = await collection.aggregate(pipeline).to_list(limit + 1)
+
+    if len(batch) > limit and not skip:
+        boundary = batch[-1]["distance_km"]
+        below = [doc for doc in batch if doc["distance_km"] < boundary]
+        tie_pipeline = [
+            _geo_near_stage(
+                lat, lng, query,
+                boundary * 1000 + _BOUND_SLACK_M,
+                boundary * 1000 - _BOUND_SLACK_M
+            ),
+            {"$match": {"distance_km": boundary, **({"$and": [seek]} if seek else {})}},
+            {"$sort": {"id": 1}},
+            {"$limit": limit + 1 - len(below)},
+            {"$project": projection},
+        ]
+        ties = await collection.aggregate(tie_pipeline).to_list(limit + 1)
+        if ties:
+            batch = below + ties
+        else:
+            batch = below + sorted((d for d in batch if d["distance_km"] == boundary), key=lambda d: d["id"])
+    else:
+        batch.sort(key=lambda d: (d["distance_km"], d["id"]))
+
+    if len(batch) <= limit:
+        return batch, None
+    items = batch[:limit]
+    return items, encode_cursor(items[-1], GEO_SORT_SPEC, scope)
+
+
+async def count_within(
+    collection,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    query: Dict[str, Any],
+    cap: int = GEO_COUNT_CAP
+) -> Tuple[int, bool]:
+    """
+    Count listings within radius_km, stopping at `cap`.
+    Returns (count, capped); when capped is True the real count is larger.
+    """
+    geo_query = {
+        **query,
+        "geo_point": {"$geoWithin": {"$centerSphere": [[lng, lat], radius_km / EARTH_RADIUS_KM]}},
+    }
+    count = await collection.count_documents(geo_query, limit=cap + 1)
+    return min(count, cap), count > cap
+
+
+async def backfill_geo_points(db, batch_size: int = 500) -> int:
+    """
+    Write geo_point on listings that only have location_data.lat/lng.
+    Resumable: progress is checkpointed by _id in db.migrations, so a restart
+    continues where the last batch ended and unusable coordinates are not
+    rescanned on every boot.
+    """
+    from pymongo import UpdateOne
+
+    state = await db.migrations.find_one({"_id": GEO_BACKFILL_MIGRATION_ID}) or {}
+    if state.get("completed_at"):
+        return 0
+
+    last_id = state.get("last_id")
+    updated = 0
+    while True:
+        query = {
+            "geo_point": {"$in": [None]},
+            "location_data.lat": {"$exists": True},
+            "location_data.lng": {"$exists": True},
+        }
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.listings.find(
+            query, {"_id": 1, "location_data.lat": 1, "location_data.lng": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            loc = doc.get("location_data") or {}
+            point = geo_point_from(loc.get("lat"), loc.get("lng"))
+            if point:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"geo_point": point}}))
+        if ops:
+            await db.listings.bulk_write(ops, ordered=False)
+            updated += len(ops)
+
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": GEO_BACKFILL_MIGRATION_ID},
+            {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)},
+             "$inc": {"updated": len(ops), "scanned": len(batch)}},
+            upsert=True
+        )
+
+    await db.migrations.update_one(
+        {"_id": GEO_BACKFILL_MIGRATION_ID},
+        {"$set": {"completed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    if updated:
+        logger.info(f"Backfilled geo_point on {updated} listings")
+    return updated
@@ -0,0 +1,159 @@
+"""
+Shared HTTP Client Pool for Avida
+Keep-alive httpx clients per upstream (admin backend, admin frontend, internal
+calls) instead of a fresh AsyncClient - and TCP connection - per request.
+Records a latency histogram per upstream for /api/perf/stats.
+"""
+
+import os
+import time
+import bisect
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Pool configuration
+HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+HTTP_POOL_CONNECT_TIMEOUT = float(os.environ.get("HTTP_POOL_CONNECT_TIMEOUT", "5"))
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (non-cumulative count per bucket)."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+
+    def observe(self, elapsed_ms: float, error: bool = False):
+        self.counts[bisect.bisect_left(self.buckets, elapsed_ms)] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing quantile q."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}ms" for b in self.buckets] + ["le_inf"]
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.total, 2) if self.total else None,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class HttpClientPool:
+    """
+    Lazily created, shared httpx.AsyncClient per upstream name.
+    Call aclose() on shutdown.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def client(self, upstream: str = "default") -> httpx.AsyncClient:
+        """Get (or create) the keep-alive client for an upstream."""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(30.0, connect=HTTP_POOL_CONNECT_TIMEOUT),
+            )
+            self._clients[upstream] = client
+        return client
+
+    def histogram(self, upstream: str) -> LatencyHistogram:
+        if upstream not in self._histograms:
+            self._histograms[upstream] = LatencyHistogram()
+        return self._histograms[upstream]
+
+    async def request(self, upstream: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a buffered request through the pool and record its latency."""
+        start = time.perf_counter()
+        error = True
+        try:
+            response = await self.client(upstream).request(method, url, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            self.histogram(upstream).observe((time.perf_counter() - start) * 1000, error=error)
+
+    async def send_stream(
+        self,
+        upstream: str,
+        request: httpx.Request,
+        follow_redirects: bool = False
+    ) -> httpx.Response:
+        """
+        Send a request and return as soon as headers arrive; the caller streams
+        the body and must close the response. Latency is time-to-headers.
+        """
+        start = time.perf_counter()
+        error = True
+        try:
+            response = await self.client(upstream).send(request, stream=True, follow_redirects=follow_redirects)
+            error = response.status_code >= 500
+            return response
+        finally:
+            self.histogram(upstream).observe((time.perf_counter() - start) * 1000, error=error)
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        logger.info("HTTP client pool closed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limits": {
+                "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+                "max_keepalive": HTTP_POOL_MAX_KEEPALIVE,
+                "keepalive_expiry_seconds": HTTP_POOL_KEEPALIVE_EXPIRY,
+            },
+            "upstreams": {name: h.snapshot() for name, h in self._histograms.items()},
+        }
+
+
+# Hop-by-hop headers that must not be forwarded by a proxy
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host",
+}
+
+
+def forwardable_headers(headers) -> Dict[str, str]:
+    """Copy headers, dropping hop-by-hop ones."""
+    return {k: v for k, v in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+
+
+# Singleton instance
+http_pool = HttpClientPool()
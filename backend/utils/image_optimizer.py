@@ -10,6 +10,8 @@ import logging
 from typing import Optional, Tuple
 from PIL import Image
 
+from utils.cpu_pool import cpu_pool
+
 logger = logging.getLogger(__name__)
 
 # Configuration
@@ -83,6 +85,11 @@ def create_thumbnail(base64_string: str, size: Tuple[int, int] = THUMBNAIL_SIZE)
     return encode_image_to_base64(image, format="WEBP", quality=75)
 
 
+async def create_thumbnail_async(base64_string: str, size: Tuple[int, int] = THUMBNAIL_SIZE) -> Optional[str]:
+    """create_thumbnail in the CPU pool."""
+    return await cpu_pool.run(create_thumbnail, base64_string, size, label="image_thumbnail")
+
+
 def optimize_image(base64_string: str, max_size: Tuple[int, int] = PREVIEW_SIZE) -> Optional[str]:
     """
     Optimize an image: resize and convert to WebP.
@@ -0,0 +1,539 @@
+"""
+Maintained Leaderboards for Avida
+Ranked (member, score) boards so rank-of-user, top-N and around-me windows
+cost O(log n) instead of grouping a whole collection per request.
+
+- Redis sorted sets when the cache is connected (shared by all workers),
+  otherwise an in-memory indexable skiplist per process
+- Ranks are 1-based, highest score first; equal scores are ordered by member
+  descending (Redis ZREVRANGE order) in both backends
+- Boards are updated incrementally by the writers and reconciled from MongoDB
+  by rebuild(): at first use, via scripts/rebuild_leaderboards.py, and every
+  LEADERBOARD_MEMORY_MAX_AGE seconds for memory boards
+- Redis rebuilds hold a SET NX lock, ZADD the loaded scores into per-rebuild
+  temporary keys and RENAME them into place. The members written while a
+  rebuild runs are journaled and re-read from MongoDB after the swap, since
+  the load may or may not have seen those writes
+
+The badge leaderboard keeps two boards over user_badges: "points" (sum of
+points_value) and "count" (badges held).
+"""
+
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_BACKEND = os.environ.get("LEADERBOARD_BACKEND", "auto")  # auto, redis, memory
+# Memory boards only see this worker's writes; they are rebuilt when older than this
+LEADERBOARD_MEMORY_MAX_AGE = int(os.environ.get("LEADERBOARD_MEMORY_MAX_AGE", "300"))  # seconds
+# A Redis rebuild that crashed releases its lock and temporary boards after this
+LEADERBOARD_REBUILD_LOCK_SECONDS = int(os.environ.get("LEADERBOARD_REBUILD_LOCK_SECONDS", "300"))
+REDIS_PREFIX = "leaderboard"
+
+# Rounds of re-reading members written during a rebuild before giving up on catching up
+LEADERBOARD_REBUILD_CATCHUP_ROUNDS = 10
+
+Entry = Tuple[str, float]
+# Loads every board of a rebuild: board -> entries
+LoadBoards = Callable[[], Awaitable[Dict[str, List[Entry]]]]
+# Re-reads some members: board -> {member: score}; members left out are unranked
+ReloadMembers = Callable[[List[str]], Awaitable[Dict[str, Dict[str, float]]]]
+
+
+# =============================================================================
+# INDEXABLE SKIPLIST
+# =============================================================================
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * level
+        # Number of bottom-level steps to next[level]
+        self.width: List[int] = [1] * level
+
+
+class IndexableSkipList:
+    """
+    Ascending skiplist of unique (score, member) keys with link widths, so
+    insert, remove, rank and positional access are all O(log n) expected.
+    """
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self.head = _Node(None, self.MAX_LEVEL)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def _path(self, key) -> Tuple[List[_Node], List[int]]:
+        """Rightmost node before `key` on every level, and its 0-based position (head = 0)."""
+        chain: List[_Node] = [self.head] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node, pos = self.head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                pos += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = pos
+        return chain, positions
+
+    def insert(self, key):
+        chain, positions = self._path(key)
+        new = _Node(key, self._random_level())
+        pos = positions[0] + 1
+        for level in range(len(new.next)):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - (pos - positions[level]) + 1
+            prev.width[level] = pos - positions[level]
+        for level in range(len(new.next), self.MAX_LEVEL):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key) -> bool:
+        chain, _ = self._path(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            return False
+        for level in range(self.MAX_LEVEL):
+            prev = chain[level]
+            if prev.next[level] is target:
+                prev.width[level] += target.width[level] - 1
+                prev.next[level] = target.next[level]
+            else:
+                prev.width[level] -= 1
+        self.size -= 1
+        return True
+
+    def index(self, key) -> Optional[int]:
+        """0-based ascending position of `key`, or None."""
+        chain, positions = self._path(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            return None
+        return positions[0]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        """Keys at ascending positions [start, stop)."""
+        start, stop = max(0, start), min(stop, self.size)
+        if start >= stop:
+            return []
+        node, remaining = self.head, start + 1
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class MemoryBoard:
+    """Per-process board: member -> score plus an indexable skiplist."""
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.order = IndexableSkipList()
+
+    def _set(self, member: str, score: Optional[float]):
+        old = self.scores.pop(member, None)
+        if old is not None:
+            self.order.remove((old, member))
+        if score is not None:
+            self.scores[member] = score
+            self.order.insert((score, member))
+
+    def incr(self, member: str, delta: float) -> float:
+        score = self.scores.get(member, 0.0) + delta
+        self._set(member, score)
+        return score
+
+    def rank(self, member: str) -> Optional[int]:
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return self.order.size - self.order.index((score, member))
+
+    def range(self, offset: int, limit: int) -> List[Entry]:
+        """Entries at descending ranks offset+1 .. offset+limit."""
+        stop = self.order.size - offset
+        keys = self.order.slice(stop - limit, stop)
+        return [(member, score) for score, member in reversed(keys)]
+
+
+class MemoryLeaderboardBackend:
+    name = "memory"
+
+    def __init__(self):
+        self._boards: Dict[str, MemoryBoard] = {}
+        # Members written while replace_all() runs, re-read once the fresh boards are in place
+        self._touched: Optional[set] = None
+
+    def _board(self, board: str) -> MemoryBoard:
+        return self._boards.setdefault(board, MemoryBoard())
+
+    async def exists(self, board: str) -> bool:
+        return board in self._boards
+
+    async def incr(self, board: str, member: str, delta: float) -> float:
+        if self._touched is not None:
+            self._touched.add(member)
+        return self._board(board).incr(member, delta)
+
+    async def remove(self, board: str, member: str):
+        if self._touched is not None:
+            self._touched.add(member)
+        self._board(board)._set(member, None)
+
+    async def rank(self, board, member) -> Optional[int]:
+        return self._board(board).rank(member)
+
+    async def score(self, board, member) -> Optional[float]:
+        return self._board(board).scores.get(member)
+
+    async def scores(self, board, members) -> List[Optional[float]]:
+        scores = self._board(board).scores
+        return [scores.get(m) for m in members]
+
+    async def range(self, board, offset, limit) -> List[Entry]:
+        return self._board(board).range(offset, limit)
+
+    async def count(self, board) -> int:
+        return self._board(board).order.size
+
+    async def replace_all(self, load: LoadBoards, reload: ReloadMembers) -> bool:
+        self._touched = set()
+        try:
+            loaded = await load()
+            fresh = {board: MemoryBoard() for board in loaded}
+            for board, entries in loaded.items():
+                for member, score in entries:
+                    fresh[board]._set(member, score)
+            self._boards.update(fresh)
+            for _ in range(LEADERBOARD_REBUILD_CATCHUP_ROUNDS):
+                members, self._touched = self._touched, set()
+                if not members:
+                    break
+                reloaded = await reload(sorted(members))
+                for board in loaded:
+                    scores = reloaded.get(board, {})
+                    for member in members:
+                        self._board(board)._set(member, scores.get(member))
+        finally:
+            self._touched = None
+        return True
+
+
+class RedisLeaderboardBackend:
+    """
+    Boards as Redis sorted sets. A rebuild takes a SET NX lock, fills a
+    temporary key per board and RENAMEs it into place; members written
+    meanwhile are collected in a set and re-read after the swap.
+    """
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, board: str) -> str:
+        return f"{REDIS_PREFIX}:{board}"
+
+    def _rebuild_key(self, board: str, token: str) -> str:
+        return f"{self._key(board)}:rebuild:{token}"
+
+    async def exists(self, board: str) -> bool:
+        return bool(await self.client.exists(f"{self._key(board)}:built"))
+
+    def _touched_key(self, token: str) -> str:
+        return f"{REDIS_PREFIX}:rebuild:{token}:touched"
+
+    async def _write(self, member, apply):
+        """Run apply(pipe) and, during a rebuild, note the member for re-reading in the same transaction."""
+        token = await self.client.get(f"{REDIS_PREFIX}:rebuilding")
+        pipe = self.client.pipeline(transaction=True)
+        apply(pipe)
+        if token:
+            pipe.sadd(self._touched_key(token), member)
+            pipe.expire(self._touched_key(token), LEADERBOARD_REBUILD_LOCK_SECONDS)
+        return (await pipe.execute())[0]
+
+    async def incr(self, board, member, delta) -> float:
+        return await self._write(member, lambda pipe: pipe.zincrby(self._key(board), delta, member))
+
+    async def remove(self, board, member):
+        await self._write(member, lambda pipe: pipe.zrem(self._key(board), member))
+
+    async def rank(self, board, member) -> Optional[int]:
+        rank = await self.client.zrevrank(self._key(board), member)
+        return None if rank is None else rank + 1
+
+    async def score(self, board, member) -> Optional[float]:
+        return await self.client.zscore(self._key(board), member)
+
+    async def scores(self, board, members) -> List[Optional[float]]:
+        pipe = self.client.pipeline(transaction=False)
+        for member in members:
+            pipe.zscore(self._key(board), member)
+        return await pipe.execute()
+
+    async def range(self, board, offset, limit) -> List[Entry]:
+        if limit <= 0:
+            return []
+        return await self.client.zrevrange(self._key(board), offset, offset + limit - 1, withscores=True)
+
+    async def count(self, board) -> int:
+        return await self.client.zcard(self._key(board))
+
+    async def replace_all(self, load: LoadBoards, reload: ReloadMembers) -> bool:
+        """Rebuild every board load() returns. False when another worker holds the rebuild lock."""
+        lock = f"{REDIS_PREFIX}:rebuild-lock"
+        token = uuid.uuid4().hex
+        if not await self.client.set(lock, token, nx=True, ex=LEADERBOARD_REBUILD_LOCK_SECONDS):
+            return False
+        touched = self._touched_key(token)
+        try:
+            # Set before loading: every member written from here on is re-read after the swap
+            await self.client.set(f"{REDIS_PREFIX}:rebuilding", token, ex=LEADERBOARD_REBUILD_LOCK_SECONDS)
+            loaded = await load()
+            for board, entries in loaded.items():
+                tmp = self._rebuild_key(board, token)
+                pipe = self.client.pipeline(transaction=False)
+                for i, (member, score) in enumerate(entries, 1):
+                    pipe.zadd(tmp, {member: score})
+                    if i % 1000 == 0:
+                        await pipe.execute()
+                pipe.expire(tmp, LEADERBOARD_REBUILD_LOCK_SECONDS)
+                await pipe.execute()
+
+            pipe = self.client.pipeline(transaction=True)
+            for board, entries in loaded.items():
+                key, tmp = self._key(board), self._rebuild_key(board, token)
+                if not entries:
+                    # Nobody holds a badge
+                    pipe.delete(key)
+                elif await self.client.exists(tmp):
+                    pipe.rename(tmp, key)
+                    pipe.persist(key)
+                else:
+                    raise RuntimeError(f"Temporary leaderboard {tmp} disappeared during the rebuild")
+                pipe.set(f"{key}:built", "1")
+            await pipe.execute()
+
+            for _ in range(LEADERBOARD_REBUILD_CATCHUP_ROUNDS):
+                pipe = self.client.pipeline(transaction=True)
+                pipe.smembers(touched)
+                pipe.delete(touched)
+                members = sorted((await pipe.execute())[0])
+                if not members:
+                    break
+                reloaded = await reload(members)
+                pipe = self.client.pipeline(transaction=True)
+                for board in loaded:
+                    scores = reloaded.get(board, {})
+                    present = {m: scores[m] for m in members if m in scores}
+                    missing = [m for m in members if m not in scores]
+                    if present:
+                        pipe.zadd(self._key(board), present)
+                    if missing:
+                        pipe.zrem(self._key(board), *missing)
+                await pipe.execute()
+            return True
+        finally:
+            for name in (f"{REDIS_PREFIX}:rebuilding", lock):
+                if await self.client.get(name) == token:
+                    await self.client.delete(name)
+            await self.client.delete(touched)
+
+
+# =============================================================================
+# BADGE LEADERBOARD
+# =============================================================================
+
+class BadgeLeaderboard:
+    """Points and badge-count boards over user_badges."""
+    BOARDS = ("points", "count")
+
+    def __init__(self, db):
+        self.db = db
+        self.backend = None
+        self._ready = False
+        self._lock = asyncio.Lock()
+        self._built_at = 0.0
+        self.rebuilds = 0
+
+    def _select_backend(self):
+        from utils.cache import cache
+        if LEADERBOARD_BACKEND != "memory" and cache.connected and cache.redis_client:
+            return RedisLeaderboardBackend(cache.redis_client)
+        return MemoryLeaderboardBackend()
+
+    def _stale(self) -> bool:
+        return (
+            self.backend is not None and self.backend.name == "memory"
+            and time.monotonic() - self._built_at > LEADERBOARD_MEMORY_MAX_AGE
+        )
+
+    async def _ensure_ready(self):
+        if self._ready and not self._stale():
+            return
+        async with self._lock:
+            if self._ready and not self._stale():
+                return
+            stale = self._stale()
+            if self.backend is None or stale:
+                # Memory boards re-check for Redis, which may have connected since
+                self.backend = self._select_backend()
+            if stale or not all([await self.backend.exists(board) for board in self.BOARDS]):
+                # Stays unready while another worker holds the rebuild lock
+                self._ready = not (await self._rebuild())["skipped"]
+            else:
+                self._ready = True
+
+    async def _totals(self, user_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        pipeline: List[Dict[str, Any]] = [{"$group": {
+            "_id": "$user_id",
+            "badge_count": {"$sum": 1},
+            "total_points": {"$sum": {"$ifNull": ["$points_value", 0]}}
+        }}]
+        if user_ids is not None:
+            pipeline.insert(0, {"$match": {"user_id": {"$in": user_ids}}})
+        rows = await self.db.user_badges.aggregate(pipeline).to_list(None)
+        return [r for r in rows if r["_id"]]
+
+    async def _rebuild(self) -> Dict[str, Any]:
+        users = []
+
+        async def load():
+            rows = await self._totals()
+            users.append(len(rows))
+            return {
+                "points": [(r["_id"], float(r["total_points"])) for r in rows],
+                "count": [(r["_id"], float(r["badge_count"])) for r in rows],
+            }
+
+        async def reload(user_ids):
+            rows = await self._totals(user_ids)
+            return {
+                "points": {r["_id"]: float(r["total_points"]) for r in rows},
+                "count": {r["_id"]: float(r["badge_count"]) for r in rows},
+            }
+
+        if not await self.backend.replace_all(load, reload):
+            logger.info("Badge leaderboard rebuild skipped, another worker is rebuilding")
+            return {"users": None, "skipped": True}
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+        logger.info(f"Badge leaderboard rebuilt: {users[0]} users ({self.backend.name})")
+        return {"users": users[0], "skipped": False}
+
+    async def rebuild(self) -> Dict[str, Any]:
+        """Reconcile both boards from user_badges."""
+        async with self._lock:
+            if self.backend is None:
+                self.backend = self._select_backend()
+            result = await self._rebuild()
+            self._ready = self._ready or not result["skipped"]
+        return {**result, "backend": self.backend.name}
+
+    async def record_award(self, user_id: str, points: float = 0):
+        try:
+            await self._ensure_ready()
+            await self.backend.incr("count", user_id, 1)
+            await self.backend.incr("points", user_id, float(points or 0))
+        except Exception as e:
+            logger.warning(f"Badge leaderboard award update failed for {user_id}: {e}")
+
+    async def record_revoke(self, user_id: str, points: float = 0):
+        try:
+            await self._ensure_ready()
+            if await self.backend.incr("count", user_id, -1) <= 0:
+                # Users without badges are not ranked
+                for board in self.BOARDS:
+                    await self.backend.remove(board, user_id)
+            else:
+                await self.backend.incr("points", user_id, -float(points or 0))
+        except Exception as e:
+            logger.warning(f"Badge leaderboard revoke update failed for {user_id}: {e}")
+
+    async def rank(self, user_id: str, board: str = "points") -> Optional[int]:
+        await self._ensure_ready()
+        return await self.backend.rank(board, user_id)
+
+    async def entry(self, user_id: str) -> Dict[str, Any]:
+        """Rank, points and badge count of one user (rank None when they hold no badges)."""
+        await self._ensure_ready()
+        points = await self.backend.score("points", user_id)
+        count = await self.backend.score("count", user_id)
+        return {
+            "rank": await self.backend.rank("points", user_id),
+            "total_points": int(points or 0),
+            "badge_count": int(count or 0),
+        }
+
+    async def scores(self, board: str, user_ids: List[str]) -> Dict[str, int]:
+        """Scores of several users on one board (users without badges are omitted)."""
+        await self._ensure_ready()
+        if not user_ids:
+            return {}
+        values = await self.backend.scores(board, user_ids)
+        return {u: int(v) for u, v in zip(user_ids, values) if v is not None}
+
+    async def top(self, board: str = "points", offset: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        await self._ensure_ready()
+        rows = await self.backend.range(board, offset, limit)
+        return [{"rank": offset + i + 1, "user_id": member, "score": int(score)}
+                for i, (member, score) in enumerate(rows)]
+
+    async def around(self, user_id: str, board: str = "points", radius: int = 5) -> List[Dict[str, Any]]:
+        """Entries within `radius` ranks of the user (empty when they are not ranked)."""
+        rank = await self.rank(user_id, board)
+        if rank is None:
+            return []
+        offset = max(0, rank - 1 - radius)
+        return await self.top(board, offset, rank + radius - offset)
+
+    async def total(self, board: str = "points") -> int:
+        await self._ensure_ready()
+        return await self.backend.count(board)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.backend else None,
+            "ready": self._ready,
+            "rebuilds": self.rebuilds,
+        }
+
+
+_badge_leaderboard: Optional[BadgeLeaderboard] = None
+
+
+def get_badge_leaderboard(db) -> BadgeLeaderboard:
+    """Get or create the badge leaderboard instance"""
+    global _badge_leaderboard
+    if _badge_leaderboard is None:
+        _badge_leaderboard = BadgeLeaderboard(db)
+    return _badge_leaderboard
@@ -0,0 +1,157 @@
+"""
+Batch Loaders for Avida
+Request-scoped, DataLoader-style batching for enrichment lookups, so a list
+of N items costs one $in query per collection instead of N find_one calls.
+
+- BatchLoader collects the keys requested during one event-loop tick and
+  resolves them with a single fetch(keys) call; results are memoized for
+  the loader's lifetime (one request), so repeated keys cost nothing
+- Card loaders fetch listings and users with card-sized projections: no
+  legacy base64 image arrays, seo_data or descriptions
+- get_loaders(request) returns the loaders bound to the current request
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+MAX_BATCH_SIZE = 500
+
+# Listing fields shown on cards (inbox rows, favorites, offers). r2_images and
+# feed_thumbnail hold small URLs/thumbnails; the legacy images array does not.
+LISTING_CARD_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "price": 1,
+    "currency": 1,
+    "status": 1,
+    "user_id": 1,
+    "location": 1,
+    "feed_thumbnail": 1,
+    "r2_images": {"$slice": 1},
+}
+
+USER_CARD_PROJECTION = {"_id": 0, "user_id": 1, "name": 1, "picture": 1}
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Coalesces load(key) calls made in the same loop tick into one
+    fetch(keys) -> {key: value} call. Missing keys resolve to None.
+    """
+
+    def __init__(self, fetch: Callable[[List[K]], Awaitable[Dict[K, V]]], max_batch_size: int = MAX_BATCH_SIZE):
+        self.fetch = fetch
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self.batches = 0
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: V):
+        """Seed a value that is already known (e.g. the document just written)."""
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._resolve(keys[start:start + self.max_batch_size]))
+
+    async def _resolve(self, keys: List[K]):
+        self.batches += 1
+        try:
+            found = await self.fetch(keys)
+        except Exception as e:
+            for key in keys:
+                # Forget failed keys so a later load can retry
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+def listing_card(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A listing document (LISTING_CARD_PROJECTION) shaped as a card with at most one image."""
+    thumbnail = None
+    r2_images = doc.get("r2_images") or []
+    if r2_images and isinstance(r2_images[0], dict):
+        thumbnail = r2_images[0].get("thumb_url") or r2_images[0].get("url")
+    thumbnail = thumbnail or doc.get("feed_thumbnail") or None
+    return {
+        "id": doc["id"],
+        "title": doc.get("title"),
+        "price": doc.get("price"),
+        "currency": doc.get("currency"),
+        "status": doc.get("status"),
+        "user_id": doc.get("user_id"),
+        "location": doc.get("location"),
+        "images": [thumbnail] if thumbnail else [],
+    }
+
+
+async def fetch_listing_cards(db, listing_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Listing cards by id. Legacy listings without a stored thumbnail fall back to their first image."""
+    docs = await db.listings.find({"id": {"$in": listing_ids}}, LISTING_CARD_PROJECTION).to_list(len(listing_ids))
+    cards = {doc["id"]: listing_card(doc) for doc in docs}
+
+    # feed_thumbnail is "" once the thumbnail backfill found nothing, so only
+    # listings the backfill has not reached need their first image
+    legacy = [doc["id"] for doc in docs if not doc.get("r2_images") and "feed_thumbnail" not in doc]
+    if legacy:
+        async for doc in db.listings.find({"id": {"$in": legacy}}, {"_id": 0, "id": 1, "images": {"$slice": 1}}):
+            first = (doc.get("images") or [None])[0]
+            if isinstance(first, dict):
+                first = first.get("url") or first.get("uri")
+            if first:
+                cards[doc["id"]]["images"] = [first]
+    return cards
+
+
+async def fetch_user_cards(db, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    docs = await db.users.find({"user_id": {"$in": user_ids}}, USER_CARD_PROJECTION).to_list(len(user_ids))
+    return {doc["user_id"]: {"user_id": doc["user_id"], "name": doc.get("name"), "picture": doc.get("picture")} for doc in docs}
+
+
+class Loaders:
+    """The loaders for one request."""
+
+    def __init__(self, db):
+        self.listing_cards: BatchLoader[str, Dict[str, Any]] = BatchLoader(lambda ids: fetch_listing_cards(db, ids))
+        self.user_cards: BatchLoader[str, Dict[str, Any]] = BatchLoader(lambda ids: fetch_user_cards(db, ids))
+
+
+def get_loaders(request, db) -> Loaders:
+    """Loaders bound to `request` (created on first use), or fresh ones when there is no request."""
+    if request is None:
+        return Loaders(db)
+    loaders = getattr(request.state, "loaders", None)
+    if loaders is None:
+        loaders = Loaders(db)
+        request.state.loaders = loaders
+    return loaders
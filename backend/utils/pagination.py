@@ -0,0 +1,173 @@
+"""
+Keyset (Seek) Pagination for Avida
+Opaque, signed cursors so deep pages seek through an index instead of
+skipping over every earlier document.
+"""
+
+import os
+import hmac
+import json
+import base64
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Secret used to sign cursors so clients cannot forge seek positions
+CURSOR_SECRET = os.environ.get(
+    "CURSOR_SECRET_KEY",
+    os.environ.get("ADMIN_JWT_SECRET_KEY", "avida-cursor-secret-change-in-production")
+)
+SIGNATURE_BYTES = 12
+
+# Sort spec type: [(field, direction), ...]
+SortSpec = List[Tuple[str, int]]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor is malformed, tampered with, or from another sort."""
+
+
+# =============================================================================
+# BOOST TIER
+# =============================================================================
+
+def compute_boost_tier(is_boosted: bool, boost_priority: Optional[int] = 0) -> int:
+    """
+    Collapse (is_boosted, boost_priority) into one stored, indexable value.
+    Non-boosted listings are tier 0; boosted listings rank by 1 + priority.
+    """
+    if not is_boosted:
+        return 0
+    return 1 + max(int(boost_priority or 0), 0)
+
+
+# Same formula as compute_boost_tier, for pipeline-style updates
+BOOST_TIER_EXPR = {
+    "$cond": [
+        {"$eq": ["$is_boosted", True]},
+        {"$add": [1, {"$max": [{"$ifNull": ["$boost_priority", 0]}, 0]}]},
+        0
+    ]
+}
+
+
+async def backfill_boost_tier(db) -> int:
+    """Store boost_tier on legacy listings that predate the field."""
+    result = await db.listings.update_many(
+        {"boost_tier": {"$exists": False}},
+        [{"$set": {"boost_tier": BOOST_TIER_EXPR}}]
+    )
+    if result.modified_count:
+        logger.info(f"Backfilled boost_tier on {result.modified_count} listings")
+    return result.modified_count
+
+
+# =============================================================================
+# CURSOR ENCODING
+# =============================================================================
+
+def _sort_signature(sort_spec: SortSpec, scope: Optional[str] = None) -> str:
+    signature = ",".join(f"{field}:{direction}" for field, direction in sort_spec)
+    return f"{signature}|{scope}" if scope else signature
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(CURSOR_SECRET.encode(), payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(doc: Dict[str, Any], sort_spec: SortSpec, scope: Optional[str] = None) -> str:
+    """
+    Build an opaque cursor pointing just after `doc` in `sort_spec` order.
+    `scope` binds the cursor to query inputs the sort depends on (e.g. a geo center).
+    """
+    payload = json.dumps({
+        "s": _sort_signature(sort_spec, scope),
+        "v": [_encode_value(doc.get(field)) for field, _ in sort_spec],
+    }, separators=(",", ":"), default=str).encode()
+    token = payload + _sign(payload)
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_spec: SortSpec, scope: Optional[str] = None) -> List[Any]:
+    """Verify a cursor and return its seek values in sort_spec order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        token = base64.urlsafe_b64decode(padded.encode())
+    except Exception:
+        raise InvalidCursorError("Malformed cursor")
+
+    payload, signature = token[:-SIGNATURE_BYTES], token[-SIGNATURE_BYTES:]
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidCursorError("Cursor signature mismatch")
+
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        raise InvalidCursorError("Malformed cursor")
+
+    if data.get("s") != _sort_signature(sort_spec, scope):
+        raise InvalidCursorError("Cursor was issued for a different sort order")
+
+    values = data.get("v")
+    if not isinstance(values, list) or len(values) != len(sort_spec):
+        raise InvalidCursorError("Malformed cursor")
+    return [_decode_value(v) for v in values]
+
+
+# =============================================================================
+# SEEK QUERIES
+# =============================================================================
+
+def build_seek_filter(sort_spec: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """
+    Build the filter selecting documents strictly after `values` in sort order.
+
+    For sort (a desc, b asc, id asc) this is:
+        a < va  OR  (a == va AND b > vb)  OR  (a == va AND b == vb AND id > vid)
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort_spec):
+        branch = {f: values[j] for j, (f, _) in enumerate(sort_spec[:i])}
+        branch[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        branches.append(branch)
+    return {"$or": branches} if len(branches) > 1 else branches[0]
+
+
+def apply_seek(query: Dict[str, Any], sort_spec: SortSpec, cursor: Optional[str]) -> Dict[str, Any]:
+    """Return `query` narrowed to documents after `cursor` (unchanged if no cursor)."""
+    if not cursor:
+        return query
+    seek = build_seek_filter(sort_spec, decode_cursor(cursor, sort_spec))
+    if not query:
+        return seek
+    return {"$and": [query, seek]}
+
+
+def page_from_batch(
+    items: List[Dict[str, Any]],
+    limit: int,
+    sort_spec: SortSpec
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trim a `limit + 1` batch to `limit` items and build the next cursor.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1], sort_spec)
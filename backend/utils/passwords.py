@@ -0,0 +1,54 @@
+"""
+Password Hashing for Avida
+bcrypt hashing and verification, with awaitable variants that run bcrypt in
+the CPU pool so logins and bulk imports do not block the event loop.
+Legacy SHA-256 ("salt:hash") hashes are still accepted by verify_password.
+"""
+
+import hashlib
+
+from passlib.context import CryptContext
+
+from utils.cpu_pool import cpu_pool
+
+# Bcrypt password context
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """Hash password using bcrypt"""
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """Verify password against stored hash (supports both bcrypt and legacy SHA-256)"""
+    try:
+        # Try bcrypt first
+        if stored_hash.startswith('$2'):
+            return pwd_context.verify(password, stored_hash)
+        
+        # Fallback to legacy SHA-256 format (salt:hash)
+        if ':' in stored_hash:
+            salt, password_hash = stored_hash.split(':')
+            return hashlib.sha256((password + salt).encode()).hexdigest() == password_hash
+        
+        return False
+    except Exception:
+        return False
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password in the CPU pool."""
+    return await cpu_pool.run(hash_password, password, label="bcrypt_hash")
+
+
+async def hash_passwords_async(passwords: list) -> list:
+    """Hash several passwords concurrently in the CPU pool (input order)."""
+    return await cpu_pool.map(hash_password, passwords, label="bcrypt_hash")
+
+
+async def verify_password_async(password: str, stored_hash: str) -> bool:
+    """verify_password; only bcrypt hashes are worth a trip to the CPU pool."""
+    if not stored_hash or not stored_hash.startswith('$2'):
+        return verify_password(password, stored_hash or "")
+    return await cpu_pool.run(verify_password, password, stored_hash, label="bcrypt_verify")
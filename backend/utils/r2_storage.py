@@ -1,6 +1,7 @@
 """
 Cloudflare R2 Storage utility.
 Uploads/downloads objects via the Cloudflare REST API.
+Pillow transcoding runs in the CPU pool (utils/cpu_pool.py) via the *_async helpers.
 """
 import os
 import base64
@@ -13,6 +14,8 @@ from typing import Optional, Tuple
 import httpx
 from PIL import Image
 
+from utils.cpu_pool import cpu_pool
+
 logger = logging.getLogger(__name__)
 
 CF_ACCOUNT_ID = os.environ.get("CF_ACCOUNT_ID", "")
@@ -122,6 +125,19 @@ def make_thumbnail(
     return buf.read(), "image/webp"
 
 
+def transcode_upload(image_data: bytes) -> Tuple[Tuple[bytes, str], Tuple[bytes, str]]:
+    """Full-size WebP plus thumbnail from one upload: ((full_bytes, ct), (thumb_bytes, ct))."""
+    return (
+        compress_image(image_data, max_width=1200, quality=80),
+        make_thumbnail(image_data, size=(300, 300), quality=60),
+    )
+
+
+async def transcode_upload_async(image_data: bytes) -> Tuple[Tuple[bytes, str], Tuple[bytes, str]]:
+    """transcode_upload in the CPU pool (the upload bytes are shipped to the worker once)."""
+    return await cpu_pool.run(transcode_upload, image_data, label="image_transcode")
+
+
 def decode_base64_image(data_uri: str) -> Tuple[bytes, str]:
     """Decode a base64 data URI into raw bytes + content_type."""
     if data_uri.startswith("data:"):
@@ -150,13 +166,12 @@ async def upload_base64_image(
     # Build path: listings/{user_id}/{listing_id}/ or listings/{listing_id}/
     path_prefix = f"listings/{user_id}/{listing_id}" if user_id else f"listings/{listing_id}"
 
-    # Compress full image
-    full_bytes, full_ct = compress_image(raw_bytes, max_width=1200, quality=80)
+    # Compress full image and thumbnail off the event loop
+    (full_bytes, full_ct), (thumb_bytes, thumb_ct) = await transcode_upload_async(raw_bytes)
     full_path = f"{path_prefix}/{uid}_{image_index}.webp"
     full_result = await upload_bytes(full_bytes, full_path, full_ct)
 
-    # Create and upload thumbnail
-    thumb_bytes, thumb_ct = make_thumbnail(raw_bytes, size=(300, 300), quality=60)
+    # Upload thumbnail
     thumb_path = f"{path_prefix}/thumb_{uid}_{image_index}.webp"
     thumb_result = await upload_bytes(thumb_bytes, thumb_path, thumb_ct)
 
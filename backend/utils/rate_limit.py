@@ -0,0 +1,247 @@
+"""
+Rate Limiting for Avida
+GCRA (generic cell rate algorithm) limiter shared by all workers.
+
+- One number per active key (the theoretical arrival time), expiring as
+  soon as the key's allowance is fully restored
+- Redis backend: one atomic Lua script per check, using the Redis clock
+- Memory backend: single-process and test runs, with idle-key eviction
+- rate_limit(action) returns a FastAPI dependency for per-route limits
+- Allowed/throttled counters per action via get_stats()
+"""
+
+import os
+import math
+import time
+import hashlib
+import logging
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "auto")  # auto, redis, memory
+RATE_LIMIT_MEMORY_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MEMORY_MAX_KEYS", "100000"))
+RATE_LIMIT_DEFAULT = int(os.environ.get("RATE_LIMIT_DEFAULT", "100"))
+RATE_LIMIT_KEY_PREFIX = "rl"
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """`limit` requests per `period` seconds, allowing bursts of up to `burst` (default: limit)."""
+    limit: int
+    period: float = 60.0
+    burst: Optional[int] = None
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.limit
+
+    @property
+    def burst_tolerance(self) -> float:
+        return self.emission_interval * (self.burst or self.limit)
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed (0 if allowed)
+    reset_after: float  # seconds until the full allowance is restored
+
+
+def _gcra(tat: Optional[float], now: float, rule: RateLimitRule, cost: int):
+    """Returns (result, new_tat or None if the request is rejected)."""
+    emission = rule.emission_interval
+    tolerance = rule.burst_tolerance
+    tat = max(tat or now, now)
+    new_tat = tat + emission * cost
+    if new_tat - now > tolerance:
+        return RateLimitResult(False, 0, new_tat - now - tolerance, tat - now), None
+    remaining = int(math.floor((tolerance - (new_tat - now)) / emission + 1e-9))
+    return RateLimitResult(True, remaining, 0.0, new_tat - now), new_tat
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class MemoryRateLimitBackend:
+    """Per-process GCRA state; keys are dropped once idle long enough to be full again."""
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self.evictions = 0
+
+    def _evict(self, now: float):
+        # Oldest-updated first; stop at the first key still recovering
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                break
+            del self._tats[key]
+            self.evictions += 1
+
+    async def hit(self, key: str, rule: RateLimitRule, cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        result, new_tat = _gcra(self._tats.get(key), now, rule, cost)
+        if new_tat is not None:
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+        self._evict(now)
+        return result
+
+    async def reset(self, key: str):
+        self._tats.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._tats)
+
+
+# KEYS[1] = key; ARGV = emission interval (s), burst tolerance (s), cost
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}
+GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local new_tat = tat + emission * cost
+if new_tat - now > tolerance then
+  return {0, 0, math.ceil((new_tat - now - tolerance) * 1000), math.ceil((tat - now) * 1000)}
+end
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', math.max(1, math.ceil((new_tat - now) * 1000)))
+return {1, math.floor((tolerance - (new_tat - now)) / emission + 1e-9), 0, math.ceil((new_tat - now) * 1000)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Shared GCRA state in Redis; each check is one atomic script call."""
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(GCRA_LUA)
+
+    async def hit(self, key: str, rule: RateLimitRule, cost: int = 1) -> RateLimitResult:
+        allowed, remaining, retry_ms, reset_ms = await self._script(
+            keys=[f"{RATE_LIMIT_KEY_PREFIX}:{key}"],
+            args=[rule.emission_interval, rule.burst_tolerance, cost]
+        )
+        return RateLimitResult(bool(allowed), int(remaining), int(retry_ms) / 1000, int(reset_ms) / 1000)
+
+    async def reset(self, key: str):
+        await self.client.delete(f"{RATE_LIMIT_KEY_PREFIX}:{key}")
+
+    def size(self) -> Optional[int]:
+        return None  # keys expire in Redis
+
+
+# =============================================================================
+# LIMITER
+# =============================================================================
+
+class RateLimiter:
+    """Per-action rules on top of a memory or Redis backend."""
+
+    def __init__(self, rules: Optional[Dict[str, RateLimitRule]] = None):
+        self.rules: Dict[str, RateLimitRule] = dict(rules or {})
+        self.default_rule = RateLimitRule(RATE_LIMIT_DEFAULT, 60)
+        self.memory = MemoryRateLimitBackend()
+        self.backend = self.memory
+        self.backend_errors = 0
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"allowed": 0, "throttled": 0})
+
+    def configure(self, limits: Dict[str, int], period: float = 60.0):
+        """Set rules from a {action: requests per period} mapping."""
+        for action, limit in limits.items():
+            self.rules[action] = RateLimitRule(limit, period)
+
+    def use_redis(self, client):
+        """Switch to the shared Redis backend (no-op when RATE_LIMIT_BACKEND=memory)."""
+        if RATE_LIMIT_BACKEND == "memory" or client is None:
+            return
+        self.backend = RedisRateLimitBackend(client)
+        logger.info("Rate limiter using Redis backend")
+
+    def rule_for(self, action: str) -> RateLimitRule:
+        return self.rules.get(action, self.default_rule)
+
+    async def hit(self, key: str, action: str, cost: int = 1) -> RateLimitResult:
+        rule = self.rule_for(action)
+        limit_key = f"{action}:{key}"
+        try:
+            result = await self.backend.hit(limit_key, rule, cost)
+        except Exception as e:
+            # Redis unavailable: keep limiting per process rather than failing open
+            self.backend_errors += 1
+            logger.debug(f"Rate limit backend error, using memory: {e}")
+            result = await self.memory.hit(limit_key, rule, cost)
+        self._counters[action]["allowed" if result.allowed else "throttled"] += 1
+        return result
+
+    async def allow(self, key: str, action: str) -> bool:
+        return (await self.hit(key, action)).allowed
+
+    async def reset(self, key: str, action: str):
+        await self.backend.reset(f"{action}:{key}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "backend_errors": self.backend_errors,
+            "memory_keys": self.memory.size(),
+            "memory_evictions": self.memory.evictions,
+            "rules": {a: {"limit": r.limit, "period": r.period} for a, r in self.rules.items()},
+            "actions": {a: dict(c) for a, c in self._counters.items()},
+        }
+
+
+# Singleton instance
+rate_limiter = RateLimiter()
+
+
+# =============================================================================
+# FASTAPI DEPENDENCY
+# =============================================================================
+
+def client_key(request: Request) -> str:
+    """Session token (hashed) when present, otherwise the client IP."""
+    token = request.cookies.get("session_token")
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        token = auth_header[7:]
+    if token:
+        return "t:" + hashlib.sha256(token.encode()).hexdigest()[:24]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def rate_limit(action: str, key_func: Callable[[Request], str] = client_key, cost: int = 1):
+    """
+    FastAPI dependency enforcing the rule for `action`.
+
+    Usage:
+        @router.post("/upload", dependencies=[Depends(rate_limit("image_upload"))])
+    """
+    async def dependency(request: Request):
+        result = await rate_limiter.hit(key_func(request), action, cost)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please slow down.",
+                headers={
+                    "Retry-After": str(max(1, math.ceil(result.retry_after))),
+                    "X-RateLimit-Limit": str(rate_limiter.rule_for(action).limit),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+        return result
+    return dependency
@@ -0,0 +1,175 @@
+"""
+Read Watermarks for Avida
+Read state of a conversation is one timestamp per participant instead of a
+read flag on every message:
+
+- buyer_read_at / seller_read_at on the conversation hold the created_at of
+  the newest message that participant has seen; they only move forward ($max)
+- A message is read once its created_at <= the recipient's watermark
+- advance_read_watermark moves the caller's watermark and derives their
+  unread counter from it (zero once it reaches last_message_time)
+- backfill_read_watermarks: resumable migration turning legacy per-message
+  read flags into watermarks
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+READ_WATERMARK_MIGRATION_ID = "conversations_read_watermarks"
+
+
+def participant_role(conversation: Dict[str, Any], user_id: str) -> str:
+    return "buyer" if conversation.get("buyer_id") == user_id else "seller"
+
+
+def watermark_field(role: str) -> str:
+    return f"{role}_read_at"
+
+
+def unread_field(role: str) -> str:
+    return f"{role}_unread"
+
+
+def read_watermarks(conversation: Dict[str, Any]) -> Dict[str, Optional[datetime]]:
+    """Watermark per participant id."""
+    return {
+        conversation.get("buyer_id"): conversation.get(watermark_field("buyer")),
+        conversation.get("seller_id"): conversation.get(watermark_field("seller")),
+    }
+
+
+def apply_read_state(messages: List[Dict[str, Any]], conversation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Set each message's `read` from the recipient's watermark. Legacy read
+    flags still count until the backfill has reached the conversation.
+    """
+    for msg in messages:
+        recipient = "seller" if msg.get("sender_id") == conversation.get("buyer_id") else "buyer"
+        watermark = conversation.get(watermark_field(recipient))
+        created_at = msg.get("created_at")
+        by_watermark = isinstance(watermark, datetime) and isinstance(created_at, datetime) and created_at <= watermark
+        msg["read"] = bool(by_watermark or msg.get("read"))
+    return messages
+
+
+async def count_unread(db, conversation_id: str, user_id: str, watermark: Optional[datetime]) -> int:
+    """Messages from the other participant newer than `watermark`."""
+    query = {"conversation_id": conversation_id, "sender_id": {"$ne": user_id}}
+    if watermark is not None:
+        query["created_at"] = {"$gt": watermark}
+    return await db.messages.count_documents(query)
+
+
+async def advance_read_watermark(db, conversation: Dict[str, Any], user_id: str, up_to: Optional[datetime] = None) -> Optional[int]:
+    """
+    Advance user_id's watermark to `up_to` (default: the newest message) and
+    re-derive their unread counter. Returns the change in that counter, or
+    None when nothing moved (no document is written then). `conversation`
+    is updated in place.
+    """
+    conversation_id = conversation["id"]
+    role = participant_role(conversation, user_id)
+    field, counter = watermark_field(role), unread_field(role)
+
+    if up_to is None:
+        latest = await db.messages.find_one(
+            {"conversation_id": conversation_id}, {"_id": 0, "created_at": 1}, sort=[("created_at", -1)]
+        )
+        up_to = latest.get("created_at") if latest else None
+    if not isinstance(up_to, datetime):
+        return None
+
+    current = conversation.get(field)
+    if isinstance(current, datetime) and up_to <= current and not conversation.get(counter):
+        return None
+
+    await db.conversations.update_one({"id": conversation_id}, {"$max": {field: up_to}})
+    conversation[field] = max(up_to, current) if isinstance(current, datetime) else up_to
+    watermark = conversation[field]
+
+    # Caught up with the last message: the counter is simply zero
+    before = await db.conversations.find_one_and_update(
+        {"id": conversation_id, "last_message_time": {"$lte": watermark}},
+        {"$set": {counter: 0}},
+        projection={"_id": 0, counter: 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is not None:
+        conversation[counter] = 0
+        return -(before.get(counter) or 0)
+
+    # Reading an older page: count what is left, unless a new message landed meanwhile
+    fresh = await db.conversations.find_one({"id": conversation_id}, {"_id": 0, "last_message_time": 1})
+    unread = await count_unread(db, conversation_id, user_id, watermark)
+    before = await db.conversations.find_one_and_update(
+        {"id": conversation_id, "last_message_time": (fresh or {}).get("last_message_time")},
+        {"$set": {counter: unread}},
+        projection={"_id": 0, counter: 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return 0
+    conversation[counter] = unread
+    return unread - (before.get(counter) or 0)
+
+
+async def backfill_read_watermarks(db, batch_size: int = 500) -> int:
+    """
+    Derive buyer_read_at / seller_read_at from legacy `read: True` messages.
+    Resumable: conversations are walked by _id and checkpointed in
+    db.migrations; watermarks are only ever raised ($max).
+    """
+    state = await db.migrations.find_one({"_id": READ_WATERMARK_MIGRATION_ID}) or {}
+    if state.get("completed_at"):
+        return 0
+
+    last_id = state.get("last_id")
+    updated = 0
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await db.conversations.find(
+            query, {"_id": 1, "id": 1, "buyer_id": 1, "seller_id": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        by_id = {conv["id"]: conv for conv in batch if conv.get("id")}
+        newest_read = db.messages.aggregate([
+            {"$match": {"conversation_id": {"$in": list(by_id)}, "read": True}},
+            {"$group": {"_id": {"c": "$conversation_id", "s": "$sender_id"}, "at": {"$max": "$created_at"}}},
+        ])
+        watermarks: Dict[Any, Dict[str, datetime]] = {}
+        async for row in newest_read:
+            conv = by_id.get(row["_id"]["c"])
+            if not conv or not isinstance(row["at"], datetime):
+                continue
+            # Read messages sent by one participant move the other one's watermark
+            reader = "seller" if row["_id"]["s"] == conv.get("buyer_id") else "buyer"
+            watermarks.setdefault(conv["_id"], {})[watermark_field(reader)] = row["at"]
+
+        ops = [UpdateOne({"_id": _id}, {"$max": fields}) for _id, fields in watermarks.items()]
+        if ops:
+            await db.conversations.bulk_write(ops, ordered=False)
+            updated += len(ops)
+
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": READ_WATERMARK_MIGRATION_ID},
+            {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)},
+             "$inc": {"updated": len(ops), "scanned": len(batch)}},
+            upsert=True
+        )
+
+    await db.migrations.update_one(
+        {"_id": READ_WATERMARK_MIGRATION_ID},
+        {"$set": {"completed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    if updated:
+        logger.info(f"Backfilled read watermarks on {updated} conversations")
+    return updated
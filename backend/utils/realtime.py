@@ -0,0 +1,287 @@
+"""
+Real-time Scale-out for Avida
+Lets several uvicorn workers serve Socket.IO as one server.
+
+- create_client_manager: the pub/sub manager AsyncServer fans emits and room
+  joins through. Redis spans workers and hosts; the in-memory bus links
+  several servers inside one process (tests, the load test); "local" keeps
+  python-socketio's single-process default
+- PresenceRegistry: which users have a live socket on any worker, shared
+  through Redis when the cache is connected. Each worker heartbeats its own
+  sockets, so entries left by a worker that died expire after
+  PRESENCE_TTL_SECONDS
+- user_room / stats_room / admin_room: emits addressed to a user or admin go
+  to a room instead of a worker-local socket id
+
+Clients using the long-polling transport need sticky sessions when there is
+more than one worker; websocket-only clients do not.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import socketio
+    from socketio.async_pubsub_manager import AsyncPubSubManager
+    SOCKETIO_AVAILABLE = True
+except ImportError:
+    SOCKETIO_AVAILABLE = False
+
+SOCKETIO_MANAGER = os.environ.get("SOCKETIO_MANAGER", "auto")  # auto, redis, memory, local
+SOCKETIO_CHANNEL = os.environ.get("SOCKETIO_CHANNEL", "avida-socketio")
+SOCKETIO_REDIS_URL = os.environ.get("SOCKETIO_REDIS_URL") or os.environ.get("REDIS_URL")
+PRESENCE_TTL_SECONDS = int(os.environ.get("PRESENCE_TTL_SECONDS", "90"))
+PRESENCE_HEARTBEAT_SECONDS = int(os.environ.get("PRESENCE_HEARTBEAT_SECONDS", "30"))
+PRESENCE_KEY_PREFIX = "presence"
+
+
+def user_room(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def stats_room(user_id: str) -> str:
+    return f"stats:{user_id}"
+
+
+def admin_room(admin_id: str) -> str:
+    return f"admin:{admin_id}"
+
+
+# =============================================================================
+# CLIENT MANAGERS
+# =============================================================================
+
+if SOCKETIO_AVAILABLE:
+    class InMemoryPubSubManager(AsyncPubSubManager):
+        """
+        Pub/sub over per-process queues: servers created in the same process
+        on the same channel see each other's emits, as if they were workers
+        sharing Redis.
+        """
+        name = "memory"
+        _subscribers: Dict[str, List[asyncio.Queue]] = defaultdict(list)
+
+        def __init__(self, channel: str = SOCKETIO_CHANNEL, write_only: bool = False, logger=None):
+            super().__init__(channel=channel, write_only=write_only, logger=logger)
+            self._queue: asyncio.Queue = asyncio.Queue()
+            if not write_only:
+                self._subscribers[channel].append(self._queue)
+
+        async def _publish(self, data):
+            for queue in self._subscribers[self.channel]:
+                queue.put_nowait(data)
+
+        async def _listen(self):
+            while True:
+                yield await self._queue.get()
+
+
+def create_client_manager(mode: str = SOCKETIO_MANAGER, write_only: bool = False):
+    """
+    Client manager for socketio.AsyncServer, or None for the single-process
+    default. "auto" uses Redis when a Redis URL is configured.
+    """
+    if not SOCKETIO_AVAILABLE or mode == "local":
+        return None
+    if mode == "memory":
+        return InMemoryPubSubManager(write_only=write_only)
+    if mode == "redis" or (mode == "auto" and SOCKETIO_REDIS_URL):
+        try:
+            import redis.asyncio  # noqa: F401  (AsyncRedisManager only fails once connecting)
+        except ImportError:
+            logger.warning("Socket.IO Redis manager needs the redis package; emits stay on this worker")
+            return None
+        logger.info(f"Socket.IO using Redis pub/sub on channel {SOCKETIO_CHANNEL}")
+        return socketio.AsyncRedisManager(
+            SOCKETIO_REDIS_URL or "redis://localhost:6379", channel=SOCKETIO_CHANNEL, write_only=write_only
+        )
+    return None
+
+
+# =============================================================================
+# PRESENCE
+# =============================================================================
+
+class MemoryPresenceBackend:
+    """group:user_id -> {sid: expiry}; only sees this process."""
+    name = "memory"
+
+    def __init__(self):
+        self._sockets: Dict[str, Dict[str, float]] = {}
+
+    def _live(self, key: str) -> Dict[str, float]:
+        sockets = self._sockets.get(key)
+        if not sockets:
+            return {}
+        now = time.time()
+        for sid in [sid for sid, expiry in sockets.items() if expiry <= now]:
+            del sockets[sid]
+        if not sockets:
+            del self._sockets[key]
+        return sockets
+
+    async def add(self, group: str, user_id: str, sid: str, ttl: int) -> int:
+        self._sockets.setdefault(f"{group}:{user_id}", {})[sid] = time.time() + ttl
+        return len(self._live(f"{group}:{user_id}"))
+
+    async def remove(self, group: str, user_id: str, sid: str) -> int:
+        self._sockets.get(f"{group}:{user_id}", {}).pop(sid, None)
+        return len(self._live(f"{group}:{user_id}"))
+
+    async def refresh(self, group: str, entries: Iterable[Tuple[str, str]], ttl: int):
+        for sid, user_id in entries:
+            await self.add(group, user_id, sid, ttl)
+
+    async def online(self, group: str, user_ids: List[str]) -> Set[str]:
+        return {user_id for user_id in user_ids if self._live(f"{group}:{user_id}")}
+
+
+class RedisPresenceBackend:
+    """One sorted set per user: member sid, score = expiry time."""
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, group: str, user_id: str) -> str:
+        return f"{PRESENCE_KEY_PREFIX}:{group}:{user_id}"
+
+    async def add(self, group: str, user_id: str, sid: str, ttl: int) -> int:
+        key, now = self._key(group, user_id), time.time()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(key, {sid: now + ttl})
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.expire(key, ttl)
+        pipe.zcard(key)
+        return (await pipe.execute())[-1]
+
+    async def remove(self, group: str, user_id: str, sid: str) -> int:
+        key = self._key(group, user_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrem(key, sid)
+        pipe.zremrangebyscore(key, "-inf", time.time())
+        pipe.zcard(key)
+        return (await pipe.execute())[-1]
+
+    async def refresh(self, group: str, entries: Iterable[Tuple[str, str]], ttl: int):
+        expiry = time.time() + ttl
+        pipe = self.client.pipeline(transaction=False)
+        for sid, user_id in entries:
+            pipe.zadd(self._key(group, user_id), {sid: expiry})
+            pipe.expire(self._key(group, user_id), ttl)
+        await pipe.execute()
+
+    async def online(self, group: str, user_ids: List[str]) -> Set[str]:
+        if not user_ids:
+            return set()
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.zcount(self._key(group, user_id), now, "+inf")
+        counts = await pipe.execute()
+        return {user_id for user_id, count in zip(user_ids, counts) if count}
+
+
+class PresenceRegistry:
+    """
+    Users with at least one live socket in `group`, across all workers.
+    Socket ids are only ever handled by the worker holding the connection,
+    so sid -> user_id stays local; user -> sockets is shared.
+    """
+
+    def __init__(self, group: str, ttl: int = PRESENCE_TTL_SECONDS, heartbeat: int = PRESENCE_HEARTBEAT_SECONDS):
+        self.group = group
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.backend = MemoryPresenceBackend()
+        self.local: Dict[str, str] = {}  # sid -> user_id, sockets on this worker
+        self._task: Optional[asyncio.Task] = None
+        self.errors = 0
+
+    def use_redis(self, client):
+        if client is None:
+            return
+        self.backend = RedisPresenceBackend(client)
+        logger.info(f"Presence '{self.group}' using Redis backend")
+
+    def user_for(self, sid: str) -> Optional[str]:
+        return self.local.get(sid)
+
+    async def connect(self, sid: str, user_id: str) -> bool:
+        """Register a socket. Returns True if it is the user's only live socket."""
+        previous = self.local.get(sid)
+        if previous and previous != user_id:
+            await self.disconnect(sid)
+        self.local[sid] = user_id
+        try:
+            return await self.backend.add(self.group, user_id, sid, self.ttl) == 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Presence connect failed for {user_id}: {e}")
+            return True
+
+    async def disconnect(self, sid: str) -> Tuple[Optional[str], bool]:
+        """Drop a socket. Returns (user_id, whether the user has no live socket left)."""
+        user_id = self.local.pop(sid, None)
+        if user_id is None:
+            return None, False
+        try:
+            return user_id, await self.backend.remove(self.group, user_id, sid) == 0
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Presence disconnect failed for {user_id}: {e}")
+            return user_id, True
+
+    async def is_online(self, user_id: str) -> bool:
+        return user_id in await self.online([user_id])
+
+    async def online(self, user_ids: List[str]) -> Set[str]:
+        try:
+            return await self.backend.online(self.group, list(user_ids))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Presence lookup failed: {e}")
+            return {user_id for user_id in user_ids if user_id in self.local.values()}
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if not self.local:
+                continue
+            try:
+                await self.backend.refresh(self.group, list(self.local.items()), self.ttl)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Presence heartbeat failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # Leave nothing behind for the other workers to wait out
+        for sid in list(self.local):
+            await self.disconnect(sid)
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "group": self.group,
+            "backend": self.backend.name,
+            "local_sockets": len(self.local),
+            "local_users": len(set(self.local.values())),
+            "errors": self.errors,
+        }
+
+
+# Users with the app open, and users subscribed to live stats
+presence = PresenceRegistry("online")
+stats_subscribers = PresenceRegistry("stats")
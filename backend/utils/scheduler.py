@@ -0,0 +1,440 @@
+"""
+Cluster-wide Job Scheduler for Avida
+Named background jobs that run once per schedule across all workers, instead
+of a `while True: ...; await asyncio.sleep()` loop in every worker:
+
+- scheduler.register(name, func, trigger): IntervalTrigger(seconds) or
+  CronTrigger("0 9 * * 1") (5-field crontab, UTC)
+- Every worker polls db.scheduled_jobs; a due job is claimed with an atomic
+  lease (find_one_and_update) that is renewed while it runs, so a job never
+  overlaps itself and the lease of a worker that died simply expires
+- Random jitter on each next_run_at keeps jobs from firing in lockstep
+- Every run lands in db.scheduled_job_runs with its duration, status and
+  result (expired after JOB_RUN_HISTORY_DAYS)
+- Pausing and run requests are plain fields on the job document, so the admin
+  dashboard (another process) controls jobs through list_job_states /
+  request_job_run / set_job_paused without talking to the workers
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "5"))
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "120"))
+JOB_RUN_HISTORY_DAYS = int(os.environ.get("JOB_RUN_HISTORY_DAYS", "30"))
+
+JOBS_COLLECTION = "scheduled_jobs"
+RUNS_COLLECTION = "scheduled_job_runs"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# =============================================================================
+# TRIGGERS
+# =============================================================================
+
+class IntervalTrigger:
+    """Every `seconds`, counted from the end of the previous run."""
+
+    def __init__(self, seconds: float, initial_delay: float = 0):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+        self.initial_delay = initial_delay
+
+    def first_run(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.initial_delay)
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds)
+
+    def describe(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    """
+    Standard 5-field crontab (minute hour day-of-month month day-of-week), in
+    UTC. Fields take *, lists, ranges and steps; day-of-week 0 and 7 are
+    Sunday. As in cron, a job with both day fields restricted runs when
+    either matches; a day field starting with * (including */N) only
+    narrows the other one.
+    """
+    _FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        values = {}
+        for part, (name, low, high) in zip(parts, self._FIELDS):
+            values[name] = self._parse(part, low, high)
+        self.minutes = sorted(values["minute"])
+        self.hours = sorted(values["hour"])
+        self.days = values["day"]
+        self.months = values["month"]
+        self.weekdays = {d % 7 for d in values["weekday"]}
+        self._any_day = parts[2].startswith("*")
+        self._any_weekday = parts[4].startswith("*")
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        result: Set[int] = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(x) for x in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step else start
+            step_value = int(step) if step else 1
+            if start < low or end > high or start > end or step_value < 1:
+                raise ValueError(f"Invalid cron field {field!r}")
+            result.update(range(start, end + 1, step_value))
+        return result
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        in_month = day.day in self.days
+        in_week = (day.weekday() + 1) % 7 in self.weekdays  # cron counts from Sunday
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def first_run(self, now: datetime) -> datetime:
+        return self.next_run(now)
+
+    def next_run(self, after: datetime) -> datetime:
+        """The first matching minute strictly after `after`."""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):  # Feb 29 schedules can be years apart
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def describe(self) -> str:
+        return f"cron {self.expression}"
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    trigger: Any
+    jitter: float = 0
+    lease_seconds: int = JOB_LEASE_SECONDS
+    timeout: Optional[float] = None
+    description: str = ""
+
+    def next_run(self, after: datetime) -> datetime:
+        return self.trigger.next_run(after) + timedelta(seconds=random.uniform(0, self.jitter))
+
+
+def _summarize(result: Any) -> Any:
+    """Job return value in a form that is safe to store."""
+    if result is None:
+        return None
+    try:
+        stored = json.loads(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        stored = str(result)
+    if len(json.dumps(stored)) > 2000:
+        return str(stored)[:2000]
+    return stored
+
+
+class JobScheduler:
+    """
+    Registry of named jobs plus the loop that claims and runs the due ones.
+    Every worker runs the same loop; the lease decides which one runs a job.
+    """
+
+    def __init__(self, poll_seconds: float = JOB_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self.db = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._synced: Set[str] = set()
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    def register(self, name: str, func: Callable[[], Awaitable[Any]], trigger, *, jitter: float = 0,
+                 lease_seconds: int = JOB_LEASE_SECONDS, timeout: Optional[float] = None,
+                 description: str = "") -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already registered")
+        job = Job(name, func, trigger, jitter, lease_seconds, timeout, description or (func.__doc__ or "").strip())
+        self.jobs[name] = job
+        self._synced.discard(name)
+        return job
+
+    async def _sync(self, job: Job):
+        """Create the job document on first sight; keep its schedule text current."""
+        now = _utcnow()
+        await self.db[JOBS_COLLECTION].update_one(
+            {"_id": job.name},
+            {"$setOnInsert": {
+                "next_run_at": job.trigger.first_run(now) + timedelta(seconds=random.uniform(0, job.jitter)),
+                "paused": False,
+                "run_requested": False,
+                "created_at": now,
+             },
+             "$set": {"schedule": job.trigger.describe(), "description": job.description.split("\n")[0]}},
+            upsert=True
+        )
+        self._synced.add(job.name)
+
+    async def tick(self) -> List[str]:
+        """Claim and start every due job not already running here. Returns their names."""
+        for job in self.jobs.values():
+            if job.name not in self._synced:
+                await self._sync(job)
+
+        now = _utcnow()
+        idle = [name for name in self.jobs if name not in self._running]
+        if not idle:
+            return []
+        due = await self.db[JOBS_COLLECTION].find(
+            {"_id": {"$in": idle},
+             "$and": [
+                 {"$or": [{"run_requested": True}, {"paused": {"$ne": True}, "next_run_at": {"$lte": now}}]},
+                 {"$or": [{"lease_until": None}, {"lease_until": {"$lte": now}}]},
+             ]},
+            {"_id": 1}
+        ).to_list(len(idle))
+
+        started = []
+        for doc in due:
+            job = self.jobs[doc["_id"]]
+            before = await self.db[JOBS_COLLECTION].find_one_and_update(
+                {"_id": job.name,
+                 "$and": [
+                     {"$or": [{"run_requested": True}, {"paused": {"$ne": True}, "next_run_at": {"$lte": now}}]},
+                     {"$or": [{"lease_until": None}, {"lease_until": {"$lte": now}}]},
+                 ]},
+                {"$set": {"lease_owner": self.owner, "lease_until": now + timedelta(seconds=job.lease_seconds),
+                          "running_since": now, "run_requested": False}},
+                projection={"run_requested": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if before is None:
+                # Another worker claimed it between the scan and the claim
+                self.stats["claims_lost"] += 1
+                continue
+            trigger = "manual" if before.get("run_requested") else "schedule"
+            self._running[job.name] = asyncio.create_task(self._run(job, trigger))
+            started.append(job.name)
+        return started
+
+    async def _keep_lease(self, job: Job, work: asyncio.Future, lost: asyncio.Event):
+        # The lease was just claimed; past this point another worker may take the job
+        deadline = time.monotonic() + job.lease_seconds
+        delay = job.lease_seconds / 3
+        while True:
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            attempted = time.monotonic()
+            try:
+                result = await self.db[JOBS_COLLECTION].update_one(
+                    {"_id": job.name, "lease_owner": self.owner},
+                    {"$set": {"lease_until": _utcnow() + timedelta(seconds=job.lease_seconds)}}
+                )
+            except Exception as e:
+                if time.monotonic() < deadline:
+                    # Retry sooner, the lease still has time left
+                    logger.warning(f"Lease renewal for job {job.name} failed, retrying: {e}")
+                    delay = job.lease_seconds / 10
+                    continue
+                logger.error(f"Could not renew the lease on job {job.name} before it expired: {e}")
+                result = None
+            if result is None or not result.matched_count:
+                logger.warning(f"Lost lease on job {job.name}; cancelling this run")
+                lost.set()
+                work.cancel()
+                return
+            deadline = attempted + job.lease_seconds
+            delay = job.lease_seconds / 3
+
+    async def _run(self, job: Job, trigger: str):
+        started_at, clock = _utcnow(), time.monotonic()
+        status, result, error = "succeeded", None, None
+        lost = asyncio.Event()
+        work = asyncio.ensure_future(job.func())
+        keeper = asyncio.create_task(self._keep_lease(job, work, lost))
+        try:
+            result = await asyncio.wait_for(work, job.timeout) if job.timeout else await work
+        except asyncio.TimeoutError:
+            status, error = "timed_out", f"Exceeded {job.timeout:g}s"
+        except asyncio.CancelledError:
+            if not lost.is_set():
+                # The scheduler is stopping: give the lease back for another worker
+                await self._finish(job, trigger, started_at, clock, "cancelled", None, "Worker shutting down")
+                raise
+            status, error = "lease_lost", "Lease expired while running"
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            keeper.cancel()
+            self._running.pop(job.name, None)
+        await self._finish(job, trigger, started_at, clock, status, result, error)
+
+    async def _finish(self, job: Job, trigger: str, started_at: datetime, clock: float,
+                      status: str, result: Any, error: Optional[str]):
+        finished_at = _utcnow()
+        duration_ms = int((time.monotonic() - clock) * 1000)
+        self.stats[status] += 1
+        try:
+            released = await self.db[JOBS_COLLECTION].update_one(
+                {"_id": job.name, "lease_owner": self.owner},
+                {"$set": {
+                    # A cancelled run is picked up again right away by another worker
+                    "next_run_at": finished_at if status == "cancelled" else job.next_run(finished_at),
+                    "lease_owner": None,
+                    "lease_until": None,
+                    "running_since": None,
+                    "last_run_at": started_at,
+                    "last_finished_at": finished_at,
+                    "last_status": status,
+                    "last_duration_ms": duration_ms,
+                    "last_error": error,
+                 },
+                 "$inc": {"runs": 1, "failures": int(status != "succeeded")}}
+            )
+            if not released.matched_count:
+                logger.warning(f"Job {job.name} finished after losing its lease")
+            await self.db[RUNS_COLLECTION].insert_one({
+                "id": uuid.uuid4().hex,
+                "job": job.name,
+                "owner": self.owner,
+                "trigger": trigger,
+                "status": status,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "duration_ms": duration_ms,
+                "error": error,
+                "result": _summarize(result),
+                "expires_at": finished_at + timedelta(days=JOB_RUN_HISTORY_DAYS),
+            })
+        except Exception as e:
+            logger.error(f"Failed to record run of job {job.name}: {e}")
+        if status == "succeeded":
+            logger.debug(f"Job {job.name} finished in {duration_ms}ms")
+        else:
+            logger.warning(f"Job {job.name} {status} after {duration_ms}ms: {error}")
+
+    async def _loop(self):
+        # Spread the workers' polls over the interval
+        await asyncio.sleep(random.uniform(0, self.poll_seconds))
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                self.stats["tick_errors"] += 1
+                logger.error(f"Job scheduler tick failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self, db):
+        self.db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Job scheduler started with {len(self.jobs)} jobs as {self.owner}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "jobs": len(self.jobs),
+            "running_here": sorted(self._running),
+            **self.stats,
+        }
+
+
+# =============================================================================
+# JOB CONTROL (plain database operations, usable from any process)
+# =============================================================================
+
+def _public(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc = dict(doc)
+    doc["name"] = doc.pop("_id")
+    doc["running"] = bool(doc.get("lease_until") and _aware(doc["lease_until"]) > _utcnow())
+    return doc
+
+
+async def list_job_states(db) -> List[Dict[str, Any]]:
+    docs = await db[JOBS_COLLECTION].find({}).sort("_id", 1).to_list(500)
+    return [_public(doc) for doc in docs]
+
+
+async def get_job_state(db, name: str) -> Optional[Dict[str, Any]]:
+    doc = await db[JOBS_COLLECTION].find_one({"_id": name})
+    return _public(doc) if doc else None
+
+
+async def request_job_run(db, name: str) -> bool:
+    """Ask for a run on the next poll, even when the job is paused. False if unknown."""
+    result = await db[JOBS_COLLECTION].update_one(
+        {"_id": name}, {"$set": {"run_requested": True, "run_requested_at": _utcnow()}}
+    )
+    return result.matched_count > 0
+
+
+async def set_job_paused(db, name: str, paused: bool) -> bool:
+    """
+    Pause or resume scheduled runs. A run in progress finishes; a resumed job
+    that missed its time runs once, not once per missed slot. False if unknown.
+    """
+    result = await db[JOBS_COLLECTION].update_one(
+        {"_id": name}, {"$set": {"paused": paused, "paused_at": _utcnow() if paused else None}}
+    )
+    return result.matched_count > 0
+
+
+async def list_job_runs(db, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+    return await db[RUNS_COLLECTION].find({"job": name}, {"_id": 0}).sort("started_at", -1).to_list(limit)
+
+
+scheduler = JobScheduler()
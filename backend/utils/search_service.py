@@ -0,0 +1,320 @@
+"""
+Listing Search Service for Avida
+Pluggable full-text search behind one interface, replacing unanchored $regex scans.
+
+Backends:
+- MongoTextSearchBackend (default): weighted $text index, ranked by textScore
+- InMemorySearchBackend: in-process inverted index with BM25F scoring (tests/dev)
+
+Select with SEARCH_BACKEND=mongo|memory.
+"""
+
+import os
+import re
+import math
+import logging
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "mongo")
+
+# Field weights: a title hit counts far more than a description hit
+FIELD_WEIGHTS = {
+    "title": 10,
+    "subcategory": 4,
+    "category_id": 3,
+    "description": 1,
+}
+
+# Edge n-gram bounds for as-you-type title suggestions
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 12
+
+# Minimal stopword lists for the marketplace languages (EN/DE/SW)
+STOPWORDS = {
+    "en": {"a", "an", "and", "the", "for", "of", "in", "on", "with", "to", "at", "by", "or", "is", "new"},
+    "de": {"der", "die", "das", "und", "mit", "fur", "von", "im", "in", "ein", "eine", "zu", "auf", "oder", "neu"},
+    "sw": {"na", "ya", "wa", "kwa", "la", "za", "cha", "vya", "ni", "katika", "au", "mpya"},
+}
+ALL_STOPWORDS = set().union(*STOPWORDS.values())
+
+# Characters NFKD does not decompose
+_SPECIAL_FOLDS = str.maketrans({"ß": "ss", "ø": "o", "æ": "ae", "œ": "oe", "ł": "l", "đ": "d"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# =============================================================================
+# TEXT NORMALIZATION
+# =============================================================================
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip diacritics (Müller -> muller, Straße -> strasse)."""
+    if not text:
+        return ""
+    text = text.lower().translate(_SPECIAL_FOLDS)
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """Fold and split text into search tokens."""
+    tokens = _TOKEN_RE.findall(fold_text(text))
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in ALL_STOPWORDS] or tokens
+    return tokens
+
+
+def untokenized_filter(q: str) -> Dict[str, Any]:
+    """
+    Filter for a query with no searchable tokens. Text made only of
+    characters outside [a-z0-9] after folding (CJK, emoji) falls back to an
+    escaped substring match on the title instead of matching everything.
+    """
+    q = (q or "").strip()
+    return {"title": {"$regex": re.escape(q), "$options": "i"}} if q else {}
+
+
+def build_search_prefixes(title: str) -> List[str]:
+    """Edge n-grams of every title token, stored on the listing for suggestions."""
+    prefixes = set()
+    for token in tokenize(title, drop_stopwords=False):
+        for length in range(MIN_PREFIX_LENGTH, min(len(token), MAX_PREFIX_LENGTH) + 1):
+            prefixes.add(token[:length])
+    return sorted(prefixes)
+
+
+def search_fields_for(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived fields a listing document must carry for the search service."""
+    return {"search_prefixes": build_search_prefixes(listing.get("title") or "")}
+
+
+# =============================================================================
+# SERVICE INTERFACE
+# =============================================================================
+
+class SearchService:
+    """
+    Search interface used by /search, /search/suggestions and /listings?search=.
+    Backends only decide which listings match a query and how they rank;
+    callers keep building the rest of the Mongo filter as before.
+    """
+
+    name = "base"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def match_filter(self, q: str) -> Dict[str, Any]:
+        """Filter fragment restricting a listings query to documents matching `q`."""
+        raise NotImplementedError
+
+    async def ranked_search(
+        self,
+        base_filter: Dict[str, Any],
+        q: str,
+        projection: Dict[str, Any],
+        skip: int,
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (listings ordered by relevance, total matches)."""
+        raise NotImplementedError
+
+    async def suggest_titles(self, prefix: str, base_filter: Dict[str, Any], limit: int) -> List[str]:
+        """Listing titles that match the partially typed `prefix`."""
+        tokens = tokenize(prefix, drop_stopwords=False)
+        if not tokens:
+            return []
+        # Completed words must match exactly; the last word is still being typed
+        query = {**base_filter, "search_prefixes": {"$all": [t[:MAX_PREFIX_LENGTH] for t in tokens]}}
+        docs = await self.db.listings.find(query, {"_id": 0, "title": 1}).limit(limit).to_list(length=limit)
+        return [d["title"] for d in docs if d.get("title")]
+
+    def index_listing(self, listing: Dict[str, Any]) -> None:
+        """Notify the backend that a listing was created or changed."""
+
+    def remove_listing(self, listing_id: str) -> None:
+        """Notify the backend that a listing is gone or no longer searchable."""
+
+
+class MongoTextSearchBackend(SearchService):
+    """Default backend: the weighted idx_listings_text_search $text index."""
+
+    name = "mongo"
+
+    async def match_filter(self, q: str) -> Dict[str, Any]:
+        terms = " ".join(tokenize(q))
+        return {"$text": {"$search": terms}} if terms else untokenized_filter(q)
+
+    async def ranked_search(self, base_filter, q, projection, skip, limit):
+        text = await self.match_filter(q)
+        query = {**base_filter, **text}
+        total = await self.db.listings.count_documents(query)
+        if "$text" not in text:
+            docs = await self.db.listings.find(query, projection).sort(
+                [("boost_tier", -1), ("created_at", -1), ("id", -1)]
+            ).skip(skip).limit(limit).to_list(length=limit)
+            return docs, total
+
+        docs = await self.db.listings.find(
+            query, {**projection, "score": {"$meta": "textScore"}}
+        ).sort([
+            ("score", {"$meta": "textScore"}),
+            ("boost_tier", -1),
+            ("created_at", -1),
+        ]).skip(skip).limit(limit).to_list(length=limit)
+        for doc in docs:
+            doc.pop("score", None)
+        return docs, total
+
+
+class InMemorySearchBackend(SearchService):
+    """
+    In-process inverted index with BM25F scoring.
+    Intended for tests and small dev databases; call load() once at startup.
+    """
+
+    name = "memory"
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+    MAX_CANDIDATES = 1000
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)  # term -> {listing_id: weighted tf}
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+
+    async def load(self, batch_size: int = 1000) -> int:
+        """Build the index from all active listings."""
+        projection = {"_id": 0, "id": 1, "status": 1, **{f: 1 for f in FIELD_WEIGHTS}}
+        count = 0
+        async for listing in self.db.listings.find({"status": "active"}, projection).batch_size(batch_size):
+            self.index_listing(listing)
+            count += 1
+        logger.info(f"In-memory search index loaded with {count} listings")
+        return count
+
+    def index_listing(self, listing: Dict[str, Any]) -> None:
+        listing_id = listing.get("id")
+        if not listing_id:
+            return
+        self.remove_listing(listing_id)
+        if listing.get("status", "active") != "active":
+            return
+
+        weighted_tf: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(str(listing.get(field) or "")):
+                weighted_tf[token] += weight
+
+        for term, tf in weighted_tf.items():
+            self.postings[term][listing_id] = tf
+        self.doc_terms[listing_id] = list(weighted_tf)
+        self.doc_lengths[listing_id] = sum(weighted_tf.values())
+
+    def remove_listing(self, listing_id: str) -> None:
+        for term in self.doc_terms.pop(listing_id, []):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(listing_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.doc_lengths.pop(listing_id, None)
+
+    def score(self, q: str) -> List[Tuple[str, float]]:
+        """Rank listing ids for `q` by BM25F; every query term must match."""
+        terms = tokenize(q)
+        if not terms or not self.doc_lengths:
+            return []
+
+        n_docs = len(self.doc_lengths)
+        avg_len = sum(self.doc_lengths.values()) / n_docs
+        candidates: Optional[set] = None
+        for term in terms:
+            ids = set(self.postings.get(term, {}))
+            candidates = ids if candidates is None else candidates & ids
+        if not candidates:
+            return []
+
+        scores = {}
+        for listing_id in candidates:
+            length_norm = 1 - self.B + self.B * self.doc_lengths[listing_id] / avg_len
+            total = 0.0
+            for term in terms:
+                postings = self.postings[term]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                tf = postings[listing_id]
+                total += idf * tf * (self.K1 + 1) / (tf + self.K1 * length_norm)
+            scores[listing_id] = total
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    async def match_filter(self, q: str) -> Dict[str, Any]:
+        if not tokenize(q):
+            return untokenized_filter(q)
+        ranked = self.score(q)[:self.MAX_CANDIDATES]
+        return {"id": {"$in": [listing_id for listing_id, _ in ranked]}}
+
+    async def ranked_search(self, base_filter, q, projection, skip, limit):
+        if not tokenize(q):
+            query = {**base_filter, **untokenized_filter(q)}
+            total = await self.db.listings.count_documents(query)
+            docs = await self.db.listings.find(query, projection).sort(
+                [("boost_tier", -1), ("created_at", -1), ("id", -1)]
+            ).skip(skip).limit(limit).to_list(length=limit)
+            return docs, total
+        ranked = self.score(q)[:self.MAX_CANDIDATES]
+        order = {listing_id: i for i, (listing_id, _) in enumerate(ranked)}
+        query = {**base_filter, "id": {"$in": list(order)}}
+        docs = await self.db.listings.find(query, {**projection, "id": 1}).to_list(length=len(order))
+        docs.sort(key=lambda d: order.get(d.get("id"), len(order)))
+        return docs[skip:skip + limit], len(docs)
+
+
+# =============================================================================
+# SINGLETON
+# =============================================================================
+
+_search_service: Optional[SearchService] = None
+
+
+def get_search_service(db) -> SearchService:
+    """Get or create the configured search service."""
+    global _search_service
+    if _search_service is None:
+        if SEARCH_BACKEND == "memory":
+            _search_service = InMemorySearchBackend(db)
+        else:
+            _search_service = MongoTextSearchBackend(db)
+        logger.info(f"Search service initialized ({_search_service.name} backend)")
+    return _search_service
+
+
+async def backfill_search_prefixes(db, batch_size: int = 500) -> int:
+    """
+    Store search_prefixes on listings that predate the field.
+    Resumable: only touches documents still missing it.
+    """
+    from pymongo import UpdateOne
+
+    updated = 0
+    while True:
+        batch = await db.listings.find(
+            {"search_prefixes": {"$exists": False}},
+            {"_id": 1, "title": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        await db.listings.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": search_fields_for(doc)})
+            for doc in batch
+        ], ordered=False)
+        updated += len(batch)
+    if updated:
+        logger.info(f"Backfilled search_prefixes on {updated} listings")
+    return updated
+
@@ -0,0 +1,199 @@
+"""
+Session Resolution Cache for Avida
+Keeps authenticated requests from hitting user_sessions/users (and writing
+last_seen) on every call.
+
+- SessionCache: bounded TTL + LRU map of session token -> user document
+- LastSeenTracker: coalesces last_seen updates into periodic bulk_write flushes
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_MAX_ENTRIES = int(os.environ.get("SESSION_CACHE_MAX_ENTRIES", "10000"))
+SESSION_CACHE_TTL = int(os.environ.get("SESSION_CACHE_TTL", "30"))  # seconds
+LAST_SEEN_WRITE_INTERVAL = int(os.environ.get("LAST_SEEN_WRITE_INTERVAL", "60"))  # per user
+LAST_SEEN_FLUSH_INTERVAL = int(os.environ.get("LAST_SEEN_FLUSH_INTERVAL", "15"))
+
+
+class SessionCache:
+    """
+    Bounded TTL + LRU cache of resolved sessions.
+    Entries also expire with the session itself, whichever comes first.
+    """
+
+    def __init__(self, max_entries: int = SESSION_CACHE_MAX_ENTRIES, ttl: int = SESSION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # token -> (cache deadline, session expires_at, user document)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached user document for a session token, if still valid."""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        deadline, session_expires_at, user_doc = entry
+        if deadline <= time.monotonic() or (
+            session_expires_at and session_expires_at <= datetime.now(timezone.utc)
+        ):
+            self._remove(token)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user_doc
+
+    def put(self, token: str, user_doc: Dict[str, Any], session_expires_at: Optional[datetime] = None):
+        """Cache a resolved session."""
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (time.monotonic() + self.ttl, session_expires_at, user_doc)
+        self._tokens_by_user[user_doc["user_id"]].add(token)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_token(self, token: Optional[str]):
+        """Drop one session (logout, revoked session)."""
+        if token and token in self._entries:
+            self._remove(token)
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: Optional[str]):
+        """Drop every cached session of a user (password change, ban, profile edit)."""
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self._remove(token)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[2].get("user_id")
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class LastSeenTracker:
+    """
+    Coalesces last_seen writes: at most one write per user per
+    LAST_SEEN_WRITE_INTERVAL seconds, flushed in one bulk_write.
+    """
+
+    def __init__(
+        self,
+        write_interval: int = LAST_SEEN_WRITE_INTERVAL,
+        flush_interval: int = LAST_SEEN_FLUSH_INTERVAL
+    ):
+        self.write_interval = write_interval
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, datetime] = {}
+        self._last_written: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+        self.flushed_writes = 0
+        self.flushes = 0
+        self.coalesced = 0
+
+    def touch(self, user_id: str):
+        """Record activity; schedules a write only if the last one is old enough."""
+        now = time.monotonic()
+        last = self._last_written.get(user_id)
+        if user_id in self._pending or (last is not None and now - last < self.write_interval):
+            self.coalesced += 1
+            return
+        self._pending[user_id] = datetime.now(timezone.utc)
+        self._last_written[user_id] = now
+
+    async def flush(self) -> int:
+        """Write all pending last_seen values in one bulk_write."""
+        if not self._pending or self._db is None:
+            return 0
+        from pymongo import UpdateOne
+
+        pending, self._pending = self._pending, {}
+        try:
+            await self._db.users.bulk_write([
+                UpdateOne({"user_id": user_id}, {"$set": {"last_seen": seen_at}})
+                for user_id, seen_at in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.warning(f"last_seen flush failed ({len(pending)} users): {e}")
+            return 0
+
+        self.flushed_writes += len(pending)
+        self.flushes += 1
+
+        # Forget users whose write window has passed so the map stays bounded
+        cutoff = time.monotonic() - self.write_interval
+        self._last_written = {u: t for u, t in self._last_written.items() if t > cutoff}
+        return len(pending)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self, db):
+        self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"last_seen flusher started (every {self.flush_interval}s)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "flushed_writes": self.flushed_writes,
+            "flushes": self.flushes,
+            "coalesced_touches": self.coalesced,
+            "write_interval_seconds": self.write_interval,
+        }
+
+
+# Singleton instances
+session_cache = SessionCache()
+last_seen_tracker = LastSeenTracker()
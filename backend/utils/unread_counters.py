@@ -0,0 +1,84 @@
+"""
+Unread Message Counters for Avida
+One maintained total per user in db.user_unread_counts, so the unread badge
+is a single indexed read instead of a scan over the user's conversations:
+
+- adjust_unread applies the same delta as the conversation counter it mirrors
+  ($inc, atomic) and pushes the new total to the user's Socket.IO room
+- get_unread_count reads the total, recounting from conversations when the
+  document is missing or older than UNREAD_RECOUNT_SECONDS (heals drift from
+  writers that touch conversation counters directly)
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from utils.realtime import user_room
+
+logger = logging.getLogger(__name__)
+
+UNREAD_RECOUNT_SECONDS = int(os.environ.get("UNREAD_RECOUNT_SECONDS", "3600"))
+
+
+async def recount_unread(db, user_id: str) -> int:
+    """Sum the user's per-conversation counters and store the total."""
+    rows = await db.conversations.aggregate([
+        {"$match": {"$or": [{"buyer_id": user_id}, {"seller_id": user_id}]}},
+        {"$group": {"_id": None, "count": {"$sum": {
+            "$cond": [{"$eq": ["$buyer_id", user_id]}, {"$ifNull": ["$buyer_unread", 0]}, {"$ifNull": ["$seller_unread", 0]}]
+        }}}},
+    ]).to_list(1)
+    count = max(rows[0]["count"], 0) if rows else 0
+    now = datetime.now(timezone.utc)
+    await db.user_unread_counts.update_one(
+        {"user_id": user_id},
+        {"$set": {"messages": count, "recounted_at": now, "updated_at": now}},
+        upsert=True
+    )
+    return count
+
+
+async def get_unread_count(db, user_id: str) -> int:
+    doc = await db.user_unread_counts.find_one({"user_id": user_id}, {"_id": 0, "messages": 1, "recounted_at": 1})
+    recounted_at = (doc or {}).get("recounted_at")
+    if recounted_at is not None and recounted_at.tzinfo is None:
+        recounted_at = recounted_at.replace(tzinfo=timezone.utc)
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=UNREAD_RECOUNT_SECONDS)
+    if not doc or recounted_at is None or recounted_at < stale_before:
+        return await recount_unread(db, user_id)
+    return doc.get("messages", 0)
+
+
+async def publish_unread(sio, user_id: str, count: int):
+    if not sio:
+        return
+    try:
+        await sio.emit("unread_count", {"count": count}, room=user_room(user_id))
+    except Exception as e:
+        logger.warning(f"Failed to push unread count to {user_id}: {e}")
+
+
+async def adjust_unread(db, user_id: str, delta: int, sio=None) -> Optional[int]:
+    """
+    Apply `delta` to the user's total after the matching conversation counter
+    changed, then push the new total. Returns the total.
+    """
+    if not delta:
+        return None
+    doc = await db.user_unread_counts.find_one_and_update(
+        {"user_id": user_id},
+        {"$inc": {"messages": delta}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0, "messages": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    # No total yet (its first recount includes this change), or it drifted below zero
+    if doc is None or doc.get("messages", 0) < 0:
+        count = await recount_unread(db, user_id)
+    else:
+        count = doc["messages"]
+    await publish_unread(sio, user_id, count)
+    return count